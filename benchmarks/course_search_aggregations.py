@@ -0,0 +1,245 @@
+"""
+Benchmark the strategies available to compute the facets of course searches with a full text
+query, comparing "global" aggregations, which repeat the full text query in each of them, with
+aggregations scoped under the full text query, filters being applied with a post filter.
+
+The benchmark builds a synthetic index of courses, runs the same text searches with all
+facets using each strategy, checks that they return the same results and facet counts, and
+reports the time spent by Elasticsearch on each query.
+
+Usage (from the root of the project, with Elasticsearch up and running):
+
+    $ bin/run python benchmarks/course_search_aggregations.py --courses 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+SANDBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sandbox")
+
+WORDS = [
+    "artificial",
+    "biology",
+    "chemistry",
+    "data",
+    "economics",
+    "french",
+    "history",
+    "intelligence",
+    "learning",
+    "machine",
+    "management",
+    "physics",
+    "programming",
+    "psychology",
+    "statistics",
+]
+
+# Text searches, combined or not with filters, as sent by the search page
+QUERY_STRINGS = [
+    "query=learning",
+    "query=machine%20learning",
+    "query=data&languages=fr",
+    "query=history&availability=open",
+    "query=physics&organizations=105&subjects=3",
+    "query=programming&new=new&levels=12",
+]
+
+
+def setup_django():
+    """Configure Django with the settings of the sandbox."""
+    sys.path.insert(0, SANDBOX_PATH)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
+
+    import configurations  # pylint: disable=import-outside-toplevel
+
+    configurations.setup()
+
+
+def generate_course_runs(now, max_course_runs):
+    """Generate random course runs scattered around the current date."""
+    course_runs = []
+    for _ in range(random.randint(0, max_course_runs)):
+        start = now + timedelta(days=random.randint(-700, 300))
+        enrollment_start = start - timedelta(days=random.randint(0, 60))
+        course_runs.append(
+            {
+                "start": start,
+                "end": start + timedelta(days=random.randint(10, 120)),
+                "enrollment_start": enrollment_start,
+                "enrollment_end": enrollment_start
+                + timedelta(days=random.randint(10, 120)),
+                "languages": random.sample(["en", "fr", "de"], random.randint(1, 2)),
+            }
+        )
+    return sorted(course_runs, key=lambda course_run: now - course_run["end"])
+
+
+def generate_courses(index, count, max_course_runs):
+    """Generate the actions to index random course documents."""
+    # pylint: disable=import-outside-toplevel
+    from django.utils import timezone
+
+    from richie.apps.search.indexers.courses import CoursesIndexer
+
+    now = timezone.now()
+    for i in range(count):
+        yield {
+            "_id": str(i),
+            "_index": index,
+            "_op_type": "index",
+            "code": f"{i:06d}",
+            "is_listed": random.random() > 0.05,
+            "is_new": random.random() > 0.8,
+            "title": {"en": " ".join(random.sample(WORDS, 3))},
+            "description": {"en": " ".join(random.choices(WORDS, k=30))},
+            "categories": [str(random.randint(1, 30)) for _ in range(3)],
+            "organizations": [str(random.randint(100, 150))],
+            "persons": [str(random.randint(200, 400)) for _ in range(2)],
+            **CoursesIndexer.format_course_runs(
+                generate_course_runs(now, max_course_runs)
+            ),
+        }
+
+
+def get_body(query_string):
+    """Build the body of a search request the same way as the course viewset does."""
+    # pylint: disable=import-outside-toplevel
+    from django.http.request import QueryDict
+
+    from richie.apps.search.forms import CourseSearchForm
+
+    form = CourseSearchForm(data=QueryDict(query_string=query_string))
+    if not form.is_valid():
+        raise ValueError(form.errors)
+
+    _limit, _offset, query, aggs = form.build_es_query()
+    body = {
+        "query": query,
+        "aggs": aggs,
+        "script_fields": form.get_script_fields(),
+        "_source": False,
+        "size": 21,
+    }
+    post_filter = form.get_post_filter()
+    if post_filter:
+        body["post_filter"] = post_filter
+    return body
+
+
+def run_queries(index, strategy, repeat):
+    """
+    Run each text search with a strategy and return their durations and their responses,
+    stripped of what may vary between strategies.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.test.utils import override_settings
+
+    from richie.apps.search import ES_CLIENT
+
+    durations = []
+    responses = {}
+    with override_settings(RICHIE_SEARCH_AGGS_STRATEGY=strategy):
+        for _ in range(repeat):
+            for query_string in QUERY_STRINGS:
+                response = ES_CLIENT.search(
+                    index=index, body=get_body(query_string), request_cache=False
+                )
+                durations.append(response["took"])
+                responses[query_string] = (
+                    response["hits"]["total"],
+                    [hit["_id"] for hit in response["hits"]["hits"]],
+                    response["aggregations"]["all_courses"],
+                )
+    return durations, responses
+
+
+def format_durations(durations):
+    """Summarize a list of durations in milliseconds."""
+    durations = sorted(durations)
+    return (
+        f"median {statistics.median(durations):.0f}ms, "
+        f"p95 {durations[int(0.95 * (len(durations) - 1))]:.0f}ms, "
+        f"max {durations[-1]:.0f}ms"
+    )
+
+
+def main():
+    """Build the synthetic index, run the benchmark and clean up."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--courses", type=int, default=50000)
+    parser.add_argument("--max-course-runs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(args.seed)
+
+    # pylint: disable=import-outside-toplevel
+    from richie.apps.search import ES_CLIENT, ES_INDICES_CLIENT
+    from richie.apps.search.elasticsearch import bulk_compat
+    from richie.apps.search.filter_definitions import FILTERS
+    from richie.apps.search.forms import CourseSearchForm
+    from richie.apps.search.index_manager import create_index
+    from richie.apps.search.indexers.courses import CoursesIndexer
+
+    class BenchmarkCoursesIndexer(CoursesIndexer):
+        """Build the benchmark index next to the real indices, under another name."""
+
+        index_name = "richie_benchmark_courses"
+
+    # Compute facets on all values instead of the children of pages that may not exist
+    for filter_definition in FILTERS.values():
+        if hasattr(filter_definition, "reverse_id"):
+            filter_definition.reverse_id = None
+
+    index = create_index(BenchmarkCoursesIndexer)
+    try:
+        start = time.perf_counter()
+        bulk_compat(
+            actions=generate_courses(index, args.courses, args.max_course_runs),
+            chunk_size=1000,
+            client=ES_CLIENT,
+        )
+        ES_INDICES_CLIENT.refresh(index=index)
+        print(f"Indexed {args.courses:d} courses in {time.perf_counter() - start:.1f}s")
+
+        for script_id, script in CoursesIndexer.scripts.items():
+            ES_CLIENT.put_script(id=script_id, body=script)
+
+        results = {}
+        responses = {}
+        for strategy in [
+            CourseSearchForm.AGGS_GLOBAL,
+            CourseSearchForm.AGGS_POST_FILTER,
+        ]:
+            # Warm up to exclude script compilation and caches loading
+            run_queries(index, strategy, 3)
+            results[strategy], responses[strategy] = run_queries(
+                index, strategy, args.repeat
+            )
+            print(f"{strategy:>11s}: {format_durations(results[strategy]):s}")
+
+        for query_string in QUERY_STRINGS:
+            if (
+                responses[CourseSearchForm.AGGS_GLOBAL][query_string]
+                != responses[CourseSearchForm.AGGS_POST_FILTER][query_string]
+            ):
+                print(f"Results differ between strategies for: {query_string:s}")
+
+        speedup = statistics.median(results[CourseSearchForm.AGGS_GLOBAL]) / max(
+            statistics.median(results[CourseSearchForm.AGGS_POST_FILTER]), 1
+        )
+        print(f"Speedup: {speedup:.1f}x")
+    finally:
+        ES_INDICES_CLIENT.delete(index=index)
+
+
+if __name__ == "__main__":
+    main()
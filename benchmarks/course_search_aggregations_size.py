@@ -0,0 +1,169 @@
+"""
+Measure the size of the body of course search requests with the default filters
+configuration, and the time Elasticsearch spends parsing and running them on an empty index,
+comparing the current encoding of choice facets, one "filters" aggregation per filter with
+the clauses shared by all choices hoisted out, with the former encoding, one "filter"
+aggregation per choice, each repeating all the clauses of other filters.
+
+Usage (from the root of the project, with Elasticsearch up and running):
+
+    $ bin/run python benchmarks/course_search_aggregations_size.py
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+SANDBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sandbox")
+
+# Searches as sent by the search page, from the first visit to a combination of filters
+QUERY_STRINGS = [
+    "",
+    "availability=open",
+    "languages=fr&languages=en&availability=ongoing&subjects=1",
+    "query=learning",
+    "query=machine%20learning&languages=fr&organizations=105&new=new",
+]
+
+
+def setup_django():
+    """Configure Django with the settings of the sandbox."""
+    sys.path.insert(0, SANDBOX_PATH)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
+
+    import configurations  # pylint: disable=import-outside-toplevel
+
+    configurations.setup()
+
+
+def get_clauses(queries):
+    """Flatten the clauses of a list of query fragments."""
+    return [clause for kf_pair in queries for clause in kf_pair["fragment"]]
+
+
+def get_legacy_aggs(form, aggs):
+    """Rewrite the aggregations of choice filters with one "filter" aggregation per choice."""
+    # pylint: disable=import-outside-toplevel
+    from richie.apps.search.filter_definitions import FILTERS, NestingWrapper
+    from richie.apps.search.filter_definitions.mixins import ChoicesAggsMixin
+
+    queries = form.get_queries()
+    legacy_aggs = dict(aggs)
+    for filter_definition in FILTERS.values():
+        if isinstance(filter_definition, NestingWrapper):
+            stripped_queries = [
+                kf_pair
+                for kf_pair in queries
+                if kf_pair["key"] != filter_definition.name
+            ]
+            for child in filter_definition.filter_definitions.values():
+                del legacy_aggs[child.name]
+                for choice_key in child.get_fragment_map():
+                    nested_queries = filter_definition.get_query_fragment(
+                        {**form.cleaned_data, child.name: [choice_key]}
+                    )
+                    legacy_aggs[f"{child.name:s}@{choice_key:s}"] = {
+                        "filter": {
+                            "bool": {
+                                "must": get_clauses(stripped_queries + nested_queries)
+                            }
+                        }
+                    }
+        elif isinstance(filter_definition, ChoicesAggsMixin):
+            del legacy_aggs[filter_definition.name]
+            other_clauses = get_clauses(
+                kf_pair
+                for kf_pair in queries
+                if kf_pair["key"] is not filter_definition.name
+            )
+            for choice_key, fragment in filter_definition.get_fragment_map().items():
+                legacy_aggs[f"{filter_definition.name:s}@{choice_key:s}"] = {
+                    "filter": {"bool": {"must": fragment + other_clauses}}
+                }
+    return legacy_aggs
+
+
+def get_bodies(query_string):
+    """Build the body of a search request with the current and the legacy encoding."""
+    # pylint: disable=import-outside-toplevel
+    from django.http.request import QueryDict
+
+    from richie.apps.search.forms import CourseSearchForm
+
+    form = CourseSearchForm(data=QueryDict(query_string=query_string))
+    if not form.is_valid():
+        raise ValueError(form.errors)
+
+    _limit, _offset, query, aggs = form.build_es_query()
+    body = {
+        "query": query,
+        "aggs": aggs,
+        "script_fields": form.get_script_fields(),
+        "size": 0,
+    }
+    legacy_aggs = {
+        "all_courses": {
+            **aggs["all_courses"],
+            "aggregations": get_legacy_aggs(form, aggs["all_courses"]["aggregations"]),
+        }
+    }
+    return {"current": body, "legacy": {**body, "aggs": legacy_aggs}}
+
+
+def measure_took(index, body, repeat):
+    """Run a search several times and return the median time reported by Elasticsearch."""
+    # pylint: disable=import-outside-toplevel
+    from richie.apps.search import ES_CLIENT
+
+    durations = []
+    for _ in range(repeat):
+        response = ES_CLIENT.search(index=index, body=body, request_cache=False)
+        durations.append(response["took"])
+    return statistics.median(durations)
+
+
+def main():
+    """Create an empty index, measure each search with each encoding and clean up."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    # pylint: disable=import-outside-toplevel
+    from richie.apps.search import ES_CLIENT, ES_INDICES_CLIENT
+    from richie.apps.search.filter_definitions import FILTERS
+    from richie.apps.search.index_manager import create_index
+    from richie.apps.search.indexers.courses import CoursesIndexer
+
+    class BenchmarkCoursesIndexer(CoursesIndexer):
+        """Create the benchmark index next to the real indices, under another name."""
+
+        index_name = "richie_benchmark_courses"
+
+    # Compute facets on all values instead of the children of pages that may not exist
+    for filter_definition in FILTERS.values():
+        if hasattr(filter_definition, "reverse_id"):
+            filter_definition.reverse_id = None
+
+    index = create_index(BenchmarkCoursesIndexer)
+    try:
+        for script_id, script in CoursesIndexer.scripts.items():
+            ES_CLIENT.put_script(id=script_id, body=script)
+
+        for query_string in QUERY_STRINGS:
+            print(f"?{query_string:s}")
+            for encoding, body in get_bodies(query_string).items():
+                # Warm up to exclude script compilation
+                measure_took(index, body, 3)
+                size = len(json.dumps(body, default=str).encode("utf-8"))
+                took = measure_took(index, body, args.repeat)
+                print(f"{encoding:>9s}: {size / 1024:8.1f}kB, took {took:.0f}ms")
+    finally:
+        ES_INDICES_CLIENT.delete(index=index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure the time spent in Python to build the body of course search requests with the
+configured filters, from the validation of the querystring to the query and aggregations
+sent to Elasticsearch, for searches as sent by the search page.
+
+Elasticsearch is not needed: no request is sent.
+
+Usage (from the root of the project):
+
+    $ bin/run python benchmarks/course_search_request_building.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+SANDBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sandbox")
+
+# Searches as sent by the search page, from the first visit to a combination of filters
+QUERY_STRINGS = [
+    "",
+    "availability=open",
+    "languages=fr&languages=en&availability=ongoing&subjects=1",
+    "query=learning",
+    "query=machine%20learning&languages=fr&organizations=105&new=new",
+]
+
+
+def setup_django():
+    """Configure Django with the settings of the sandbox."""
+    sys.path.insert(0, SANDBOX_PATH)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
+
+    import configurations  # pylint: disable=import-outside-toplevel
+
+    configurations.setup()
+
+
+def build_request(query_string):
+    """Validate a querystring and build the body of the search the way the viewset does."""
+    # pylint: disable=import-outside-toplevel
+    from django.http.request import QueryDict
+
+    from richie.apps.search.forms import CourseSearchForm
+
+    form = CourseSearchForm(data=QueryDict(query_string=query_string))
+    if not form.is_valid():
+        raise ValueError(form.errors)
+
+    _limit, _offset, query, aggs = form.build_es_query()
+    return {
+        "query": query,
+        "aggs": aggs,
+        "script_fields": form.get_script_fields(),
+        "post_filter": form.get_post_filter(),
+    }
+
+
+def measure(query_string, repeat, number):
+    """Return the median time, in microseconds, to build a search request."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            build_request(query_string)
+        durations.append((time.perf_counter() - start) / number * 1e6)
+    return statistics.median(durations)
+
+
+def main():
+    """Build each search request repeatedly and report the median time spent."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+
+    # pylint: disable=import-outside-toplevel
+    from django.utils import translation
+
+    from richie.apps.search.filter_definitions import FILTERS, NestingWrapper
+
+    # Compute facets on all values instead of the children of pages that may not exist
+    filter_definitions = []
+    for filter_definition in FILTERS.values():
+        if isinstance(filter_definition, NestingWrapper):
+            filter_definitions.extend(filter_definition.filter_definitions.values())
+        else:
+            filter_definitions.append(filter_definition)
+        if hasattr(filter_definition, "reverse_id"):
+            filter_definition.reverse_id = None
+
+    print(f"{len(filter_definitions):d} filters configured")
+    translation.activate("en")
+    for query_string in QUERY_STRINGS:
+        # Warm up to exclude the costs paid once per process
+        build_request(query_string)
+        took = measure(query_string, args.repeat, args.number)
+        print(f"{took:8.0f}µs ?{query_string:s}")
+
+
+if __name__ == "__main__":
+    main()
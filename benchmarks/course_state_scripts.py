@@ -0,0 +1,212 @@
+"""
+Benchmark the stored scripts that compute the state of courses and rank them in search
+results, comparing the current scripts, which read the dates of course runs as epoch
+milliseconds, with the former scripts, which parsed them from their ISO 8601 strings.
+
+The benchmark builds a synthetic index of courses, runs the same ranked search with each
+version of the scripts and reports the time spent by Elasticsearch on each query.
+
+Usage (from the root of the project, with Elasticsearch up and running):
+
+    $ bin/run python benchmarks/course_state_scripts.py --courses 50000
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+SANDBOX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sandbox")
+LEGACY_SUFFIX = "_benchmark_legacy"
+
+# Parsing the dates of course runs was the way the scripts worked before their epoch
+# milliseconds siblings were indexed
+LEGACY_SCRIPT_PREFIX = """
+    DateTimeFormatter formatter = DateTimeFormatter.ofPattern(
+        "yyyy-MM-dd'T'HH:mm:ss[.SSSSSS]XXXXX"
+    );
+"""
+LEGACY_DATE_SUBSTITUTION = (
+    r"params\._source\.course_runs\[(\w+)\]\['(\w+)_ms'\]",
+    r"ZonedDateTime.parse(params._source.course_runs[\1]['\2'], formatter)"
+    r".toInstant().toEpochMilli()",
+)
+
+
+def setup_django():
+    """Configure Django with the settings of the sandbox."""
+    sys.path.insert(0, SANDBOX_PATH)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings")
+    os.environ.setdefault("DJANGO_CONFIGURATION", "Development")
+
+    import configurations  # pylint: disable=import-outside-toplevel
+
+    configurations.setup()
+
+
+def get_legacy_script(script):
+    """Rewrite a script so that it parses the dates of course runs."""
+    source = re.sub(*LEGACY_DATE_SUBSTITUTION, script["script"]["source"])
+    return {"script": {**script["script"], "source": LEGACY_SCRIPT_PREFIX + source}}
+
+
+def generate_course_runs(now, max_course_runs):
+    """Generate random course runs scattered around the current date."""
+    course_runs = []
+    for _ in range(random.randint(0, max_course_runs)):
+        start = now + timedelta(days=random.randint(-700, 300))
+        enrollment_start = start - timedelta(days=random.randint(0, 60))
+        course_runs.append(
+            {
+                "start": start,
+                "end": start + timedelta(days=random.randint(10, 120)),
+                "enrollment_start": enrollment_start,
+                "enrollment_end": enrollment_start
+                + timedelta(days=random.randint(10, 120)),
+                "languages": random.sample(["en", "fr", "de"], random.randint(1, 2)),
+            }
+        )
+    return sorted(course_runs, key=lambda course_run: now - course_run["end"])
+
+
+def generate_courses(index, count, max_course_runs):
+    """Generate the actions to index random course documents."""
+    # pylint: disable=import-outside-toplevel
+    from django.utils import timezone
+
+    from richie.apps.search.indexers.courses import CoursesIndexer
+
+    now = timezone.now()
+    for i in range(count):
+        yield {
+            "_id": str(i),
+            "_index": index,
+            "_op_type": "index",
+            "is_listed": True,
+            "title": {"en": f"Course {i:d}"},
+            "course_runs": [
+                CoursesIndexer.format_es_course_run(course_run)
+                for course_run in generate_course_runs(now, max_course_runs)
+            ],
+        }
+
+
+def run_queries(index, script_suffix, repeat):
+    """Run ranked searches with a version of the scripts and return their durations."""
+    # pylint: disable=import-outside-toplevel
+    import arrow
+
+    from richie.apps.search import ES_CLIENT
+
+    durations = []
+    for _ in range(repeat):
+        params = {
+            "languages": None,
+            "ms_since_epoch": arrow.utcnow().int_timestamp * 1000,
+            "states": None,
+        }
+        response = ES_CLIENT.search(
+            index=index,
+            body={
+                "query": {
+                    "function_score": {
+                        "query": {"bool": {"filter": {"term": {"is_listed": True}}}},
+                        "boost_mode": "replace",
+                        "script_score": {
+                            "script": {
+                                "id": f"score{script_suffix:s}",
+                                "params": params,
+                            }
+                        },
+                    }
+                },
+                "script_fields": {
+                    "state": {
+                        "script": {
+                            "id": f"state_field{script_suffix:s}",
+                            "params": params,
+                        }
+                    }
+                },
+                "_source": False,
+                "size": 21,
+            },
+            request_cache=False,
+        )
+        durations.append(response["took"])
+    return durations
+
+
+def format_durations(durations):
+    """Summarize a list of durations in milliseconds."""
+    durations = sorted(durations)
+    return (
+        f"median {statistics.median(durations):.0f}ms, "
+        f"p95 {durations[int(0.95 * (len(durations) - 1))]:.0f}ms, "
+        f"max {durations[-1]:.0f}ms"
+    )
+
+
+def main():
+    """Build the synthetic index, run the benchmark and clean up."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", 1)[0])
+    parser.add_argument("--courses", type=int, default=50000)
+    parser.add_argument("--max-course-runs", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(args.seed)
+
+    # pylint: disable=import-outside-toplevel
+    from richie.apps.search import ES_CLIENT, ES_INDICES_CLIENT
+    from richie.apps.search.elasticsearch import bulk_compat
+    from richie.apps.search.index_manager import create_index
+    from richie.apps.search.indexers.courses import CoursesIndexer
+
+    class BenchmarkCoursesIndexer(CoursesIndexer):
+        """Build the benchmark index next to the real indices, under another name."""
+
+        index_name = "richie_benchmark_courses"
+
+    index = create_index(BenchmarkCoursesIndexer)
+    try:
+        start = time.perf_counter()
+        bulk_compat(
+            actions=generate_courses(index, args.courses, args.max_course_runs),
+            chunk_size=1000,
+            client=ES_CLIENT,
+        )
+        ES_INDICES_CLIENT.refresh(index=index)
+        print(f"Indexed {args.courses:d} courses in {time.perf_counter() - start:.1f}s")
+
+        versions = {"current": "", "legacy": LEGACY_SUFFIX}
+        for script_id, script in CoursesIndexer.scripts.items():
+            ES_CLIENT.put_script(
+                id=f"{script_id:s}{LEGACY_SUFFIX:s}", body=get_legacy_script(script)
+            )
+            ES_CLIENT.put_script(id=script_id, body=script)
+
+        results = {}
+        for version, script_suffix in versions.items():
+            # Warm up to exclude script compilation and caches loading
+            run_queries(index, script_suffix, 3)
+            results[version] = run_queries(index, script_suffix, args.repeat)
+            print(f"{version:>8s}: {format_durations(results[version]):s}")
+
+        speedup = statistics.median(results["legacy"]) / max(
+            statistics.median(results["current"]), 1
+        )
+        print(f"Speedup: {speedup:.1f}x")
+    finally:
+        ES_INDICES_CLIENT.delete(index=index)
+        for script_id in CoursesIndexer.scripts:
+            ES_CLIENT.delete_script(id=f"{script_id:s}{LEGACY_SUFFIX:s}", ignore=404)
+
+
+if __name__ == "__main__":
+    main()
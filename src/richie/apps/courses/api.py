@@ -3,6 +3,7 @@ API endpoints for the courses app.
 """
 from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
 
 from cms import signals as cms_signals
 from cms.models import Page
@@ -145,7 +146,7 @@ def course_runs_sync(request, version):
                     draft_course_run__sync_mode=CourseRunSyncMode.SYNC_TO_PUBLIC,
                     draft_course_run=course_run,
                 )
-            ).update(**cleaned_data)
+            ).update(**cleaned_data, updated_on=timezone.now())
 
             public_course = course_run.direct_course.public_extension
             if course_run.sync_mode == CourseRunSyncMode.SYNC_TO_PUBLIC:
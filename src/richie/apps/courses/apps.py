@@ -0,0 +1,22 @@
+"""Signals to invalidate the rendered glimpses when pages are published."""
+from django.apps import AppConfig
+
+
+class CoursesConfig(AppConfig):
+    """Configuration class for the courses app."""
+
+    name = "richie.apps.courses"
+
+    # pylint: disable=import-outside-toplevel
+    def ready(self):
+        """Register signals to invalidate the rendered glimpses."""
+        from cms.signals import post_publish, post_unpublish
+
+        from .signals import on_page_publication_changed
+
+        post_publish.connect(
+            on_page_publication_changed, dispatch_uid="courses_glimpses_post_publish"
+        )
+        post_unpublish.connect(
+            on_page_publication_changed, dispatch_uid="courses_glimpses_post_unpublish"
+        )
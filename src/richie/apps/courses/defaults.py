@@ -347,3 +347,7 @@ EFFORT_UNITS = {
 # Maximum number of archived course runs displayed by default on course detail page.
 # The additional runs can be viewed by clicking on `View more` link.
 RICHIE_MAX_ARCHIVED_COURSE_RUNS = 10
+
+# Duration, in seconds, for which the rendering of the glimpses of public pages is cached.
+# Set `RICHIE_GLIMPSE_CACHE_TIMEOUT` to 0 to disable the cache.
+GLIMPSE_CACHE_TIMEOUT = 60 * 60
@@ -0,0 +1,95 @@
+"""
+Cache the rendering of glimpses: the same course, organization and person glimpses are
+rendered over and over on category, organization, person and program pages.
+
+A rendered glimpse is cached by public page, language, variant and publication version of
+its page. As a glimpse also displays information from other pages (e.g. the logo of the main
+organization of a course), all the glimpses are invalidated at once, each time a page is
+published or unpublished, by moving a generation number that is part of their keys.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.utils.translation import get_language
+
+from cms.toolbar.utils import get_toolbar_from_request
+
+from . import defaults
+
+GENERATION_CACHE_KEY = "richie:glimpses:generation"
+
+
+def get_glimpse_cache_timeout():
+    """Return the duration for which glimpses are cached, 0 if the cache is disabled."""
+    return getattr(
+        settings, "RICHIE_GLIMPSE_CACHE_TIMEOUT", defaults.GLIMPSE_CACHE_TIMEOUT
+    )
+
+
+def get_generation():
+    """
+    Get the current generation of cached glimpses. If it is missing from the cache, a fresh
+    value is stored so that glimpses cached before it was lost can't be revived.
+    """
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        # Another process may be doing the same, only the first value stored is kept
+        generation = time.time_ns()
+        cache.add(GENERATION_CACHE_KEY, generation, timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY, generation)
+    return generation
+
+
+def invalidate_glimpses():
+    """Invalidate all the rendered glimpses in all processes."""
+    try:
+        cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        # The generation is missing, the next glimpse rendered will store a fresh one
+        pass
+
+
+def get_glimpse_cache_key(request, page, variant, vary_on=()):
+    """
+    Return the key under which the glimpse of a page is cached, or None if the glimpse should
+    not be cached: the glimpses of draft pages and all glimpses rendered in edit mode are
+    always rendered again.
+
+    The values in `vary_on` are added to the key, they should include everything the glimpse
+    displays that does not come from a page (e.g. the state of a course that changes with
+    time).
+    """
+    if not get_glimpse_cache_timeout() or request is None or page is None:
+        return None
+
+    if page.publisher_is_draft or get_toolbar_from_request(request).edit_mode_active:
+        return None
+
+    return make_template_fragment_key(
+        f"richie.glimpse.{get_generation()}",
+        [
+            page.id,
+            get_language(),
+            variant,
+            page.changed_date.timestamp(),
+            *vary_on,
+        ],
+    )
+
+
+def render_glimpse(request, page, variant, vary_on, render):
+    """
+    Return the glimpse of a page from the cache or call `render` to render it, caching the
+    result if possible.
+    """
+    key = get_glimpse_cache_key(request, page, variant, vary_on)
+    if key is None:
+        return render()
+
+    content = cache.get(key)
+    if content is None:
+        content = render()
+        cache.set(key, content, get_glimpse_cache_timeout())
+    return content
@@ -0,0 +1,135 @@
+"""
+Pre-generate the thumbnails of the pictures displayed on courses, organizations, categories
+and persons.
+"""
+import logging
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django import db
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from djangocms_picture.models import Picture
+from filer.models import Image
+
+from richie.plugins.simple_picture.helpers import generate_picture_info, get_preset_name
+
+logger = logging.getLogger("richie.commands.courses.generate_thumbnails")
+
+# The presets in which the pictures found in each placeholder are formatted for the search
+# index, on top of the preset used to render them on pages, named after the placeholder
+PICTURE_PRESETS_BY_SLOT = {
+    "course_cover": ["cover"],
+    "icon": ["icon"],
+    "logo": ["logo"],
+    "portrait": ["portrait"],
+}
+
+
+def get_presets_by_image():
+    """
+    Look for the images of all the pictures found in the placeholders of course, organization,
+    category and person pages.
+
+    Pictures are rendered on pages in the preset named after their placeholder and indexed
+    in the presets listed in `PICTURE_PRESETS_BY_SLOT`. Names that are not configured in
+    settings fall back to the "default" preset.
+
+    Returns:
+    --------
+        Dict[int, List[str]]: a dictionary mapping the id of each image with the names of the
+            presets in which it is displayed.
+    """
+    presets_by_image = defaultdict(set)
+    for image_id, slot in (
+        Picture.objects.filter(
+            Q(cmsplugin_ptr__placeholder__page__course__isnull=False)
+            | Q(cmsplugin_ptr__placeholder__page__organization__isnull=False)
+            | Q(cmsplugin_ptr__placeholder__page__category__isnull=False)
+            | Q(cmsplugin_ptr__placeholder__page__person__isnull=False),
+            picture__isnull=False,
+        )
+        .values_list("picture_id", "cmsplugin_ptr__placeholder__slot")
+        .distinct()
+    ):
+        presets_by_image[image_id].update(
+            get_preset_name(preset_name)
+            for preset_name in [slot, *PICTURE_PRESETS_BY_SLOT.get(slot, [])]
+        )
+    return {image_id: sorted(presets) for image_id, presets in presets_by_image.items()}
+
+
+def generate_image_thumbnails(image_id, preset_names):
+    """
+    Generate the thumbnails of an image for a list of presets and cache its information for
+    each of them. This is run in a worker process by the command.
+    """
+    image = Image.objects.get(pk=image_id)
+    for preset_name in preset_names:
+        generate_picture_info(image, preset_name)
+    return len(preset_names)
+
+
+class Command(BaseCommand):
+    """
+    Render, in a pool of worker processes, all the thumbnails defined by the presets in which
+    the pictures of courses, organizations, categories and persons are displayed, so that
+    indexing or rendering pages only has to look up their urls in the cache.
+
+    This should be run after modifying the `RICHIE_SIMPLEPICTURE_PRESETS` setting and before
+    regenerating the search indices. The default cache must be shared between processes
+    (e.g. Redis) for the urls computed by the worker processes to be found later.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes generating thumbnails concurrently.",
+        )
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("The number of workers should be a positive integer.")
+
+        presets_by_image = get_presets_by_image()
+        logger.info(
+            "Generating the thumbnails of %d images with %d worker processes...",
+            len(presets_by_image),
+            options["workers"],
+        )
+
+        # Database connections can't be shared with forked processes: close them so each
+        # worker process opens its own
+        db.connections.close_all()
+
+        count = 0
+        with ProcessPoolExecutor(
+            max_workers=options["workers"],
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            futures = {
+                executor.submit(generate_image_thumbnails, image_id, preset_names): (
+                    image_id
+                )
+                for image_id, preset_names in presets_by_image.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    count += future.result()
+                except Exception as error:  # pylint: disable=broad-except
+                    # A broken image should not prevent generating the others
+                    logger.error(
+                        "Failed to generate the thumbnails of image %d: %s",
+                        futures[future],
+                        error,
+                    )
+
+        logger.info("Thumbnails generated for %d picture presets.", count)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.9 on 2021-11-22 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("courses", "0032_auto_20211004_1733"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="courserun",
+            name="updated_on",
+            field=models.DateTimeField(auto_now=True, verbose_name="updated on"),
+        ),
+    ]
@@ -2,23 +2,29 @@
 Declare and configure the models for the courses application
 """
 # pylint: disable=too-many-lines
+from collections import defaultdict
 from collections.abc import Mapping
 from datetime import MAXYEAR, datetime
+from functools import reduce
+from operator import or_
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models
-from django.db.models import Q, Sum
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Substr
+from django.db.models.query import ModelIterable
 from django.urls import reverse
-from django.utils import timezone
+from django.utils import timezone, translation
 from django.utils.functional import cached_property, lazy
 from django.utils.translation import gettext_lazy as _
 
 import pytz
 from cms.constants import PUBLISHER_STATE_DIRTY
 from cms.extensions.extension_pool import extension_pool
-from cms.models import Page, PagePermission
+from cms.models import Page, PagePermission, Title, TreeNode
 from cms.models.pluginmodel import CMSPlugin
+from cms.utils import get_current_site, i18n
 from filer.fields.image import FilerImageField
 from filer.models import FolderPermission
 from parler.models import TranslatableModel, TranslatedField, TranslatedFieldsModel
@@ -27,7 +33,12 @@ from ...core.defaults import ALL_LANGUAGES
 from ...core.fields.duration import CompositeDurationField
 from ...core.fields.multiselect import MultiSelectField
 from ...core.helpers import get_permissions
-from ...core.models import BasePageExtension, EsIdMixin
+from ...core.models import (
+    BasePageExtension,
+    EsIdMixin,
+    PageExtensionManager,
+    PageExtensionQuerySet,
+)
 from .. import defaults, utils
 from .category import Category, CategoryPluginModel
 from .organization import Organization, OrganizationPluginModel
@@ -135,6 +146,65 @@ class CourseState(Mapping):
         return self._d["priority"] < other["priority"]
 
 
+class CourseQuerySet(PageExtensionQuerySet):
+    """
+    Add to the queryset of page extensions the computation of the state of all the courses
+    it yields at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Record whether the state of courses should be computed when they are fetched."""
+        super().__init__(*args, **kwargs)
+        self._with_state = False
+
+    def _clone(self):
+        """Keep computing the state of courses on querysets derived from this one."""
+        clone = super()._clone()
+        # pylint: disable=protected-access
+        clone._with_state = self._with_state
+        return clone
+
+    def _fetch_all(self):
+        """Compute the state of the courses fetched, if requested, once they are fetched."""
+        is_fetched = self._result_cache is not None
+        super()._fetch_all()
+        if (
+            self._with_state
+            and not is_fetched
+            and issubclass(self._iterable_class, ModelIterable)
+        ):
+            Course.prefetch_states(self._result_cache)
+
+    def with_state(self):
+        """
+        Compute the state of all the courses when the queryset is evaluated, loading their
+        course runs in one query, instead of one query per course when their `state` is
+        accessed (see `Course.prefetch_states`).
+        """
+        clone = self._chain()
+        # pylint: disable=protected-access
+        clone._with_state = True
+        return clone
+
+
+class CourseManager(PageExtensionManager):
+    """
+    Add the bulk computation of course states to the manager of page extensions.
+    """
+
+    def get_queryset(self):
+        """
+        Use our custom queryset for courses.
+        """
+        return CourseQuerySet(self.model, using=self._db)
+
+    def with_state(self):
+        """
+        Make our custom method "with_state" available on the course manager.
+        """
+        return self.get_queryset().with_state()
+
+
 # pylint: disable=too-many-public-methods
 class Course(EsIdMixin, BasePageExtension):
     """
@@ -187,6 +257,8 @@ class Course(EsIdMixin, BasePageExtension):
 
     PAGE = defaults.COURSES_PAGE
 
+    objects = CourseManager()
+
     class Meta:
         db_table = "richie_course"
         verbose_name = _("course")
@@ -360,7 +432,15 @@ class Course(EsIdMixin, BasePageExtension):
         information to return the first one as the main organization. We assume that only one
         placeholder holds organization plugins and return the first organization in order of
         position in this placeholder.
+
+        It may have been loaded beforehand along with the main organization of other courses
+        (see `prefetch_main_organizations`).
         """
+        try:
+            return self.prefetched_main_organization
+        except AttributeError:
+            pass
+
         return (
             self.get_organizations()
             .order_by("extended_object__organization_plugins__cmsplugin_ptr__position")
@@ -465,30 +545,40 @@ class Course(EsIdMixin, BasePageExtension):
         ).order_by("-start")
 
     @cached_property
-    def course_runs_enrollment_count(self):
+    def course_runs_list(self):
         """
-        Returns a query that sum the enrollment count of each course run. They may be directly
-        related to the course or to a snapshot of the course.
+        Load, in one query, the course runs related to the course or to one of its snapshots,
+        ordered by descending start date like `course_runs`, along with their translations.
 
-        The draft and the public page have their own course runs. The course runs on the draft
-        page are copied to the public page when the course is published (for any language).
+        The course runs grouped by state, their enrollment count and the web analytics
+        dimensions displayed on the course page are all derived from this list.
         """
-        is_draft = self.extended_object.publisher_is_draft
-        node = self.extended_object.node
-        current_and_descendant_nodes = node.__class__.get_tree(parent=node)
+        course_runs = list(self.course_runs.prefetch_related("translations"))
+        for course_run in course_runs:
+            # Templates check whether each course run is related to a snapshot, spare them a
+            # query for the course runs directly related to the course
+            if course_run.direct_course_id == self.id:
+                course_run.direct_course = self
+        return course_runs
 
-        return CourseRun.objects.filter(
-            direct_course__extended_object__node__in=current_and_descendant_nodes,
-            direct_course__extended_object__publisher_is_draft=is_draft,
-        ).aggregate(sum=Sum("enrollment_count"))["sum"]
+    @cached_property
+    def course_runs_enrollment_count(self):
+        """
+        Returns the sum of the enrollment count of each course run, or None if the course has
+        no course runs. They may be directly related to the course or to a snapshot of the
+        course.
+        """
+        if not self.course_runs_list:
+            return None
+        return sum(course_run.enrollment_count for course_run in self.course_runs_list)
 
-    @property
+    @cached_property
     def course_runs_dict(self):
         """Returns a dict of course runs grouped by their state."""
         course_runs_dict = {
             i: [] for i in range(len(CourseState.STATE_CALLS_TO_ACTION))
         }
-        for run in self.course_runs:
+        for run in self.course_runs_list:
             course_runs_dict[run.state["priority"]].append(run)
 
         return dict(course_runs_dict)
@@ -585,20 +675,19 @@ class Course(EsIdMixin, BasePageExtension):
         """
         return self.get_reverse_related_page_extensions("program", language=language)
 
-    @property
-    def state(self):
+    @staticmethod
+    def get_best_state(course_runs_dates):
         """
-        The state of the course carrying information on what to display on a course glimpse.
-
-        The game is to find the highest priority state for this course among its course runs.
+        Find the highest priority state among course runs, each given as a tuple of its start,
+        end, enrollment start and enrollment end dates. Course runs are expected to be ordered
+        by descending start date so that the most recent one wins between states of the same
+        priority.
         """
         # The default state is for a course that has no course runs
         best_state = CourseState(CourseState.TO_BE_SCHEDULED)
 
-        for course_run in self.course_runs.only(
-            "start", "end", "enrollment_start", "enrollment_end"
-        ):
-            state = course_run.state
+        for dates in course_runs_dates:
+            state = CourseRun.compute_state(*dates)
             if state < best_state:
                 best_state = state
             if state["priority"] == CourseState.ONGOING_OPEN:
@@ -607,6 +696,172 @@ class Course(EsIdMixin, BasePageExtension):
 
         return best_state
 
+    @classmethod
+    def prefetch_states(cls, courses):
+        """
+        Compute the state of a list of courses, loading the course runs directly related to
+        each course or to one of its snapshots in one query, and attach it to each course so
+        that accessing their `state` property does not query the database.
+        """
+        courses = [course for course in courses if course is not None]
+        if not courses:
+            return
+
+        # Load the pages, and the nodes of pages, that were not fetched with the courses in
+        # one query each and attach them so they are also available to the caller
+        missing_pages = Page.objects.select_related("node").in_bulk(
+            {
+                course.extended_object_id
+                for course in courses
+                if not cls.extended_object.is_cached(course)
+            }
+        )
+        for course in courses:
+            if course.extended_object_id in missing_pages:
+                course.extended_object = missing_pages[course.extended_object_id]
+        missing_nodes = TreeNode.objects.in_bulk(
+            {
+                course.extended_object.node_id
+                for course in courses
+                if not Page.node.is_cached(course.extended_object)
+            }
+        )
+        for course in courses:
+            if course.extended_object.node_id in missing_nodes:
+                course.extended_object.node = missing_nodes[
+                    course.extended_object.node_id
+                ]
+
+        # Draft and public pages share the same node so we must also check the version
+        courses_by_node = defaultdict(list)
+        for course in courses:
+            page = course.extended_object
+            courses_by_node[page.node.path, page.publisher_is_draft].append(course)
+
+        course_runs_dates = defaultdict(list)
+        for path, is_draft, *dates in (
+            CourseRun.filter_by_course_nodes(courses_by_node)
+            .order_by("-start")
+            .values_list(
+                "direct_course__extended_object__node__path",
+                "direct_course__extended_object__publisher_is_draft",
+                "start",
+                "end",
+                "enrollment_start",
+                "enrollment_end",
+            )
+        ):
+            # A course run is related to the course of its page or of any ancestor page (it
+            # may be attached to a snapshot of the course)
+            for length in range(TreeNode.steplen, len(path) + 1, TreeNode.steplen):
+                for course in courses_by_node.get((path[:length], is_draft), []):
+                    course_runs_dates[course.id].append(dates)
+
+        for course in courses:
+            course.prefetched_state = cls.get_best_state(course_runs_dates[course.id])
+
+    @classmethod
+    def prefetch_main_organizations(cls, courses):
+        """
+        Load the main organization of a list of courses in two queries, applying the same
+        language fallbacks and publication rules as `get_main_organization`, and attach it to
+        each course so that calling `get_main_organization` does not query the database.
+        """
+        courses = [course for course in courses if course is not None]
+        if not courses:
+            return
+
+        current_language = translation.get_language()
+        site = get_current_site()
+        languages = [current_language] + i18n.get_fallback_languages(
+            current_language, site_id=site.pk
+        )
+
+        plugins_by_page = defaultdict(list)
+        for page_id, *plugin in OrganizationPluginModel.objects.filter(
+            cmsplugin_ptr__placeholder__page__in={
+                course.extended_object_id for course in courses
+            }
+        ).values_list(
+            "cmsplugin_ptr__placeholder__page",
+            "cmsplugin_ptr__language",
+            "page_id",
+            "cmsplugin_ptr__position",
+        ):
+            plugins_by_page[page_id].append(plugin)
+
+        organizations = (
+            Organization.objects.filter(
+                extended_object_id__in={
+                    target_id
+                    for plugins in plugins_by_page.values()
+                    for _language, target_id, _position in plugins
+                }
+            )
+            .select_related("extended_object")
+            .annotate(
+                is_published=Exists(
+                    Title.objects.filter(
+                        page=OuterRef("extended_object"), published=True
+                    )
+                )
+            )
+            .in_bulk(field_name="extended_object_id")
+        )
+
+        for course in courses:
+            plugins = plugins_by_page[course.extended_object_id]
+            existing_languages = {plugin_language for plugin_language, *_ in plugins}
+            relevant_languages = [
+                language for language in languages if language in existing_languages
+            ]
+            relevant_language = (
+                relevant_languages[0] if relevant_languages else current_language
+            )
+            candidates = [
+                (position, organizations[target_id])
+                for plugin_language, target_id, position in plugins
+                if plugin_language == relevant_language and target_id in organizations
+                # For a public course, we must filter out organizations that are not
+                # published in any language
+                and (
+                    course.extended_object.publisher_is_draft
+                    or organizations[target_id].is_published
+                )
+            ]
+            course.prefetched_main_organization = (
+                min(candidates, key=lambda candidate: candidate[0])[1]
+                if candidates
+                else None
+            )
+
+    @property
+    def state(self):
+        """
+        The state of the course carrying information on what to display on a course glimpse.
+
+        The game is to find the highest priority state for this course among its course runs.
+        It may have been computed beforehand along with the state of other courses (see
+        `prefetch_states`).
+        """
+        try:
+            return self.prefetched_state
+        except AttributeError:
+            pass
+
+        # Reuse the course runs if they were already loaded to display the course page
+        if "course_runs_list" in self.__dict__:
+            return self.get_best_state(
+                (run.start, run.end, run.enrollment_start, run.enrollment_end)
+                for run in self.course_runs_list
+            )
+
+        return self.get_best_state(
+            self.course_runs.values_list(
+                "start", "end", "enrollment_start", "enrollment_end"
+            )
+        )
+
     def copy_relations(self, oldinstance, language=None):
         """
         This method is called for 2 types of copying:
@@ -710,6 +965,7 @@ class CourseRun(TranslatableModel):
         blank=True,
         help_text=_("The number of enrolled students"),
     )
+    updated_on = models.DateTimeField(_("updated on"), auto_now=True)
 
     class Meta:
         db_table = "richie_course_run"
@@ -809,6 +1065,44 @@ class CourseRun(TranslatableModel):
                 )  # mark page dirty in all languages
         return super().delete(*args, **kwargs)
 
+    @classmethod
+    def filter_by_course_nodes(cls, nodes):
+        """
+        Batch counterpart of `Course.course_runs`: build a query yielding the course runs
+        directly related to a list of courses or to one of their snapshots, the courses being
+        given by the path of their node and the version of their page.
+
+        Descendants of a node share the beginning of its path, so course runs are matched on
+        the beginning of the path of the node of their course, with one `IN` clause for all
+        the courses at the same depth instead of one `LIKE` clause per course.
+        """
+        paths_by_length = defaultdict(set)
+        for path, is_draft in nodes:
+            paths_by_length[len(path), is_draft].add(path)
+        if not paths_by_length:
+            return cls.objects.none()
+
+        path_field = "direct_course__extended_object__node__path"
+        return cls.objects.annotate(
+            **{
+                f"course_path_{length:d}": Substr(path_field, 1, length)
+                for length, _is_draft in paths_by_length
+            }
+        ).filter(
+            reduce(
+                or_,
+                [
+                    Q(
+                        **{
+                            f"course_path_{length:d}__in": paths,
+                            "direct_course__extended_object__publisher_is_draft": is_draft,
+                        }
+                    )
+                    for (length, is_draft), paths in paths_by_length.items()
+                ],
+            )
+        )
+
     # pylint: disable=too-many-return-statements
     @staticmethod
     def compute_state(start, end, enrollment_start, enrollment_end):
@@ -0,0 +1,237 @@
+"""
+Helpers to load, in a handful of set-based queries, what is needed to render a list of
+glimpses or the placeholders of a page. They allow our templates to render a paginated list
+of courses, organizations or persons without issuing queries for each glimpse, and to look
+up the plugins of a page several times without querying the database each time.
+"""
+from collections import defaultdict
+
+from django.db.models import Exists, F, OuterRef, prefetch_related_objects
+
+from cms.models import CMSPlugin, Placeholder, Title
+from cms.models.titlemodels import EmptyTitle
+from cms.toolbar.utils import get_toolbar_from_request
+from cms.utils.i18n import get_language_list
+from cms.utils.plugins import assign_plugins, get_plugins
+from djangocms_picture.models import Picture
+
+from .models import Course
+
+
+def get_unique_pages(pages):
+    """Return a list of the pages that are not None, keeping only one instance per page."""
+    return list({page.id: page for page in pages if page is not None}.values())
+
+
+def prefetch_titles(pages):
+    """
+    Load the titles of a list of pages in one query and populate the title cache of each page
+    so that methods like `get_title` or `get_absolute_url` can be called without querying
+    the database.
+
+    DjangoCMS reloads the titles of a page each time a language that has no title is
+    requested, so we also cache an empty title for each missing language. It is falsy and
+    triggers the same language fallbacks as a missing title would.
+    """
+    pages = get_unique_pages(pages)
+    if not pages:
+        return
+
+    titles = defaultdict(dict)
+    for title in Title.objects.filter(page__in=pages):
+        titles[title.page_id][title.language] = title
+
+    languages = get_language_list()
+    for page in pages:
+        page.title_cache = titles[page.id]
+        for language in languages:
+            page.title_cache.setdefault(language, EmptyTitle(language=language))
+
+
+class PlaceholdersMemo:
+    """
+    The placeholders loaded during a request, by page id and slot, None meaning that the page
+    has no placeholder for this slot. We also keep track of the pages of which all the
+    placeholders were loaded.
+    """
+
+    def __init__(self):
+        self.placeholders = defaultdict(dict)
+        self.complete_page_ids = set()
+
+    def is_loaded(self, page, slot):
+        """Return True if the placeholder of a page for a slot is known."""
+        return slot in self.placeholders[page.id] or page.id in self.complete_page_ids
+
+    def add(self, page, placeholders, is_complete=False):
+        """
+        Record placeholders loaded for a page. Placeholders recorded earlier in the request are
+        kept along with the plugins that may already be assigned to them.
+
+        Returns the placeholders that were not known yet.
+        """
+        page_placeholders = self.placeholders[page.id]
+        added = []
+        for placeholder in placeholders:
+            if page_placeholders.get(placeholder.slot) is None:
+                placeholder.page = page
+                page_placeholders[placeholder.slot] = placeholder
+                added.append(placeholder)
+        if is_complete:
+            self.complete_page_ids.add(page.id)
+        return added
+
+
+def get_placeholders_memo(request):
+    """Return the memo of the placeholders loaded during a request, creating it if needed."""
+    try:
+        return request.richie_placeholders_memo
+    except AttributeError:
+        request.richie_placeholders_memo = PlaceholdersMemo()
+        return request.richie_placeholders_memo
+
+
+def prefetch_placeholders(request, pages, slots):
+    """
+    Load the placeholders identified by their slot on each page of a list of pages, along with
+    their plugins cast down to their concrete instances, and record them in the memo of the
+    request so that the `get_page_plugins` template tag can read them without querying the
+    database.
+
+    Plugins are assigned the way DjangoCMS does when rendering placeholders: in one query for
+    all the placeholders and one query per plugin type, applying the same language fallbacks.
+    """
+    # Plugins are selected according to the language and edit mode of the request
+    if request is None:
+        return
+
+    memo = get_placeholders_memo(request)
+    pages = [
+        page
+        for page in get_unique_pages(pages)
+        if not all(memo.is_loaded(page, slot) for slot in slots)
+    ]
+    if not pages:
+        return
+
+    placeholders = defaultdict(list)
+    # Reuse the join on pages to know on which page each placeholder was found
+    for placeholder in Placeholder.objects.filter(
+        page__in=pages, slot__in=slots
+    ).annotate(prefetch_page_id=F("page")):
+        placeholders[placeholder.prefetch_page_id].append(placeholder)
+
+    placeholders_by_template = defaultdict(list)
+    for page in pages:
+        placeholders_by_template[page.get_template()].extend(
+            memo.add(page, placeholders[page.id])
+        )
+        # Slots for which the page has no placeholder are recorded so that they are not
+        # looked up again
+        for slot in slots:
+            memo.placeholders[page.id].setdefault(slot, None)
+
+    pictures = []
+    for template, template_placeholders in placeholders_by_template.items():
+        assign_plugins(request, template_placeholders, template)
+        pictures.extend(
+            plugin
+            for placeholder in template_placeholders
+            for plugin in get_plugins(request, placeholder, template)
+            if isinstance(plugin, Picture)
+        )
+
+    # Covers, logos and portraits are displayed on glimpses, load their image all at once
+    prefetch_related_objects(pictures, "picture")
+
+
+def get_placeholder(request, page, slot):
+    """
+    Return the placeholder of a page for a slot, or None if the page has no placeholder for
+    this slot.
+
+    The first time a placeholder of a page is requested during a request, all the
+    placeholders of the page are loaded in one query and memoized. On the current page, we
+    share the placeholders that DjangoCMS loads, along with their plugins, to render the
+    `placeholder` template tags. On other pages, plugins are assigned to each placeholder the
+    first time they are requested and kept on the placeholder for the following lookups.
+    """
+    memo = get_placeholders_memo(request)
+    if not memo.is_loaded(page, slot):
+        current_page = getattr(request, "current_page", None)
+        if current_page is not None and page.pk == current_page.pk:
+            # pylint: disable=protected-access
+            renderer = get_toolbar_from_request(request).get_content_renderer()
+            if page.pk not in renderer._placeholders_by_page_cache:
+                renderer._preload_placeholders_for_page(page)
+            placeholders = renderer._placeholders_by_page_cache[page.pk].values()
+        else:
+            placeholders = page.placeholders.all()
+        memo.add(page, placeholders, is_complete=True)
+
+    return memo.placeholders[page.id].get(slot)
+
+
+def get_slots_with_plugins(page):
+    """
+    Return the slots of the placeholders of a page that contain plugins, in any language.
+    They are computed in one query and cached on the page for the following lookups.
+    """
+    try:
+        return page.slots_with_plugins
+    except AttributeError:
+        page.slots_with_plugins = set(
+            page.placeholders.filter(
+                Exists(CMSPlugin.objects.filter(placeholder=OuterRef("pk")))
+            ).values_list("slot", flat=True)
+        )
+        return page.slots_with_plugins
+
+
+def prefetch_course_glimpses(request, courses):
+    """
+    Load all that is displayed on the glimpses of a list of courses: their state, their cover
+    and icon, as well as their main organization with its logo.
+
+    Returns the courses as a list in the same order.
+    """
+    courses = list(courses)
+    Course.prefetch_states(courses)
+    Course.prefetch_main_organizations(courses)
+
+    course_pages = [course.extended_object for course in courses]
+    organization_pages = [
+        course.prefetched_main_organization.extended_object
+        for course in courses
+        if course.prefetched_main_organization
+    ]
+    prefetch_titles(course_pages + organization_pages)
+    prefetch_placeholders(request, course_pages, ["course_cover", "course_icons"])
+    prefetch_placeholders(request, organization_pages, ["logo"])
+    return courses
+
+
+def prefetch_organization_glimpses(request, organizations):
+    """
+    Load the titles, logo and description of a list of organizations to display their glimpse.
+
+    Returns the organizations as a list in the same order.
+    """
+    organizations = list(organizations)
+    pages = [organization.extended_object for organization in organizations]
+    prefetch_titles(pages)
+    prefetch_placeholders(request, pages, ["logo", "description"])
+    return organizations
+
+
+def prefetch_person_glimpses(request, persons):
+    """
+    Load the titles and portrait of a list of persons to display their glimpse.
+
+    Returns the persons as a list in the same order.
+    """
+    persons = list(persons)
+    pages = [person.extended_object for person in persons]
+    prefetch_titles(pages)
+    prefetch_placeholders(request, pages, ["portrait"])
+    return persons
@@ -0,0 +1,15 @@
+"""Invalidate the rendered glimpses each time a page is published or unpublished."""
+from django.db import transaction
+
+from .glimpse_cache import invalidate_glimpses
+
+
+# pylint: disable=unused-argument
+def on_page_publication_changed(sender, instance, language, **kwargs):
+    """
+    Invalidate the cached glimpses once the transaction is successful, so that they are not
+    cached again from the former content of the page in the meantime.
+
+    Synchronizing the course runs of a public course also sends the `post_publish` signal.
+    """
+    transaction.on_commit(invalidate_glimpses)
@@ -2,7 +2,6 @@
 import json
 
 from django import template
-from django.core.exceptions import ObjectDoesNotExist
 from django.template.defaultfilters import stringfilter
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -23,6 +22,7 @@ from cms.toolbar.utils import get_toolbar_from_request
 from cms.utils import get_site_id
 from cms.utils.plugins import get_plugins
 
+from .. import glimpse_cache, prefetch
 from ..lms import LMSHandler
 
 # pylint: disable=invalid-name
@@ -48,17 +48,19 @@ def get_plugins_render_tag(context, name, varname, nodelist, page_lookup=None):
         if not page:
             return ""
 
-        try:
-            placeholder = page.placeholders.get(slot=name)
-        except ObjectDoesNotExist:
+        # Placeholders and their plugins are loaded once per page and request, unless they
+        # were loaded beforehand along with those of other pages (see the
+        # `prefetch_*_glimpses` template tags)
+        placeholder = prefetch.get_placeholder(request, page, name)
+        if placeholder is None:
             return ""
-        else:
-            context[varname] = [
-                cms_plugin.get_plugin_instance()[0]
-                for cms_plugin in get_plugins(
-                    request, placeholder, template=page.get_template()
-                )
-            ]
+
+        context[varname] = [
+            cms_plugin.get_plugin_instance()[0]
+            for cms_plugin in get_plugins(
+                request, placeholder, template=page.get_template()
+            )
+        ]
 
         # Default content if there is no plugins in the placeholder
         if not context[varname] and nodelist:
@@ -205,15 +207,53 @@ class BlockPlugin(Tag):
         return internal_context["content"]
 
 
+@register.tag()
+class GlimpseCache(Tag):
+    """
+    Cache the rendering of the glimpse of a public page until a page is published or
+    unpublished eg:
+
+        {% glimpse_cache course_page course_variant course_state.priority %}
+            ...
+        {% endglimpse_cache %}
+
+    Keyword arguments:
+        page: the page of which the block renders the glimpse
+        variant: the variant of the glimpse
+        vary_on: optional values on which the rendering of the block depends and that do
+            not come from a page
+
+    The block is always rendered for draft pages or when the toolbar is in edit mode.
+    """
+
+    name = "glimpse_cache"
+    options = Options(
+        Argument("page"),
+        Argument("variant"),
+        MultiValueArgument("vary_on", required=False),
+        blocks=[("endglimpse_cache", "nodelist")],
+    )
+
+    # pylint: disable=arguments-differ,too-many-arguments
+    def render_tag(self, context, page, variant, vary_on, nodelist):
+        return glimpse_cache.render_glimpse(
+            context.get("request"),
+            page,
+            variant,
+            vary_on,
+            lambda: nodelist.render(context),
+        )
+
+
 @register.filter()
 def is_empty_placeholder(page, slot):
     """A template filter to determine if a placeholder is empty.
 
     This is useful when we don't want to include any wrapper markup in our template unless
-    the placeholder unless it actually contains plugins.
+    the placeholder unless it actually contains plugins. The slots containing plugins are
+    looked up once for all the placeholders of the page.
     """
-    placeholder = page.placeholders.get(slot=slot)
-    return not placeholder.cmsplugin_set.exists()
+    return slot not in prefetch.get_slots_with_plugins(page)
 
 
 @register.filter()
@@ -227,6 +267,41 @@ def order_by(queryset, args):
     return queryset.order_by(*args)
 
 
+@register.simple_tag(takes_context=True)
+def prefetch_course_glimpses(context, courses):
+    """A template tag to load all that is displayed on a list of course glimpses at once eg:
+
+        {% prefetch_course_glimpses page_obj.object_list as courses %}
+        {% for course in courses %}
+            {% include "courses/cms/fragment_course_glimpse.html" %}
+        {% endfor %}
+
+    This is useful to render a paginated list of courses with a handful of queries instead
+    of several queries per course.
+    """
+    return prefetch.prefetch_course_glimpses(context.get("request"), courses)
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_organization_glimpses(context, organizations):
+    """A template tag to load all that is displayed on a list of organization glimpses at once.
+
+    See `prefetch_course_glimpses` for an example of use.
+    """
+    return prefetch.prefetch_organization_glimpses(
+        context.get("request"), organizations
+    )
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_person_glimpses(context, persons):
+    """A template tag to load all that is displayed on a list of person glimpses at once.
+
+    See `prefetch_course_glimpses` for an example of use.
+    """
+    return prefetch.prefetch_person_glimpses(context.get("request"), persons)
+
+
 @register.filter()
 def has_connected_lms(course_run):
     """
@@ -0,0 +1,176 @@
+"""
+Send actions to Elasticsearch in bulk requests dispatched in parallel, retrying the actions
+rejected because the cluster is overloaded and reporting the failure of each action.
+"""
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from elasticsearch.exceptions import TransportError
+from elasticsearch.helpers import BulkIndexError, expand_action
+
+from .elasticsearch import DOC_TYPE
+
+# Status returned by Elasticsearch for requests rejected because it is overloaded
+TOO_MANY_REQUESTS = 429
+
+BulkResult = namedtuple("BulkResult", ["success", "failures"])
+
+# An action serialized for the bulk API along with what is needed to report its failure
+SerializedAction = namedtuple("SerializedAction", ["lines", "size", "op_type", "meta"])
+
+
+def serialize_actions(client, actions):
+    """
+    Serialize actions to the lines expected by the bulk API. A dummy type is added to the
+    actions to satisfy the requirement for ES6.
+    """
+    serializer = client.transport.serializer
+    is_es6 = client.__es_version__ == "6"
+    for action in actions:
+        action_line, data = expand_action(action)
+        ((op_type, meta),) = action_line.items()
+        if is_es6:
+            meta["_type"] = DOC_TYPE
+        lines = [serializer.dumps(action_line)]
+        if data is not None:
+            lines.append(serializer.dumps(data))
+        # Count one more byte for the new line following each line
+        size = sum(len(line.encode("utf-8")) + 1 for line in lines)
+        yield SerializedAction(lines, size, op_type, meta)
+
+
+def chunk_actions(serialized_actions, chunk_size, max_chunk_bytes):
+    """
+    Group serialized actions in chunks holding at most `chunk_size` actions and at most
+    `max_chunk_bytes` bytes. An action bigger than `max_chunk_bytes` is sent alone.
+    """
+    chunk, chunk_bytes = [], 0
+    for action in serialized_actions:
+        if chunk and (
+            len(chunk) >= chunk_size or chunk_bytes + action.size > max_chunk_bytes
+        ):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(action)
+        chunk_bytes += action.size
+    if chunk:
+        yield chunk
+
+
+def get_failure(action, status, error):
+    """Describe the failure of an action like Elasticsearch does in bulk responses."""
+    return {action.op_type: {**action.meta, "status": status, "error": error}}
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def send_chunk(client, chunk, max_retries, initial_backoff, max_backoff):
+    """
+    Send a chunk of actions in a bulk request. The actions rejected because Elasticsearch
+    is overloaded are sent again after an exponential backoff, up to `max_retries` times.
+
+    Returns:
+    --------
+        Tuple[int, List[Dict]]: the number of successful actions and the failure of each
+            action that could not be processed, as described in bulk responses.
+    """
+    success, failures = 0, []
+    for attempt in range(max_retries + 1):
+        body = "".join(f"{line:s}\n" for action in chunk for line in action.lines)
+        try:
+            response = client.bulk(body=body)
+        except TransportError as error:
+            if error.status_code != TOO_MANY_REQUESTS:
+                raise
+            rejected = [(action, error.status_code, error.error) for action in chunk]
+        else:
+            rejected = []
+            for action, item in zip(chunk, response["items"]):
+                ((_op_type, result),) = item.items()
+                status = result.get("status", 500)
+                if 200 <= status < 300:
+                    success += 1
+                elif status == TOO_MANY_REQUESTS:
+                    rejected.append((action, status, result.get("error")))
+                else:
+                    failures.append(get_failure(action, status, result.get("error")))
+
+        if not rejected or attempt == max_retries:
+            break
+
+        time.sleep(min(max_backoff, initial_backoff * 2 ** attempt))
+        chunk = [action for action, _status, _error in rejected]
+
+    failures.extend(
+        get_failure(action, status, error) for action, status, error in rejected
+    )
+    return success, failures
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def parallel_bulk(
+    client,
+    actions,
+    chunk_size,
+    max_chunk_bytes,
+    thread_count,
+    max_retries,
+    initial_backoff,
+    max_backoff,
+    raise_on_error=True,
+):
+    """
+    Send actions to Elasticsearch in chunks limited in number of actions and in bytes.
+    Chunks are sent concurrently by `thread_count` threads and no more chunks than threads
+    are prepared in advance, so that a generator of actions is consumed as the requests
+    are sent and not loaded in memory at once.
+
+    The order in which actions are processed is not guaranteed: several actions on the same
+    document should not be sent in the same call.
+
+    Returns:
+    --------
+        BulkResult: the number of successful actions and the failure of each action that
+            could not be processed, as described in bulk responses.
+
+    Raises:
+    -------
+        BulkIndexError: if any action failed and `raise_on_error` is True. The failures are
+            available on its `errors` attribute.
+    """
+    success, failures = 0, []
+
+    def collect(done):
+        nonlocal success
+        for future in done:
+            chunk_success, chunk_failures = future.result()
+            success += chunk_success
+            failures.extend(chunk_failures)
+
+    with ThreadPoolExecutor(max_workers=thread_count) as executor:
+        in_flight = set()
+        for chunk in chunk_actions(
+            serialize_actions(client, actions), chunk_size, max_chunk_bytes
+        ):
+            # Wait for a request to complete before preparing more chunks
+            if len(in_flight) >= thread_count:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            in_flight.add(
+                executor.submit(
+                    send_chunk,
+                    client,
+                    chunk,
+                    max_retries,
+                    initial_backoff,
+                    max_backoff,
+                )
+            )
+        collect(wait(in_flight).done)
+
+    if failures and raise_on_error:
+        raise BulkIndexError(
+            f"{len(failures):d} document(s) failed to index.", failures
+        )
+
+    return BulkResult(success, failures)
@@ -9,6 +9,68 @@ from django.utils.translation import gettext_lazy as _
 ES_CHUNK_SIZE = 500
 ES_PAGE_SIZE = 10
 
+# Bulk requests: maximum size of a request in bytes (on top of the number of actions set by
+# ES_CHUNK_SIZE), number of requests sent concurrently, and how many times and after how long
+# (in seconds, doubled after each attempt up to a maximum) actions rejected by an overloaded
+# cluster are retried
+ES_BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+ES_BULK_THREAD_COUNT = 4
+ES_BULK_MAX_RETRIES = 5
+ES_BULK_INITIAL_BACKOFF = 1
+ES_BULK_MAX_BACKOFF = 60
+
+# Queue of pending updates processed by the `process_search_queue` command: how many times
+# an entry is attempted before giving up and how long to wait before retrying it (in seconds,
+# doubled after each failed attempt)
+SEARCH_QUEUE_MAX_ATTEMPTS = 5
+SEARCH_QUEUE_RETRY_DELAY = 60
+
+# How the facets of course searches with a full text query are computed: "global" to count
+# all documents, repeating the full text query in each aggregation, or "post_filter" to count
+# the documents matching the full text query, which then only runs once (see
+# `CourseSearchForm.use_post_filter`). Both strategies return the same facet counts and rank
+# results the same way.
+SEARCH_AGGS_STRATEGY = "global"
+
+# Maximum number of names of indexed objects (in a given language) kept in the cache local to
+# each process to label facets, in front of the shared "search" cache
+I18N_NAMES_CACHE_SIZE = 2000
+
+# Responses of the course search endpoint can be cached in the "search" cache for this number
+# of seconds, the cache being disabled if it is not set
+SEARCH_RESPONSE_CACHE_TIMEOUT = None
+
+# Precision (in milliseconds) of the current time used to compute the state of courses in
+# searches: identical searches within the same bucket of time send identical queries so their
+# responses can be cached
+SEARCH_TIME_BUCKET = 1000
+
+# Course searches requesting both results and facets can run them as separate queries, sent
+# concurrently in a multi search request, so that facets can be cached on their own for this
+# number of seconds (not cached if it is not set). Facets depend on the current time so they
+# are only reused within the same bucket of time (see `SEARCH_TIME_BUCKET`).
+SEARCH_SEPARATE_FACETS = False
+SEARCH_FACETS_CACHE_TIMEOUT = None
+
+# Course searches paginated with a cursor can be tied to a point in time, kept alive for this
+# duration between pages (e.g. "1m"), so that results don't shift when courses change. This
+# requires Elasticsearch 7.10 or later.
+SEARCH_CURSOR_KEEP_ALIVE = None
+
+# Number of suggestions returned for each kind of object by the combined autocomplete
+# endpoint, which can be set for some kinds (e.g. {"courses": 10})
+SEARCH_AUTOCOMPLETE_SIZE = 5
+SEARCH_AUTOCOMPLETE_SIZES = {}
+
+# Suggestions for prefixes of up to this number of characters of the alphabet are precomputed
+# in the "search" cache after the indices are regenerated (0 to disable) and kept for this
+# number of seconds, suggestions for longer prefixes are kept in a LRU cache of this size
+# local to each process
+SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH = 2
+SEARCH_AUTOCOMPLETE_PRECOMPUTED_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+SEARCH_AUTOCOMPLETE_CACHE_TIMEOUT = 24 * 60 * 60
+SEARCH_AUTOCOMPLETE_CACHE_SIZE = 5000
+
 # Use a lazy to enable easier testing by not defining the value at bootstrap time
 ES_INDICES_PREFIX = lazy(lambda: settings.RICHIE_ES_INDICES_PREFIX)()
 
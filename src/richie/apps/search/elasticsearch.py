@@ -42,6 +42,19 @@ class ElasticsearchClientCompat7to6(Elasticsearch):
 
         return super().get(index=index, id=id, doc_type=DOC_TYPE)
 
+    def mget(self, body, index=None, params=None, **kwargs):
+        """
+        Patch the dummy doc type onto each document of multi document retrieval requests so
+        ES6 accepts the requests.
+        """
+        if self.__es_version__ == "6":
+            body = {
+                **body,
+                "docs": [{"_type": DOC_TYPE, **doc} for doc in body["docs"]],
+            }
+
+        return super().mget(body=body, index=index, params=params or {}, **kwargs)
+
     def search(self, body=None, index=None, params=None, **kwargs):
         """
         Patch the "value" & "relation" dict in place of the int returned by ES6 for
@@ -60,6 +73,34 @@ class ElasticsearchClientCompat7to6(Elasticsearch):
 
         return search_response
 
+    def msearch(self, body, index=None, params=None, **kwargs):
+        """
+        Patch the "value" & "relation" dict in place of the int returned by ES6 for the hits
+        total count of each search of multi search queries.
+        """
+        msearch_response = super().msearch(
+            body=body, index=index, params=params or {}, **kwargs
+        )
+
+        if self.__es_version__ == "6":
+            for search_response in msearch_response["responses"]:
+                if "hits" in search_response:
+                    search_response["hits"]["total"] = {
+                        "value": search_response["hits"]["total"],
+                        "relation": "eq",
+                    }
+
+        return msearch_response
+
+    def open_point_in_time(self, index, keep_alive):
+        """
+        Open a point in time on an index and return its id. The version of elasticsearch-py
+        we depend on predates this API, which requires Elasticsearch 7.10 or later.
+        """
+        return self.transport.perform_request(
+            "POST", f"/{index!s}/_pit", params={"keep_alive": keep_alive}
+        )["id"]
+
 
 class ElasticsearchIndicesClientCompat7to6(IndicesClient):
     """
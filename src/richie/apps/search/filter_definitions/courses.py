@@ -6,17 +6,17 @@ from django import forms
 from django.core.cache import caches
 from django.core.cache.backends.base import InvalidCacheBackendError
 from django.core.exceptions import ImproperlyConfigured
-from django.utils import timezone, translation
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
 from cms.api import Page
 
 from richie.apps.core.defaults import ALL_LANGUAGES_DICT
 
-from .. import ES_CLIENT
 from ..fields.array import ArrayField
 from ..indexers import ES_INDICES
-from ..utils.i18n import get_best_field_language
+from ..utils.i18n_names import get_i18n_names
 from .base import BaseChoicesFilterDefinition, BaseFilterDefinition
 from .helpers import applicable_facet_limit
 from .mixins import (
@@ -216,26 +216,12 @@ class IndexableFilterDefinition(TermsQueryMixin, BaseFilterDefinition):
         a list of indexed objects' ids.
         This covers the base case for terms e.g. other models in their own ElasticSearch index
         like organizations or categories.
+        Names are cached across requests (see `richie.apps.search.utils.i18n_names`) so only
+        the documents missing from the cache are fetched from ElasticSearch.
         """
-        language = translation.get_language()
-        indexer = getattr(ES_INDICES, self.term)
-
-        # Get just the documents we need from ElasticSearch
-        # pylint: disable=unexpected-keyword-arg
-        search_query_response = ES_CLIENT.search(
-            # We only need the titles to get the i18n names
-            _source=["title"],
-            index=indexer.index_name,
-            body={"query": {"terms": {"_id": keys}}},
-            size=len(keys),
-        )
-
         # Extract the best available language here to avoid handling these kinds of
         # implementation details in the ViewSet
-        return {
-            doc["_id"]: get_best_field_language(doc["_source"]["title"], language)
-            for doc in search_query_response["hits"]["hits"]
-        }
+        return get_i18n_names(getattr(ES_INDICES, self.term), keys)
 
     def get_static_definitions(self):
         """
@@ -253,17 +239,19 @@ class IndexableFilterDefinition(TermsQueryMixin, BaseFilterDefinition):
             }
         }
 
-    def get_faceted_definitions(self, facets, data, *args, **kwargs):
+    def get_key_count_map(self, facets, data):
         """
-        Build the filter definition's values from base definition and the faceted keys in the
-        current language.
-        Those provide us with the keys and counts that we just have to consume. They come from:
+        Convert the keys & counts from ElasticSearch facets to a dictionary of the counts by key
+        of the values that should be returned for this filter. They come from:
         - a bucket with the top facets in decreasing order of counts,
         - specific facets for values that were select in the querystring (we must force them
           because they may not be in the n top facet counts but we must make sure we keep it
           so that it remains available as an option so the user sees it and can unselect it)
 
-        We resort to the `get_i18n_names` method to get the internationalized human names.
+        Returns:
+        --------
+            Tuple[Dict[str, int], bool]: the counts by key and whether there are more values
+                than the ones returned.
         """
         # Convert the keys & counts from ElasticSearch facets to a more readily consumable format
         #   {
@@ -330,8 +318,31 @@ class IndexableFilterDefinition(TermsQueryMixin, BaseFilterDefinition):
             }
         )
 
+        return key_count_map, has_more_values
+
+    def get_i18n_names_lookups(self, facets, data):
+        """
+        The names of all the keys returned for this filter are looked for in the filter's index.
+        """
+        key_count_map, _has_more_values = self.get_key_count_map(facets, data)
+        return {getattr(ES_INDICES, self.term): [*key_count_map]}
+
+    def get_faceted_definitions(self, facets, data, *args, i18n_names=None, **kwargs):
+        """
+        Build the filter definition's values from base definition and the faceted keys in the
+        current language (see `get_key_count_map` for how keys are selected).
+
+        The internationalized human names are taken from `i18n_names` if they were fetched
+        beforehand along with the names needed by other filters (see `get_i18n_names_lookups`)
+        or we resort to the `get_i18n_names` method.
+        """
+        key_count_map, has_more_values = self.get_key_count_map(facets, data)
+
         # Get internationalized names for all our keys
-        key_i18n_name_map = self.get_i18n_names([*key_count_map])
+        if i18n_names is None:
+            key_i18n_name_map = self.get_i18n_names([*key_count_map])
+        else:
+            key_i18n_name_map = i18n_names[getattr(ES_INDICES, self.term)]
 
         # Add human names to keys and counts before sorting as some of our sortings
         # use alphabetical ordering.
@@ -476,19 +487,18 @@ class AvailabilityFilterDefinition(
 
     def get_fragment_map(self):
         """Return the hardcoded query fragments updated to the current datetime."""
+        now = timezone.now()
         return {
             self.OPEN: [
-                {"range": {"course_runs.enrollment_start": {"lte": timezone.now()}}},
-                {"range": {"course_runs.enrollment_end": {"gte": timezone.now()}}},
-            ],
-            self.COMING_SOON: [
-                {"range": {"course_runs.start": {"gte": timezone.now()}}}
+                {"range": {"course_runs.enrollment_start": {"lte": now}}},
+                {"range": {"course_runs.enrollment_end": {"gte": now}}},
             ],
+            self.COMING_SOON: [{"range": {"course_runs.start": {"gte": now}}}],
             self.ONGOING: [
-                {"range": {"course_runs.start": {"lte": timezone.now()}}},
-                {"range": {"course_runs.end": {"gte": timezone.now()}}},
+                {"range": {"course_runs.start": {"lte": now}}},
+                {"range": {"course_runs.end": {"gte": now}}},
             ],
-            self.ARCHIVED: [{"range": {"course_runs.end": {"lte": timezone.now()}}}],
+            self.ARCHIVED: [{"range": {"course_runs.end": {"lte": now}}}],
         }
 
 
@@ -505,9 +515,18 @@ class LanguagesFilterDefinition(
         """Return the language values defined in the project's settings."""
         return ALL_LANGUAGES_DICT
 
-    def get_fragment_map(self):
-        """Compute query fragments for each language defined in the project's settings."""
+    # pylint: disable=no-self-use
+    @cached_property
+    def fragment_map(self):
+        """
+        Compute query fragments for each language defined in the project's settings once, as
+        they never change while the application is running.
+        """
         return {
             language: [{"term": {"course_runs.languages": language}}]
             for language in ALL_LANGUAGES_DICT
         }
+
+    def get_fragment_map(self):
+        """Return the query fragments computed for each language."""
+        return self.fragment_map
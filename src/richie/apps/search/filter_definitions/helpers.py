@@ -1,5 +1,6 @@
 """Common helpers for different kinds of filter definitions."""
 from ..defaults import FACET_COUNTS_DEFAULT_LIMIT, FACET_COUNTS_MAX_LIMIT
+from ..utils.i18n_names import get_i18n_names_many
 
 
 def applicable_facet_limit(data, filter_name):
@@ -16,3 +17,26 @@ def applicable_facet_limit(data, filter_name):
         )
     except KeyError:
         return FACET_COUNTS_DEFAULT_LIMIT
+
+
+def get_faceted_definitions(filter_definitions, facets, data):
+    """
+    Build the faceted definitions of a list of filter definitions, fetching the names of the
+    indexed objects needed by all of them at once instead of one request per filter.
+    """
+    ids_by_indexer = {}
+    for filter_definition in filter_definitions:
+        for indexer, ids in filter_definition.get_i18n_names_lookups(
+            facets, data
+        ).items():
+            ids_by_indexer.setdefault(indexer, set()).update(ids)
+
+    i18n_names = get_i18n_names_many(ids_by_indexer)
+
+    return {
+        name: faceted_definition
+        for filter_definition in filter_definitions
+        for name, faceted_definition in filter_definition.get_faceted_definitions(
+            facets, data=data, i18n_names=i18n_names
+        ).items()
+    }
@@ -34,28 +34,40 @@ class ChoicesAggsMixin:
     # pylint: disable=unused-argument
     def get_aggs_fragment(self, queries, *args, **kwargs):
         """
-        Build the aggregations as a set of filters, one for each possible value of the field.
+        Build the aggregations as a multi-bucket "filters" aggregation, with one bucket for
+        each possible value of the field, under a filter aggregation that applies the query
+        fragments shared by all buckets.
         """
         return {
-            # Create a custom aggregation for each possible choice for this filter
-            # eg `availability@coming_soon` & `availability@current` & `availability@open`
-            f"{self.name:s}@{choice_key:s}": {
+            self.name: {
+                # Use all the query fragments from the queries *but* the one(s) that filter on
+                # the current filter: each bucket adds back the only one that is relevant to
+                # its choice.
                 "filter": {
                     "bool": {
-                        # Use all the query fragments from the queries *but* the one(s) that
-                        # filter on the current filter: we manually add back the only one that
-                        # is relevant to the current choice.
-                        "must": choice_fragment
-                        + [
+                        "must": [
                             clause
                             for kf_pair in queries
                             for clause in kf_pair["fragment"]
                             if kf_pair["key"] is not self.name
                         ]
                     }
-                }
+                },
+                # Create a bucket for each possible choice for this filter
+                # eg `coming_soon` & `current` & `open` for availability
+                "aggregations": {
+                    self.name: {
+                        "filters": {
+                            "filters": {
+                                choice_key: {"bool": {"must": choice_fragment}}
+                                for choice_key, choice_fragment in (
+                                    self.get_fragment_map().items()
+                                )
+                            }
+                        }
+                    }
+                },
             }
-            for choice_key, choice_fragment in self.get_fragment_map().items()
         }
 
 
@@ -105,31 +117,66 @@ class NestedChoicesAggsMixin:
                 }
             }
 
-        This can only be built by calling the parent NestingWrapper with customized filter data.
+        This is built like the parent NestingWrapper builds its nested query, with customized
+        filter data. The clauses of the other children don't depend on the choice so they are
+        built once, the clauses of each choice being inserted at the position of the current
+        filter. The query fragments on fields that are not nested (the nesting parent is
+        responsible for excluding the queries related to nested fields) are shared by all
+        choices so they are applied once by a filter aggregation wrapping a multi-bucket
+        "filters" aggregation.
         """
+        children_clauses = [
+            None
+            if filter_definition is self
+            else [
+                clause
+                for kf_pair in filter_definition.get_query_fragment(data)
+                for clause in kf_pair["fragment"]
+            ]
+            for filter_definition in parent.filter_definitions.values()
+        ]
+
+        def get_choice_query(choice_key):
+            """Build the nested query applying only the current choice on this field."""
+            choice_clauses = [
+                clause
+                for kf_pair in self.get_query_fragment({self.name: [choice_key]})
+                for clause in kf_pair["fragment"]
+            ]
+            return parent.get_nested_query(
+                [
+                    clause
+                    for clauses in children_clauses
+                    for clause in (choice_clauses if clauses is None else clauses)
+                ]
+            )
+
         return {
-            # Create a custom aggregation for each possible choice for this filter
-            # eg `availability@coming_soon` & `availability@current` & `availability@open`
-            f"{self.name:s}@{choice_key:s}": {
+            self.name: {
                 "filter": {
                     "bool": {
-                        # Use all the query fragments from the queries (the nesting parent is
-                        # responsible for excluding the queries related to nested fields so we
-                        # have to manually add them, making sure to apply on the current field
-                        # only the current choice.
                         "must": [
                             clause
-                            for kf_pair in (
-                                queries
-                                + parent.get_query_fragment(
-                                    # override data with only the current choice
-                                    {**data, self.name: [choice_key]}
-                                )
-                            )
+                            for kf_pair in queries
                             for clause in kf_pair["fragment"]
                         ]
                     }
-                }
+                },
+                # Create a bucket for each possible choice for this filter
+                # eg `coming_soon` & `current` & `open` for availability
+                "aggregations": {
+                    self.name: {
+                        "filters": {
+                            "filters": {
+                                # Apply the nested queries, making sure to apply on the
+                                # current field only the current choice
+                                choice_key: {
+                                    "bool": {"must": [get_choice_query(choice_key)]}
+                                }
+                                for choice_key in self.get_fragment_map()
+                            }
+                        }
+                    }
+                },
             }
-            for choice_key, choice_fragment in self.get_fragment_map().items()
         }
@@ -1,17 +1,24 @@
 """
 Validate and clean request parameters for our endpoints using Django forms
 """
-from functools import reduce
-
 from django import forms
 from django.conf import settings
+from django.core import signing
+from django.utils.functional import cached_property
 from django.utils.translation import get_language
 
 import arrow
 
 from richie.apps.courses.models import CourseState
 
-from .defaults import QUERY_ANALYZERS, RELATED_CONTENT_BOOST
+from .defaults import (
+    ES_STATE_WEIGHTS,
+    QUERY_ANALYZERS,
+    RELATED_CONTENT_BOOST,
+    SEARCH_AGGS_STRATEGY,
+    SEARCH_CURSOR_KEEP_ALIVE,
+    SEARCH_TIME_BUCKET,
+)
 from .filter_definitions import FILTERS, AvailabilityFilterDefinition
 
 # Instantiate filter fields for each filter defined in settings
@@ -42,6 +49,11 @@ FILTER_FIELDS = {
     for key, value in filter_definition.get_form_fields().items()
 }
 
+# Form fields are added to each form and the names of those expecting lists are looked up for
+# each parameter, they are extracted once instead of on each request
+FILTER_FORM_FIELDS = {key: value[0] for key, value in FILTER_FIELDS.items()}
+LIST_FILTER_FIELDS = frozenset(key for key, value in FILTER_FIELDS.items() if value[1])
+
 
 class SearchForm(forms.Form):
     """Validate the query string params in a search request."""
@@ -62,6 +74,11 @@ class CourseSearchForm(SearchForm):
     definitions and generate Elasticsearch queries.
     """
 
+    AGGS_GLOBAL, AGGS_POST_FILTER = "global", "post_filter"
+    CURSOR_SALT = "richie.apps.search.forms.CourseSearchForm.cursor"
+
+    cursor = forms.CharField(required=False)
+
     def __init__(self, *args, data=None, **kwargs):
         """
         Adapt the search form to handle filters:
@@ -74,7 +91,7 @@ class CourseSearchForm(SearchForm):
             {
                 k: data.getlist(k)
                 # Form fields are marked to expect lists as input or not as explained above
-                if (k in FILTER_FIELDS and FILTER_FIELDS[k][1] is True) else v[0]
+                if k in LIST_FILTER_FIELDS else v[0]
                 for k, v in data.lists()
             }
             if data
@@ -82,7 +99,7 @@ class CourseSearchForm(SearchForm):
         )
 
         super().__init__(data=data_fixed, *args, **kwargs)
-        self.fields.update({k: v[0] for k, v in FILTER_FIELDS.items()})
+        self.fields.update(FILTER_FORM_FIELDS)
         self.states = None
 
     def clean_availability(self):
@@ -111,6 +128,85 @@ class CourseSearchForm(SearchForm):
 
         return availabilities
 
+    def clean_cursor(self):
+        """
+        Decode the cursor returned with the previous page of results (see `encode_cursor`).
+        An empty cursor requests the first page.
+        """
+        cursor = self.cleaned_data.get("cursor")
+        if not cursor:
+            return None
+        try:
+            return signing.loads(cursor, salt=self.CURSOR_SALT)
+        except signing.BadSignature as error:
+            raise forms.ValidationError("Invalid cursor.") from error
+
+    def encode_cursor(self, search_after, pit_id=None):
+        """
+        Encode the sort values of the last result of a page, the point in time the search
+        is tied to if any and the time at which the state of courses was computed, in an
+        opaque cursor to request the next page.
+        """
+        return signing.dumps(
+            {
+                "search_after": search_after,
+                "pit_id": pit_id,
+                "ms_since_epoch": self.ms_since_epoch,
+            },
+            salt=self.CURSOR_SALT,
+            compress=True,
+        )
+
+    def use_cursor(self):
+        """
+        Whether results are paginated with a cursor instead of an offset. Cursor pagination
+        is requested by passing a `cursor` parameter, empty for the first page.
+        """
+        return "cursor" in self.data
+
+    @staticmethod
+    def get_cursor_keep_alive():
+        """
+        Return how long the point in time searches paginated with a cursor are tied to should
+        be kept alive between pages, or None if they are not tied to a point in time.
+        """
+        return getattr(
+            settings, "RICHIE_SEARCH_CURSOR_KEEP_ALIVE", SEARCH_CURSOR_KEEP_ALIVE
+        )
+
+    def get_cursor_sort(self):
+        """
+        Build the sort clause of searches paginated with a cursor: results are ranked as with
+        an offset, with a tiebreaker so that the sort values of each document are unique.
+        Searches tied to a point in time are tiebroken by Elasticsearch on `_shard_doc`, the
+        others on the `page_id` keyword field as sorting on `_id` loads it in memory.
+        """
+        sort = self.get_sort() or [{"_score": {"order": "desc"}}]
+        if self.get_cursor_keep_alive():
+            return sort
+        return sort + [{"page_id": {"order": "asc", "unmapped_type": "keyword"}}]
+
+    @cached_property
+    def ms_since_epoch(self):
+        """
+        The current time in milliseconds, as seen by the scripts that compute the state of
+        courses, rounded down to the `RICHIE_SEARCH_TIME_BUCKET` setting so that identical
+        searches made within the same bucket of time send identical queries and can be cached.
+
+        Pages following the first page of a search paginated with a cursor reuse the time of
+        the first page, so that courses are ranked the same way and the sort values of the
+        cursor still apply.
+        """
+        cursor = self.cleaned_data.get("cursor") or {}
+        if cursor.get("ms_since_epoch") is not None:
+            return cursor["ms_since_epoch"]
+
+        bucket = max(
+            getattr(settings, "RICHIE_SEARCH_TIME_BUCKET", SEARCH_TIME_BUCKET), 1
+        )
+        ms_since_epoch = arrow.utcnow().int_timestamp * 1000
+        return ms_since_epoch - ms_since_epoch % bucket
+
     def get_script_fields(self):
         """
         Build the part of the Elasticseach query that defines script fields ie fields that can not
@@ -129,13 +225,47 @@ class CourseSearchForm(SearchForm):
                     "id": "state_field",
                     "params": {
                         "languages": self.cleaned_data.get("languages") or None,
-                        "ms_since_epoch": arrow.utcnow().int_timestamp * 1000,
+                        "ms_since_epoch": self.ms_since_epoch,
                         "states": self.states,
                     },
                 }
             }
         }
 
+    def get_sort(self):
+        """
+        Build the sort clause of the Elasticsearch query when results can be ranked on the
+        state computed at indexing time (see `CoursesIndexer.get_es_state`) instead of being
+        scored by a script.
+
+        This is only possible when there is no full text query, whose relevance score is
+        blended with the state of courses, and no filter on languages or availability, which
+        change the course runs that are considered to compute the state of a course.
+
+        The indexed priority follows the order of course states. It ranks courses like the
+        script only if the weights configured in `RICHIE_ES_STATE_WEIGHTS` decrease in the
+        same order.
+
+        Returns:
+        --------
+            List[Dict] or None: the sort clause or None if results must be scored by script.
+        """
+        if (
+            self.cleaned_data.get("query")
+            or self.cleaned_data.get("languages")
+            or self.states is not None
+            or any(
+                weight <= next_weight
+                for weight, next_weight in zip(ES_STATE_WEIGHTS, ES_STATE_WEIGHTS[1:])
+            )
+        ):
+            return None
+
+        return [
+            {"state_priority": {"order": "asc", "unmapped_type": "integer"}},
+            {"state_rank": {"order": "asc", "unmapped_type": "long"}},
+        ]
+
     def get_queries(self):
         """
         Aggregate queries from each filter definition.
@@ -157,7 +287,7 @@ class CourseSearchForm(SearchForm):
 
         # Add the query fragments of each filter definition to the list of queries
         for filter_definition in FILTERS.values():
-            queries = queries + filter_definition.get_query_fragment(self.cleaned_data)
+            queries.extend(filter_definition.get_query_fragment(self.cleaned_data))
 
         # Full text search is a regular (multilingual) match query
         full_text = self.cleaned_data.get("query")
@@ -218,6 +348,46 @@ class CourseSearchForm(SearchForm):
 
         return queries
 
+    def use_post_filter(self):
+        """
+        Whether the aggregations should be computed on the documents matching the full text
+        query, the filters being applied to the results with a post filter, instead of being
+        computed on all documents with the full text query repeated in each aggregation.
+
+        This only makes a difference, and is only done if configured, when there is a full
+        text query: the aggregations then don't have to run this expensive query again.
+        """
+        return bool(
+            self.cleaned_data.get("query")
+            and getattr(settings, "RICHIE_SEARCH_AGGS_STRATEGY", SEARCH_AGGS_STRATEGY)
+            == self.AGGS_POST_FILTER
+        )
+
+    def get_post_filter(self):
+        """
+        Build the filter that applies to the results, but not to the aggregations, when they
+        are computed on the documents matching the full text query (see `use_post_filter`).
+
+        Returns:
+        --------
+            Dict or None: the raw Elasticsearch query to use as post filter or None if the
+                filters are part of the main query.
+        """
+        if not self.use_post_filter():
+            return None
+
+        return {
+            "bool": {
+                "filter": [{"term": {"is_listed": True}}]
+                + [
+                    clause
+                    for kf_pair in self.get_queries()
+                    if kf_pair["key"] != "query"
+                    for clause in kf_pair["fragment"]
+                ]
+            }
+        }
+
     def build_es_query(self):
         """
         Build the actual Elasticsearch search query and aggregation query from the fragments
@@ -239,53 +409,72 @@ class CourseSearchForm(SearchForm):
         # https://www.elastic.co/guide/en/elasticsearch/reference/current/query-dsl-bool-query.html
         queries = self.get_queries()
 
-        # Concatenate all the sub-queries lists together to form the queries list
-        query = {
-            "function_score": {
-                "query": {
-                    "bool": {
-                        # Always filter out courses that are not flagged for listing
-                        "filter": {"term": {"is_listed": True}},
-                        "must":
-                        # queries => map(pluck("fragment")) => flatten()
-                        [
-                            clause
-                            for kf_pair in queries
-                            for clause in kf_pair["fragment"]
-                        ],
-                    }
-                },
-                "boost_mode": "replace",
-                "script_score": {
-                    "script": {
-                        "id": "score",
-                        "params": {
-                            "languages": self.cleaned_data.get("languages") or None,
-                            "ms_since_epoch": arrow.utcnow().timestamp() * 1000,
-                            "states": self.states,
-                        },
-                    }
-                },
+        if self.use_post_filter():
+            # The main query is reduced to the full text query so that aggregations can be
+            # computed on its results, the filters being applied to results by the post filter
+            # (see `get_post_filter`) and to the aggregations of other filters.
+            text_queries = [kf_pair for kf_pair in queries if kf_pair["key"] == "query"]
+            queries = [kf_pair for kf_pair in queries if kf_pair["key"] != "query"]
+            query = {
+                "bool": {
+                    "must": [
+                        clause
+                        for kf_pair in text_queries
+                        for clause in kf_pair["fragment"]
+                    ],
+                    # Filters are kept as optional clauses: they don't restrict the documents
+                    # on which aggregations are computed but add to the score of the results
+                    # kept by the post filter as much as they do with global aggregations, so
+                    # that results are ranked the same by the score script.
+                    "should": [
+                        clause for kf_pair in queries for clause in kf_pair["fragment"]
+                    ],
+                }
+            }
+            # Aggregations are scoped under the main query instead of being global
+            aggs_scope = {"filter": {"match_all": {}}}
+        else:
+            # Concatenate all the sub-queries lists together to form the queries list
+            query = {
+                "bool": {
+                    # Always filter out courses that are not flagged for listing
+                    "filter": {"term": {"is_listed": True}},
+                    "must":
+                    # queries => map(pluck("fragment")) => flatten()
+                    [clause for kf_pair in queries for clause in kf_pair["fragment"]],
+                }
+            }
+            aggs_scope = {"global": {}}
+
+        # Results are sorted on fields computed at indexing time when possible, otherwise
+        # they are scored by a script that computes the state of each course
+        if self.get_sort() is None:
+            query = {
+                "function_score": {
+                    "query": query,
+                    "boost_mode": "replace",
+                    "script_score": {
+                        "script": {
+                            "id": "score",
+                            "params": {
+                                "languages": self.cleaned_data.get("languages") or None,
+                                "ms_since_epoch": self.ms_since_epoch,
+                                "states": self.states,
+                            },
+                        }
+                    },
+                }
             }
-        }
 
         # Concatenate our hardcoded filters query fragments with organizations and categories
-        # terms aggregations build on-the-fly
-        aggs = {
-            "all_courses": {
-                "global": {},
-                "aggregations": reduce(
-                    # Merge all the partial aggregations dicts together
-                    lambda acc, aggs_fragment: {**acc, **aggs_fragment},
-                    # Generate a partial aggregations dict (an aggs_fragment) for each filter
-                    [
-                        filter.get_aggs_fragment(queries, self.cleaned_data)
-                        for filter in FILTERS.values()
-                    ],
-                    {},
-                ),
-            }
-        }
+        # terms aggregations build on-the-fly: merge the partial aggregations dict (an
+        # aggs_fragment) generated for each filter in place
+        aggregations = {}
+        for filter_definition in FILTERS.values():
+            aggregations.update(
+                filter_definition.get_aggs_fragment(queries, self.cleaned_data)
+            )
+        aggs = {"all_courses": {**aggs_scope, "aggregations": aggregations}}
 
         return (
             self.cleaned_data.get("limit"),
@@ -1,30 +1,156 @@
 """
 ElasticSearch indices utilities.
 """
+import multiprocessing
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from functools import reduce
+from math import ceil
 
+from django import db
 from django.conf import settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from elasticsearch.exceptions import NotFoundError, RequestError
+from elasticsearch.helpers import BulkIndexError, scan
 
 from . import ES_CLIENT, ES_INDICES_CLIENT
-from .defaults import ES_CHUNK_SIZE, ES_INDICES_PREFIX
-from .elasticsearch import bulk_compat
+from .bulk import BulkResult, parallel_bulk
+from .defaults import (
+    ES_BULK_INITIAL_BACKOFF,
+    ES_BULK_MAX_BACKOFF,
+    ES_BULK_MAX_CHUNK_BYTES,
+    ES_BULK_MAX_RETRIES,
+    ES_BULK_THREAD_COUNT,
+    ES_CHUNK_SIZE,
+    ES_INDICES_PREFIX,
+)
 from .indexers import ES_INDICES
 from .text_indexing import ANALYSIS_SETTINGS
+from .utils.autocomplete import (
+    changes_suggestions,
+    invalidate_autocomplete,
+    precompute_autocomplete_prefixes,
+)
+from .utils.response_cache import invalidate_search_responses
+
+
+def get_bulk_options():
+    """Return the parameters of our bulk engine, as configured in settings."""
+    return {
+        "client": ES_CLIENT,
+        "chunk_size": getattr(settings, "RICHIE_ES_CHUNK_SIZE", ES_CHUNK_SIZE),
+        "max_chunk_bytes": getattr(
+            settings, "RICHIE_ES_BULK_MAX_CHUNK_BYTES", ES_BULK_MAX_CHUNK_BYTES
+        ),
+        "thread_count": getattr(
+            settings, "RICHIE_ES_BULK_THREAD_COUNT", ES_BULK_THREAD_COUNT
+        ),
+        "max_retries": getattr(
+            settings, "RICHIE_ES_BULK_MAX_RETRIES", ES_BULK_MAX_RETRIES
+        ),
+        "initial_backoff": getattr(
+            settings, "RICHIE_ES_BULK_INITIAL_BACKOFF", ES_BULK_INITIAL_BACKOFF
+        ),
+        "max_backoff": getattr(
+            settings, "RICHIE_ES_BULK_MAX_BACKOFF", ES_BULK_MAX_BACKOFF
+        ),
+    }
+
+
+def is_missing_course_document(failure):
+    """
+    Return True if a bulk failure is a partial update of a course whose document is missing
+    from the courses index.
+    """
+    ((op_type, details),) = failure.items()
+    error = details.get("error")
+    return (
+        op_type == "update"
+        and details.get("_index") == ES_INDICES.courses.index_name
+        and isinstance(error, dict)
+        and error.get("type") == "document_missing_exception"
+    )
 
 
 def richie_bulk(actions):
-    """Wrap bulk helper to set default parameters."""
-    return bulk_compat(
-        actions=actions,
-        chunk_size=getattr(settings, "RICHIE_ES_CHUNK_SIZE", ES_CHUNK_SIZE),
-        client=ES_CLIENT,
-        stats_only=True,
+    """
+    Wrap our bulk engine to set default parameters from settings (see `bulk.parallel_bulk`).
+
+    Partial updates of courses whose document is missing from the index (e.g. a course that
+    was published since the index was last updated) are retried as whole documents.
+
+    Returns a `BulkResult` holding the number of successful actions and the failure of
+    each action that could not be processed. A `BulkIndexError` is raised if any action
+    failed.
+    """
+    bulk_options = get_bulk_options()
+    success, failures = parallel_bulk(
+        actions=actions, raise_on_error=False, **bulk_options
     )
 
+    missing_ids = [
+        failure["update"]["_id"]
+        for failure in failures
+        if is_missing_course_document(failure)
+    ]
+    if missing_ids:
+        retry_success, retry_failures = parallel_bulk(
+            actions=ES_INDICES.courses.get_es_documents_for_ids(missing_ids),
+            raise_on_error=False,
+            **bulk_options,
+        )
+        success += retry_success
+        failures = [
+            failure for failure in failures if not is_missing_course_document(failure)
+        ] + retry_failures
+
+    if failures:
+        raise BulkIndexError(
+            f"{len(failures):d} document(s) failed to index.", failures
+        )
+    return BulkResult(success, failures)
+
+
+def refresh_live_indices(indices, suggestions_changed=True):
+    """
+    Make the changes sent to live indices visible: refresh the indices, then invalidate
+    cached search responses, so that responses cached after the invalidation can not be
+    computed on documents that are not searchable yet. Cached suggestions are only
+    invalidated if they may have changed, to keep the precomputed prefixes when only other
+    fields are updated.
+    """
+    try:
+        if indices:
+            ES_INDICES_CLIENT.refresh(index=",".join(sorted(indices)))
+    finally:
+        invalidate_search_responses()
+        if suggestions_changed:
+            invalidate_autocomplete()
+
+
+def bulk_live_indices(actions):
+    """
+    Send actions to the live indices in bulk (see `richie_bulk`) and make them visible
+    (see `refresh_live_indices`), even if some actions failed as other documents may have
+    been indexed.
+    """
+    indices = set()
+    suggestions_changed = False
+
+    def track_actions(actions):
+        nonlocal suggestions_changed
+        for action in actions:
+            indices.add(action["_index"])
+            suggestions_changed = suggestions_changed or changes_suggestions(action)
+            yield action
+
+    try:
+        return richie_bulk(track_actions(actions))
+    finally:
+        refresh_live_indices(indices, suggestions_changed)
+
 
 def get_indices_by_alias(existing_indices, alias):
     """
@@ -36,9 +162,9 @@ def get_indices_by_alias(existing_indices, alias):
             yield index, alias
 
 
-def perform_create_index(indexable, logger=None):
+def create_index(indexable, logger=None):
     """
-    Create a new index in ElasticSearch from an indexable instance
+    Create a new empty index in ElasticSearch from an indexable instance
     """
     # Create a new index name, suffixing its name with a timestamp
     new_index = f"{indexable.index_name:s}_{timezone.now():%Y-%m-%d-%Hh%Mm%S.%fs}"
@@ -55,18 +181,130 @@ def perform_create_index(indexable, logger=None):
 
     ES_INDICES_CLIENT.put_mapping(body=indexable.mapping, index=new_index)
 
+    # Return the name of the index we just created in ElasticSearch
+    return new_index
+
+
+def send_documents(indexable, documents, profiler=None):
+    """
+    Send the documents built by an indexable to ElasticSearch in bulk, measuring how they
+    are built and sent if a profiler is given (see `utils.profiling.IndexingProfiler`).
+    """
+    if profiler:
+        return profiler.run(indexable, documents, richie_bulk)
+    return richie_bulk(documents)
+
+
+def perform_create_index(indexable, logger=None, profiler=None):
+    """
+    Create a new index in ElasticSearch from an indexable instance
+    """
+    new_index = create_index(indexable, logger)
+
     # Populate the new index with data provided from our indexable class
-    richie_bulk(indexable.get_es_documents(new_index))
+    send_documents(indexable, indexable.get_es_documents(new_index), profiler)
 
     # Return the name of the index we just created in ElasticSearch
     return new_index
 
 
-def regenerate_indices(logger):
+def get_pk_ranges(indexable, count):
+    """
+    Split the objects indexed by an indexable in `count` ranges of primary keys holding
+    about the same number of objects, so that the index can be built by several processes.
+
+    Only indexables that expose the queryset of the objects they index and accept a
+    `pk_range` argument on their `get_es_documents` method can be split, like all Richie's
+    indexers. For the others, or if there is nothing to split, the only range returned is
+    `None` i.e. all objects.
+    """
+    if count < 2 or not hasattr(indexable, "get_queryset"):
+        return [None]
+
+    pks = list(indexable.get_queryset().order_by("pk").values_list("pk", flat=True))
+    if not pks:
+        return [None]
+
+    size = ceil(len(pks) / count)
+    return [
+        (pks[i], pks[min(i + size, len(pks)) - 1]) for i in range(0, len(pks), size)
+    ]
+
+
+def init_worker():
+    """
+    Make sure a worker process does not share the ElasticSearch connections it inherited
+    from its parent process with its siblings.
+    """
+    ES_CLIENT.transport.set_connections(ES_CLIENT.transport.hosts)
+
+
+def populate_index(indexable, index, pk_range=None):
+    """
+    Populate an index with the documents provided by an indexable, limited to a range of
+    primary keys if any. This is run in a worker process by `perform_create_indices`.
+    """
+    if pk_range:
+        return richie_bulk(indexable.get_es_documents(index, pk_range=pk_range))
+    return richie_bulk(indexable.get_es_documents(index))
+
+
+def perform_create_indices(indexables, workers, logger=None):
+    """
+    Create a new index in ElasticSearch for each indexable, populating them concurrently
+    in a pool of `workers` processes. The indexables that support it are split in ranges of
+    primary keys so their index is populated by several processes.
+
+    The new indices are all deleted if populating any of them failed.
+    """
+    new_indices = [create_index(indexable, logger) for indexable in indexables]
+
+    tasks = [
+        (indexable, new_index, pk_range)
+        for indexable, new_index in zip(indexables, new_indices)
+        for pk_range in get_pk_ranges(indexable, workers)
+    ]
+    if logger:
+        logger.info(
+            f"Populating {len(new_indices):d} indices in {len(tasks):d} slices "
+            f"with {workers:d} worker processes..."
+        )
+
+    # Database connections can't be shared with forked processes: close them so each
+    # worker process opens its own
+    db.connections.close_all()
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=init_worker,
+        ) as executor:
+            futures = [executor.submit(populate_index, *task) for task in tasks]
+            for future in as_completed(futures):
+                # Raise the exception of any slice that failed
+                future.result()
+    except Exception:
+        for new_index in new_indices:
+            # pylint: disable=unexpected-keyword-arg
+            ES_INDICES_CLIENT.delete(index=new_index, ignore=[400, 404])
+        raise
+
+    return new_indices
+
+
+def regenerate_indices(logger, workers=1, profiler=None):
     """
     Create new indices for our indexables and replace possible existing indices with
     a new one only once it has successfully built it.
+
+    With several `workers`, the new indices are populated concurrently by a pool of
+    processes and the aliases are only swapped once all of them are complete. Otherwise,
+    the population of each index can be measured by a `profiler`.
     """
+    # Documents changed after this point in time will be caught by the next delta update
+    watermark = timezone.now()
+
     # Get all existing indices once; we'll look up into this list many times
     try:
         existing_indices = ES_INDICES_CLIENT.get_alias("*")
@@ -76,9 +314,15 @@ def regenerate_indices(logger):
 
     # Create a new index for each of those modules
     # NB: we're mapping perform_create_index which produces side-effects
-    indices_to_create = zip(
-        list(map(lambda ix: perform_create_index(ix, logger), ES_INDICES)), ES_INDICES
-    )
+    if workers > 1:
+        new_indices = perform_create_indices(list(ES_INDICES), workers, logger)
+    else:
+        new_indices = list(
+            map(lambda ix: perform_create_index(ix, logger, profiler), ES_INDICES)
+        )
+    for new_index in new_indices:
+        set_watermark(new_index, watermark)
+    indices_to_create = zip(new_indices, ES_INDICES)
 
     # Prepare to alias them so they can be swapped-in for the previous versions
     actions_to_create_aliases = [
@@ -141,6 +385,9 @@ def regenerate_indices(logger):
                 raise exception
 
     perform_aliases_update()
+    # Searches now target the new indices
+    invalidate_search_responses()
+    invalidate_autocomplete()
 
     for useless_index in useless_indices:
         # Disable keyword arguments checking as elasticsearch-py uses a decorator to list
@@ -150,6 +397,126 @@ def regenerate_indices(logger):
         # pylint: disable=unexpected-keyword-arg
         ES_INDICES_CLIENT.delete(index=useless_index, ignore=[400, 404])
 
+    # Serve the most frequent autocomplete requests from the cache from now on
+    precompute_autocomplete_prefixes(logger)
+
+
+def get_watermark(index):
+    """
+    Get the watermark stored on an index (or the index behind an alias): the point in time
+    up to which changes to the database were reflected in the index. Return None if the index
+    does not exist or holds no watermark.
+    """
+    try:
+        mappings = ES_INDICES_CLIENT.get_mapping(index=index)
+    except NotFoundError:
+        return None
+
+    for details in mappings.values():
+        watermark = details["mappings"].get("_meta", {}).get("watermark")
+        return parse_datetime(watermark) if watermark else None
+    return None
+
+
+def set_watermark(index, watermark):
+    """Store a watermark in the metadata of an index (or the index behind an alias)."""
+    ES_INDICES_CLIENT.put_mapping(
+        body={"_meta": {"watermark": watermark.isoformat()}}, index=index
+    )
+
+
+def get_stale_document_ids(indexable, index):
+    """
+    Return the ids of the documents of an index whose object is not indexed anymore, e.g.
+    because its page was unpublished or deleted. Like in all Richie's indexers, documents
+    are expected to be identified by the id of the page of their object.
+    """
+    indexed_ids = {
+        str(page_id)
+        for page_id in indexable.get_queryset().values_list(
+            "extended_object_id", flat=True
+        )
+    }
+    return [
+        hit["_id"]
+        for hit in scan(
+            ES_CLIENT, index=index, query={"query": {"match_all": {}}}, _source=False
+        )
+        if hit["_id"] not in indexed_ids
+    ]
+
+
+def delete_stale_documents(indexable, index, logger=None):
+    """
+    Delete from an index the documents whose object is not indexed anymore (see
+    `get_stale_document_ids`).
+    """
+    stale_ids = get_stale_document_ids(indexable, index)
+    if not stale_ids:
+        return
+    if logger:
+        logger.info(
+            f"Deleting {len(stale_ids):d} documents that are not indexed anymore "
+            f'from "{index:s}"...'
+        )
+    richie_bulk(
+        [{"_op_type": "delete", "_index": index, "_id": es_id} for es_id in stale_ids]
+    )
+
+
+def update_indices(logger=None, since=None, profiler=None):
+    """
+    Update the live indices with the documents of the objects that changed after a date,
+    instead of recreating them from scratch. The documents of objects that are not indexed
+    anymore, whenever they left the index, are deleted.
+
+    The date is `since` if it is given, or else the watermark stored on each index by its
+    last full regeneration or update. The watermark is then moved to the time the update
+    started. The update of each index can be measured by a `profiler`.
+
+    The updated indices are made visible once at the end (see `refresh_live_indices`).
+    """
+    updated_indices = set()
+    try:
+        for indexable in ES_INDICES:
+            alias = indexable.index_name
+            if not hasattr(indexable, "get_queryset"):
+                if logger:
+                    logger.info(f'Skipping "{alias:s}" that does not support updates.')
+                continue
+
+            if not ES_INDICES_CLIENT.exists_alias(name=alias):
+                if logger:
+                    logger.info(f'Skipping "{alias:s}" that does not exist yet.')
+                continue
+
+            changed_since = since or get_watermark(alias)
+            if not changed_since:
+                if logger:
+                    logger.info(f'Skipping "{alias:s}" that holds no watermark.')
+                continue
+
+            # Documents changed after this point in time will be caught by the next update
+            watermark = timezone.now()
+            updated_indices.add(alias)
+
+            if logger:
+                logger.info(
+                    f'Updating "{alias:s}" with the documents changed since '
+                    f"{changed_since.isoformat():s}..."
+                )
+            send_documents(
+                indexable,
+                indexable.get_es_documents(index=alias, since=changed_since),
+                profiler,
+            )
+
+            delete_stale_documents(indexable, alias, logger)
+            set_watermark(alias, watermark)
+    finally:
+        if updated_indices:
+            refresh_live_indices(updated_indices)
+
 
 def store_es_scripts(logger=None):
     """
@@ -17,7 +17,7 @@ from ..defaults import ES_INDICES_PREFIX
 from ..forms import ItemSearchForm
 from ..text_indexing import MULTILINGUAL_TEXT
 from ..utils.i18n import get_best_field_language
-from ..utils.indexers import slice_string_for_completion
+from ..utils.indexers import get_page_changed_clause, slice_string_for_completion
 
 
 class CategoriesIndexer:
@@ -148,20 +148,33 @@ class CategoriesIndexer:
         }
 
     @classmethod
-    def get_es_documents(cls, index=None, action="index"):
+    def get_queryset(cls, since=None):
         """
-        Loop on all the categories in database and format them for the ElasticSearch index
+        Return the queryset of the categories that should be indexed, limited to those
+        that changed after a date if `since` is given.
+        """
+        categories = Category.objects.filter(
+            extended_object__publisher_is_draft=False,
+            extended_object__title_set__published=True,
+        )
+        if since:
+            categories = categories.filter(get_page_changed_clause(since))
+        return categories.distinct()
+
+    @classmethod
+    def get_es_documents(cls, index=None, action="index", pk_range=None, since=None):
+        """
+        Loop on all the categories in database and format them for the ElasticSearch index.
+        They can be limited to a range of primary keys (bounds included) with `pk_range`
+        or to those that changed after a date with `since`.
         """
         index = index or cls.index_name
 
-        for category in (
-            Category.objects.filter(
-                extended_object__publisher_is_draft=False,
-                extended_object__title_set__published=True,
-            )
-            .distinct()
-            .iterator()
-        ):
+        categories = cls.get_queryset(since=since)
+        if pk_range:
+            categories = categories.filter(pk__range=pk_range)
+
+        for category in categories.iterator():
             yield cls.get_es_document_for_category(category, index=index, action=action)
 
     @staticmethod
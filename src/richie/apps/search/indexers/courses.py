@@ -1,33 +1,67 @@
 """
 ElasticSearch course document management utilities
 """
+# pylint: disable=too-many-lines
 from collections import defaultdict
 from datetime import datetime
-from functools import reduce
+from itertools import islice
+from operator import itemgetter
 
 from django.conf import settings
-from django.db.models import Prefetch
-from django.utils import translation
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.utils import timezone, translation
 
 from cms.models import Title
 from djangocms_picture.models import Picture
+from elasticsearch.helpers import scan
 
 from richie.apps.search.indexers.organizations import OrganizationsIndexer
 from richie.plugins.plain_text.models import PlainText
 from richie.plugins.simple_picture.helpers import get_picture_info
 from richie.plugins.simple_text_ckeditor.models import SimpleText
 
-from ...courses.models import MAX_DATE, CategoryPluginModel, Course, CourseState
-from ..defaults import ES_INDICES_PREFIX, ES_STATE_WEIGHTS
+from ...courses.models import (
+    MAX_DATE,
+    Category,
+    CategoryPluginModel,
+    Course,
+    CourseRun,
+    CourseState,
+    Organization,
+    OrganizationPluginModel,
+    Person,
+    PersonPluginModel,
+)
+from .. import ES_CLIENT
+from ..defaults import ES_CHUNK_SIZE, ES_INDICES_PREFIX, ES_STATE_WEIGHTS
 from ..forms import CourseSearchForm
 from ..text_indexing import MULTILINGUAL_TEXT
+from ..utils import prefetch
 from ..utils.i18n import get_best_field_language
-from ..utils.indexers import slice_string_for_completion
+from ..utils.indexers import (
+    get_epoch_milliseconds,
+    get_page_changed_clause,
+    slice_string_for_completion,
+)
 
+COURSE_RUN_FIELDS = ["start", "end", "enrollment_start", "enrollment_end", "languages"]
+COURSE_RUN_DATE_FIELDS = ["start", "end", "enrollment_start", "enrollment_end"]
+MAX_DATE_MS = get_epoch_milliseconds(MAX_DATE)
+
+# The date of the best course run that ranks a course among the courses in the same state
+STATE_DATE_FIELDS = {
+    CourseState.ONGOING_OPEN: "enrollment_end",
+    CourseState.FUTURE_OPEN: "start",
+    CourseState.ARCHIVED_OPEN: "enrollment_end",
+    CourseState.FUTURE_NOT_YET_OPEN: "start",
+    CourseState.FUTURE_CLOSED: "start",
+    CourseState.ONGOING_CLOSED: "end",
+    CourseState.ARCHIVED_CLOSED: "end",
+}
+
+# Dates of course runs are read from their epoch milliseconds siblings (e.g. `start_ms`),
+# computed at indexing time, to avoid parsing dates each time the script is run.
 BEST_STATE_SCRIPT = """
-    DateTimeFormatter formatter = DateTimeFormatter.ofPattern(
-        "yyyy-MM-dd'T'HH:mm:ss[.SSSSSS]XXXXX"
-    );
     int best_state = 7;
     int best_index = 0;
     long start, end, enrollment_start, enrollment_end;
@@ -36,18 +70,10 @@ BEST_STATE_SCRIPT = """
     // Go through the sorted course runs nested under this course to look for the
     // best course run (open for enrollment > future > on-going > archived)
     for (int i = 0; i < params._source.course_runs.length; ++i) {
-        start = ZonedDateTime.parse(
-            params._source.course_runs[i]['start'], formatter
-        ).toInstant().toEpochMilli();
-        end = ZonedDateTime.parse(
-            params._source.course_runs[i]['end'], formatter
-        ).toInstant().toEpochMilli();
-        enrollment_start = ZonedDateTime.parse(
-            params._source.course_runs[i]['enrollment_start'], formatter
-        ).toInstant().toEpochMilli();
-        enrollment_end = ZonedDateTime.parse(
-            params._source.course_runs[i]['enrollment_end'], formatter
-        ).toInstant().toEpochMilli();
+        start = params._source.course_runs[i]['start_ms'];
+        end = params._source.course_runs[i]['end_ms'];
+        enrollment_start = params._source.course_runs[i]['enrollment_start_ms'];
+        enrollment_end = params._source.course_runs[i]['enrollment_end_ms'];
 
         // Use language sets to check their intersection
         intersection = new HashSet(params._source.course_runs[i]['languages']);
@@ -155,6 +181,7 @@ BEST_STATE_SCRIPT = """
 """
 
 
+# pylint: disable=too-many-public-methods
 class CoursesIndexer:
     """
     Makes available the parameters the indexer requires as well as functions to shape
@@ -173,13 +200,26 @@ class CoursesIndexer:
                     "end": {"type": "date"},
                     "enrollment_start": {"type": "date"},
                     "enrollment_end": {"type": "date"},
+                    # Epoch milliseconds siblings of the dates, for use in scripts
+                    "start_ms": {"type": "long"},
+                    "end_ms": {"type": "long"},
+                    "enrollment_start_ms": {"type": "long"},
+                    "enrollment_end_ms": {"type": "long"},
                     "languages": {"type": "keyword"},
                 },
             },
+            # State of the course when searching without filters on languages or
+            # availability, for ranking courses without scripts
+            "state_priority": {"type": "integer"},
+            "state_date_time": {"type": "date"},
+            "state_rank": {"type": "long"},
+            "state_changes_on": {"type": "date"},
             # Keywords
             "categories": {"type": "keyword"},
             "organizations": {"type": "keyword"},
             "persons": {"type": "keyword"},
+            # Unique per course, to tiebreak searches paginated with a cursor
+            "page_id": {"type": "keyword"},
             # Searchable
             # description, title, category names & organization names are handled
             # by `MULTILINGUAL_TEXT`
@@ -294,9 +334,8 @@ class CoursesIndexer:
                     // Ordered by ascending end of enrollment datetime. The next course to
                     // end enrollment is displayed first.
                     return (_score + 1) * (
-                        {weight_0:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['enrollment_end'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_0:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['enrollment_end_ms']
                     );
                 }}
                 else if (best_state == 1) {{
@@ -304,9 +343,8 @@ class CoursesIndexer:
                     // Ordered by starting datetime. The next course to start is displayed
                     // first.
                     return (_score + 1) * (
-                        {weight_1:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['start'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_1:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['start_ms']
                     );
                 }}
                 else if (best_state == 2) {{
@@ -314,9 +352,8 @@ class CoursesIndexer:
                     // Ordered by ascending end of enrollment datetime. The next course to
                     // end enrollment is displayed first.
                     return (_score + 1) * (
-                        {weight_2:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['enrollment_end'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_2:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['enrollment_end_ms']
                     );
                 }}
                 else if (best_state == 3) {{
@@ -324,27 +361,24 @@ class CoursesIndexer:
                     // Ordered by starting datetime. The next course to start is displayed
                     // first.
                     return (_score + 1) * (
-                        {weight_3:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['start'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_3:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['start_ms']
                     );
                 }}
                 else if (best_state == 4) {{
                     // The course is future but already closed for enrollment
                     // Ordered by end datetime. The next course to end is displayed first
                     return (_score + 1) * (
-                        {weight_4:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['start'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_4:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['start_ms']
                     );
                 }}
                 else if (best_state == 5) {{
                     // The course is on-going and closed for enrollment
                     // Ordered by end datetime. The next course to end is displayed first
                     return (_score + 1) * (
-                        {weight_5:d} * params.ms_since_epoch - ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['end'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_5:d} * params.ms_since_epoch -
+                        params._source.course_runs[best_index]['end_ms']
                     );
                 }}
                 else if (best_state == 6) {{
@@ -352,9 +386,8 @@ class CoursesIndexer:
                     // Ordered by end datetime. The next course to start is displayed
                     // first.
                     return (_score + 1) * (
-                        {weight_6:d} * params.ms_since_epoch + ZonedDateTime.parse(
-                            params._source.course_runs[best_index]['end'], formatter
-                        ).toInstant().toEpochMilli()
+                        {weight_6:d} * params.ms_since_epoch +
+                        params._source.course_runs[best_index]['end_ms']
                     );
                 }}
                 // The course has no course runs
@@ -434,8 +467,6 @@ class CoursesIndexer:
         """
         Build an Elasticsearch document from the course instance.
         """
-        index = index or cls.index_name
-
         # Prepare published titles
         titles = {
             t.language: t.title
@@ -492,18 +523,6 @@ class CoursesIndexer:
         ):
             introductions[plain_text.cmsplugin_ptr.language].append(plain_text.body)
 
-        # Prepare localized duration texts
-        duration = {}
-        for language, _ in settings.LANGUAGES:
-            with translation.override(language):
-                duration[language] = course.get_duration_display()
-
-        # Prepare localized effort texts
-        effort = {}
-        for language, _ in settings.LANGUAGES:
-            with translation.override(language):
-                effort[language] = course.get_effort_display()
-
         # Prepare categories, making sure we get title information for categories
         # in the same query
         category_pages = (
@@ -560,62 +579,357 @@ class CoursesIndexer:
         # computations that require looping on the course runs
         # Course runs with no start date or no start of enrollment date are ignored as
         # they are still to be scheduled.
-        course_runs = [
+        course_runs = course.course_runs.filter(
+            start__isnull=False, enrollment_start__isnull=False
+        ).order_by("-end")
+
+        return cls.build_es_document_for_course(
+            course,
+            {
+                "titles": titles,
+                "cover_images": cover_images,
+                "icon_images": icon_images,
+                "descriptions": descriptions,
+                "introductions": introductions,
+                "category_pages": category_pages,
+                "organizations": organizations,
+                "organization_highlighted": organization_highlighted,
+                "organization_highlighted_cover_image": (
+                    organization_highlighted_cover_image
+                ),
+                "persons": persons,
+                "course_runs": course_runs.values(*COURSE_RUN_FIELDS),
+            },
+            index=index,
+            action=action,
+        )
+
+    # pylint: disable=too-many-locals
+    @classmethod
+    def get_es_documents_for_courses(cls, courses, index=None, action="index"):
+        """
+        Build Elasticsearch documents for a batch of course instances.
+
+        This is the batch counterpart of `get_es_document_for_course`: it produces the same
+        documents but loads each relation for the whole batch in a set-based query, so that
+        the number of queries does not depend on the number of courses in the batch.
+
+        The course instances are expected to be loaded with their page, its node and their
+        draft extension (see `get_es_documents`).
+        """
+        courses = list(courses)
+        pages = [course.extended_object for course in courses]
+        page_ids = [page.id for page in pages]
+        languages = [language for language, _ in settings.LANGUAGES]
+
+        # Prepare titles and fill the page title caches to compute absolute urls
+        titles = prefetch.get_titles_by_page(page_ids)
+        for page in pages:
+            prefetch.fill_title_cache(page, titles[page.id], languages)
+
+        # Prepare cover images
+        covers = prefetch.get_plugins_by_page(
+            Picture, page_ids, "course_cover", select_related=["picture"]
+        )
+
+        # Prepare the related category icons
+        icon_images = cls.get_icon_images_by_page(page_ids)
+
+        # Prepare description and introduction texts
+        descriptions = prefetch.get_plugins_by_page(
+            SimpleText, page_ids, "course_description"
+        )
+        introductions = prefetch.get_plugins_by_page(
+            PlainText, page_ids, "course_introduction"
+        )
+
+        # Prepare categories, organizations and persons with their published titles
+        categories = prefetch.get_direct_related_page_extensions(
+            pages, Category, CategoryPluginModel
+        )
+        category_pages = prefetch.get_root_to_leaf_public_category_pages(
             {
-                "start": cr["start"],
-                "end": cr["end"] or MAX_DATE,
-                "enrollment_start": cr["enrollment_start"],
-                "enrollment_end": cr["enrollment_end"] or cr["end"] or MAX_DATE,
-                "languages": cr["languages"],
+                page_id: [category for category, _position in pairs]
+                for page_id, pairs in categories.items()
             }
-            for cr in course.course_runs.filter(
-                start__isnull=False, enrollment_start__isnull=False
+        )
+        organizations = prefetch.get_direct_related_page_extensions(
+            pages, Organization, OrganizationPluginModel
+        )
+        persons = prefetch.get_direct_related_page_extensions(
+            pages, Person, PersonPluginModel
+        )
+
+        # The main organization is the one with the lowest plugin position
+        organizations_main = {
+            page_id: min(pairs, key=itemgetter(1))[0]
+            for page_id, pairs in organizations.items()
+            if pairs
+        }
+        logo_images = cls.get_logo_images_by_page(organizations_main.values())
+
+        # Prepare course runs
+        course_runs = prefetch.get_course_runs_by_course(
+            courses,
+            COURSE_RUN_FIELDS,
+            start__isnull=False,
+            enrollment_start__isnull=False,
+        )
+
+        for course in courses:
+            page_id = course.extended_object_id
+
+            cover_images = {}
+            for cover in covers[page_id]:
+                language = cover.cmsplugin_ptr.language
+                with translation.override(language):
+                    picture_info = get_picture_info(cover, "cover")
+                    if picture_info:
+                        cover_images[language] = picture_info
+
+            organization_main = organizations_main.get(page_id)
+            yield cls.build_es_document_for_course(
+                course,
+                {
+                    "titles": {
+                        t.language: t.title for t in titles[page_id] if t.published
+                    },
+                    "cover_images": cover_images,
+                    "icon_images": icon_images[page_id],
+                    "descriptions": cls.group_texts_by_language(descriptions[page_id]),
+                    "introductions": cls.group_texts_by_language(
+                        introductions[page_id]
+                    ),
+                    "category_pages": category_pages[page_id],
+                    "organizations": [
+                        organization for organization, _ in organizations[page_id]
+                    ],
+                    "organization_highlighted": organization_main,
+                    "organization_highlighted_cover_image": (
+                        logo_images[organization_main.extended_object_id]
+                        if organization_main
+                        else {}
+                    ),
+                    "persons": [person for person, _ in persons[page_id]],
+                    "course_runs": course_runs[course.id],
+                },
+                index=index,
+                action=action,
             )
-            .order_by("-end")
-            .values("start", "end", "enrollment_start", "enrollment_end", "languages")
-        ]
 
+    @staticmethod
+    def get_icon_images_by_page(page_ids):
+        """
+        Prepare, in a handful of queries, the icon of the main category linked to each course
+        page of a list, in each language.
+
+        Returns:
+        --------
+            Dict[int, Dict[str, Dict]]: a dictionary mapping each page id with the icon
+                information in each language.
+        """
+        languages = [language for language, _ in settings.LANGUAGES]
+        icon_plugins = prefetch.get_plugins_by_page(
+            CategoryPluginModel,
+            page_ids,
+            "course_icons",
+            select_related=["page__category"],
+            cmsplugin_ptr__position=0,
+        )
+        category_page_ids = {
+            plugin_model.page_id
+            for plugin_models in icon_plugins.values()
+            for plugin_model in plugin_models
+        }
+        icons = prefetch.get_plugins_by_page(
+            Picture,
+            category_page_ids,
+            "icon",
+            select_related=["picture"],
+            cmsplugin_ptr__position=0,
+        )
+        category_titles = prefetch.get_titles_by_page(category_page_ids)
+
+        icon_images = defaultdict(dict)
+        for page_id, plugin_models in icon_plugins.items():
+            for plugin_model in plugin_models:
+                language = plugin_model.language
+                prefetch.fill_title_cache(
+                    plugin_model.page, category_titles[plugin_model.page_id], languages
+                )
+                for icon in icons[plugin_model.page_id]:
+                    if icon.cmsplugin_ptr.language != language:
+                        continue
+                    with translation.override(language):
+                        picture_info = get_picture_info(icon, "icon") or {}
+                        icon_images[page_id][language] = {
+                            **picture_info,
+                            "color": plugin_model.page.category.color,
+                            "title": plugin_model.page.get_title(),
+                        }
+        return icon_images
+
+    @staticmethod
+    def get_logo_images_by_page(organizations):
+        """
+        Prepare, in one query, the logo of each organization of a list, in each language.
+
+        Returns:
+        --------
+            Dict[int, Dict[str, Dict]]: a dictionary mapping the page id of each organization
+                with its logo information in each language.
+        """
+        logos = prefetch.get_plugins_by_page(
+            Picture,
+            {organization.extended_object_id for organization in organizations},
+            "logo",
+            select_related=["picture"],
+        )
+        logo_images = defaultdict(dict)
+        for page_id, page_logos in logos.items():
+            for logo in page_logos:
+                language = logo.cmsplugin_ptr.language
+                with translation.override(language):
+                    logo_images[page_id][language] = get_picture_info(logo, "logo")
+        return logo_images
+
+    @classmethod
+    def get_es_partial_documents_for_courses(cls, courses, related, index=None):
+        """
+        Build Elasticsearch `update` actions for a batch of course instances, limited to the
+        fields that are denormalized from their related "categories", "organizations",
+        "persons" or "course_runs". This avoids rebuilding whole course documents when one
+        of the objects they are related to is modified.
+
+        The course instances are expected to be loaded with their page, its node and their
+        draft extension (see `get_es_partial_documents`).
+        """
+        index = index or cls.index_name
+        courses = list(courses)
+        pages = [course.extended_object for course in courses]
+
+        if related == "categories":
+            categories = prefetch.get_direct_related_page_extensions(
+                pages, Category, CategoryPluginModel
+            )
+            category_pages = prefetch.get_root_to_leaf_public_category_pages(
+                {
+                    page_id: [category for category, _position in pairs]
+                    for page_id, pairs in categories.items()
+                }
+            )
+            icon_images = cls.get_icon_images_by_page([page.id for page in pages])
+            fields = {
+                page.id: {
+                    **cls.format_categories(category_pages[page.id]),
+                    "icon": icon_images[page.id],
+                }
+                for page in pages
+            }
+        elif related == "organizations":
+            organizations = prefetch.get_direct_related_page_extensions(
+                pages, Organization, OrganizationPluginModel
+            )
+            organizations_main = {
+                page_id: min(pairs, key=itemgetter(1))[0]
+                for page_id, pairs in organizations.items()
+                if pairs
+            }
+            logo_images = cls.get_logo_images_by_page(organizations_main.values())
+            fields = {}
+            for page in pages:
+                organization_main = organizations_main.get(page.id)
+                fields[page.id] = cls.format_organizations(
+                    [organization for organization, _ in organizations[page.id]],
+                    organization_main,
+                    logo_images[organization_main.extended_object_id]
+                    if organization_main
+                    else {},
+                )
+        elif related == "persons":
+            persons = prefetch.get_direct_related_page_extensions(
+                pages, Person, PersonPluginModel
+            )
+            fields = {
+                page.id: cls.format_persons([person for person, _ in persons[page.id]])
+                for page in pages
+            }
+        elif related == "course_runs":
+            # Course runs with no start date or no start of enrollment date are ignored as
+            # they are still to be scheduled.
+            course_runs = prefetch.get_course_runs_by_course(
+                courses,
+                COURSE_RUN_FIELDS,
+                start__isnull=False,
+                enrollment_start__isnull=False,
+            )
+            fields = {
+                course.extended_object_id: {
+                    **cls.format_course_runs(course_runs[course.id]),
+                    "is_new": len(course_runs[course.id]) == 1,
+                }
+                for course in courses
+            }
+        else:
+            raise ValueError(f"Courses are not related to {related!s}.")
+
+        for course in courses:
+            yield {
+                "_id": course.get_es_id(),
+                "_index": index,
+                "_op_type": "update",
+                "doc": fields[course.extended_object_id],
+            }
+
+    @classmethod
+    def get_es_partial_documents(cls, courses, related, index=None):
+        """
+        Stream Elasticsearch `update` actions for the courses of a queryset, limited to the
+        fields that are denormalized from their related "categories", "organizations",
+        "persons" or "course_runs" (see `get_es_partial_documents_for_courses`). Courses
+        are processed in batches so that the actions are never all held in memory.
+        """
+        batch_size = cls.get_batch_size()
+        courses = courses.select_related(
+            "extended_object__node", "draft_extension"
+        ).iterator()
+
+        while True:
+            batch = list(islice(courses, batch_size))
+            if not batch:
+                break
+            yield from cls.get_es_partial_documents_for_courses(
+                batch, related, index=index
+            )
+
+    @staticmethod
+    def group_titles_by_language(titles):
+        """Group a list of titles by language, keeping their order."""
+        names = {}
+        for title in titles:
+            names.setdefault(title.language, []).append(title.title)
+        return names
+
+    @classmethod
+    def format_categories(cls, category_pages):
+        """Format the fields of a course document related to its categories."""
         return {
-            "_id": course.get_es_id(),
-            "_index": index,
-            "_op_type": action,
-            "absolute_url": {
-                lang: course.extended_object.get_absolute_url(lang)
-                for lang, _ in settings.LANGUAGES
-            },
             "categories": [page.category.get_es_id() for page in category_pages],
             # Index the names of categories to surface them in full text searches
-            "categories_names": reduce(
-                lambda acc, title: {
-                    **acc,
-                    title.language: acc[title.language] + [title.title]
-                    if acc.get(title.language)
-                    else [title.title],
-                },
-                [title for page in category_pages for title in page.published_titles],
-                {},
+            "categories_names": cls.group_titles_by_language(
+                [title for page in category_pages for title in page.published_titles]
             ),
-            "code": course.code,
-            "complete": {
-                language: slice_string_for_completion(title)
-                for language, title in titles.items()
-            }
-            if course.is_listed
-            else None,
-            "course_runs": course_runs,
-            "cover_image": cover_images,
-            "description": {
-                language: " ".join(st) for language, st in descriptions.items()
-            },
-            "duration": duration,
-            "effort": effort,
-            "icon": icon_images,
-            "introduction": {
-                language: " ".join(st) for language, st in introductions.items()
-            },
-            "is_new": len(course_runs) == 1,
-            # If titles is an empty dict, it means the course is not published in any language:
-            "is_listed": bool(course.is_listed and titles),
+        }
+
+    @classmethod
+    def format_organizations(
+        cls,
+        organizations,
+        organization_highlighted,
+        organization_highlighted_cover_image,
+    ):
+        """Format the fields of a course document related to its organizations."""
+        return {
             # Pick the highlighted organization from the organizations QuerySet to benefit from
             # the prefetch of related title sets
             "organization_highlighted": {
@@ -629,55 +943,319 @@ class CoursesIndexer:
                 organization.get_es_id() for organization in organizations
             ],
             # Index the names of organizations to surface them in full text searches
-            "organizations_names": reduce(
-                lambda acc, title: {
-                    **acc,
-                    title.language: acc[title.language] + [title.title]
-                    if acc.get(title.language)
-                    else [title.title],
-                },
+            "organizations_names": cls.group_titles_by_language(
                 [
                     title
                     for organization in organizations
                     for title in organization.extended_object.published_titles
-                ],
-                {},
+                ]
             ),
+        }
+
+    @classmethod
+    def format_persons(cls, persons):
+        """Format the fields of a course document related to its persons."""
+        return {
             "persons": [person.get_es_id() for person in persons],
-            "persons_names": reduce(
-                lambda acc, title: {
-                    **acc,
-                    title.language: acc[title.language] + [title.title]
-                    if acc.get(title.language)
-                    else [title.title],
-                },
+            "persons_names": cls.group_titles_by_language(
                 [
                     title
                     for person in persons
                     for title in person.extended_object.published_titles
-                ],
-                {},
+                ]
+            ),
+        }
+
+    @staticmethod
+    def group_texts_by_language(text_plugins):
+        """Group the bodies of a list of text plugins by language."""
+        texts = defaultdict(list)
+        for text_plugin in text_plugins:
+            texts[text_plugin.cmsplugin_ptr.language].append(text_plugin.body)
+        return texts
+
+    @staticmethod
+    def format_es_course_run(course_run):
+        """
+        Format the values of a course run for its nested document in a course document.
+        Open-ended dates are replaced by the end of time and each date gets a sibling field
+        holding its value in milliseconds since the epoch, for use in scripts.
+        """
+        document = {
+            "start": course_run["start"],
+            "end": course_run["end"] or MAX_DATE,
+            "enrollment_start": course_run["enrollment_start"],
+            "enrollment_end": course_run["enrollment_end"]
+            or course_run["end"]
+            or MAX_DATE,
+            "languages": course_run["languages"],
+        }
+        for field in COURSE_RUN_DATE_FIELDS:
+            document[f"{field:s}_ms"] = get_epoch_milliseconds(document[field])
+        return document
+
+    @staticmethod
+    def get_es_course_run_state(course_run, now_ms):
+        """
+        Compute the state of a formatted course run at a date given in epoch milliseconds,
+        the same way as the `score` script does.
+        """
+        if course_run["start_ms"] < now_ms:
+            if course_run["end_ms"] > now_ms:
+                return (
+                    CourseState.ONGOING_OPEN
+                    if course_run["enrollment_end_ms"] > now_ms
+                    else CourseState.ONGOING_CLOSED
+                )
+            if course_run["enrollment_end_ms"] > now_ms:
+                return CourseState.ARCHIVED_OPEN
+            return CourseState.ARCHIVED_CLOSED
+        if course_run["enrollment_start_ms"] > now_ms:
+            return CourseState.FUTURE_NOT_YET_OPEN
+        if course_run["enrollment_end_ms"] > now_ms:
+            return CourseState.FUTURE_OPEN
+        return CourseState.FUTURE_CLOSED
+
+    @staticmethod
+    def get_es_state(course_runs, now=None):
+        """
+        Compute the state of a course from its formatted course runs, ordered by descending
+        end date, the same way as the `score` script does when searching without filters on
+        languages or availability:
+        - `state_priority`: the priority of the best state among the course runs,
+        - `state_date_time`: the date of the best course run that matters for this state,
+        - `state_rank`: a value ranking the course among courses in the same state when
+          sorted in ascending order,
+        - `state_changes_on`: the next date at which the state may change, after which the
+          document must be refreshed.
+        """
+        now_ms = get_epoch_milliseconds(now or timezone.now())
+        best_state = CourseState.TO_BE_SCHEDULED
+        best_course_run = None
+
+        for course_run in course_runs:
+            state = CoursesIndexer.get_es_course_run_state(course_run, now_ms)
+            if state < best_state:
+                best_state = state
+                best_course_run = course_run
+                # Course runs are ordered by end date so the remaining course runs can not
+                # be better than on-going open or archived open
+                if state in [CourseState.ONGOING_OPEN, CourseState.ARCHIVED_OPEN]:
+                    break
+
+        if best_course_run:
+            date_field = STATE_DATE_FIELDS[best_state]
+            state_date_time = best_course_run[date_field]
+            state_rank = best_course_run[f"{date_field:s}_ms"]
+            # Archived courses are ranked by descending end date
+            if best_state == CourseState.ARCHIVED_CLOSED:
+                state_rank = -state_rank
+        else:
+            state_date_time, state_rank = None, 0
+
+        return {
+            "state_priority": best_state,
+            "state_date_time": state_date_time,
+            "state_rank": state_rank,
+            "state_changes_on": min(
+                (
+                    course_run[field]
+                    for course_run in course_runs
+                    for field in COURSE_RUN_DATE_FIELDS
+                    if now_ms < course_run[f"{field:s}_ms"] < MAX_DATE_MS
+                ),
+                default=None,
             ),
+        }
+
+    @classmethod
+    def format_course_runs(cls, course_runs):
+        """
+        Format the course runs of a course, ordered by descending end date, and the state
+        they give to the course.
+        """
+        course_runs = [
+            cls.format_es_course_run(course_run) for course_run in course_runs
+        ]
+        return {
+            "course_runs": course_runs,
+            **cls.get_es_state(course_runs),
+        }
+
+    @classmethod
+    def build_es_document_for_course(cls, course, related, index=None, action="index"):
+        """
+        Build an Elasticsearch document from the course instance and its related objects,
+        whether they were loaded for this course only or for a batch of courses.
+        """
+        index = index or cls.index_name
+
+        # Prepare localized duration texts
+        duration = {}
+        for language, _ in settings.LANGUAGES:
+            with translation.override(language):
+                duration[language] = course.get_duration_display()
+
+        # Prepare localized effort texts
+        effort = {}
+        for language, _ in settings.LANGUAGES:
+            with translation.override(language):
+                effort[language] = course.get_effort_display()
+
+        titles = related["titles"]
+
+        return {
+            "_id": course.get_es_id(),
+            "_index": index,
+            "_op_type": action,
+            "absolute_url": {
+                lang: course.extended_object.get_absolute_url(lang)
+                for lang, _ in settings.LANGUAGES
+            },
+            **cls.format_categories(related["category_pages"]),
+            "code": course.code,
+            "complete": {
+                language: slice_string_for_completion(title)
+                for language, title in titles.items()
+            }
+            if course.is_listed
+            else None,
+            **cls.format_course_runs(related["course_runs"]),
+            "is_new": len(related["course_runs"]) == 1,
+            "cover_image": related["cover_images"],
+            "description": {
+                language: " ".join(st)
+                for language, st in related["descriptions"].items()
+            },
+            "duration": duration,
+            "effort": effort,
+            "icon": related["icon_images"],
+            "introduction": {
+                language: " ".join(st)
+                for language, st in related["introductions"].items()
+            },
+            # If titles is an empty dict, it means the course is not published in any language:
+            "is_listed": bool(course.is_listed and titles),
+            **cls.format_organizations(
+                related["organizations"],
+                related["organization_highlighted"],
+                related["organization_highlighted_cover_image"],
+            ),
+            "page_id": course.get_es_id(),
+            **cls.format_persons(related["persons"]),
             "title": titles,
         }
 
     @classmethod
-    def get_es_documents(cls, index=None, action="index"):
+    def get_queryset(cls, since=None):
         """
-        Loop on all the courses in database and format them for the ElasticSearch index
+        Return the queryset of the courses that should be indexed, limited to those whose
+        document may have changed after a date if `since` is given: the course page or one
+        of its course runs changed, or the page of a category, organization or person it is
+        related to changed.
+        """
+        courses = Course.objects.filter(
+            extended_object__publisher_is_draft=False,  # index the public object
+            extended_object__title_set__published=True,  # only index published courses
+            extended_object__node__parent__cms_pages__course__isnull=True,  # exclude snapshots
+        )
+        if since:
+            # Course runs may be attached to the course or to one of its snapshots
+            courses = courses.annotate(
+                has_changed_runs=Exists(
+                    CourseRun.objects.filter(
+                        direct_course__extended_object__node__path__startswith=OuterRef(
+                            "extended_object__node__path"
+                        ),
+                        direct_course__extended_object__publisher_is_draft=False,
+                        updated_on__gt=since,
+                    )
+                )
+            )
+            changed_clause = get_page_changed_clause(since) | Q(has_changed_runs=True)
+            for model_name in ["category", "organization", "person"]:
+                changed_clause |= get_page_changed_clause(
+                    since,
+                    page_lookup=(
+                        "extended_object__placeholders__cmsplugin__"
+                        f"courses_{model_name:s}pluginmodel__page__publisher_public"
+                    ),
+                )
+            courses = courses.filter(changed_clause)
+        return courses.distinct()
+
+    @staticmethod
+    def get_batch_size():
+        """
+        Return the number of courses formatted together by `get_es_documents`, the objects
+        related to a batch of courses being loaded at once.
+        """
+        return getattr(settings, "RICHIE_ES_CHUNK_SIZE", ES_CHUNK_SIZE)
+
+    @classmethod
+    def get_es_documents(cls, index=None, action="index", pk_range=None, since=None):
+        """
+        Loop on all the courses in database and format them for the ElasticSearch index.
+        Courses are processed in batches to load their related objects in bulk.
+
+        A `(first_pk, last_pk)` tuple can be passed as `pk_range` to only format the courses
+        within this range of primary keys (bounds included), so that several processes can
+        share the work of building the index. Passing a date as `since` only formats the
+        courses whose document may have changed after this date.
         """
         index = index or cls.index_name
+        batch_size = cls.get_batch_size()
+
+        courses = cls.get_queryset(since=since)
+        if pk_range:
+            courses = courses.filter(pk__range=pk_range)
+        courses = courses.select_related(
+            "extended_object__node", "draft_extension"
+        ).iterator()
 
-        for course in (
-            Course.objects.filter(
-                extended_object__publisher_is_draft=False,  # index the public object
-                extended_object__title_set__published=True,  # only index published courses
-                extended_object__node__parent__cms_pages__course__isnull=True,  # exclude snapshots
+        while True:
+            batch = list(islice(courses, batch_size))
+            if not batch:
+                break
+            yield from cls.get_es_documents_for_courses(
+                batch, index=index, action=action
             )
-            .distinct()
-            .iterator()
-        ):
-            yield cls.get_es_document_for_course(course, index=index, action=action)
+
+    @classmethod
+    def get_es_documents_for_ids(cls, es_ids, index=None):
+        """
+        Format, as whole documents, the indexable courses identified by the id of their
+        Elasticsearch document. This is used to index the courses whose document was missing
+        when a partial update was sent for them.
+        """
+        courses = (
+            cls.get_queryset()
+            .filter(extended_object_id__in=es_ids)
+            .select_related("extended_object__node", "draft_extension")
+        )
+        return cls.get_es_documents_for_courses(courses, index=index or cls.index_name)
+
+    @classmethod
+    def get_es_documents_with_expired_state(cls, index=None):
+        """
+        Look in the index for the courses whose state may have changed since they were
+        indexed and stream `update` actions refreshing their course runs and state.
+        """
+        index = index or cls.index_name
+        expired_ids = [
+            hit["_id"]
+            for hit in scan(
+                ES_CLIENT,
+                index=index,
+                query={"query": {"range": {"state_changes_on": {"lte": "now"}}}},
+                _source=False,
+            )
+        ]
+        return cls.get_es_partial_documents(
+            cls.get_queryset().filter(extended_object_id__in=expired_ids),
+            "course_runs",
+            index=index,
+        )
 
     @staticmethod
     def format_es_object_for_api(es_course, language=None):
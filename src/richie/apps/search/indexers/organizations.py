@@ -17,7 +17,7 @@ from ..defaults import ES_INDICES_PREFIX
 from ..forms import ItemSearchForm
 from ..text_indexing import MULTILINGUAL_TEXT
 from ..utils.i18n import get_best_field_language
-from ..utils.indexers import slice_string_for_completion
+from ..utils.indexers import get_page_changed_clause, slice_string_for_completion
 
 
 class OrganizationsIndexer:
@@ -114,20 +114,33 @@ class OrganizationsIndexer:
         return logo_images
 
     @classmethod
-    def get_es_documents(cls, index=None, action="index"):
+    def get_queryset(cls, since=None):
         """
-        Loop on all the organizations in database and format them for the ElasticSearch index
+        Return the queryset of the organizations that should be indexed, limited to those
+        that changed after a date if `since` is given.
+        """
+        organizations = Organization.objects.filter(
+            extended_object__publisher_is_draft=False,
+            extended_object__title_set__published=True,
+        )
+        if since:
+            organizations = organizations.filter(get_page_changed_clause(since))
+        return organizations.distinct()
+
+    @classmethod
+    def get_es_documents(cls, index=None, action="index", pk_range=None, since=None):
+        """
+        Loop on all the organizations in database and format them for the ElasticSearch index.
+        They can be limited to a range of primary keys (bounds included) with `pk_range`
+        or to those that changed after a date with `since`.
         """
         index = index or cls.index_name
 
-        for organization in (
-            Organization.objects.filter(
-                extended_object__publisher_is_draft=False,
-                extended_object__title_set__published=True,
-            )
-            .distinct()
-            .iterator()
-        ):
+        organizations = cls.get_queryset(since=since)
+        if pk_range:
+            organizations = organizations.filter(pk__range=pk_range)
+
+        for organization in organizations.iterator():
             yield cls.get_es_document_for_organization(
                 organization, index=index, action=action
             )
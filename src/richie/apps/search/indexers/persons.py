@@ -17,7 +17,7 @@ from ..defaults import ES_INDICES_PREFIX
 from ..forms import ItemSearchForm
 from ..text_indexing import MULTILINGUAL_TEXT
 from ..utils.i18n import get_best_field_language
-from ..utils.indexers import slice_string_for_completion
+from ..utils.indexers import get_page_changed_clause, slice_string_for_completion
 
 
 class PersonsIndexer:
@@ -106,20 +106,33 @@ class PersonsIndexer:
         }
 
     @classmethod
-    def get_es_documents(cls, index=None, action="index"):
+    def get_queryset(cls, since=None):
         """
-        Loop on all the persons in database and format them for the ElasticSearch index
+        Return the queryset of the persons that should be indexed, limited to those
+        that changed after a date if `since` is given.
+        """
+        persons = Person.objects.filter(
+            extended_object__publisher_is_draft=False,
+            extended_object__title_set__published=True,
+        )
+        if since:
+            persons = persons.filter(get_page_changed_clause(since))
+        return persons.distinct()
+
+    @classmethod
+    def get_es_documents(cls, index=None, action="index", pk_range=None, since=None):
+        """
+        Loop on all the persons in database and format them for the ElasticSearch index.
+        They can be limited to a range of primary keys (bounds included) with `pk_range`
+        or to those that changed after a date with `since`.
         """
         index = index or cls.index_name
 
-        for person in (
-            Person.objects.filter(
-                extended_object__publisher_is_draft=False,
-                extended_object__title_set__published=True,
-            )
-            .distinct()
-            .iterator()
-        ):
+        persons = cls.get_queryset(since=since)
+        if pk_range:
+            persons = persons.filter(pk__range=pk_range)
+
+        for person in persons.iterator():
             yield cls.get_es_document_for_person(person, index=index, action=action)
 
     @staticmethod
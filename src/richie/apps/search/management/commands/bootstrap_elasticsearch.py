@@ -3,9 +3,12 @@ Handle ElasticSearch setup that needs to be done at bootstrap time.
 """
 import logging
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
-from ...index_manager import regenerate_indices, store_es_scripts
+from ...index_manager import regenerate_indices, store_es_scripts, update_indices
+from ...utils.profiling import IndexingProfiler
 
 logger = logging.getLogger("richie.search.bootstrap_elasticsearch")
 
@@ -16,20 +19,103 @@ class Command(BaseCommand):
     - create indices for courses, organizations, categories,
     - index all records in their respective indices,
     - store necessary scripts.
+
+    With "--since" or "--changed-only", only the records that changed are updated in the
+    existing indices instead, and the documents of records that are not indexed anymore
+    (e.g. unpublished or deleted pages) are deleted.
+
+    With "--profile", the time spent building documents and sending them, the SQL queries
+    run and the size of documents are measured for each indexer and reported at the end.
     """
 
     help = __doc__
 
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Number of processes used to populate the indices concurrently. "
+                "The courses index is split in slices shared between processes."
+            ),
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Only update, in the existing indices, the records that changed after this "
+                'date and time in ISO 8601 format (e.g. "2021-11-22T10:00:00+00:00").'
+            ),
+        )
+        parser.add_argument(
+            "--changed-only",
+            action="store_true",
+            default=False,
+            help=(
+                "Only update, in the existing indices, the records that changed since the "
+                "indices were last regenerated or updated."
+            ),
+        )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            default=False,
+            help=(
+                "Report, for each indexer, the time spent building and sending documents, "
+                "the SQL queries run, the size of documents and the slowest batches of "
+                "documents."
+            ),
+        )
+        parser.add_argument(
+            "--profile-output",
+            help="Also write the profiling report to this file in JSON format.",
+        )
+
     def handle(self, *args, **options):
-        # Keep track of starting time for logging purposes
-        logger.info("Starting to regenerate ES indices...")
+        if options["workers"] < 1:
+            raise CommandError("The number of workers should be a positive integer.")
+
+        profiler = None
+        if options["profile"] or options["profile_output"]:
+            if options["workers"] > 1:
+                raise CommandError("Profiling is not possible with several workers.")
+            profiler = IndexingProfiler()
+
+        if options["since"] or options["changed_only"]:
+            if options["workers"] > 1:
+                raise CommandError(
+                    "Updating the records that changed is not possible with several workers."
+                )
 
-        # Creates new indices each time, populates them, and atomically replaces
-        # the old indices once the new ones are ready.
-        regenerate_indices(logger)
+            since = None
+            if options["since"]:
+                since = parse_datetime(options["since"])
+                if since is None:
+                    raise CommandError(
+                        f'"{options["since"]:s}" is not a valid ISO 8601 date and time.'
+                    )
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
 
-        # Confirm operation success through a console log
-        logger.info("ES indices regenerated.")
+            logger.info("Starting to update ES indices...")
+
+            # Upserts the documents of records that changed in the live indices and
+            # deletes those of records that are not indexed anymore
+            update_indices(logger, since=since, profiler=profiler)
+
+            logger.info("ES indices updated.")
+        else:
+            # Keep track of starting time for logging purposes
+            logger.info("Starting to regenerate ES indices...")
+
+            # Creates new indices each time, populates them, and atomically replaces
+            # the old indices once the new ones are ready.
+            regenerate_indices(logger, workers=options["workers"], profiler=profiler)
+
+            # Confirm operation success through a console log
+            logger.info("ES indices regenerated.")
 
         logger.info("Starting to store ES scripts...")
 
@@ -37,3 +123,8 @@ class Command(BaseCommand):
         store_es_scripts(logger)
 
         logger.info("ES scripts stored.")
+
+        if profiler:
+            self.stdout.write(profiler.format_report())
+            if options["profile_output"]:
+                profiler.write_json(options["profile_output"])
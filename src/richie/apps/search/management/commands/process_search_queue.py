@@ -0,0 +1,64 @@
+"""
+Process the queue of pending updates of the Elasticsearch indices.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...queue import process_search_queue
+
+logger = logging.getLogger("richie.search.process_search_queue")
+
+
+class Command(BaseCommand):
+    """
+    Send to Elasticsearch the updates that were queued when pages were published or
+    unpublished, in bulk batches. Failed updates are retried with an increasing delay.
+
+    The queue is drained once, or continuously if a polling interval is given.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "-b",
+            "--batch-size",
+            type=int,
+            help="Number of queue entries processed in each bulk request.",
+        )
+        parser.add_argument(
+            "-m",
+            "--max-attempts",
+            type=int,
+            help="Number of attempts after which a failing queue entry is abandoned.",
+        )
+        parser.add_argument(
+            "-i",
+            "--interval",
+            type=int,
+            help=(
+                "Keep polling the queue, waiting this number of seconds after it was "
+                "drained."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        for option in ["batch_size", "max_attempts", "interval"]:
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f'"{option:s}" should be a positive integer.')
+
+        while True:
+            processed = process_search_queue(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+                logger=logger,
+            )
+            if processed:
+                logger.info("%d search queue entries processed.", processed)
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
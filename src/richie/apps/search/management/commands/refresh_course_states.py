@@ -0,0 +1,52 @@
+"""
+Refresh the state of the courses whose state may have changed since they were indexed.
+"""
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...index_manager import bulk_live_indices
+from ...indexers import ES_INDICES
+
+logger = logging.getLogger("richie.search.refresh_course_states")
+
+
+class Command(BaseCommand):
+    """
+    The state of each course is computed when it is indexed, along with the date at which
+    it may change (e.g. when a course run starts or its enrollment ends), so that courses
+    can be ranked without computing their state with a script on each search.
+
+    Look for courses whose state change date has passed and update their course runs and
+    state in the index. This command should be run periodically (e.g. every few minutes),
+    once or continuously if an interval is given.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "-i",
+            "--interval",
+            type=int,
+            help=(
+                "Keep refreshing course states, waiting this number of seconds between "
+                "each refresh."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["interval"] is not None and options["interval"] < 1:
+            raise CommandError('"interval" should be a positive integer.')
+
+        while True:
+            actions = list(ES_INDICES.courses.get_es_documents_with_expired_state())
+            if actions:
+                bulk_live_indices(actions)
+                logger.info("%d course states refreshed.", len(actions))
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,36 @@
+"""
+Report the hits and misses of the cache of search responses.
+"""
+from django.core.management.base import BaseCommand
+
+from ...utils.response_cache import get_response_cache_stats, reset_response_cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Print the number of searches served from the cache of responses and the number of
+    searches that were sent to Elasticsearch, counted since the counters were last reset.
+    """
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            default=False,
+            help="Reset the counters after reporting them.",
+        )
+
+    def handle(self, *args, **options):
+        stats = get_response_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0
+        self.stdout.write(
+            f"hits: {stats['hits']:d}, misses: {stats['misses']:d}, "
+            f"hit ratio: {ratio:.1%}"
+        )
+
+        if options["reset"]:
+            reset_response_cache_stats()
@@ -0,0 +1,103 @@
+# Generated by Django 3.2.9 on 2021-11-23 09:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("cms", "0022_auto_20180620_1551"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchAccess",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+            ],
+            options={
+                "permissions": (
+                    (
+                        "can_manage_elasticsearch",
+                        "Allow managing Elasticsearch indices",
+                    ),
+                ),
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="SearchQueueEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("index", "index"), ("delete", "delete")],
+                        max_length=10,
+                        verbose_name="action",
+                    ),
+                ),
+                (
+                    "language",
+                    models.CharField(
+                        blank=True, max_length=10, null=True, verbose_name="language"
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="attempts"
+                    ),
+                ),
+                ("last_error", models.TextField(blank=True, verbose_name="last error")),
+                (
+                    "retry_on",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="retry on"
+                    ),
+                ),
+                (
+                    "created_on",
+                    models.DateTimeField(auto_now_add=True, verbose_name="created on"),
+                ),
+                (
+                    "updated_on",
+                    models.DateTimeField(auto_now=True, verbose_name="updated on"),
+                ),
+                (
+                    "page",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_queue_entry",
+                        to="cms.page",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "search queue entry",
+                "verbose_name_plural": "search queue entries",
+                "db_table": "richie_search_queue_entry",
+                "ordering": ("created_on",),
+            },
+        ),
+    ]
@@ -1,5 +1,9 @@
 """Declare and configure the models for richie's search application."""
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from cms.models import Page
 
 
 class SearchAccess(models.Model):
@@ -11,3 +15,35 @@ class SearchAccess(models.Model):
         permissions = (
             ("can_manage_elasticsearch", "Allow managing Elasticsearch indices"),
         )
+
+
+class SearchQueueEntry(models.Model):
+    """
+    A pending update of the Elasticsearch indices for a page, recorded when the page is
+    published or unpublished and processed asynchronously by the `process_search_queue`
+    command. There is at most one entry per page so that repeated publications of a page
+    are coalesced in a single update.
+    """
+
+    ACTION_CHOICES = (("index", _("index")), ("delete", _("delete")))
+
+    page = models.OneToOneField(
+        to=Page, on_delete=models.CASCADE, related_name="search_queue_entry"
+    )
+    action = models.CharField(_("action"), max_length=10, choices=ACTION_CHOICES)
+    language = models.CharField(_("language"), max_length=10, blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(_("attempts"), default=0)
+    last_error = models.TextField(_("last error"), blank=True)
+    retry_on = models.DateTimeField(_("retry on"), default=timezone.now)
+    created_on = models.DateTimeField(_("created on"), auto_now_add=True)
+    updated_on = models.DateTimeField(_("updated on"), auto_now=True)
+
+    class Meta:
+        db_table = "richie_search_queue_entry"
+        verbose_name = _("search queue entry")
+        verbose_name_plural = _("search queue entries")
+        ordering = ("created_on",)
+
+    def __str__(self):
+        """Human representation of a search queue entry."""
+        return f"{self.action:s} page {self.page_id!s}"
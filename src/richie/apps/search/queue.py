@@ -0,0 +1,151 @@
+"""
+Process the queue of pending updates of the Elasticsearch indices recorded when pages are
+published or unpublished (see the `RICHIE_QUEUE_SEARCH_UPDATES` setting).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .defaults import ES_CHUNK_SIZE, SEARCH_QUEUE_MAX_ATTEMPTS, SEARCH_QUEUE_RETRY_DELAY
+from .index_manager import bulk_live_indices
+from .models import SearchQueueEntry
+from .signals import get_es_actions_for_page, is_named_in_facets
+from .utils.i18n_names import invalidate_i18n_names
+
+
+def record_failure(entries, error):
+    """
+    Record a failed attempt to process queue entries and postpone their next attempt,
+    doubling the delay after each failed attempt.
+    """
+    retry_delay = getattr(
+        settings, "RICHIE_SEARCH_QUEUE_RETRY_DELAY", SEARCH_QUEUE_RETRY_DELAY
+    )
+    for entry in entries:
+        # Entries that were updated in the meantime are considered as new entries
+        SearchQueueEntry.objects.filter(
+            pk=entry.pk, updated_on=entry.updated_on
+        ).update(
+            attempts=entry.attempts + 1,
+            last_error=repr(error),
+            retry_on=timezone.now()
+            + timedelta(seconds=retry_delay * 2 ** entry.attempts),
+        )
+
+
+def add_action(actions, action):
+    """
+    Add an action to a dictionary of actions keyed by document, so that each document is
+    only sent once. Partial updates of the same document are merged together.
+    """
+    key = action["_index"], action["_id"]
+    existing_action = actions.get(key)
+    if action["_op_type"] == "update" and existing_action:
+        # A whole document or a deletion already covers the partial update
+        if existing_action["_op_type"] == "update":
+            actions[key] = {
+                **existing_action,
+                "doc": {**existing_action["doc"], **action["doc"]},
+            }
+        return
+    actions[key] = action
+
+
+def prepare_actions(entries, logger=None):
+    """
+    Build the actions of a batch of queue entries, each document being only sent once (see
+    `add_action`). Entries whose actions could not be built are recorded as failed, so that
+    they don't prevent the rest of the queue from being processed.
+
+    Returns a tuple of the actions keyed by document and of the entries that were prepared.
+    """
+    actions = {}
+    prepared_entries = []
+    for entry in entries:
+        try:
+            # Actions may be streamed: build them all here to catch any error. A savepoint
+            # keeps the transaction usable to record the failure after a database error.
+            with transaction.atomic():
+                entry_actions = list(
+                    get_es_actions_for_page(entry.page, entry.action, entry.language)
+                )
+        # pylint: disable=broad-except
+        except Exception as error:
+            if logger:
+                logger.error("Failed to prepare %s: %r", entry, error)
+            record_failure([entry], error)
+        else:
+            prepared_entries.append(entry)
+            for action in entry_actions:
+                add_action(actions, action)
+    return actions, prepared_entries
+
+
+def send_actions(actions, entries, logger=None):
+    """
+    Send the actions of a batch of queue entries to Elasticsearch in one bulk request and
+    remove the entries from the queue, or record them as failed if the request failed.
+
+    Returns the number of entries that were successfully processed.
+    """
+    try:
+        if actions:
+            bulk_live_indices(actions.values())
+    # pylint: disable=broad-except
+    except Exception as error:
+        if logger:
+            logger.error(
+                "Failed to send %d actions to Elasticsearch: %r", len(actions), error
+            )
+        record_failure(entries, error)
+        return 0
+
+    for entry in entries:
+        # Entries that were updated in the meantime must be processed again
+        SearchQueueEntry.objects.filter(
+            pk=entry.pk, updated_on=entry.updated_on
+        ).delete()
+    if any(is_named_in_facets(entry.page) for entry in entries):
+        invalidate_i18n_names()
+    return len(entries)
+
+
+def process_search_queue(batch_size=None, max_attempts=None, logger=None):
+    """
+    Drain the queue of pending updates of the Elasticsearch indices: entries are processed
+    in batches and the actions of all entries in a batch are sent to Elasticsearch in one
+    bulk request. A document impacted by several entries of a batch is only sent once (see
+    `add_action`).
+
+    Entries that fail are retried later, until they reach the maximum number of attempts.
+    They are then left in the queue for inspection.
+
+    Several workers may process the queue concurrently: the entries of a batch are locked
+    until the batch is processed and entries locked by another worker are skipped.
+
+    Returns the number of entries that were successfully processed.
+    """
+    batch_size = batch_size or getattr(settings, "RICHIE_ES_CHUNK_SIZE", ES_CHUNK_SIZE)
+    max_attempts = max_attempts or getattr(
+        settings, "RICHIE_SEARCH_QUEUE_MAX_ATTEMPTS", SEARCH_QUEUE_MAX_ATTEMPTS
+    )
+    processed = 0
+
+    while True:
+        with transaction.atomic():
+            # Pages are not joined so that only the rows of the entries are locked
+            entries = list(
+                SearchQueueEntry.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=max_attempts, retry_on__lte=timezone.now())
+                .prefetch_related("page")
+                .order_by("created_on")[:batch_size]
+            )
+            if not entries:
+                break
+
+            actions, prepared_entries = prepare_actions(entries, logger=logger)
+            processed += send_actions(actions, prepared_entries, logger=logger)
+
+    return processed
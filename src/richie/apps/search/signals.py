@@ -1,56 +1,57 @@
 """Update Elasticsearch indices each time a page is modified."""
+from itertools import chain
+
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
 from django.dispatch import receiver
+from django.utils import timezone
 
 from cms import operations
 from cms.models import Title
 from cms.signals import post_obj_operation
 
 from richie.apps.courses.models import Category, Course, Organization, Person
-from richie.apps.search.index_manager import richie_bulk
+from richie.apps.search.index_manager import bulk_live_indices
 from richie.apps.search.indexers import ES_INDICES
 from richie.apps.search.indexers.categories import CategoriesIndexer
+from richie.apps.search.models import SearchQueueEntry
+from richie.apps.search.utils.i18n_names import invalidate_i18n_names
 
 
-def apply_es_action_to_course(instance, action, _language):
+def get_es_actions_for_course(instance, action, _language):
     """
-    Update Elasticsearch indices when a course is modified:
+    Get the actions to update Elasticsearch indices when a course is modified:
     - update the course document in the Elasticsearch courses index.
 
-    Returns None if the page was related to a course and the Elasticsearch update is done.
     Raises ObjectDoesNotExist if the page instance is not related to a course.
     """
     course = Course.objects.get(draft_extension__extended_object=instance)
-    if not course.is_snapshot:
-        richie_bulk(
-            [ES_INDICES.courses.get_es_document_for_course(course, action=action)]
-        )
+    if course.is_snapshot:
+        return []
+    return [ES_INDICES.courses.get_es_document_for_course(course, action=action)]
 
 
-def apply_es_action_to_organization(instance, action, language):
+def get_es_actions_for_organization(instance, action, language):
     """
-    Update Elasticsearch indices when an organization is modified:
+    Get the actions to update Elasticsearch indices when an organization is modified:
     - update the organization document in the Elasticsearch organizations index for the
       organization and its direct parent (because the parent ID may change from Parent to Leaf),
-    - update the course documents in the Elasticsearch courses index for all courses linked to
-      this organization.
+    - update the fields denormalized from the organization in the documents of all courses
+      linked to it in the Elasticsearch courses index. These actions are streamed so that
+      courses are loaded and formatted in batches.
 
-    Returns None if the page was related to an organization and the Elasticsearch update is done.
     Raises ObjectDoesNotExist if the page instance is not related to an organization.
     """
     organization = Organization.objects.get(draft_extension__extended_object=instance)
-    actions = [
-        ES_INDICES.courses.get_es_document_for_course(course)
-        for course in organization.get_courses(language)
-        if not course.is_snapshot
-    ]
-    actions.append(
+    course_actions = ES_INDICES.courses.get_es_partial_documents(
+        organization.get_courses(language), "organizations"
+    )
+    organization_actions = [
         ES_INDICES.organizations.get_es_document_for_organization(
             organization, action=action
         )
-    )
+    ]
 
     # Update the organization's parent only if it exists
     try:
@@ -58,55 +59,52 @@ def apply_es_action_to_organization(instance, action, language):
     except AttributeError:
         pass
     else:
-        actions.append(
+        organization_actions.append(
             ES_INDICES.organizations.get_es_document_for_organization(parent)
         )
 
-    richie_bulk(actions)
+    return chain(course_actions, organization_actions)
 
 
-def apply_es_action_to_person(instance, action, language):
+def get_es_actions_for_person(instance, action, language):
     """
-    Update Elasticsearch indices when a person is modified:
+    Get the actions to update Elasticsearch indices when a person is modified:
     - update the person document in the Elasticsearch persons index for the
       person,
-    - update the course documents in the Elasticsearch courses index for all courses linked to
-      this person.
+    - update the fields denormalized from the person in the documents of all courses
+      linked to it in the Elasticsearch courses index. These actions are streamed so that
+      courses are loaded and formatted in batches.
 
-    Returns None if the page was related to a person and the Elasticsearch update is done.
     Raises ObjectDoesNotExist if the page instance is not related to a person.
     """
     person = Person.objects.get(draft_extension__extended_object=instance)
-    actions = [
-        ES_INDICES.courses.get_es_document_for_course(course)
-        for course in person.get_courses(language)
-        if not course.is_snapshot
-    ]
-    actions.append(ES_INDICES.persons.get_es_document_for_person(person, action=action))
-
-    richie_bulk(actions)
+    course_actions = ES_INDICES.courses.get_es_partial_documents(
+        person.get_courses(language), "persons"
+    )
+    return chain(
+        course_actions,
+        [ES_INDICES.persons.get_es_document_for_person(person, action=action)],
+    )
 
 
-def apply_es_action_to_category(instance, action, language):
+def get_es_actions_for_category(instance, action, language):
     """
-    Update Elasticsearch indices when a category is modified:
+    Get the actions to update Elasticsearch indices when a category is modified:
     - update the category document in the Elasticsearch categories index for the category
       and its direct parent (because the parent ID may change from Parent to Leaf),
-    - update the course documents in the Elasticsearch courses index for all courses linked to
-      this category.
+    - update the fields denormalized from the category in the documents of all courses
+      linked to it in the Elasticsearch courses index. These actions are streamed so that
+      courses are loaded and formatted in batches.
 
-    Returns None if the page was related to a category and the Elasticsearch update is done.
     Raises ObjectDoesNotExist if the page instance is not related to a category.
     """
     category = Category.objects.get(draft_extension__extended_object=instance)
-    actions = [
-        ES_INDICES.courses.get_es_document_for_course(course)
-        for course in category.get_courses(language)
-        if not course.is_snapshot
-    ]
-    actions.append(
-        ES_INDICES.categories.get_es_document_for_category(category, action=action)
+    course_actions = ES_INDICES.courses.get_es_partial_documents(
+        category.get_courses(language), "categories"
     )
+    category_actions = [
+        ES_INDICES.categories.get_es_document_for_category(category, action=action)
+    ]
 
     # Update the category's parent only if it exists
     try:
@@ -114,49 +112,147 @@ def apply_es_action_to_category(instance, action, language):
     except AttributeError:
         pass
     else:
-        actions.append(ES_INDICES.categories.get_es_document_for_category(parent))
+        category_actions.append(
+            ES_INDICES.categories.get_es_document_for_category(parent)
+        )
 
-    richie_bulk(actions)
+    return chain(course_actions, category_actions)
 
 
-def apply_es_action_to_page(page, action, language):
+def apply_es_action_to_course(instance, action, language):
+    """
+    Update Elasticsearch indices when a course is modified.
+
+    Returns None if the page was related to a course and the Elasticsearch update is done.
+    Raises ObjectDoesNotExist if the page instance is not related to a course.
     """
-    Try updating each type of page extension one-by-one until one works (because we don't know
-    to which type of page extension this page is related).
+    actions = get_es_actions_for_course(instance, action, language)
+    if actions:
+        bulk_live_indices(actions)
+
+
+def apply_es_action_to_organization(instance, action, language):
+    """
+    Update Elasticsearch indices when an organization is modified.
+
+    Returns None if the page was related to an organization and the Elasticsearch update is done.
+    Raises ObjectDoesNotExist if the page instance is not related to an organization.
+    """
+    bulk_live_indices(get_es_actions_for_organization(instance, action, language))
+    invalidate_i18n_names()
+
+
+def apply_es_action_to_person(instance, action, language):
+    """
+    Update Elasticsearch indices when a person is modified.
+
+    Returns None if the page was related to a person and the Elasticsearch update is done.
+    Raises ObjectDoesNotExist if the page instance is not related to a person.
+    """
+    bulk_live_indices(get_es_actions_for_person(instance, action, language))
+    invalidate_i18n_names()
+
+
+def apply_es_action_to_category(instance, action, language):
+    """
+    Update Elasticsearch indices when a category is modified.
+
+    Returns None if the page was related to a category and the Elasticsearch update is done.
+    Raises ObjectDoesNotExist if the page instance is not related to a category.
+    """
+    bulk_live_indices(get_es_actions_for_category(instance, action, language))
+    invalidate_i18n_names()
+
+
+def get_es_actions_for_page(page, action, language):
+    """
+    Try getting the actions for each type of page extension one-by-one until one works
+    (because we don't know to which type of page extension this page is related).
+    Returns an empty list if the page is not related to any indexed page extension.
+
+    Actions may be returned as a lazy iterable: they must only be consumed once.
     """
     for method in [
-        apply_es_action_to_course,
-        apply_es_action_to_category,
-        apply_es_action_to_organization,
-        apply_es_action_to_person,
+        get_es_actions_for_course,
+        get_es_actions_for_category,
+        get_es_actions_for_organization,
+        get_es_actions_for_person,
     ]:
         try:
             # The method should raise an ObjectDoesNotExist exception if the page extension
             # linked to this page is of another type.
-            method(page, action, language)
+            return method(page, action, language)
         except ObjectDoesNotExist:
             continue
-        else:
-            return
+    return []
+
+
+def is_named_in_facets(page):
+    """
+    Check whether a page is related to a page extension whose name is used to label the
+    facets of course searches and is thus cached (see `richie.apps.search.utils.i18n_names`).
+    """
+    return any(
+        hasattr(page, extension) for extension in ["category", "organization", "person"]
+    )
+
+
+def apply_es_action_to_page(page, action, language):
+    """
+    Update Elasticsearch indices with the actions related to a page, whatever the type of
+    page extension it is related to.
+    """
+    actions = get_es_actions_for_page(page, action, language)
+    if actions:
+        bulk_live_indices(actions)
+        if is_named_in_facets(page):
+            invalidate_i18n_names()
+
+
+def queue_es_action_to_page(page, action, language):
+    """
+    Record an update of the Elasticsearch indices for a page, to be processed later by the
+    `process_search_queue` command. An update already pending for the page is replaced so
+    that the page is only processed once.
+    """
+    SearchQueueEntry.objects.update_or_create(
+        page=page,
+        defaults={
+            "action": action,
+            "language": language,
+            "attempts": 0,
+            "last_error": "",
+            "retry_on": timezone.now(),
+        },
+    )
+
+
+def on_page_action(page, action, language):
+    """
+    Trigger the update of the Elasticsearch indices for a page, either by queuing it in the
+    same database transaction or by applying it only once the transaction is successful.
+    """
+    if getattr(settings, "RICHIE_QUEUE_SEARCH_UPDATES", False):
+        queue_es_action_to_page(page, action, language)
+    else:
+        transaction.on_commit(lambda: apply_es_action_to_page(page, action, language))
 
 
 # pylint: disable=unused-argument
 def on_page_published(sender, instance, language, **kwargs):
     """
     Trigger update of the Elasticsearch indices impacted by the modification of the instance
-    only once the database transaction is successful.
+    (see `on_page_action`).
     """
     if getattr(settings, "RICHIE_KEEP_SEARCH_UPDATED", True):
-        transaction.on_commit(
-            lambda: apply_es_action_to_page(instance, "index", language)
-        )
+        on_page_action(instance, "index", language)
 
 
 # pylint: disable=unused-argument
 def on_page_unpublished(sender, instance, language, **kwargs):
     """
     Trigger update of the Elasticsearch indices impacted by the modification of the instance
-    only once the database transaction is successful.
+    (see `on_page_action`).
     """
     if getattr(settings, "RICHIE_KEEP_SEARCH_UPDATED", True):
         # Only unlist pages that are unpublished from all languages otherwise,
@@ -166,9 +262,7 @@ def on_page_unpublished(sender, instance, language, **kwargs):
             if Title.objects.filter(page=instance, published=True).exists()
             else "delete"
         )
-        transaction.on_commit(
-            lambda: apply_es_action_to_page(instance, action, language)
-        )
+        on_page_action(instance, action, language)
 
 
 # pylint: disable=unused-argument
@@ -184,4 +278,4 @@ def on_page_moved(sender, **kwargs):
         if operation_type == operations.MOVE_PAGE:
             page = kwargs["obj"]
             if hasattr(page, "category"):
-                richie_bulk(CategoriesIndexer.get_es_documents())
+                bulk_live_indices(CategoriesIndexer.get_es_documents())
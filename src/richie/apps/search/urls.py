@@ -5,7 +5,7 @@ from django.urls import path
 
 from rest_framework import routers
 
-from .views import bootstrap_elasticsearch, filter_definitions
+from .views import autocomplete, bootstrap_elasticsearch, filter_definitions
 from .viewsets.categories import CategoriesViewSet
 from .viewsets.courses import CoursesViewSet
 from .viewsets.organizations import OrganizationsViewSet
@@ -28,6 +28,7 @@ urlpatterns = [
         name="bootstrap_elasticsearch",
     ),
     path(r"filter-definitions/", filter_definitions, name="filter_definitions"),
+    path(r"search/autocomplete/", autocomplete, name="autocomplete"),
 ]
 
 urlpatterns += ROUTER.urls
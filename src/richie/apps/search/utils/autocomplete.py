@@ -0,0 +1,322 @@
+"""
+Autocomplete queries with the completion suggesters of indices, caching suggestions by
+index, contexts, language, size and normalized prefix.
+
+Short prefixes, the most frequent ones, are precomputed in the "search" cache shared by all
+processes after the indices are regenerated (see `precompute_autocomplete_prefixes`). Longer
+prefixes are cached in a LRU cache local to each process. All keys include a generation that
+is bumped each time documents are indexed in a way that may change suggestions, so that the
+precomputed prefixes are kept when only other fields are updated (e.g. the state of courses).
+"""
+import unicodedata
+
+from django.conf import settings
+
+from ..defaults import (
+    SEARCH_AUTOCOMPLETE_CACHE_SIZE,
+    SEARCH_AUTOCOMPLETE_CACHE_TIMEOUT,
+    SEARCH_AUTOCOMPLETE_PRECOMPUTED_ALPHABET,
+    SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH,
+    SEARCH_AUTOCOMPLETE_SIZE,
+)
+from ..filter_definitions import FILTERS
+from ..indexers import ES_INDICES
+from .cache import LRUCache, bump_generation, get_generation, get_shared_cache
+from .multi_search import multi_search
+
+GENERATION_CACHE_KEY = "autocomplete_generation"
+
+# Number of completion suggesters sent in each multi search request to precompute prefixes
+PRECOMPUTE_BATCH_SIZE = 100
+
+local_cache = LRUCache(
+    "RICHIE_SEARCH_AUTOCOMPLETE_CACHE_SIZE", SEARCH_AUTOCOMPLETE_CACHE_SIZE
+)
+
+
+def get_autocomplete_kinds():
+    """
+    Map each kind of object that can be autocompleted with its indexer and the contexts of its
+    completion suggester: courses and the objects of autocompletable filters. Categories of
+    all kinds share an index and are told apart by a context, the reverse id of the meta
+    category of the filter (see `CategoriesIndexer.get_es_document_for_category`).
+    """
+    kinds = {"courses": (ES_INDICES.courses, None)}
+    for filter_definition in FILTERS.values():
+        if not getattr(filter_definition, "is_autocompletable", False):
+            continue
+        indexer = getattr(ES_INDICES, filter_definition.term)
+        kinds[filter_definition.name] = (
+            indexer,
+            {"kind": [filter_definition.reverse_id]}
+            if indexer is ES_INDICES.categories
+            else None,
+        )
+    return kinds
+
+
+def get_autocomplete_generation(shared_cache):
+    """
+    Get the generation of the cached suggestions, bumped each time documents are indexed in a
+    way that may change suggestions (see `changes_suggestions`).
+    """
+    return get_generation(shared_cache, GENERATION_CACHE_KEY)
+
+
+def get_precomputed_prefix_length():
+    """Return the length up to which prefixes are precomputed in the shared cache."""
+    return getattr(
+        settings,
+        "RICHIE_SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH",
+        SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH,
+    )
+
+
+def normalize_prefix(prefix):
+    """
+    Normalize a prefix the way the completion fields analyze it, lowercase and insensitive to
+    diacritics, so that prefixes getting the same suggestions share the same cache key.
+    """
+    decomposed = unicodedata.normalize("NFKD", prefix)
+    return " ".join(
+        "".join(char for char in decomposed if not unicodedata.combining(char))
+        .lower()
+        .split()
+    )
+
+
+def get_cache_key(generation, language, completion):
+    """
+    Build the key under which the suggestions of a completion, given as an (indexer, prefix,
+    contexts, size) tuple, are cached.
+    """
+    indexer, prefix, contexts, size = completion
+    contexts_key = ",".join(
+        f"{name:s}={'|'.join(values):s}"
+        for name, values in sorted((contexts or {}).items())
+    )
+    return (
+        f"autocomplete_{generation:d}_{indexer.index_name!s}_{contexts_key:s}_"
+        f"{language:s}_{size:d}_{normalize_prefix(prefix):s}"
+    )
+
+
+def get_cache_keys(shared_cache, completions, language):
+    """
+    Build the cache key of each completion (see `autocomplete_many`), along with whether its
+    prefix is short enough to be cached in the shared cache, or None if there is no shared
+    cache.
+    """
+    if shared_cache is None:
+        return [None] * len(completions)
+
+    generation = get_autocomplete_generation(shared_cache)
+    precomputed_length = get_precomputed_prefix_length()
+    default_size = getattr(
+        settings, "RICHIE_SEARCH_AUTOCOMPLETE_SIZE", SEARCH_AUTOCOMPLETE_SIZE
+    )
+    return [
+        (
+            get_cache_key(
+                generation, language, (indexer, prefix, contexts, size or default_size)
+            ),
+            len(normalize_prefix(prefix)) <= precomputed_length,
+        )
+        for indexer, prefix, contexts, size in completions
+    ]
+
+
+def get_completion_body(name, prefix, language, contexts=None, size=None):
+    """Build the body of a search running a completion suggester."""
+    completion = {
+        "field": f"complete.{language:s}",
+        "size": size
+        or getattr(
+            settings, "RICHIE_SEARCH_AUTOCOMPLETE_SIZE", SEARCH_AUTOCOMPLETE_SIZE
+        ),
+    }
+    if contexts:
+        completion["contexts"] = contexts
+    return {
+        # Only suggestions are needed, not the hits of the default query
+        "size": 0,
+        "suggest": {name: {"prefix": prefix, "completion": completion}},
+    }
+
+
+def fetch_suggestions(completions, language):
+    """
+    Run the completion suggesters of a list of completions (see `autocomplete_many`) in one
+    multi search request and return their suggestions in the same order.
+    """
+    responses = multi_search(
+        [
+            (
+                indexer.index_name,
+                get_completion_body(
+                    "suggestions", prefix, language, contexts=contexts, size=size
+                ),
+            )
+            for indexer, prefix, contexts, size in completions
+        ]
+    )
+    return [
+        [
+            indexer.format_es_document_for_autocomplete(option, language)
+            for option in response["suggest"]["suggestions"][0]["options"]
+        ]
+        for (indexer, _prefix, _contexts, _size), response in zip(
+            completions, responses
+        )
+    ]
+
+
+def autocomplete_many(completions, language):
+    """
+    Get the suggestions of several completions, first looking in the caches and then running
+    the completion suggesters of those that are still missing in one multi search request.
+
+    Arguments:
+    ----------
+        completions (List[Tuple]): a list of (indexer, prefix, contexts, size) tuples, the
+            contexts and size being optional (None).
+        language (str): the language of the completion fields and of the suggestions.
+
+    Returns:
+    --------
+        List[List[Dict]]: the suggestions of each completion, in the same order, formatted by
+            the indexer for autocomplete consumers.
+    """
+    shared_cache = get_shared_cache()
+    keys = get_cache_keys(shared_cache, completions, language)
+
+    suggestions = [None] * len(completions)
+    if shared_cache is not None:
+        found = {
+            **local_cache.get_many([key for key, is_short in keys if not is_short]),
+            **shared_cache.get_many([key for key, is_short in keys if is_short]),
+        }
+        suggestions = [found.get(key) for key, _is_short in keys]
+
+    missing = [i for i, value in enumerate(suggestions) if value is None]
+    if not missing:
+        return suggestions
+
+    fetched = {}
+    for i, value in zip(
+        missing, fetch_suggestions([completions[i] for i in missing], language)
+    ):
+        suggestions[i] = value
+        if keys[i] is not None:
+            fetched[keys[i]] = value
+
+    if fetched:
+        local_cache.set_many(
+            {key: value for (key, is_short), value in fetched.items() if not is_short}
+        )
+        shared_cache.set_many(
+            {key: value for (key, is_short), value in fetched.items() if is_short},
+            getattr(
+                settings,
+                "RICHIE_SEARCH_AUTOCOMPLETE_CACHE_TIMEOUT",
+                SEARCH_AUTOCOMPLETE_CACHE_TIMEOUT,
+            ),
+        )
+
+    return suggestions
+
+
+def autocomplete(indexer, prefix, language, contexts=None, size=None):
+    """Get the suggestions of a single completion (see `autocomplete_many`)."""
+    return autocomplete_many([(indexer, prefix, contexts, size)], language)[0]
+
+
+def get_prefixes_with_suggestions(batch, language):
+    """
+    Get the suggestions of a list of (indexer, prefix, contexts) tuples, in multi search
+    requests of `PRECOMPUTE_BATCH_SIZE` completion suggesters, caching them on the way, and
+    yield the tuples whose prefix has suggestions.
+    """
+    for start in range(0, len(batch), PRECOMPUTE_BATCH_SIZE):
+        end = start + PRECOMPUTE_BATCH_SIZE
+        chunk = batch[start:end]
+        results = autocomplete_many(
+            [
+                (indexer, prefix, dict(contexts) or None, None)
+                for indexer, prefix, contexts in chunk
+            ],
+            language,
+        )
+        yield from (item for item, suggestions in zip(chunk, results) if suggestions)
+
+
+def precompute_autocomplete_prefixes(logger=None):
+    """
+    Warm the shared cache with the suggestions of all the prefixes made of up to
+    `RICHIE_SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH` characters of the alphabet, for all
+    kinds of objects and languages. Prefixes extending a prefix that has no suggestions can't
+    have any either, they are not requested.
+
+    Returns the number of prefixes cached.
+    """
+    length = get_precomputed_prefix_length()
+    if not length or get_shared_cache() is None:
+        return 0
+
+    alphabet = getattr(
+        settings,
+        "RICHIE_SEARCH_AUTOCOMPLETE_PRECOMPUTED_ALPHABET",
+        SEARCH_AUTOCOMPLETE_PRECOMPUTED_ALPHABET,
+    )
+    # Organizations or persons may be autocompleted as several kinds, they are only
+    # precomputed once (contexts are turned into tuples to be hashable)
+    completions = {
+        (
+            indexer,
+            tuple(
+                (name, tuple(values))
+                for name, values in sorted((contexts or {}).items())
+            ),
+        )
+        for indexer, contexts in get_autocomplete_kinds().values()
+    }
+
+    count = 0
+    for language, _name in settings.LANGUAGES:
+        prefixes = {completion: [""] for completion in completions}
+        for _ in range(length):
+            batch = [
+                (indexer, f"{prefix:s}{char:s}", contexts)
+                for (indexer, contexts), parents in prefixes.items()
+                for prefix in parents
+                for char in alphabet
+            ]
+            prefixes = {completion: [] for completion in completions}
+            for indexer, prefix, contexts in get_prefixes_with_suggestions(
+                batch, language
+            ):
+                prefixes[(indexer, contexts)].append(prefix)
+            count += len(batch)
+
+    if logger:
+        logger.info("%d autocomplete prefixes precomputed.", count)
+    return count
+
+
+def changes_suggestions(action):
+    """
+    Return True if a bulk action may change the suggestions of completion suggesters: any
+    action but the partial updates that leave the completion field untouched.
+    """
+    return action.get("_op_type", "index") != "update" or "complete" in action.get(
+        "doc", {}
+    )
+
+
+def invalidate_autocomplete():
+    """
+    Invalidate all the cached suggestions, in all processes, by moving to a new generation of
+    keys. The keys of former generations are left to expire from the shared cache.
+    """
+    local_cache.clear()
+    bump_generation(get_shared_cache(), GENERATION_CACHE_KEY)
@@ -0,0 +1,106 @@
+"""
+Helpers shared by the caches of the search app, which are built on top of the "search" cache,
+sometimes behind a LRU cache local to each process.
+
+Cached values are invalidated in all processes at once by bumping a generation number, stored
+in the shared cache, that is part of their keys: keys of former generations are never read
+again and are left to expire.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+
+def get_shared_cache():
+    """Return the "search" cache or None if it is not configured."""
+    try:
+        return caches["search"]
+    except InvalidCacheBackendError:
+        return None
+
+
+def get_generation(shared_cache, key):
+    """
+    Get the current generation stored under a key. If it is missing from the shared cache
+    (never set, evicted or cleared), a fresh value is stored, so that values cached for a
+    previous generation, for example in a cache local to a process, can't be revived.
+    """
+    if shared_cache is None:
+        # Without a shared cache, values can only be invalidated in the current process
+        return 0
+
+    generation = shared_cache.get(key)
+    if generation is None:
+        # Another process may be doing the same, only the first value stored is kept
+        generation = time.time_ns()
+        shared_cache.add(key, generation, timeout=None)
+        generation = shared_cache.get(key, generation)
+    return generation
+
+
+def bump_generation(shared_cache, key):
+    """Move the generation stored under a key to a new value."""
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.incr(key)
+    except ValueError:
+        # The generation is missing, the next reading will store a fresh one
+        pass
+
+
+def increment_counter(shared_cache, key):
+    """Increment a counter that never expires, creating it if it is missing."""
+    if shared_cache is None:
+        return
+    try:
+        shared_cache.incr(key)
+    except ValueError:
+        if not shared_cache.add(key, 1, timeout=None):
+            # Another process created the counter in the meantime
+            shared_cache.incr(key)
+
+
+class LRUCache:
+    """A thread-safe dictionary that drops its least recently used keys beyond a size."""
+
+    def __init__(self, size_setting, default_size):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_setting = size_setting
+        self.default_size = default_size
+
+    @property
+    def max_size(self):
+        """The size is read from the settings each time to ease testing."""
+        return getattr(settings, self.size_setting, self.default_size)
+
+    def get_many(self, keys):
+        """Return a dictionary of the values found for a list of keys."""
+        values = {}
+        with self._lock:
+            for key in keys:
+                try:
+                    values[key] = self._data[key]
+                except KeyError:
+                    continue
+                self._data.move_to_end(key)
+        return values
+
+    def set_many(self, values):
+        """Set the values of a dictionary, evicting the oldest keys if necessary."""
+        with self._lock:
+            for key, value in values.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all the keys."""
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,157 @@
+"""
+Cache the internationalized names of indexed objects (categories, organizations, persons...)
+so that facets can be labelled without querying Elasticsearch on each search request.
+
+Names are cached by index, object id and language at two levels: a LRU cache local to each process
+in front of the "search" cache shared by all processes. Both levels are invalidated at once
+by bumping a generation number, stored in the shared cache, that is part of all the keys
+(see `utils.cache`).
+"""
+from django.conf import settings
+from django.utils import translation
+
+from .. import ES_CLIENT
+from ..defaults import I18N_NAMES_CACHE_SIZE
+from .cache import LRUCache, bump_generation, get_generation, get_shared_cache
+from .i18n import get_best_field_language
+
+GENERATION_CACHE_KEY = "i18n_names_generation"
+
+
+local_cache = LRUCache("RICHIE_SEARCH_I18N_NAMES_CACHE_SIZE", I18N_NAMES_CACHE_SIZE)
+
+
+def get_shared_cache_key(generation, index_name, object_id, language):
+    """Build the key under which a name is stored in the shared cache."""
+    return f"i18n_name_{generation:d}_{index_name!s}_{object_id!s}_{language:s}"
+
+
+def fetch_i18n_names(keys, language):
+    """
+    Fetch from Elasticsearch, in one `mget` request, the names of the objects identified by
+    a list of `(generation, index_name, object_id, language)` keys.
+
+    Returns:
+    --------
+        Dict[Tuple, str]: a dictionary mapping keys with the names of the objects found in
+            their index, for all the languages of the site on top of the requested language.
+    """
+    # We only need the titles to get the i18n names
+    # pylint: disable=unexpected-keyword-arg
+    response = ES_CLIENT.mget(
+        body={
+            "docs": [
+                {"_index": index_name, "_id": object_id}
+                for _generation, index_name, object_id, _language in keys
+            ]
+        },
+        _source=["title"],
+    )
+
+    fetched_names = {}
+    languages = {language, *(lang for lang, _ in settings.LANGUAGES)}
+    # Documents are returned in the order in which they were requested. We don't rely on
+    # their "_index" as it may be the name of the index behind an alias.
+    for key, doc in zip(keys, response["docs"]):
+        if not doc.get("found"):
+            continue
+        for lang in languages:
+            fetched_names[(*key[:3], lang)] = get_best_field_language(
+                doc["_source"]["title"], lang
+            )
+    return fetched_names
+
+
+def get_i18n_names_many(ids_by_indexer, language=None):
+    """
+    Get the name of each object of lists of ids in several indices, in the best available
+    language, first looking in the local cache, then in the shared cache and finally fetching
+    the names that are still missing from all the indices in one `mget` request.
+
+    The names of an object fetched from Elasticsearch are cached for all the languages of
+    the site at once.
+
+    Arguments:
+    ----------
+        ids_by_indexer (Dict[Indexer, Iterable[str]]): a dictionary mapping indexers with the
+            ids of the objects to look for in their index.
+
+    Returns:
+    --------
+        Dict[Indexer, Dict[str, str]]: a dictionary mapping each indexer with a dictionary of
+            the names of the objects found in its index by id. Ids that are not found are
+            omitted.
+    """
+    language = language or translation.get_language()
+    shared_cache = get_shared_cache()
+    generation = get_generation(shared_cache, GENERATION_CACHE_KEY)
+
+    names = {indexer: {} for indexer in ids_by_indexer}
+    keys = {
+        (generation, str(indexer.index_name), str(object_id), language): (
+            indexer,
+            str(object_id),
+        )
+        for indexer, ids in ids_by_indexer.items()
+        for object_id in ids
+    }
+
+    def add_names(names_by_key):
+        for key, name in names_by_key.items():
+            indexer, object_id = keys[key]
+            names[indexer][object_id] = name
+
+    add_names(local_cache.get_many(keys))
+    missing_keys = {
+        get_shared_cache_key(*key): key
+        for key, (indexer, object_id) in keys.items()
+        if object_id not in names[indexer]
+    }
+    if missing_keys and shared_cache:
+        shared_names = {
+            missing_keys[shared_key]: name
+            for shared_key, name in shared_cache.get_many(missing_keys).items()
+        }
+        local_cache.set_many(shared_names)
+        add_names(shared_names)
+
+    missing = sorted(
+        key
+        for key, (indexer, object_id) in keys.items()
+        if object_id not in names[indexer]
+    )
+    if not missing:
+        return names
+
+    fetched_names = fetch_i18n_names(missing, language)
+    add_names({key: fetched_names[key] for key in missing if key in fetched_names})
+
+    local_cache.set_many(fetched_names)
+    if shared_cache:
+        shared_cache.set_many(
+            {get_shared_cache_key(*key): name for key, name in fetched_names.items()}
+        )
+
+    return names
+
+
+def get_i18n_names(indexer, ids, language=None):
+    """
+    Get the name of each object of a list of ids in an indexer's index, in the best available
+    language (see `get_i18n_names_many`).
+
+    Returns:
+    --------
+        Dict[str, str]: a dictionary mapping each id found in the index with its name.
+            Ids that are not found are omitted.
+    """
+    return get_i18n_names_many({indexer: ids}, language=language)[indexer]
+
+
+def invalidate_i18n_names():
+    """
+    Invalidate all the cached names, in all processes, by moving to a new generation of keys.
+    The keys of former generations are left to expire from the shared cache.
+    """
+    local_cache.clear()
+    bump_generation(get_shared_cache(), GENERATION_CACHE_KEY)
@@ -2,8 +2,13 @@
 Common utilities related to our indexers. For use in our indexers and related settings,
 or as helpers for users of the project.
 """
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Q
 from django.utils.module_loading import import_string
 
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
 
 class IndicesList:
     """
@@ -45,3 +50,21 @@ def slice_string_for_completion(string):
     """
     parts = [part for part in string.split(" ") if part != ""]
     return [" ".join(parts[index:]) for index, _ in enumerate(parts)]
+
+
+def get_page_changed_clause(since, page_lookup="extended_object"):
+    """
+    Build a clause to filter objects on whether a related page was modified or published
+    after a date. The page is the page extended by the objects unless another lookup is given.
+    """
+    return Q(**{f"{page_lookup:s}__changed_date__gt": since}) | Q(
+        **{f"{page_lookup:s}__publication_date__gt": since}
+    )
+
+
+def get_epoch_milliseconds(value):
+    """
+    Convert an aware datetime to the number of milliseconds elapsed since the epoch, truncating
+    microseconds like Elasticsearch does when it parses a date.
+    """
+    return (value - EPOCH) // timedelta(milliseconds=1)
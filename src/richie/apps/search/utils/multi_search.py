@@ -0,0 +1,32 @@
+"""
+Run several Elasticsearch searches in one round-trip.
+"""
+from elasticsearch.exceptions import TransportError
+
+from .. import ES_CLIENT
+
+
+def multi_search(searches):
+    """
+    Run several searches, given as a list of (index, body) tuples, in one round-trip to
+    Elasticsearch and return their responses in the same order. A failure of any of the
+    searches is raised. Searches tied to a point in time don't target an index.
+    """
+    if len(searches) < 2:
+        return [ES_CLIENT.search(index=index, body=body) for index, body in searches]
+
+    response = ES_CLIENT.msearch(
+        body=[
+            line
+            for index, body in searches
+            for line in ({"index": index} if index else {}, body)
+        ]
+    )
+    for search_response in response["responses"]:
+        if "error" in search_response:
+            raise TransportError(
+                search_response.get("status", "N/A"),
+                search_response["error"].get("type"),
+                search_response["error"],
+            )
+    return response["responses"]
@@ -0,0 +1,316 @@
+"""
+Helpers to load the objects related to a whole list of pages in a handful of set-based
+queries. They allow our indexers to build documents for batches of objects without issuing
+queries for each object.
+"""
+from collections import defaultdict
+
+from django.db.models import F, Prefetch
+from django.utils import translation
+
+from cms.models import Page, Title, TreeNode
+from cms.models.titlemodels import EmptyTitle
+from cms.utils import get_current_site, i18n
+
+from richie.apps.courses.models import CourseRun
+
+
+def get_ancestor_paths(path):
+    """Compute the paths of all the ancestors of a node from its materialized path."""
+    return [path[0:pos] for pos in range(0, len(path), TreeNode.steplen)[1:]]
+
+
+def get_titles_by_page(page_ids):
+    """
+    Load all the titles of a list of pages in one query.
+
+    Returns:
+    --------
+        Dict[int, List[Title]]: a dictionary mapping each page id with its titles in all
+            languages, published or not.
+    """
+    titles = defaultdict(list)
+    for title in Title.objects.filter(page_id__in=page_ids):
+        titles[title.page_id].append(title)
+    return titles
+
+
+def fill_title_cache(page, titles, languages):
+    """
+    Populate the title cache of a page instance so that methods like `get_title` or
+    `get_absolute_url` can be called without querying the database.
+
+    DjangoCMS reloads the titles of a page each time a language that has no title is
+    requested, so we also cache an empty title for each missing language. It is falsy and
+    triggers the same language fallbacks as a missing title would.
+    """
+    page.title_cache = {title.language: title for title in titles}
+    for language in languages:
+        page.title_cache.setdefault(language, EmptyTitle(language=language))
+
+
+def get_plugins_by_page(plugin_model, page_ids, slot, select_related=(), **filters):
+    """
+    Load, in one query, the plugins of a given model found in a placeholder identified by
+    its slot, on each page of a list of pages. The relations listed in `select_related` are
+    loaded in the same query.
+
+    Returns:
+    --------
+        Dict[int, List[CMSPlugin]]: a dictionary mapping each page id with the plugins found
+            on it, in the order they were returned by the database.
+    """
+    plugins = defaultdict(list)
+    # Reuse the join on placeholder pages to know on which page each plugin was found
+    plugin_query = (
+        plugin_model.objects.filter(
+            cmsplugin_ptr__placeholder__page__in=page_ids,
+            cmsplugin_ptr__placeholder__slot=slot,
+            **filters,
+        )
+        .select_related(*select_related)
+        .annotate(prefetch_page_id=F("cmsplugin_ptr__placeholder__page"))
+    )
+    for plugin in plugin_query:
+        plugins[plugin.prefetch_page_id].append(plugin)
+    return plugins
+
+
+def get_relevant_languages(page_ids, existing_languages, language=None):
+    """
+    For each page, pick the first language, among the current language and its fallbacks,
+    in which plugins exist on the page.
+
+    Returns:
+    --------
+        Dict[int, str]: a dictionary mapping each page id with its relevant language, the
+            current language if the page has no plugins in any of the languages.
+    """
+    current_language = language or translation.get_language()
+    site = get_current_site()
+    languages = [current_language] + i18n.get_fallback_languages(
+        current_language, site_id=site.pk
+    )
+    return {
+        page_id: next(
+            (lang for lang in languages if lang in existing_languages[page_id]),
+            current_language,
+        )
+        for page_id in page_ids
+    }
+
+
+def get_plugin_positions(pages, plugin_model, language=None):
+    """
+    For each page in a list of pages, find the lowest position of the plugins pointing to
+    each target page, among the plugins in the most relevant language of the page according
+    to the language fallbacks.
+
+    Returns:
+    --------
+        Dict[int, Dict[int, int]]: a dictionary mapping the id of each page with the lowest
+            position of the plugins pointing to each target page id.
+    """
+    rows = list(
+        plugin_model.objects.filter(
+            cmsplugin_ptr__placeholder__page__in=[page.id for page in pages]
+        ).values_list(
+            "cmsplugin_ptr__placeholder__page",
+            "cmsplugin_ptr__language",
+            "page_id",
+            "cmsplugin_ptr__position",
+        )
+    )
+
+    existing_languages = defaultdict(set)
+    for page_id, plugin_language, _target_id, _position in rows:
+        existing_languages[page_id].add(plugin_language)
+
+    relevant_languages = get_relevant_languages(
+        [page.id for page in pages], existing_languages, language=language
+    )
+
+    positions = defaultdict(dict)
+    for page_id, plugin_language, target_id, position in rows:
+        if plugin_language == relevant_languages[page_id]:
+            current_position = positions[page_id].get(target_id, position)
+            positions[page_id][target_id] = min(position, current_position)
+    return positions
+
+
+def get_direct_related_page_extensions(
+    pages, extension_model, plugin_model, language=None
+):
+    """
+    Batch counterpart of `BasePageExtension.get_direct_related_page_extensions`: for each page
+    in a list of pages, look for the page extensions linked to it via a plugin, applying the
+    same language fallbacks and publication rules.
+
+    Returns:
+    --------
+        Dict[int, List[Tuple[PageExtension, int]]]: a dictionary mapping the id of each page
+            with the page extensions linked to it, ranked by their `path` to respect the order
+            in the page tree. Each extension comes with the lowest position among the plugins
+            pointing to it from the page.
+
+    The extensions are loaded with their draft/public counterparts and the published titles
+    of their page (on a `published_titles` attribute), so that computing their ES ids or
+    names requires no further query.
+    """
+    positions = get_plugin_positions(pages, plugin_model, language=language)
+
+    extensions = {
+        extension.extended_object_id: extension
+        for extension in extension_model.objects.filter(
+            extended_object_id__in={
+                target_id
+                for page_positions in positions.values()
+                for target_id in page_positions
+            }
+        )
+        .select_related(
+            "extended_object__node",
+            "draft_extension",
+            "public_extension",
+        )
+        .prefetch_related(
+            Prefetch(
+                "extended_object__title_set",
+                to_attr="published_titles",
+                queryset=Title.objects.filter(published=True),
+            )
+        )
+    }
+
+    related = {}
+    for page in pages:
+        related[page.id] = sorted(
+            [
+                (extensions[target_id], position)
+                for target_id, position in positions[page.id].items()
+                if target_id in extensions
+                # For a public page, we must filter out page extensions that are not
+                # published in any language
+                and (
+                    page.publisher_is_draft
+                    or extensions[target_id].extended_object.published_titles
+                )
+            ],
+            key=lambda pair: pair[0].extended_object.node.path,
+        )
+    return related
+
+
+def get_root_to_leaf_public_category_pages(categories_by_page):
+    """
+    Batch counterpart of `Course.get_root_to_leaf_public_category_pages`: for each page, get
+    the public pages of the categories linked to it and of their ancestors, excluding meta
+    categories.
+
+    Arguments:
+    ----------
+        categories_by_page (Dict[int, List[Category]]): a dictionary mapping page ids with the
+            draft categories linked to each page, as returned by
+            `get_direct_related_page_extensions`.
+
+    Returns:
+    --------
+        Dict[int, List[Page]]: a dictionary mapping each page id with category pages ranked
+            by their `path`. Pages are loaded with their category and published titles (on a
+            `published_titles` attribute).
+    """
+    # Draft and public pages share the same node
+    public_paths = {
+        page_id: [category.extended_object.node.path for category in categories]
+        for page_id, categories in categories_by_page.items()
+    }
+
+    def get_pages(**filters):
+        """Load pages with all we need to build ES documents in the same queries."""
+        return {
+            page.node.path: page
+            for page in Page.objects.filter(
+                publisher_is_draft=False, title_set__published=True, **filters
+            )
+            .select_related("node", "category__draft_extension")
+            .prefetch_related(
+                Prefetch(
+                    "title_set",
+                    to_attr="published_titles",
+                    queryset=Title.objects.filter(published=True),
+                )
+            )
+            .distinct()
+        }
+
+    # 1. We want the pages directly related to a category
+    direct_pages = get_pages(
+        node__path__in={path for paths in public_paths.values() for path in paths}
+    )
+
+    # 2. We want the pages related to one of the ancestors of the categories. Don't include
+    # the meta category as it materializes a "filter bank" and not a search option
+    ancestor_pages = get_pages(
+        node__path__in={
+            ancestor_path
+            for paths in public_paths.values()
+            for path in paths
+            for ancestor_path in get_ancestor_paths(path)
+        },
+        node__parent__cms_pages__category__isnull=False,
+    )
+
+    category_pages = {}
+    for page_id, paths in public_paths.items():
+        related_paths = {path for path in paths if path in direct_pages}
+        related_paths.update(
+            ancestor_path
+            for path in paths
+            for ancestor_path in get_ancestor_paths(path)
+            if ancestor_path in ancestor_pages
+        )
+        category_pages[page_id] = [
+            direct_pages.get(path) or ancestor_pages[path]
+            for path in sorted(related_paths)
+        ]
+    return category_pages
+
+
+def get_course_runs_by_course(courses, fields, **filters):
+    """
+    Batch counterpart of `Course.course_runs`: load in one query the runs directly related to
+    each course or to one of its snapshots.
+
+    Returns:
+    --------
+        Dict[int, List[Dict]]: a dictionary mapping each course id with the values of the
+            fields requested for each of its course runs, ordered by descending end date.
+    """
+    course_runs = defaultdict(list)
+    if not courses:
+        return course_runs
+
+    # Draft and public pages share the same node so we must also check the version
+    courses_by_node = defaultdict(list)
+    for course in courses:
+        page = course.extended_object
+        courses_by_node[page.node.path, page.publisher_is_draft].append(course)
+
+    path_field = "direct_course__extended_object__node__path"
+    is_draft_field = "direct_course__extended_object__publisher_is_draft"
+    course_run_query = (
+        CourseRun.filter_by_course_nodes(courses_by_node)
+        .filter(**filters)
+        .order_by("-end")
+        .values(path_field, is_draft_field, *fields)
+    )
+
+    for course_run in course_run_query:
+        path = course_run.pop(path_field)
+        is_draft = course_run.pop(is_draft_field)
+        # A course run is related to the course of its page or of any ancestor page (it may
+        # be attached to a snapshot of the course)
+        for ancestor_path in [*get_ancestor_paths(path), path]:
+            for course in courses_by_node.get((ancestor_path, is_draft), []):
+                course_runs[course.id].append(course_run)
+    return course_runs
@@ -0,0 +1,224 @@
+"""
+Profile the population of our Elasticsearch indices to find out where the time goes:
+building documents (SQL queries, thumbnails...) or sending them to Elasticsearch.
+"""
+import heapq
+import json
+import math
+from time import perf_counter
+
+from django.db import connection
+
+from .. import ES_CLIENT
+
+
+def get_percentile(sorted_values, percentile):
+    """Compute a percentile of a sorted list of values with the nearest-rank method."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+# pylint: disable=too-many-instance-attributes
+class IndexerProfile:
+    """
+    Measures collected while populating the index of an indexer. Documents are grouped in
+    the batches in which the indexer builds them, so that the cost of loading a batch is
+    attributed to the batch rather than to its first document.
+    """
+
+    def __init__(self, name, batch_size, slowest_count):
+        """Initialize the counters of an indexer."""
+        self.name = name
+        self.batch_size = batch_size
+        self.slowest_count = slowest_count
+        self.documents = 0
+        self.build_time = 0
+        self.bulk_time = 0
+        self.query_count = 0
+        self.query_time = 0
+        self.sizes = []
+        self.slowest = []
+        self.batch = []
+        self.batch_time = 0
+        self.batch_query_count = 0
+
+    # pylint: disable=too-many-arguments
+    def execute_wrapper(self, execute, sql, params, many, context):
+        """Count the SQL queries run while building documents and time them."""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_count += 1
+            self.query_time += perf_counter() - start
+
+    def add_document(self, document, duration):
+        """Record the size of a document and the time it took to build it."""
+        self.documents += 1
+        self.build_time += duration
+        source = {key: value for key, value in document.items() if key[0] != "_"}
+        self.sizes.append(len(ES_CLIENT.transport.serializer.dumps(source).encode()))
+
+        self.batch.append(str(document.get("_id")))
+        self.batch_time += duration
+        if len(self.batch) == self.batch_size:
+            self.end_batch()
+
+    def end_batch(self):
+        """Record the cost of the current batch, keeping the slowest ones only."""
+        if not self.batch:
+            return
+        item = (
+            self.batch_time,
+            self.batch[0],
+            self.batch[-1],
+            len(self.batch),
+            self.query_count - self.batch_query_count,
+        )
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+        self.batch = []
+        self.batch_time = 0
+        self.batch_query_count = self.query_count
+
+    def as_dict(self):
+        """Summarize the measures of the indexer."""
+        sizes = sorted(self.sizes)
+        per_document = max(self.documents, 1)
+        return {
+            "indexer": self.name,
+            "documents": self.documents,
+            "total_time": self.build_time + self.bulk_time,
+            "build_time": self.build_time,
+            "bulk_time": self.bulk_time,
+            "query_count": self.query_count,
+            "query_time": self.query_time,
+            "queries_per_document": self.query_count / per_document,
+            "query_time_per_document": self.query_time / per_document,
+            "size_p50": get_percentile(sizes, 50),
+            "size_p95": get_percentile(sizes, 95),
+            "size_max": sizes[-1] if sizes else None,
+            "batch_size": self.batch_size,
+            "slowest_batches": [
+                {
+                    "first_id": first_id,
+                    "last_id": last_id,
+                    "documents": documents,
+                    "build_time": duration,
+                    "query_count": query_count,
+                }
+                for duration, first_id, last_id, documents, query_count in sorted(
+                    self.slowest, reverse=True
+                )
+            ],
+        }
+
+
+class IndexingProfiler:
+    """
+    Collect, for each indexer, the number of documents produced, the wall time split between
+    building documents and sending them in bulk, the SQL queries run while building them,
+    the size of documents and the slowest batches of documents.
+
+    Indexers may build documents in batches, loading the objects related to a whole batch
+    at once (see `get_batch_size` on the courses indexer): the time spent and the queries
+    run are then measured per batch. Other indexers build documents one by one, each
+    document being a batch of its own.
+    """
+
+    def __init__(self, slowest_count=10):
+        """Initialize an empty profile."""
+        self.slowest_count = slowest_count
+        self.profiles = []
+
+    @staticmethod
+    def profile_documents(profile, documents):
+        """Wrap an iterable of documents to measure how each of them is built."""
+        iterator = iter(documents)
+        while True:
+            start = perf_counter()
+            with connection.execute_wrapper(profile.execute_wrapper):
+                try:
+                    document = next(iterator)
+                except StopIteration:
+                    profile.end_batch()
+                    return
+            profile.add_document(document, perf_counter() - start)
+            yield document
+
+    def run(self, indexable, documents, bulk):
+        """
+        Send the documents built by an indexer with a bulk function and profile it. The time
+        spent in the bulk function, except building documents, is bulk sending time.
+        """
+        get_batch_size = getattr(indexable, "get_batch_size", None)
+        profile = IndexerProfile(
+            indexable.__name__,
+            get_batch_size() if get_batch_size else 1,
+            self.slowest_count,
+        )
+        self.profiles.append(profile)
+
+        start = perf_counter()
+        result = bulk(self.profile_documents(profile, documents))
+        profile.bulk_time = perf_counter() - start - profile.build_time
+        return result
+
+    def as_dict(self):
+        """Summarize the profile of each indexer."""
+        return {"indexers": [profile.as_dict() for profile in self.profiles]}
+
+    def format_report(self):
+        """Format the profile of each indexer as a human readable report."""
+        lines = []
+        for profile in self.as_dict()["indexers"]:
+            lines.extend(
+                [
+                    f"{profile['indexer']:s}: {profile['documents']:d} documents in "
+                    f"{profile['total_time']:.2f}s",
+                    f"  building documents: {profile['build_time']:.2f}s, "
+                    f"sending in bulk: {profile['bulk_time']:.2f}s",
+                    f"  SQL: {profile['query_count']:d} queries in "
+                    f"{profile['query_time']:.2f}s, "
+                    f"{profile['queries_per_document']:.1f} queries and "
+                    f"{profile['query_time_per_document'] * 1000:.1f}ms per document",
+                ]
+            )
+            if profile["documents"]:
+                lines.append(
+                    f"  document size: p50 {profile['size_p50']:d}B, "
+                    f"p95 {profile['size_p95']:d}B, max {profile['size_max']:d}B"
+                )
+                if profile["batch_size"] == 1:
+                    lines.append(
+                        "  slowest documents: "
+                        + ", ".join(
+                            f"{batch['first_id']:s} "
+                            f"({batch['build_time'] * 1000:.1f}ms, "
+                            f"{batch['query_count']:d} queries)"
+                            for batch in profile["slowest_batches"]
+                        )
+                    )
+                else:
+                    lines.append(
+                        "  slowest batches (documents are built by batches of "
+                        f"{profile['batch_size']:d}, the cost of a batch includes "
+                        "loading its related objects): "
+                        + ", ".join(
+                            f"{batch['first_id']:s}..{batch['last_id']:s} "
+                            f"({batch['documents']:d} documents, "
+                            f"{batch['build_time'] * 1000:.1f}ms, "
+                            f"{batch['query_count']:d} queries)"
+                            for batch in profile["slowest_batches"]
+                        )
+                    )
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        """Write the profile of each indexer to a JSON file."""
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump(self.as_dict(), output, indent=2)
@@ -0,0 +1,145 @@
+"""
+Cache the responses of the course search endpoint in the "search" cache.
+
+Responses are cached by generation of the indices, language and normalized search parameters,
+including the current time rounded by the form (see `CourseSearchForm.ms_since_epoch`). The
+generation of the indices is bumped each time documents are indexed or aliases are swapped
+to new indices, which invalidates all the responses cached until then.
+
+Hits and misses are counted in the shared cache to help sizing it.
+
+When hits and facets are searched separately (see `CoursesViewSet.search_separately`), facets
+can also be cached on their own, regardless of pagination, per bucket of time (the rounded
+current time of the form) and for as long as documents are not indexed again.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+
+from ..defaults import SEARCH_FACETS_CACHE_TIMEOUT, SEARCH_RESPONSE_CACHE_TIMEOUT
+from .cache import bump_generation, get_generation, get_shared_cache, increment_counter
+
+GENERATION_CACHE_KEY = "search_index_generation"
+HITS_CACHE_KEY = "search_response_cache_hits"
+MISSES_CACHE_KEY = "search_response_cache_misses"
+
+
+def get_index_generation(shared_cache):
+    """Get the generation of the indices, bumped each time documents are indexed."""
+    return get_generation(shared_cache, GENERATION_CACHE_KEY)
+
+
+def get_response_cache_timeout():
+    """Return the number of seconds during which responses are cached or None if disabled."""
+    return getattr(
+        settings,
+        "RICHIE_SEARCH_RESPONSE_CACHE_TIMEOUT",
+        SEARCH_RESPONSE_CACHE_TIMEOUT,
+    )
+
+
+def get_response_cache():
+    """Return the shared cache if caching responses is enabled or None otherwise."""
+    if not get_response_cache_timeout():
+        return None
+    return get_shared_cache()
+
+
+def get_params_digest(form, exclude=()):
+    """
+    Hash the parameters of a valid search form. Parameters are normalized so that the order
+    of values in the querystring does not matter.
+    """
+    params = {
+        name: sorted(value) if isinstance(value, list) else value
+        for name, value in form.cleaned_data.items()
+        if name not in exclude
+    }
+    return hashlib.md5(
+        json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def get_response_cache_key(shared_cache, form, language):
+    """Build the key of the response to a valid search form."""
+    generation = get_index_generation(shared_cache)
+    return (
+        f"search_response_{generation:d}_{language!s}_"
+        f"{form.ms_since_epoch:d}_{get_params_digest(form):s}"
+    )
+
+
+def get_cached_response(shared_cache, key):
+    """Return the response cached under a key or None, counting hits and misses."""
+    response = shared_cache.get(key)
+    increment_counter(
+        shared_cache, MISSES_CACHE_KEY if response is None else HITS_CACHE_KEY
+    )
+    return response
+
+
+def set_cached_response(shared_cache, key, response):
+    """Cache a response under a key."""
+    shared_cache.set(key, response, get_response_cache_timeout())
+
+
+def get_facets_cache():
+    """Return the shared cache if caching facets is enabled or None otherwise."""
+    if not getattr(
+        settings, "RICHIE_SEARCH_FACETS_CACHE_TIMEOUT", SEARCH_FACETS_CACHE_TIMEOUT
+    ):
+        return None
+    return get_shared_cache()
+
+
+def get_facets_cache_key(shared_cache, form, language):
+    """
+    Build the key of the facets of a valid search form, which don't depend on the page
+    of results nor on the scope of the search. Like responses, facets are cached for a
+    bucket of time as the availability of courses changes with the current time.
+    """
+    generation = get_index_generation(shared_cache)
+    digest = get_params_digest(form, exclude=("cursor", "limit", "offset", "scope"))
+    return (
+        f"search_facets_{generation:d}_{language!s}_"
+        f"{form.ms_since_epoch:d}_{digest:s}"
+    )
+
+
+def set_cached_facets(shared_cache, key, facets):
+    """Cache the facets of a search under a key."""
+    shared_cache.set(
+        key,
+        facets,
+        getattr(
+            settings, "RICHIE_SEARCH_FACETS_CACHE_TIMEOUT", SEARCH_FACETS_CACHE_TIMEOUT
+        ),
+    )
+
+
+def get_response_cache_stats():
+    """Return the number of hits and misses counted since the counters were last reset."""
+    shared_cache = get_shared_cache()
+    if shared_cache is None:
+        return {"hits": 0, "misses": 0}
+    counters = shared_cache.get_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
+    return {
+        "hits": counters.get(HITS_CACHE_KEY, 0),
+        "misses": counters.get(MISSES_CACHE_KEY, 0),
+    }
+
+
+def reset_response_cache_stats():
+    """Reset the hits and misses counters."""
+    shared_cache = get_shared_cache()
+    if shared_cache is not None:
+        shared_cache.delete_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
+
+
+def invalidate_search_responses():
+    """
+    Invalidate all the cached responses, in all processes, by moving to a new generation of
+    the indices. The keys of former generations are left to expire from the shared cache.
+    """
+    bump_generation(get_shared_cache(), GENERATION_CACHE_KEY)
@@ -6,7 +6,7 @@ from django.utils.translation import get_language_from_request
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .. import ES_CLIENT
+from .autocomplete import autocomplete
 
 
 class ViewSetMetadata:
@@ -59,28 +59,6 @@ class AutocompleteMixin:
                 },
             )
 
-        # Query our specific ES completion field
+        # Query our specific ES completion field, unless suggestions are cached
         language = get_language_from_request(request)
-        autocomplete_query_response = ES_CLIENT.search(
-            index=indexer.index_name,
-            body={
-                "suggest": {
-                    "objects": {
-                        "prefix": query,
-                        "completion": {"field": f"complete.{language:s}"},
-                    }
-                }
-            },
-        )
-
-        # Build a response array from the list of completion options
-        return Response(
-            [
-                indexer.format_es_document_for_autocomplete(
-                    option, get_language_from_request(request)
-                )
-                for option in autocomplete_query_response["suggest"]["objects"][0][
-                    "options"
-                ]
-            ]
-        )
+        return Response(autocomplete(indexer, query, language))
@@ -1,15 +1,19 @@
 """Views for richie's search application."""
+from django.conf import settings
 from django.contrib import messages
 from django.core import management
 from django.http import HttpResponse
 from django.utils.encoding import force_str
+from django.utils.translation import get_language_from_request
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.cache import cache_page
 
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from .defaults import SEARCH_AUTOCOMPLETE_SIZES
 from .filter_definitions import FILTERS
+from .utils.autocomplete import autocomplete_many, get_autocomplete_kinds
 
 
 @api_view(["POST"])
@@ -44,3 +48,45 @@ def filter_definitions(request, version):
             for name, faceted_definition in filter.get_static_definitions().items()
         }
     )
+
+
+@api_view(["GET"])
+# pylint: disable=unused-argument
+def autocomplete(request, version):
+    """
+    Autocomplete a query on all kinds of objects at once, or on the kinds passed in the "kind"
+    parameter, running the completion suggesters of those that are not cached in one multi
+    search request. Results are grouped by kind and limited to a size that can be configured
+    for each kind.
+    """
+    try:
+        query = request.query_params["query"]
+    except KeyError:
+        return Response(
+            status=400, data={"errors": ['Missing autocomplete "query" for request.']}
+        )
+
+    all_kinds = get_autocomplete_kinds()
+    requested_kinds = request.query_params.getlist("kind") or list(all_kinds)
+    unknown_kinds = [kind for kind in requested_kinds if kind not in all_kinds]
+    if unknown_kinds:
+        return Response(
+            status=400,
+            data={
+                "errors": [f"Unknown autocomplete kinds: {', '.join(unknown_kinds)}."]
+            },
+        )
+
+    language = get_language_from_request(request)
+    sizes = getattr(
+        settings, "RICHIE_SEARCH_AUTOCOMPLETE_SIZES", SEARCH_AUTOCOMPLETE_SIZES
+    )
+    suggestions = autocomplete_many(
+        [
+            (all_kinds[kind][0], query, all_kinds[kind][1], sizes.get(kind))
+            for kind in requested_kinds
+        ],
+        language,
+    )
+
+    return Response(dict(zip(requested_kinds, suggestions)))
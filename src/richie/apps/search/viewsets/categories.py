@@ -13,6 +13,7 @@ from rest_framework.viewsets import ViewSet
 from .. import ES_CLIENT
 from ..defaults import ES_PAGE_SIZE
 from ..indexers import ES_INDICES
+from ..utils.autocomplete import autocomplete
 from ..utils.viewsets import ViewSetMetadata
 
 
@@ -129,31 +130,8 @@ class CategoriesViewSet(ViewSet):
                 },
             )
 
-        # Query our specific ES completion field
+        # Query our specific ES completion field, unless suggestions are cached
         language = get_language_from_request(request)
-        autocomplete_query_response = ES_CLIENT.search(
-            index=indexer.index_name,
-            body={
-                "suggest": {
-                    "categories": {
-                        "prefix": query,
-                        "completion": {
-                            "contexts": {"kind": [kind]},
-                            "field": f"complete.{language:s}",
-                        },
-                    }
-                }
-            },
-        )
-
-        # Build a response array from the list of completion options
         return Response(
-            [
-                indexer.format_es_document_for_autocomplete(
-                    option, get_language_from_request(request)
-                )
-                for option in autocomplete_query_response["suggest"]["categories"][0][
-                    "options"
-                ]
-            ]
+            autocomplete(indexer, query, language, contexts={"kind": [kind]})
         )
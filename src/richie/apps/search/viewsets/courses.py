@@ -2,15 +2,27 @@
 API endpoints to access courses through ElasticSearch
 """
 from django.conf import settings
+from django.utils.translation import get_language
 
 from elasticsearch.exceptions import NotFoundError
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
 
 from .. import ES_CLIENT
-from ..defaults import ES_PAGE_SIZE
+from ..defaults import ES_PAGE_SIZE, SEARCH_SEPARATE_FACETS
 from ..filter_definitions import FILTERS
+from ..filter_definitions.helpers import get_faceted_definitions
 from ..indexers import ES_INDICES
+from ..utils.multi_search import multi_search
+from ..utils.response_cache import (
+    get_cached_response,
+    get_facets_cache,
+    get_facets_cache_key,
+    get_response_cache,
+    get_response_cache_key,
+    set_cached_facets,
+    set_cached_response,
+)
 from ..utils.viewsets import AutocompleteMixin, ViewSetMetadata
 
 
@@ -36,59 +48,236 @@ class CoursesViewSet(AutocompleteMixin, ViewSet):
         if not params_form.is_valid():
             return Response(status=400, data={"errors": params_form.errors})
 
-        limit, offset, query, aggs = params_form.build_es_query()
+        # Identical searches made within the same bucket of time get the same response, until
+        # documents are indexed again. Pages of results paginated with a cursor are not cached
+        # as they depend on the time and point in time of the first page.
+        response_cache = None if params_form.use_cursor() else get_response_cache()
+        if response_cache is not None:
+            cache_key = get_response_cache_key(
+                response_cache, params_form, get_language()
+            )
+            response_object = get_cached_response(response_cache, cache_key)
+            if response_object is not None:
+                return Response(response_object)
 
-        body = {
-            "script_fields": params_form.get_script_fields(),
-        }
+        limit, offset, query, aggs = params_form.build_es_query()
+        size = limit or getattr(settings, "RICHIE_ES_PAGE_SIZE", ES_PAGE_SIZE)
 
         # The querystring may request only the query or only the aggregations
         scope = params_form.cleaned_data["scope"]
-        if form_class.OBJECTS in scope or not scope:
-            body["query"] = query
-
-        if form_class.FILTERS in scope or not scope:
-            body["aggs"] = aggs
-
-        # pylint: disable=unexpected-keyword-arg
-        course_query_response = ES_CLIENT.search(
-            _source=getattr(self._meta.indexer, "display_fields", "*"),
-            index=self._meta.indexer.index_name,
-            body=body,
-            # Directly pass meta-params through as arguments to the ES client
-            from_=offset,
-            size=limit or getattr(settings, "RICHIE_ES_PAGE_SIZE", ES_PAGE_SIZE),
-        )
+        with_objects = form_class.OBJECTS in scope or not scope
+        with_filters = form_class.FILTERS in scope or not scope
 
-        response_object = {
-            "meta": {
-                "count": len(course_query_response["hits"]["hits"]),
-                "offset": offset,
-                "total_count": course_query_response["hits"]["total"]["value"],
-            }
-        }
-        if form_class.OBJECTS in scope or not scope:
-            response_object["objects"] = [
-                self._meta.indexer.format_es_object_for_api(es_course)
-                for es_course in course_query_response["hits"]["hits"]
-            ]
-
-        if form_class.FILTERS in scope or not scope:
-            filters = {
-                name: faceted_definition
-                for filter in FILTERS.values()
-                for name, faceted_definition in filter.get_faceted_definitions(
-                    course_query_response["aggregations"]["all_courses"],
-                    data=params_form.cleaned_data,
-                ).items()
-            }
-            response_object["filters"] = dict(
-                sorted(filters.items(), key=lambda f: f[1]["position"])
+        # Results paginated with a cursor start after the last result of the previous page,
+        # optionally in the same point in time
+        pit_id = None
+        if with_objects and params_form.use_cursor():
+            offset = 0
+            pit_id = self.get_point_in_time(params_form)
+
+        if with_filters and getattr(
+            settings, "RICHIE_SEARCH_SEPARATE_FACETS", SEARCH_SEPARATE_FACETS
+        ):
+            response_object = self.search_separately(
+                params_form,
+                query,
+                aggs,
+                offset,
+                size,
+                with_objects=with_objects,
+                pit_id=pit_id,
+            )
+        else:
+            body = {"script_fields": params_form.get_script_fields()}
+            if with_objects:
+                body.update(self.get_hits_body(params_form, query, pit_id=pit_id))
+
+            if with_filters:
+                body["aggs"] = aggs
+                # Aggregations are computed on the results of the full text query when the
+                # filters are applied by a post filter
+                if params_form.use_post_filter():
+                    body["query"] = query
+
+            # pylint: disable=unexpected-keyword-arg
+            course_query_response = ES_CLIENT.search(
+                _source=getattr(self._meta.indexer, "display_fields", "*"),
+                index=None if pit_id else self._meta.indexer.index_name,
+                body=body,
+                # Directly pass meta-params through as arguments to the ES client
+                from_=offset,
+                size=size,
             )
 
+            response_object = {
+                "meta": {
+                    "count": len(course_query_response["hits"]["hits"]),
+                    "offset": offset,
+                    "total_count": course_query_response["hits"]["total"]["value"],
+                }
+            }
+            if with_objects:
+                self.add_hits(response_object, params_form, course_query_response, size)
+
+            if with_filters:
+                response_object["filters"] = self.format_filters(
+                    params_form, course_query_response["aggregations"]["all_courses"]
+                )
+
+        if response_cache is not None:
+            set_cached_response(response_cache, cache_key, response_object)
+
         # Will be formatting a response_object for consumption
         return Response(response_object)
 
+    def get_point_in_time(self, params_form):
+        """
+        Return the id of the point in time a search paginated with a cursor is tied to, if
+        configured: the one of the cursor or a new one for the first page.
+        """
+        keep_alive = params_form.get_cursor_keep_alive()
+        if not keep_alive:
+            return None
+        cursor = params_form.cleaned_data["cursor"]
+        if cursor and cursor["pit_id"]:
+            return cursor["pit_id"]
+        return ES_CLIENT.open_point_in_time(
+            index=self._meta.indexer.index_name, keep_alive=keep_alive
+        )
+
+    @staticmethod
+    def get_hits_body(params_form, query, pit_id=None):
+        """Build the part of a search request body that selects, sorts and paginates hits."""
+        body = {"query": query}
+        if params_form.use_cursor():
+            body["sort"] = params_form.get_cursor_sort()
+            cursor = params_form.cleaned_data["cursor"]
+            if cursor:
+                body["search_after"] = cursor["search_after"]
+            if pit_id:
+                body["pit"] = {
+                    "id": pit_id,
+                    "keep_alive": params_form.get_cursor_keep_alive(),
+                }
+        else:
+            sort = params_form.get_sort()
+            if sort:
+                body["sort"] = sort
+        post_filter = params_form.get_post_filter()
+        if post_filter:
+            body["post_filter"] = post_filter
+        return body
+
+    def format_hits(self, search_response):
+        """Format the courses found by a search for the API."""
+        return [
+            self._meta.indexer.format_es_object_for_api(es_course)
+            for es_course in search_response["hits"]["hits"]
+        ]
+
+    def add_hits(self, response_object, params_form, search_response, size):
+        """
+        Add the courses found by a search to a response, along with the cursor of the next
+        page when results are paginated with a cursor.
+        """
+        response_object["meta"].update(
+            {
+                "count": len(search_response["hits"]["hits"]),
+                "total_count": search_response["hits"]["total"]["value"],
+            }
+        )
+        response_object["objects"] = self.format_hits(search_response)
+        if params_form.use_cursor():
+            response_object["meta"]["next_cursor"] = self.get_next_cursor(
+                params_form, search_response, size
+            )
+
+    @staticmethod
+    def get_next_cursor(params_form, search_response, size):
+        """
+        Encode the cursor of the page following the results of a search, or return None if
+        it was the last page.
+        """
+        hits = search_response["hits"]["hits"]
+        if len(hits) < size:
+            return None
+        # The id of a point in time may change from one search to the next
+        return params_form.encode_cursor(
+            hits[-1]["sort"], search_response.get("pit_id")
+        )
+
+    @staticmethod
+    def format_filters(params_form, aggregations):
+        """Build the facets of all filters from the aggregations of a search."""
+        # The names of the values of all filters are fetched at once so that the request
+        # only needs the search and at most one more round-trip to Elasticsearch
+        filters = get_faceted_definitions(
+            FILTERS.values(), aggregations, data=params_form.cleaned_data
+        )
+        return dict(sorted(filters.items(), key=lambda f: f[1]["position"]))
+
+    # pylint: disable=too-many-arguments
+    def search_separately(
+        self, params_form, query, aggs, offset, size, with_objects=True, pit_id=None
+    ):
+        """
+        Search hits and facets with separate queries, sent to Elasticsearch in one multi
+        search request so that they run concurrently. Facets are cached on their own so that
+        paging through results does not compute them again, until documents are indexed or
+        the time bucket of the search changes (see `RICHIE_SEARCH_TIME_BUCKET`).
+        """
+        index_name = self._meta.indexer.index_name
+        facets_cache = get_facets_cache()
+        facets = None
+        if facets_cache is not None:
+            facets_cache_key = get_facets_cache_key(
+                facets_cache, params_form, get_language()
+            )
+            facets = facets_cache.get(facets_cache_key)
+
+        searches = []
+        if with_objects:
+            searches.append(
+                (
+                    None if pit_id else index_name,
+                    {
+                        "_source": getattr(self._meta.indexer, "display_fields", "*"),
+                        "from": offset,
+                        "script_fields": params_form.get_script_fields(),
+                        "size": size,
+                        **self.get_hits_body(params_form, query, pit_id=pit_id),
+                    },
+                )
+            )
+        if facets is None:
+            # Matching documents only need to be counted, not scored
+            searches.append(
+                (
+                    index_name,
+                    {"aggs": aggs, "query": {"bool": {"filter": [query]}}, "size": 0},
+                )
+            )
+        responses = multi_search(searches)
+
+        if facets is None:
+            facets_response = responses[-1]
+            facets = {
+                "filters": self.format_filters(
+                    params_form, facets_response["aggregations"]["all_courses"]
+                ),
+                "total_count": facets_response["hits"]["total"]["value"],
+            }
+            if facets_cache is not None:
+                set_cached_facets(facets_cache, facets_cache_key, facets)
+
+        response_object = {
+            "meta": {"count": 0, "offset": offset, "total_count": facets["total_count"]}
+        }
+        if with_objects:
+            self.add_hits(response_object, params_form, responses[0], size)
+        response_object["filters"] = facets["filters"]
+        return response_object
+
     # pylint: disable=no-self-use,invalid-name,unused-argument
     def retrieve(self, request, pk, version):
         """
@@ -13,3 +13,8 @@ SIMPLEPICTURE_PRESETS = {
 }
 
 SIMPLEPICTURE_PRESETS.update(getattr(settings, "RICHIE_SIMPLEPICTURE_PRESETS", {}))
+
+# Time in seconds during which the thumbnails urls computed for a picture are cached
+SIMPLEPICTURE_CACHE_TIMEOUT = getattr(
+    settings, "RICHIE_SIMPLEPICTURE_CACHE_TIMEOUT", 60 * 60 * 24
+)
@@ -1,10 +1,43 @@
 """SimplePicture plugin for DjangoCMS."""
-from .defaults import SIMPLEPICTURE_PRESETS
+import hashlib
 
+from django.core.cache import cache
 
-def get_picture_info(instance, preset_name):
+from .defaults import SIMPLEPICTURE_CACHE_TIMEOUT, SIMPLEPICTURE_PRESETS
+
+
+def get_preset_name(preset_name):
+    """Return the name of the preset defined in settings for a name or "default"."""
+    return preset_name if preset_name in SIMPLEPICTURE_PRESETS else "default"
+
+
+def get_preset(preset_name):
+    """Look for a preset in settings and fallback to "default"."""
+    return SIMPLEPICTURE_PRESETS[get_preset_name(preset_name)]
+
+
+def get_picture_info_cache_key(image, preset_name):
     """
-    Compute picture information for a given preset defined in settings.
+    Compute the key under which the information of an image for a preset is cached. It
+    includes a hash of the subject location of the image, its modification date and the
+    definition of the preset, so that it changes when any of them is modified.
+
+    Names without a preset in settings share the key of the "default" preset they fall
+    back to.
+    """
+    preset_name = get_preset_name(preset_name)
+    version = hashlib.md5(
+        repr(
+            (image.subject_location, image.modified_at, get_preset(preset_name))
+        ).encode()
+    ).hexdigest()
+    return f"simple_picture_info_{image.pk:d}_{preset_name:s}_{version:s}"
+
+
+def generate_picture_info(image, preset_name):
+    """
+    Compute the information of a filer image for a preset defined in settings, generating
+    the thumbnails that do not exist yet, and cache it.
 
     A preset is of the form:
 
@@ -24,20 +57,13 @@ def get_picture_info(instance, preset_name):
     }
 
     """
-    # Bail out if the picture does not have an image as that's the object we use to get
-    # all the information we need to return any picture info.
-    if not instance.picture:
-        return None
-
-    thumbnailer = instance.picture.easy_thumbnails_thumbnailer
-
-    # Look for the preset in settings and fallback to "default"
-    preset = SIMPLEPICTURE_PRESETS.get(preset_name, SIMPLEPICTURE_PRESETS["default"])
+    thumbnailer = image.easy_thumbnails_thumbnailer
+    preset = get_preset(preset_name)
 
     # Complete picture information with thumbnails url calculated according to what is
     # defined in the preset
     picture_info = {}
-    location_dict = {"subject_location": instance.picture.subject_location}
+    location_dict = {"subject_location": image.subject_location}
 
     # - src
     options = preset["src"].copy()
@@ -56,4 +82,26 @@ def get_picture_info(instance, preset_name):
     # - sizes
     picture_info["sizes"] = preset.get("sizes")
 
+    cache.set(
+        get_picture_info_cache_key(image, preset_name),
+        picture_info,
+        SIMPLEPICTURE_CACHE_TIMEOUT,
+    )
+    return picture_info
+
+
+def get_picture_info(instance, preset_name):
+    """
+    Get the information of a picture for a given preset defined in settings (see
+    `generate_picture_info`). It is looked up in the cache first so that thumbnails
+    pre-generated by the `generate_thumbnails` command are never checked again.
+    """
+    # Bail out if the picture does not have an image as that's the object we use to get
+    # all the information we need to return any picture info.
+    if not instance.picture:
+        return None
+
+    picture_info = cache.get(get_picture_info_cache_key(instance.picture, preset_name))
+    if picture_info is None:
+        picture_info = generate_picture_info(instance.picture, preset_name)
     return picture_info
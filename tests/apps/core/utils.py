@@ -1,5 +1,6 @@
 """Test utils for the courses application"""
 import random
+from concurrent.futures import Executor, Future
 from functools import reduce
 
 from django.test.client import RequestFactory
@@ -83,3 +84,24 @@ class CheckToolbarMixin:
         # pylint: disable=no-member
         request.toolbar.get_left_items()
         return request.toolbar
+
+
+class SynchronousExecutor(Executor):
+    """
+    An executor running the tasks it is submitted in the current process, to replace a pool
+    of worker processes in tests.
+    """
+
+    def __init__(self, **kwargs):
+        """Accept the arguments of a process pool executor and ignore them."""
+        super().__init__()
+
+    # pylint: disable=arguments-differ
+    def submit(self, fn, *args, **kwargs):
+        """Run the task right away and return a future holding its outcome."""
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+        return future
@@ -0,0 +1,143 @@
+"""
+Tests for the generate_thumbnails command
+"""
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from richie.apps.courses.factories import (
+    BlogPostFactory,
+    CourseFactory,
+    OrganizationFactory,
+)
+from richie.apps.courses.management.commands.generate_thumbnails import (
+    get_presets_by_image,
+)
+from richie.plugins.simple_picture.defaults import SIMPLEPICTURE_PRESETS
+
+from ..core.utils import SynchronousExecutor
+
+
+@mock.patch(
+    "richie.apps.courses.management.commands.generate_thumbnails.ProcessPoolExecutor",
+    new=SynchronousExecutor,
+)
+@mock.patch("django.db.connections.close_all")
+class GenerateThumbnailsCommandsTestCase(TestCase):
+    """
+    Test the command that pre-generates the thumbnails of the pictures of courses,
+    organizations, categories and persons. The pool of processes is replaced by a
+    synchronous executor.
+    """
+
+    @staticmethod
+    def create_pictures():
+        """Create pages with pictures in several placeholders."""
+        course = CourseFactory(fill_cover=True, should_publish=True)
+        organization = OrganizationFactory(fill_logo=True, fill_banner=True)
+        # Blog posts are not concerned
+        BlogPostFactory(fill_cover=True)
+
+        def get_image(page, slot):
+            return (
+                page.placeholders.get(slot=slot)
+                .get_plugins()[0]
+                .get_plugin_instance()[0]
+                .picture
+            )
+
+        return {
+            "cover": get_image(course.extended_object, "course_cover"),
+            "logo": get_image(organization.extended_object, "logo"),
+            "banner": get_image(organization.extended_object, "banner"),
+        }
+
+    def test_commands_generate_thumbnails_get_presets_by_image(self, *_):
+        """
+        Each image should be rendered in the presets of the placeholders where it is found,
+        falling back to the default preset for those that are not configured.
+        """
+        images = self.create_pictures()
+
+        self.assertEqual(
+            get_presets_by_image(),
+            {
+                images["cover"].pk: ["cover", "default"],
+                images["logo"].pk: ["default"],
+                images["banner"].pk: ["default"],
+            },
+        )
+
+    def test_commands_generate_thumbnails_get_presets_by_image_configured(self, *_):
+        """
+        Images should be rendered in the presets named after their placeholder when they are
+        configured, instead of the default preset.
+        """
+        images = self.create_pictures()
+
+        with mock.patch.dict(
+            SIMPLEPICTURE_PRESETS,
+            {
+                "banner": {"src": {"size": (1000, 300)}},
+                "course_cover": {"src": {"size": (800, 400)}},
+                "logo": {"src": {"size": (200, 200)}},
+            },
+        ):
+            presets_by_image = get_presets_by_image()
+
+        self.assertEqual(
+            presets_by_image,
+            {
+                images["cover"].pk: ["course_cover", "cover"],
+                images["logo"].pk: ["logo"],
+                images["banner"].pk: ["banner"],
+            },
+        )
+
+    @mock.patch(
+        "richie.apps.courses.management.commands.generate_thumbnails."
+        "generate_picture_info"
+    )
+    def test_commands_generate_thumbnails(self, mock_generate, *_):
+        """All the presets of each image should be generated."""
+        images = self.create_pictures()
+
+        call_command("generate_thumbnails", workers=2)
+
+        self.assertEqual(
+            sorted(
+                (image.pk, preset_name)
+                for (image, preset_name), _kwargs in mock_generate.call_args_list
+            ),
+            sorted(
+                [
+                    (images["cover"].pk, "cover"),
+                    (images["cover"].pk, "default"),
+                    (images["logo"].pk, "default"),
+                    (images["banner"].pk, "default"),
+                ]
+            ),
+        )
+
+    @mock.patch(
+        "richie.apps.courses.management.commands.generate_thumbnails."
+        "generate_picture_info",
+        side_effect=OSError("broken image"),
+    )
+    def test_commands_generate_thumbnails_failure(self, mock_generate, *_):
+        """A broken image should be logged and not prevent generating the others."""
+        self.create_pictures()
+
+        with self.assertLogs(
+            "richie.commands.courses.generate_thumbnails", level="ERROR"
+        ) as logs:
+            call_command("generate_thumbnails")
+
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(mock_generate.call_count, 3)
+
+    def test_commands_generate_thumbnails_invalid(self, *_):
+        """The number of workers should be a positive integer."""
+        with self.assertRaises(CommandError):
+            call_command("generate_thumbnails", workers=0)
@@ -4,13 +4,14 @@ Unit tests for the Course model
 # pylint: disable=too-many-lines
 import functools
 import random
+from datetime import timedelta
 from unittest import mock
 
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
-from django.utils import translation
+from django.utils import timezone, translation
 
 from cms.api import add_plugin, create_page
 from cms.models import PagePermission, Title
@@ -20,7 +21,13 @@ from parler.utils.context import switch_language
 from richie.apps.core.factories import PageFactory, TitleFactory
 from richie.apps.courses import defaults, factories
 from richie.apps.courses.cms_plugins import CoursePlugin
-from richie.apps.courses.models import Course, CourseRun, CourseRunTranslation, Program
+from richie.apps.courses.models import (
+    Course,
+    CourseRun,
+    CourseRunTranslation,
+    CourseState,
+    Program,
+)
 
 # pylint: disable=too-many-public-methods
 
@@ -686,6 +693,67 @@ class CourseModelsTestCase(TestCase):
             next(o for o in all_organizations if o in published_organizations),
         )
 
+    def test_models_course_prefetch_main_organizations(self):
+        """
+        The main organization of a list of courses should be loaded in 2 queries, applying
+        the same rules as `get_main_organization`, and be returned by this method without
+        querying the database.
+        """
+        draft_organization = factories.OrganizationFactory()
+        published_organizations = factories.OrganizationFactory.create_batch(
+            2, should_publish=True
+        )
+        course_without_organization = factories.CourseFactory(should_publish=True)
+        course = factories.CourseFactory(
+            fill_organizations=[draft_organization, *published_organizations],
+            should_publish=True,
+        )
+        other_course = factories.CourseFactory(
+            fill_organizations=published_organizations[::-1]
+        )
+        # Add an organization only in French to the first course: it is ignored in English
+        # as long as there are organizations in English
+        add_plugin(
+            course.extended_object.placeholders.get(slot="course_organizations"),
+            "OrganizationPlugin",
+            "fr",
+            page=published_organizations[1].extended_object,
+        )
+
+        courses = list(
+            Course.objects.filter(
+                pk__in=[
+                    course_without_organization.public_extension.pk,
+                    course.pk,
+                    course.public_extension.pk,
+                    other_course.pk,
+                ]
+            )
+            .select_related("extended_object")
+            .order_by("pk")
+        )
+
+        with self.assertNumQueries(2):
+            Course.prefetch_main_organizations(courses)
+
+        with self.assertNumQueries(0):
+            main_organizations = [course.get_main_organization() for course in courses]
+
+        self.assertEqual(
+            main_organizations,
+            [
+                None,
+                draft_organization,
+                published_organizations[0],
+                published_organizations[1],
+            ],
+        )
+        for prefetched_course in courses:
+            del prefetched_course.prefetched_main_organization
+        self.assertEqual(
+            [course.get_main_organization() for course in courses], main_organizations
+        )
+
     def test_models_course_get_persons_empty(self):
         """
         For a course not linked to any person the method `get_persons` should
@@ -931,7 +999,8 @@ class CourseModelsTestCase(TestCase):
         course.extended_object.publish("en")
         course.refresh_from_db()
 
-        with self.assertNumQueries(4):
+        # The course runs are loaded along with their translations
+        with self.assertNumQueries(5):
             enrollment_count_sum = course.public_extension.course_runs_enrollment_count
             self.assertEqual(enrollment_count_sum, 5)
 
@@ -949,7 +1018,8 @@ class CourseModelsTestCase(TestCase):
         course.extended_object.publish("en")
         course.refresh_from_db()
 
-        with self.assertNumQueries(4):
+        # The course runs are loaded along with their translations
+        with self.assertNumQueries(5):
             runs_dict = course.public_extension.course_runs_dict
         self.assertEqual(
             functools.reduce(lambda x, k: x + len(runs_dict[k]), runs_dict, 0), 3
@@ -963,6 +1033,67 @@ class CourseModelsTestCase(TestCase):
             functools.reduce(lambda x, k: x + len(runs_dict[k]), runs_dict, 0), 3
         )
 
+    def test_models_course_course_runs_list(self):
+        """
+        The course runs of a course and of its snapshots should be loaded once, with their
+        translations, to compute the course runs grouped by state, their enrollment count
+        and the state of the course.
+        """
+        course = factories.CourseFactory(page_languages=["en", "fr"])
+        snapshot = factories.CourseFactory(
+            page_parent=course.extended_object, page_languages=["en", "fr"]
+        )
+        now = timezone.now()
+        factories.CourseRunFactory(
+            direct_course=course,
+            title="first",
+            enrollment_count=3,
+            start=now - timedelta(days=1),
+            end=now + timedelta(days=1),
+            enrollment_start=now - timedelta(days=2),
+            enrollment_end=now + timedelta(hours=1),
+        )
+        factories.CourseRunFactory(
+            direct_course=snapshot,
+            title="second",
+            enrollment_count=2,
+            start=now - timedelta(days=3),
+            end=now - timedelta(days=2),
+            enrollment_start=now - timedelta(days=4),
+            enrollment_end=now - timedelta(days=3),
+        )
+        course = Course.objects.select_related("extended_object__node").get(
+            pk=course.pk
+        )
+
+        with self.assertNumQueries(2):
+            course_runs = course.course_runs_list
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [course_run.title for course_run in course_runs], ["first", "second"]
+            )
+            self.assertEqual(course_runs[0].direct_course, course)
+            self.assertEqual(course.course_runs_enrollment_count, 5)
+            self.assertEqual(
+                course.course_runs_dict[CourseState.ONGOING_OPEN], [course_runs[0]]
+            )
+            self.assertEqual(
+                course.course_runs_dict[CourseState.ARCHIVED_CLOSED], [course_runs[1]]
+            )
+            self.assertEqual(course.state["priority"], CourseState.ONGOING_OPEN)
+
+    def test_models_course_course_runs_list_empty(self):
+        """A course without course runs should have no enrollment count."""
+        course = factories.CourseFactory()
+        course = Course.objects.select_related("extended_object__node").get(
+            pk=course.pk
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(course.course_runs_list, [])
+        self.assertIsNone(course.course_runs_enrollment_count)
+
     def test_models_course_get_programs(self):
         """
         It should be possible to retrieve the list of related programs on the course instance.
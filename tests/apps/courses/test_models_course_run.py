@@ -96,6 +96,44 @@ class CourseRunModelsTestCase(TestCase):
             course_run.public_course_run.get_course(), course.public_extension
         )
 
+    def test_models_course_run_filter_by_course_nodes(self):
+        """
+        Course runs related to courses at different depths, or to one of their snapshots,
+        should be loaded in one query, for the version of the pages requested.
+        """
+        page = create_i18n_page("A page", published=True)
+        course = CourseFactory(should_publish=True)
+        nested_course = CourseFactory(page_parent=page, should_publish=True)
+        snapshot = CourseFactory(
+            page_parent=course.extended_object, should_publish=True
+        )
+        course_runs = [
+            CourseRunFactory(direct_course=course),
+            CourseRunFactory(direct_course=snapshot),
+            CourseRunFactory(direct_course=nested_course),
+        ]
+        # Course runs of other courses are not returned
+        CourseRunFactory(direct_course=CourseFactory(should_publish=True))
+
+        nodes = [
+            (course.extended_object.node.path, True),
+            (nested_course.extended_object.node.path, True),
+        ]
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                set(CourseRun.filter_by_course_nodes(nodes)), set(course_runs)
+            )
+
+        # Public course runs are only created when the courses are published again
+        for course_to_publish in [course, snapshot, nested_course]:
+            self.assertTrue(course_to_publish.extended_object.publish("en"))
+        self.assertEqual(
+            set(CourseRun.filter_by_course_nodes([(path, False) for path, _ in nodes])),
+            {course_run.public_course_run for course_run in course_runs},
+        )
+
+        self.assertFalse(CourseRun.filter_by_course_nodes([]).exists())
+
     def test_models_course_run_state_start_to_be_scheduled(self):
         """
         A course run that has no start date should return a state with priority 6
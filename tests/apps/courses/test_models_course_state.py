@@ -7,7 +7,7 @@ from django.test import TestCase
 from django.utils import timezone
 
 from richie.apps.courses.factories import CourseFactory, CourseRunFactory
-from richie.apps.courses.models import CourseState
+from richie.apps.courses.models import Course, CourseState
 
 
 class CourseRunModelsTestCase(TestCase):
@@ -205,3 +205,74 @@ class CourseRunModelsTestCase(TestCase):
         with self.assertNumQueries(1):
             state = course.state
         self.assertEqual(state, expected_state)
+
+    def test_models_course_state_with_state(self):
+        """
+        The state of all the courses of a queryset should be computed in one query when it is
+        evaluated, including the course runs of snapshots, and then not require any query.
+        """
+        course1, course2, course3 = CourseFactory.create_batch(3)
+        self.create_run_archived_closed(course1)
+        self.create_run_future_open(course1)
+        # The best run of the second course is attached to a snapshot
+        self.create_run_ongoing_closed(course2)
+        snapshot = CourseFactory(page_parent=course2.extended_object)
+        self.create_run_ongoing_open(snapshot)
+
+        expected_states = {
+            course.id: Course.objects.get(pk=course.pk).state
+            for course in [course1, course2, course3, snapshot]
+        }
+
+        with self.assertNumQueries(2):
+            courses = list(
+                Course.objects.filter(
+                    pk__in=[course1.pk, course2.pk, course3.pk, snapshot.pk]
+                )
+                .select_related("extended_object__node")
+                .with_state()
+            )
+
+        with self.assertNumQueries(0):
+            states = {course.id: course.state for course in courses}
+        self.assertEqual(states, expected_states)
+        self.assertEqual(states[course2.id]["priority"], CourseState.ONGOING_OPEN)
+        self.assertEqual(states[course3.id]["priority"], CourseState.TO_BE_SCHEDULED)
+
+    def test_models_course_state_with_state_draft_and_public(self):
+        """
+        Draft and public courses share the same node but not their course runs: the state of
+        each should be computed from its own course runs.
+        """
+        course = CourseFactory(should_publish=True)
+        self.create_run_ongoing_open(course)
+
+        courses = list(
+            Course.objects.filter(
+                extended_object__node=course.extended_object.node
+            ).with_state()
+        )
+
+        self.assertEqual(len(courses), 2)
+        for course_version in courses:
+            self.assertEqual(
+                course_version.state, Course.objects.get(pk=course_version.pk).state
+            )
+
+    def test_models_course_state_prefetch_states(self):
+        """
+        The state of any list of courses should be computable at once, loading their pages
+        and nodes along with their course runs if they were not fetched with the courses.
+        """
+        courses = CourseFactory.create_batch(2)
+        self.create_run_future_open(courses[0])
+        courses = list(Course.objects.filter(pk__in=[c.pk for c in courses]))
+
+        with self.assertNumQueries(2):
+            Course.prefetch_states(courses)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [course.state["priority"] for course in courses],
+                [CourseState.FUTURE_OPEN, CourseState.TO_BE_SCHEDULED],
+            )
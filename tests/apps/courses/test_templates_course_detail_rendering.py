@@ -1372,3 +1372,34 @@ class RunsCourseCMSTestCase(CMSTestCase):
             response,
             '<meta name="description"',
         )
+
+    @override_settings(
+        CMS_PAGE_CACHE=False, CMS_PLACEHOLDER_CACHE=False, CMS_PLUGIN_CACHE=False
+    )
+    def test_templates_course_detail_number_queries(self):
+        """
+        The placeholders of the course page should be loaded once even if the template looks
+        up some of them several times.
+        """
+        organizations = OrganizationFactory.create_batch(
+            2, fill_logo=True, should_publish=True
+        )
+        icons = CategoryFactory.create_batch(2, fill_icon=True, should_publish=True)
+        course = CourseFactory(
+            fill_cover=True,
+            fill_icons=icons,
+            fill_organizations=organizations,
+            fill_texts={
+                "course_introduction": "PlainTextPlugin",
+                "course_description": "CKEditorPlugin",
+            },
+            should_publish=True,
+        )
+        url = course.extended_object.get_absolute_url()
+
+        # Warm up the caches that are not related to the course page
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        with self.assertNumQueries(87):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
@@ -6,6 +6,7 @@ from django.test import RequestFactory
 
 from classytags.exceptions import ArgumentRequiredError
 from cms.api import add_plugin, create_page
+from cms.models import Page
 from cms.test_utils.testcases import CMSTestCase
 
 from richie.plugins.simple_text_ckeditor.cms_plugins import CKEditorPlugin
@@ -157,3 +158,39 @@ class GetPagePluginsTemplateTagsTestCase(CMSTestCase):
 
         output = self.render_template_obj(template, {"page": "unknown"}, request)
         self.assertEqual(output, "")
+
+    @transaction.atomic
+    def test_templatetags_get_page_plugins_memoized(self):
+        """
+        The placeholders of a page and their plugins should only be loaded once per request,
+        even if the page is looked up through different instances.
+        """
+        page = create_page("Test", "richie/single_column.html", "en", published=True)
+        placeholder = page.placeholders.get(slot="maincontent")
+        add_plugin(placeholder, CKEditorPlugin, "en", body="<b>Test</b>")
+
+        request = RequestFactory().get("/")
+        request.current_page = create_page(
+            "current", "richie/single_column.html", "en", published=True
+        )
+        request.user = AnonymousUser()
+
+        template = (
+            "{% load cms_tags extra_tags %}"
+            '{% get_page_plugins "maincontent" page as plugins %}'
+            "{% for plugin in plugins %}{% render_plugin plugin %}{% endfor %}"
+            '{% get_page_plugins "unknown" page as plugins %}'
+            '{% get_page_plugins "maincontent" page as plugins %}'
+            "{% for plugin in plugins %}{% render_plugin plugin %}{% endfor %}"
+        )
+        # Load the placeholders of the page, then the plugins of the placeholder
+        with self.assertNumQueries(3):
+            output = self.render_template_obj(template, {"page": page}, request)
+        self.assertEqual(output, "<b>Test</b>\n<b>Test</b>\n")
+
+        other_instance = Page.objects.get(pk=page.pk)
+        with self.assertNumQueries(0):
+            output = self.render_template_obj(
+                template, {"page": other_instance}, request
+            )
+        self.assertEqual(output, "<b>Test</b>\n<b>Test</b>\n")
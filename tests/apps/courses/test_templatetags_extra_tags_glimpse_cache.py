@@ -0,0 +1,154 @@
+"""Test suite for the `glimpse_cache` template tag."""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone, translation
+
+from cms.models import Title
+from cms.test_utils.testcases import CMSTestCase
+
+from richie.apps.core.factories import PageFactory
+from richie.apps.courses.factories import CourseFactory, CourseRunFactory
+from richie.apps.courses.glimpse_cache import get_glimpse_cache_key
+
+TEMPLATE = (
+    "{% load extra_tags %}"
+    "{% glimpse_cache page variant extra %}{{ page.get_title }}{% endglimpse_cache %}"
+)
+
+
+class GlimpseCacheTemplateTagTestCase(CMSTestCase):
+    """
+    Integration tests to validate the behavior of the `glimpse_cache` template tag.
+    """
+
+    def setUp(self):
+        """Start each test with an empty cache."""
+        super().setUp()
+        cache.clear()
+
+    @staticmethod
+    def make_request():
+        """Build a request on a page that is not related to the glimpses."""
+        request = RequestFactory().get("/")
+        request.current_page = PageFactory(should_publish=True)
+        request.user = AnonymousUser()
+        return request
+
+    def render_glimpse(self, page, variant="glimpse", extra=None, request=None):
+        """Render the glimpse of a page through the template tag."""
+        return self.render_template_obj(
+            TEMPLATE,
+            {"page": page, "variant": variant, "extra": extra},
+            request or self.make_request(),
+        )
+
+    @staticmethod
+    def rename(page, title):
+        """Change the title of a page in database without publishing it."""
+        Title.objects.filter(page=page).update(title=title)
+        page.title_cache = {}
+
+    def test_templatetags_glimpse_cache_public_page(self):
+        """
+        The glimpse of a public page should be cached until a page is published, in the
+        same language, variant and for the same additional values.
+        """
+        page = PageFactory(
+            title__title="first", should_publish=True
+        ).get_public_object()
+        self.assertEqual(self.render_glimpse(page), "first")
+
+        self.rename(page, "second")
+        self.assertEqual(self.render_glimpse(page), "first")
+        self.assertEqual(self.render_glimpse(page, variant="card"), "second")
+        self.assertEqual(self.render_glimpse(page, extra="value"), "second")
+        with translation.override("fr"):
+            self.assertEqual(self.render_glimpse(page), "second")
+
+        # Publishing any page invalidates all the glimpses once the transaction is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            PageFactory(should_publish=True)
+        self.assertEqual(self.render_glimpse(page), "second")
+
+    def test_templatetags_glimpse_cache_unpublish(self):
+        """Unpublishing a page should invalidate all the glimpses."""
+        page = PageFactory(title__title="first", should_publish=True)
+        public_page = page.get_public_object()
+        self.assertEqual(self.render_glimpse(public_page), "first")
+
+        self.rename(public_page, "second")
+        with self.captureOnCommitCallbacks(execute=True):
+            page.unpublish("en")
+        self.assertEqual(self.render_glimpse(public_page), "second")
+
+    def test_templatetags_glimpse_cache_draft_page(self):
+        """The glimpse of a draft page should never be cached."""
+        page = PageFactory(title__title="first", should_publish=True)
+        self.assertEqual(self.render_glimpse(page), "first")
+
+        self.rename(page, "second")
+        self.assertEqual(self.render_glimpse(page), "second")
+
+    @mock.patch("richie.apps.courses.glimpse_cache.get_toolbar_from_request")
+    def test_templatetags_glimpse_cache_edit_mode(self, mock_toolbar):
+        """Glimpses should not be cached when the toolbar is in edit mode."""
+        mock_toolbar.return_value.edit_mode_active = True
+        page = PageFactory(
+            title__title="first", should_publish=True
+        ).get_public_object()
+        request = self.make_request()
+        self.assertIsNone(get_glimpse_cache_key(request, page, "glimpse"))
+
+        self.assertEqual(self.render_glimpse(page, request=request), "first")
+        self.rename(page, "second")
+        self.assertEqual(self.render_glimpse(page, request=request), "second")
+
+    @override_settings(RICHIE_GLIMPSE_CACHE_TIMEOUT=0)
+    def test_templatetags_glimpse_cache_disabled(self):
+        """Glimpses should not be cached if the timeout is set to 0."""
+        page = PageFactory(
+            title__title="first", should_publish=True
+        ).get_public_object()
+        self.assertEqual(self.render_glimpse(page), "first")
+
+        self.rename(page, "second")
+        self.assertEqual(self.render_glimpse(page), "second")
+
+    def test_templatetags_glimpse_cache_course_state(self):
+        """
+        The glimpse of a course should be rendered again when the state of the course
+        changes, for example when a course run is added to the public course.
+        """
+        course = CourseFactory(should_publish=True)
+        public_course = course.public_extension
+        template = (
+            "{% load extra_tags %}"
+            '{% include "courses/cms/fragment_course_glimpse.html" %}'
+        )
+        request = self.make_request()
+
+        output = self.render_template_obj(template, {"course": public_course}, request)
+        self.assertIn("To be scheduled", output)
+
+        with self.assertNumQueries(1):
+            # Only the state of the course is computed to build the key
+            self.assertEqual(
+                self.render_template_obj(template, {"course": public_course}, request),
+                output,
+            )
+
+        now = timezone.now()
+        CourseRunFactory(
+            direct_course=public_course,
+            start=now - timedelta(days=1),
+            end=now + timedelta(days=1),
+            enrollment_start=now - timedelta(days=1),
+            enrollment_end=now + timedelta(days=1),
+        )
+        output = self.render_template_obj(template, {"course": public_course}, request)
+        self.assertIn("Closing on", output)
@@ -0,0 +1,175 @@
+"""Test suite for the template tags prefetching what is displayed on lists of glimpses."""
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from cms.test_utils.testcases import CMSTestCase
+
+from richie.apps.core.factories import PageFactory
+from richie.apps.courses.factories import (
+    CategoryFactory,
+    CourseFactory,
+    OrganizationFactory,
+    PersonFactory,
+)
+from richie.apps.courses.models import Course, Organization, Person
+from richie.apps.courses.templatetags.extra_tags import (
+    prefetch_course_glimpses,
+    prefetch_organization_glimpses,
+    prefetch_person_glimpses,
+)
+
+COURSE_GLIMPSES_TEMPLATE = (
+    "{% load extra_tags %}"
+    "{% for course in courses %}"
+    "{{ course.extended_object.get_title }}|{{ course.state.text }}|"
+    '{% get_page_plugins "course_cover" course.extended_object as covers %}'
+    '{% get_page_plugins "course_icons" course.extended_object as icons %}'
+    "{{ covers.0.picture.id }}|{{ icons.0.page_id }}|"
+    "{% with main_organization=course.get_main_organization %}"
+    "{% if main_organization %}"
+    "{% with organization_page=main_organization.extended_object %}"
+    '{% get_page_plugins "logo" organization_page as logos %}'
+    "{{ organization_page.get_title }}|{{ logos.0.picture.id }}"
+    "{% endwith %}"
+    "{% endif %}"
+    "{% endwith %};"
+    "{% endfor %}"
+)
+
+
+class PrefetchGlimpsesTemplateTagsTestCase(CMSTestCase):
+    """
+    Integration tests to validate the behavior of the `prefetch_*_glimpses` template tags.
+    """
+
+    @staticmethod
+    def make_request():
+        """Build a request on a page that is not related to the glimpses."""
+        request = RequestFactory().get("/")
+        request.current_page = PageFactory(should_publish=True)
+        request.user = AnonymousUser()
+        return request
+
+    def test_templatetags_prefetch_course_glimpses(self):
+        """
+        The titles, states, covers, icons and main organizations of a list of courses, as well
+        as the logo of their main organization, should be loaded in bulk so that rendering the
+        glimpses of the courses does not query the database.
+        """
+        organizations = OrganizationFactory.create_batch(
+            2, fill_logo=True, should_publish=True
+        )
+        icon = CategoryFactory(fill_icon=True, should_publish=True)
+        for i in range(3):
+            CourseFactory(
+                page_title=f"course {i:d}",
+                fill_cover=True,
+                fill_icons=[icon],
+                fill_organizations=[organizations[i % 2]],
+                should_publish=True,
+            )
+        CourseFactory(page_title="course 3", should_publish=True)
+
+        courses = Course.objects.filter(
+            extended_object__publisher_is_draft=False
+        ).order_by("pk")
+        # Render the glimpses without prefetching, on another request as placeholders are
+        # memoized on the request, to compare the results
+        expected = self.render_template_obj(
+            COURSE_GLIMPSES_TEMPLATE, {"courses": courses.all()}, self.make_request()
+        )
+        request = self.make_request()
+
+        # The placeholders of the course without cover and icon are looked up again in the
+        # fallback languages, as DjangoCMS does when rendering an empty placeholder
+        with self.assertNumQueries(17):
+            page_courses = prefetch_course_glimpses({"request": request}, courses)
+
+        with self.assertNumQueries(0):
+            output = self.render_template_obj(
+                COURSE_GLIMPSES_TEMPLATE, {"courses": page_courses}, request
+            )
+
+        self.assertEqual(output, expected)
+        self.assertEqual(page_courses, list(courses))
+        glimpses = output.split(";")
+        self.assertEqual(len(glimpses), 5)
+        # Title, state, cover, icon, main organization and logo of the first course
+        course_glimpse = glimpses[0].split("|")
+        self.assertEqual(course_glimpse[:2], ["course 0", "to be scheduled"])
+        self.assertNotEqual(course_glimpse[2], "")
+        self.assertEqual(course_glimpse[3], str(icon.extended_object_id))
+        self.assertEqual(
+            course_glimpse[4], organizations[0].extended_object.get_title()
+        )
+        self.assertNotEqual(course_glimpse[5], "")
+        self.assertEqual(glimpses[3], "course 3|to be scheduled|||")
+
+    def test_templatetags_prefetch_course_glimpses_empty(self):
+        """An empty list of courses should not query the database."""
+        request = self.make_request()
+        with self.assertNumQueries(0):
+            self.assertEqual(prefetch_course_glimpses({"request": request}, []), [])
+
+    def test_templatetags_prefetch_organization_glimpses(self):
+        """
+        The titles, logos and descriptions of a list of organizations should be loaded in bulk.
+        """
+        OrganizationFactory.create_batch(
+            2, fill_logo=True, fill_description=True, should_publish=True
+        )
+        organizations = Organization.objects.filter(
+            extended_object__publisher_is_draft=False
+        ).select_related("extended_object")
+        template = (
+            "{% load extra_tags %}"
+            "{% for organization in organizations %}"
+            "{{ organization.extended_object.get_title }}|"
+            '{% get_page_plugins "logo" organization.extended_object as logos %}'
+            '{% get_page_plugins "description" organization.extended_object as texts %}'
+            "{{ logos.0.picture.id }}|{{ texts.0.body }};"
+            "{% endfor %}"
+        )
+        expected = self.render_template_obj(
+            template, {"organizations": organizations.all()}, self.make_request()
+        )
+        request = self.make_request()
+
+        with self.assertNumQueries(7):
+            page_organizations = prefetch_organization_glimpses(
+                {"request": request}, organizations
+            )
+
+        with self.assertNumQueries(0):
+            output = self.render_template_obj(
+                template, {"organizations": page_organizations}, request
+            )
+        self.assertEqual(output, expected)
+
+    def test_templatetags_prefetch_person_glimpses(self):
+        """The titles and portraits of a list of persons should be loaded in bulk."""
+        PersonFactory.create_batch(2, fill_portrait=True, should_publish=True)
+        persons = Person.objects.filter(
+            extended_object__publisher_is_draft=False
+        ).select_related("extended_object")
+        template = (
+            "{% load extra_tags %}"
+            "{% for person in persons %}"
+            "{{ person.extended_object.get_title }}|"
+            '{% get_page_plugins "portrait" person.extended_object as portraits %}'
+            "{{ portraits.0.picture.id }};"
+            "{% endfor %}"
+        )
+        expected = self.render_template_obj(
+            template, {"persons": persons.all()}, self.make_request()
+        )
+        request = self.make_request()
+
+        with self.assertNumQueries(6):
+            page_persons = prefetch_person_glimpses({"request": request}, persons)
+
+        with self.assertNumQueries(0):
+            output = self.render_template_obj(
+                template, {"persons": page_persons}, request
+            )
+        self.assertEqual(output, expected)
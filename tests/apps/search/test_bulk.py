@@ -0,0 +1,268 @@
+"""
+Tests for the engine sending bulk requests to Elasticsearch
+"""
+import json
+from unittest import mock
+
+from django.test import TestCase
+
+from elasticsearch.exceptions import TransportError
+from elasticsearch.helpers import BulkIndexError
+from elasticsearch.serializer import JSONSerializer
+
+from richie.apps.search.bulk import BulkResult, chunk_actions, parallel_bulk
+
+
+def get_client(es_version="7"):
+    """Build a fake Elasticsearch client with a real serializer."""
+    client = mock.Mock()
+    client.__es_version__ = es_version
+    client.transport.serializer = JSONSerializer()
+    return client
+
+
+def get_actions(count):
+    """Generate actions indexing simple documents."""
+    return [
+        {"_id": str(i), "_index": "test", "_op_type": "index", "title": "a" * 10}
+        for i in range(count)
+    ]
+
+
+def get_response(body, statuses=None):
+    """Build a bulk response for a request body, with a status for each action."""
+    actions = [json.loads(line) for line in body.splitlines() if "_index" in line]
+    statuses = statuses or [201] * len(actions)
+    items = []
+    for action, status in zip(actions, statuses):
+        ((op_type, meta),) = action.items()
+        result = {**meta, "status": status}
+        if status >= 300:
+            result["error"] = {"type": "some_error"}
+        items.append({op_type: result})
+    return {"errors": any(status >= 300 for status in statuses), "items": items}
+
+
+def get_ids(body):
+    """Get the ids of the documents targeted by the actions of a request body."""
+    return [
+        json.loads(line)["index"]["_id"]
+        for line in body.splitlines()
+        if '"index"' in line
+    ]
+
+
+BULK_PARAMS = {
+    "chunk_size": 500,
+    "max_chunk_bytes": 10 * 1024 * 1024,
+    "thread_count": 2,
+    "max_retries": 3,
+    "initial_backoff": 1,
+    "max_backoff": 3,
+}
+
+
+@mock.patch("time.sleep")
+class BulkTestCase(TestCase):
+    """Test sending actions to Elasticsearch in parallel bulk requests with retries."""
+
+    def test_bulk_chunk_actions(self, _mock_sleep):
+        """Chunks should be limited both in number of actions and in bytes."""
+        client = get_client()
+        client.bulk.side_effect = get_response
+
+        parallel_bulk(client, get_actions(10), **{**BULK_PARAMS, "chunk_size": 4})
+        self.assertEqual(
+            sorted(
+                len(get_ids(call.kwargs["body"])) for call in client.bulk.mock_calls
+            ),
+            [2, 4, 4],
+        )
+
+        client.bulk.reset_mock()
+        chunks = list(
+            chunk_actions(
+                [mock.Mock(size=40) for _ in range(5)],
+                chunk_size=500,
+                max_chunk_bytes=100,
+            )
+        )
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+
+        # An action bigger than the limit is sent alone
+        chunks = list(
+            chunk_actions(
+                [mock.Mock(size=size) for size in [40, 200, 40]],
+                chunk_size=500,
+                max_chunk_bytes=100,
+            )
+        )
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1, 1])
+
+    def test_bulk_success(self, mock_sleep):
+        """All actions should be sent and counted as successful."""
+        client = get_client()
+        client.bulk.side_effect = get_response
+
+        result = parallel_bulk(client, get_actions(1200), **BULK_PARAMS)
+
+        self.assertEqual(result, BulkResult(1200, []))
+        self.assertEqual(client.bulk.call_count, 3)
+        self.assertEqual(
+            sorted(
+                int(_id)
+                for call in client.bulk.mock_calls
+                for _id in get_ids(call.kwargs["body"])
+            ),
+            list(range(1200)),
+        )
+        body = client.bulk.mock_calls[0].kwargs["body"]
+        self.assertTrue(body.endswith("\n"))
+        self.assertNotIn("_type", body)
+        mock_sleep.assert_not_called()
+
+    def test_bulk_es6(self, _mock_sleep):
+        """A dummy type should be added to actions for ES6."""
+        client = get_client(es_version="6")
+        client.bulk.side_effect = get_response
+
+        parallel_bulk(client, get_actions(1), **BULK_PARAMS)
+
+        action_line = client.bulk.call_args.kwargs["body"].splitlines()[0]
+        self.assertEqual(
+            json.loads(action_line),
+            {"index": {"_id": "0", "_index": "test", "_type": "_doc"}},
+        )
+
+    def test_bulk_failures(self, _mock_sleep):
+        """The failure of each action should be reported."""
+        client = get_client()
+        client.bulk.side_effect = lambda body: get_response(body, [201, 400, 201])
+
+        with self.assertRaises(BulkIndexError) as context:
+            parallel_bulk(client, get_actions(3), **BULK_PARAMS)
+
+        expected_failures = [
+            {
+                "index": {
+                    "_id": "1",
+                    "_index": "test",
+                    "status": 400,
+                    "error": {"type": "some_error"},
+                }
+            }
+        ]
+        self.assertEqual(context.exception.errors, expected_failures)
+
+        result = parallel_bulk(
+            client, get_actions(3), **BULK_PARAMS, raise_on_error=False
+        )
+        self.assertEqual(result, BulkResult(2, expected_failures))
+
+    def test_bulk_retry_rejected_actions(self, mock_sleep):
+        """
+        Actions rejected because the cluster is overloaded should be retried alone with an
+        exponential backoff.
+        """
+        client = get_client()
+        responses = iter(
+            [
+                lambda body: get_response(body, [201, 429, 429]),
+                lambda body: get_response(body, [201, 429]),
+                get_response,
+            ]
+        )
+        # pylint: disable=unnecessary-lambda
+        client.bulk.side_effect = lambda body: next(responses)(body)
+
+        result = parallel_bulk(client, get_actions(3), **BULK_PARAMS)
+
+        self.assertEqual(result, BulkResult(3, []))
+        self.assertEqual(
+            [get_ids(call.kwargs["body"]) for call in client.bulk.mock_calls],
+            [["0", "1", "2"], ["1", "2"], ["2"]],
+        )
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(1), mock.call(2)])
+
+    def test_bulk_retry_exhausted(self, mock_sleep):
+        """
+        Actions still rejected after all retries should be reported as failures, the
+        backoff being limited to its maximum.
+        """
+        client = get_client()
+        client.bulk.side_effect = lambda body: get_response(body, [429])
+
+        result = parallel_bulk(
+            client, get_actions(1), **BULK_PARAMS, raise_on_error=False
+        )
+
+        self.assertEqual(client.bulk.call_count, 4)
+        self.assertEqual(
+            mock_sleep.call_args_list, [mock.call(1), mock.call(2), mock.call(3)]
+        )
+        self.assertEqual(result.success, 0)
+        self.assertEqual(result.failures[0]["index"]["status"], 429)
+
+    def test_bulk_retry_rejected_request(self, mock_sleep):
+        """A whole request rejected because the cluster is overloaded should be retried."""
+        client = get_client()
+        responses = iter(
+            [
+                TransportError(429, "es_rejected_execution_exception"),
+                get_response,
+            ]
+        )
+
+        def bulk(body):
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response(body)
+
+        client.bulk.side_effect = bulk
+
+        result = parallel_bulk(client, get_actions(2), **BULK_PARAMS)
+
+        self.assertEqual(result, BulkResult(2, []))
+        self.assertEqual(client.bulk.call_count, 2)
+        mock_sleep.assert_called_once_with(1)
+
+    def test_bulk_other_errors(self, _mock_sleep):
+        """Other errors should not be retried."""
+        client = get_client()
+        client.bulk.side_effect = TransportError(400, "bad request")
+
+        with self.assertRaises(TransportError):
+            parallel_bulk(client, get_actions(2), **BULK_PARAMS)
+
+        self.assertEqual(client.bulk.call_count, 1)
+
+    def test_bulk_bounded_in_flight(self, _mock_sleep):
+        """
+        Actions should be consumed as requests are sent: no more chunks than threads should
+        be prepared in advance.
+        """
+        consumed = []
+
+        def actions():
+            for action in get_actions(100):
+                consumed.append(action)
+                yield action
+
+        produced_at_call = []
+
+        def bulk(body):
+            produced_at_call.append(len(consumed))
+            return get_response(body)
+
+        client = get_client()
+        client.bulk.side_effect = bulk
+
+        parallel_bulk(
+            client, actions(), **{**BULK_PARAMS, "chunk_size": 10, "thread_count": 1}
+        )
+
+        self.assertEqual(len(produced_at_call), 10)
+        for i, produced in enumerate(produced_at_call):
+            # The chunk being sent, the next one and the action that closed it
+            self.assertLessEqual(produced, (i + 2) * 10 + 1)
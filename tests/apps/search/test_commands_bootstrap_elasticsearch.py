@@ -1,13 +1,20 @@
 """
 Tests for the regenerate_index command
 """
+import json
 import logging
+import os
+import tempfile
+from datetime import datetime
+from io import StringIO
 from unittest import mock
 
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
 
 from richie.apps.search import index_manager
+from richie.apps.search.utils.profiling import IndexingProfiler
 
 logger = logging.getLogger("richie.search.bootstrap_elasticsearch")
 
@@ -30,3 +37,128 @@ class BootstrapElasticsearchCommandsTestCase(TestCase):
         mock_regenerate.assert_called_once()
         mock_store.assert_called_once()
         self.assertEqual(mock_info.call_count, 4)
+
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.regenerate_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.store_es_scripts"
+    )
+    def test_commands_bootstrap_elasticsearch_workers(
+        self, _mock_store, mock_regenerate
+    ):
+        """The number of worker processes should be passed to the index manager."""
+        call_command("bootstrap_elasticsearch", workers=4)
+        self.assertEqual(
+            mock_regenerate.call_args_list,
+            [mock.call(logger, workers=4, profiler=None)],
+        )
+
+    def test_commands_bootstrap_elasticsearch_workers_invalid(self):
+        """The number of worker processes should be a positive integer."""
+        with self.assertRaises(CommandError):
+            call_command("bootstrap_elasticsearch", workers=0)
+
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.update_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.regenerate_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.store_es_scripts"
+    )
+    def test_commands_bootstrap_elasticsearch_since(
+        self, _mock_store, mock_regenerate, mock_update
+    ):
+        """
+        Indices should only be updated with the records changed since the date passed as
+        argument. A naive date is considered to be in the current timezone.
+        """
+        call_command("bootstrap_elasticsearch", since="2021-11-22T10:00:00+00:00")
+        call_command("bootstrap_elasticsearch", since="2021-11-22 10:00")
+
+        self.assertEqual(
+            mock_update.call_args_list,
+            [
+                mock.call(
+                    logger,
+                    since=datetime(2021, 11, 22, 10, tzinfo=timezone.utc),
+                    profiler=None,
+                ),
+                mock.call(
+                    logger,
+                    since=timezone.make_aware(datetime(2021, 11, 22, 10)),
+                    profiler=None,
+                ),
+            ],
+        )
+        self.assertFalse(mock_regenerate.called)
+
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.update_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.regenerate_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.store_es_scripts"
+    )
+    def test_commands_bootstrap_elasticsearch_changed_only(
+        self, _mock_store, mock_regenerate, mock_update
+    ):
+        """Indices should be updated with the records changed since their watermark."""
+        call_command("bootstrap_elasticsearch", changed_only=True)
+        self.assertEqual(
+            mock_update.call_args_list, [mock.call(logger, since=None, profiler=None)]
+        )
+        self.assertFalse(mock_regenerate.called)
+
+    def test_commands_bootstrap_elasticsearch_since_invalid(self):
+        """The date passed as argument should be a valid ISO 8601 date and time."""
+        with self.assertRaises(CommandError):
+            call_command("bootstrap_elasticsearch", since="yesterday")
+
+    def test_commands_bootstrap_elasticsearch_since_workers(self):
+        """Only updating the records that changed is not possible with several workers."""
+        with self.assertRaises(CommandError):
+            call_command("bootstrap_elasticsearch", changed_only=True, workers=2)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "bootstrap_elasticsearch", since="2021-11-22T10:00:00", workers=2
+            )
+
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.regenerate_indices"
+    )
+    @mock.patch(
+        "richie.apps.search.management.commands.bootstrap_elasticsearch.store_es_scripts"
+    )
+    def test_commands_bootstrap_elasticsearch_profile(
+        self, _mock_store, mock_regenerate
+    ):
+        """
+        With profiling, a profiler should be passed to the index manager and its report
+        printed at the end and written as JSON if requested.
+        """
+        stdout = StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "profile.json")
+            call_command(
+                "bootstrap_elasticsearch",
+                profile=True,
+                profile_output=path,
+                stdout=stdout,
+            )
+
+            profiler = mock_regenerate.call_args.kwargs["profiler"]
+            self.assertIsInstance(profiler, IndexingProfiler)
+            with open(path, encoding="utf-8") as profile_file:
+                self.assertEqual(json.load(profile_file), {"indexers": []})
+        self.assertEqual(stdout.getvalue(), profiler.format_report() + "\n")
+
+    def test_commands_bootstrap_elasticsearch_profile_workers(self):
+        """Profiling is not possible with several worker processes."""
+        with self.assertRaises(CommandError):
+            call_command("bootstrap_elasticsearch", profile=True, workers=2)
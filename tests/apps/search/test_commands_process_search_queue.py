@@ -0,0 +1,41 @@
+"""
+Tests for the process_search_queue command
+"""
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+
+@mock.patch(
+    "richie.apps.search.management.commands.process_search_queue.process_search_queue",
+    return_value=0,
+)
+class ProcessSearchQueueCommandsTestCase(TestCase):
+    """
+    Test the command that processes the queue of pending updates of the Elasticsearch
+    indices.
+    """
+
+    def test_commands_process_search_queue(self, mock_process):
+        """Delegate all logic to the queue module and drain the queue once by default."""
+        call_command("process_search_queue", batch_size=10, max_attempts=3)
+        self.assertEqual(
+            mock_process.call_args_list,
+            [mock.call(batch_size=10, max_attempts=3, logger=mock.ANY)],
+        )
+
+    @mock.patch("time.sleep", side_effect=[None, KeyboardInterrupt])
+    def test_commands_process_search_queue_interval(self, mock_sleep, mock_process):
+        """With an interval, the queue should be polled until the command is stopped."""
+        with self.assertRaises(KeyboardInterrupt):
+            call_command("process_search_queue", interval=5)
+
+        self.assertEqual(mock_process.call_count, 2)
+        mock_sleep.assert_called_with(5)
+
+    def test_commands_process_search_queue_invalid(self, mock_process):
+        """Options should be positive integers."""
+        with self.assertRaises(CommandError):
+            call_command("process_search_queue", batch_size=0)
+        mock_process.assert_not_called()
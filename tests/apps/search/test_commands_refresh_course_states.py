@@ -0,0 +1,86 @@
+"""
+Tests for the refresh_course_states command
+"""
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from richie.apps.courses.factories import CourseFactory, CourseRunFactory
+from richie.apps.search.indexers.courses import CoursesIndexer
+
+
+@mock.patch(
+    "richie.apps.search.management.commands.refresh_course_states.bulk_live_indices"
+)
+@mock.patch("richie.apps.search.indexers.courses.scan")
+class RefreshCourseStatesCommandsTestCase(TestCase):
+    """
+    Test the command that refreshes the state of courses whose state change date has
+    passed.
+    """
+
+    def test_commands_refresh_course_states(self, mock_scan, mock_bulk):
+        """
+        Courses found with an expired state in the index should be partially updated with
+        their course runs and state.
+        """
+        course, other_course = CourseFactory.create_batch(2, should_publish=True)
+        CourseRunFactory(direct_course=course)
+        course.extended_object.publish("en")
+        mock_scan.return_value = iter(
+            [{"_id": str(course.public_extension.get_es_id())}]
+        )
+
+        call_command("refresh_course_states")
+
+        mock_scan.assert_called_once_with(
+            mock.ANY,
+            index=CoursesIndexer.index_name,
+            query={"query": {"range": {"state_changes_on": {"lte": "now"}}}},
+            _source=False,
+        )
+        (actions,), _kwargs = mock_bulk.call_args
+        self.assertEqual(len(actions), 1)
+        self.assertEqual(actions[0]["_id"], course.public_extension.get_es_id())
+        self.assertEqual(actions[0]["_op_type"], "update")
+        self.assertEqual(
+            set(actions[0]["doc"]),
+            {
+                "course_runs",
+                "is_new",
+                "state_priority",
+                "state_date_time",
+                "state_rank",
+                "state_changes_on",
+            },
+        )
+        self.assertEqual(len(actions[0]["doc"]["course_runs"]), 1)
+        self.assertNotEqual(
+            other_course.public_extension.get_es_id(), actions[0]["_id"]
+        )
+
+    def test_commands_refresh_course_states_none(self, mock_scan, mock_bulk):
+        """Nothing should be sent to Elasticsearch if no course state has expired."""
+        mock_scan.return_value = iter([])
+        call_command("refresh_course_states")
+        self.assertFalse(mock_bulk.called)
+
+    @mock.patch("time.sleep", side_effect=[None, KeyboardInterrupt])
+    def test_commands_refresh_course_states_interval(
+        self, mock_sleep, mock_scan, _mock_bulk
+    ):
+        """With an interval, course states should be refreshed until the command is stopped."""
+        mock_scan.side_effect = lambda *args, **kwargs: iter([])
+        with self.assertRaises(KeyboardInterrupt):
+            call_command("refresh_course_states", interval=5)
+
+        self.assertEqual(mock_scan.call_count, 2)
+        mock_sleep.assert_called_with(5)
+
+    def test_commands_refresh_course_states_invalid(self, mock_scan, mock_bulk):
+        """The interval should be a positive integer."""
+        with self.assertRaises(CommandError):
+            call_command("refresh_course_states", interval=0)
+        mock_scan.assert_not_called()
+        mock_bulk.assert_not_called()
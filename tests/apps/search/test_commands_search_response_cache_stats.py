@@ -0,0 +1,41 @@
+"""
+Tests for the search_response_cache_stats command
+"""
+from io import StringIO
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase
+
+from richie.apps.search.utils.response_cache import (
+    HITS_CACHE_KEY,
+    MISSES_CACHE_KEY,
+    get_response_cache_stats,
+)
+
+
+class SearchResponseCacheStatsCommandsTestCase(TestCase):
+    """Test the command that reports the hits and misses of the cache of search responses."""
+
+    def setUp(self):
+        """Start each test with empty counters."""
+        super().setUp()
+        caches["search"].clear()
+
+    def test_commands_search_response_cache_stats(self):
+        """The counters should be reported and only reset if requested."""
+        caches["search"].set_many({HITS_CACHE_KEY: 3, MISSES_CACHE_KEY: 1})
+
+        out = StringIO()
+        call_command("search_response_cache_stats", stdout=out)
+        self.assertEqual(out.getvalue(), "hits: 3, misses: 1, hit ratio: 75.0%\n")
+        self.assertEqual(get_response_cache_stats(), {"hits": 3, "misses": 1})
+
+        call_command("search_response_cache_stats", reset=True, stdout=StringIO())
+        self.assertEqual(get_response_cache_stats(), {"hits": 0, "misses": 0})
+
+    def test_commands_search_response_cache_stats_empty(self):
+        """Nothing counted yet should not fail."""
+        out = StringIO()
+        call_command("search_response_cache_stats", stdout=out)
+        self.assertEqual(out.getvalue(), "hits: 0, misses: 0, hit ratio: 0.0%\n")
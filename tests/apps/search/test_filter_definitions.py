@@ -1,11 +1,16 @@
 """
 Tests for environment ElasticSearch support
 """
+from datetime import datetime
+from unittest import mock
+
 from django.core.cache import caches
 from django.test import TestCase
+from django.utils import timezone
 
 from richie.apps.courses.factories import CategoryFactory
 from richie.apps.search.filter_definitions import FILTERS, IndexableFilterDefinition
+from richie.apps.search.indexers import ES_INDICES
 
 
 class FilterDefintionsTestCase(TestCase):
@@ -96,3 +101,61 @@ class FilterDefintionsTestCase(TestCase):
         """
         indexable_filter_definition = IndexableFilterDefinition("name")
         self.assertEqual(indexable_filter_definition.aggs_include, ".*")
+
+    def test_filter_definitions_i18n_names_lookups(self):
+        """
+        Indexable filters should list the keys returned in their facets, including selected
+        values, to look for their names in their index. Other filters need no names.
+        """
+        facets = {
+            "organizations": {
+                "organizations": {
+                    "buckets": [
+                        {"key": "11", "doc_count": 3},
+                        {"key": "12", "doc_count": 2},
+                    ]
+                }
+            },
+            "organizations@13": {"doc_count": 1},
+            "languages": {"languages": {"buckets": {"en": {"doc_count": 4}}}},
+        }
+        data = {"organizations": ["13"], "languages": []}
+
+        self.assertEqual(
+            FILTERS["organizations"].get_i18n_names_lookups(facets, data),
+            {ES_INDICES.organizations: ["11", "12", "13"]},
+        )
+        # Filters on course runs are wrapped in a nesting wrapper
+        self.assertEqual(
+            FILTERS["course_runs"].get_i18n_names_lookups(facets, data), {}
+        )
+
+    @mock.patch.object(
+        timezone, "now", return_value=datetime(2020, 1, 1, tzinfo=timezone.utc)
+    )
+    def test_filter_definitions_nested_choices_aggs(self, _mock_now):
+        """
+        The bucket of each choice of a nested filter should apply the nested query the nesting
+        wrapper builds when only this choice is selected on the filter, along with the values
+        selected on other nested filters.
+        """
+        nesting_wrapper = FILTERS["course_runs"]
+        data = {"availability": ["open"], "languages": ["en", "fr"]}
+
+        for name, filter_definition in nesting_wrapper.filter_definitions.items():
+            buckets = filter_definition.get_aggs_fragment(
+                [], data, parent=nesting_wrapper
+            )[name]["aggregations"][name]["filters"]["filters"]
+
+            self.assertEqual(list(buckets), list(filter_definition.get_fragment_map()))
+            for choice_key, bucket in buckets.items():
+                self.assertEqual(
+                    bucket,
+                    {
+                        "bool": {
+                            "must": nesting_wrapper.get_query_fragment(
+                                {**data, name: [choice_key]}
+                            )[0]["fragment"]
+                        }
+                    },
+                )
@@ -3,8 +3,12 @@ Tests for the course search form.
 """
 from unittest import mock
 
+from django.core import signing
 from django.http.request import QueryDict
 from django.test import TestCase
+from django.test.utils import override_settings
+
+import arrow
 
 from richie.apps.core.defaults import ALL_LANGUAGES_DICT
 from richie.apps.search.forms import CourseSearchForm
@@ -30,6 +34,7 @@ class CourseSearchFormTestCase(TestCase):
             form.cleaned_data,
             {
                 "availability": [],
+                "cursor": None,
                 "languages": [],
                 "levels": [],
                 "levels_aggs": [],
@@ -134,6 +139,7 @@ class CourseSearchFormTestCase(TestCase):
             form.cleaned_data,
             {
                 "availability": ["coming_soon"],
+                "cursor": None,
                 "languages": ["fr"],
                 "levels": ["1"],
                 "levels_aggs": [],
@@ -196,6 +202,7 @@ class CourseSearchFormTestCase(TestCase):
             form.cleaned_data,
             {
                 "availability": ["coming_soon", "ongoing"],
+                "cursor": None,
                 "languages": ["fr", "en"],
                 "levels": ["1", "2"],
                 "levels_aggs": ["33", "34"],
@@ -217,6 +224,61 @@ class CourseSearchFormTestCase(TestCase):
             },
         )
 
+    def test_forms_courses_get_sort(self, *_):
+        """
+        Results should be sorted on the state computed at indexing time unless there is a
+        full text query or a filter on languages or availability.
+        """
+        for query_string, is_sorted in [
+            ("", True),
+            ("new=new&subjects=1", True),
+            ("query=some%20phrase%20terms", False),
+            ("languages=fr", False),
+            ("availability=open", False),
+        ]:
+            form = CourseSearchForm(data=QueryDict(query_string=query_string))
+            self.assertTrue(form.is_valid())
+            sort = form.get_sort()
+            query = form.build_es_query()[2]
+            if is_sorted:
+                self.assertEqual(
+                    sort,
+                    [
+                        {
+                            "state_priority": {
+                                "order": "asc",
+                                "unmapped_type": "integer",
+                            }
+                        },
+                        {"state_rank": {"order": "asc", "unmapped_type": "long"}},
+                    ],
+                )
+                # No script is needed to score results
+                self.assertEqual(list(query), ["bool"])
+            else:
+                self.assertIsNone(sort)
+                self.assertEqual(
+                    query["function_score"]["script_score"]["script"]["id"], "score"
+                )
+
+    def test_forms_courses_get_sort_custom_state_weights(self, *_):
+        """
+        Results should be scored by script when the state weights don't rank courses in the
+        order of their states.
+        """
+        form = CourseSearchForm(data=QueryDict(query_string=""))
+        self.assertTrue(form.is_valid())
+
+        for weights, is_sorted in [
+            ([100, 90, 50, 20, 10, 3, 2], True),
+            ([80, 70, 60, 30, 6, 5, 6], False),
+            ([80, 80, 60, 30, 6, 5, 1], False),
+        ]:
+            with mock.patch("richie.apps.search.forms.ES_STATE_WEIGHTS", weights):
+                self.assertEqual(form.get_sort() is not None, is_sorted)
+                query = form.build_es_query()[2]
+                self.assertEqual("function_score" in query, not is_sorted)
+
     def test_forms_courses_build_es_query_search_by_match_text(self, *_):
         """
         Happy path: build a query that filters courses by matching text
@@ -274,3 +336,276 @@ class CourseSearchFormTestCase(TestCase):
                 }
             },
         )
+
+    @override_settings(RICHIE_SEARCH_AGGS_STRATEGY="post_filter")
+    def test_forms_courses_build_es_query_post_filter(self, *_):
+        """
+        With the "post_filter" strategy, a search with a full text query should only require
+        this query to match in the main query, aggregations being scoped under it and filters
+        being applied to results by a post filter.
+        """
+        form = CourseSearchForm(
+            data=QueryDict(query_string="query=some%20phrase%20terms&new=new")
+        )
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.use_post_filter())
+
+        _limit, _offset, query, aggs = form.build_es_query()
+        text_query = query["function_score"]["query"]["bool"]["must"]
+        self.assertEqual(len(text_query), 1)
+        self.assertIn("multi_match", str(text_query))
+        # Filters only add to the score of results, as they do with global aggregations
+        self.assertEqual(
+            query["function_score"]["query"]["bool"]["should"],
+            [{"term": {"is_new": True}}],
+        )
+
+        # Aggregations are computed on the documents matching the main query and don't
+        # repeat the full text query
+        self.assertEqual(aggs["all_courses"]["filter"], {"match_all": {}})
+        self.assertNotIn("global", aggs["all_courses"])
+        self.assertNotIn("multi_match", str(aggs))
+        self.assertEqual(
+            aggs["all_courses"]["aggregations"]["subjects"]["filter"],
+            {"bool": {"must": [{"term": {"is_new": True}}]}},
+        )
+
+        self.assertEqual(
+            form.get_post_filter(),
+            {
+                "bool": {
+                    "filter": [
+                        {"term": {"is_listed": True}},
+                        {"term": {"is_new": True}},
+                    ]
+                }
+            },
+        )
+
+    def test_forms_courses_use_post_filter(self, *_):
+        """
+        A post filter should only be used if configured and if there is a full text query.
+        """
+        for query_string, strategy, expected in [
+            ("query=some%20phrase%20terms", "post_filter", True),
+            ("new=new", "post_filter", False),
+            ("query=some%20phrase%20terms", "global", False),
+        ]:
+            with override_settings(RICHIE_SEARCH_AGGS_STRATEGY=strategy):
+                form = CourseSearchForm(data=QueryDict(query_string=query_string))
+                self.assertTrue(form.is_valid())
+                self.assertEqual(form.use_post_filter(), expected)
+                if not expected:
+                    self.assertIsNone(form.get_post_filter())
+                    self.assertEqual(
+                        form.build_es_query()[3]["all_courses"]["global"], {}
+                    )
+
+    def test_forms_courses_cursor(self, *_):
+        """
+        A cursor should be decoded to the values it was encoded from and use cursor
+        pagination, even empty for the first page.
+        """
+        form = CourseSearchForm(data=QueryDict())
+        self.assertTrue(form.is_valid())
+        self.assertFalse(form.use_cursor())
+        self.assertIsNone(form.cleaned_data["cursor"])
+
+        form = CourseSearchForm(data=QueryDict(query_string="cursor="))
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.use_cursor())
+        self.assertIsNone(form.cleaned_data["cursor"])
+
+        cursor = form.encode_cursor([2, 1234, "56"], "pit")
+        ms_since_epoch = form.ms_since_epoch
+        form = CourseSearchForm(data=QueryDict(query_string=f"cursor={cursor:s}"))
+        self.assertTrue(form.is_valid())
+        self.assertTrue(form.use_cursor())
+        self.assertEqual(
+            form.cleaned_data["cursor"],
+            {
+                "search_after": [2, 1234, "56"],
+                "pit_id": "pit",
+                "ms_since_epoch": ms_since_epoch,
+            },
+        )
+
+    def test_forms_courses_cursor_ms_since_epoch(self, *_):
+        """
+        The following pages of a search paginated with a cursor should compute the state of
+        courses at the time of the first page, so that they are ranked the same way.
+        """
+        with mock.patch("arrow.utcnow", return_value=arrow.get("2022-03-01 10:00:01")):
+            form = CourseSearchForm(data=QueryDict(query_string="cursor="))
+            self.assertTrue(form.is_valid())
+            cursor = form.encode_cursor([2, 1234, "56"])
+
+        with mock.patch("arrow.utcnow", return_value=arrow.get("2022-03-01 11:00:00")):
+            form = CourseSearchForm(data=QueryDict(query_string=f"cursor={cursor:s}"))
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.ms_since_epoch, 1646128801000)
+
+            # Cursors encoded before the time was stored use the current time
+            cursor = signing.dumps(
+                {"search_after": [2, 1234, "56"], "pit_id": None},
+                salt=CourseSearchForm.CURSOR_SALT,
+                compress=True,
+            )
+            form = CourseSearchForm(data=QueryDict(query_string=f"cursor={cursor:s}"))
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.ms_since_epoch, 1646132400000)
+
+    def test_forms_courses_cursor_invalid(self, *_):
+        """A cursor that was not encoded by Richie should be rejected."""
+        form = CourseSearchForm(data=QueryDict(query_string="cursor=forged"))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors, {"cursor": ["Invalid cursor."]})
+
+    def test_forms_courses_get_cursor_sort(self, *_):
+        """
+        The sort of searches paginated with a cursor should be the same as with an offset,
+        with a tiebreaker unless they are tied to a point in time.
+        """
+        form = CourseSearchForm(data=QueryDict(query_string="cursor="))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            form.get_cursor_sort(),
+            [
+                {"state_priority": {"order": "asc", "unmapped_type": "integer"}},
+                {"state_rank": {"order": "asc", "unmapped_type": "long"}},
+                {"page_id": {"order": "asc", "unmapped_type": "keyword"}},
+            ],
+        )
+
+        form = CourseSearchForm(data=QueryDict(query_string="cursor=&query=maths"))
+        self.assertTrue(form.is_valid())
+        self.assertEqual(
+            form.get_cursor_sort(),
+            [
+                {"_score": {"order": "desc"}},
+                {"page_id": {"order": "asc", "unmapped_type": "keyword"}},
+            ],
+        )
+
+        with override_settings(RICHIE_SEARCH_CURSOR_KEEP_ALIVE="1m"):
+            self.assertEqual(form.get_cursor_sort(), [{"_score": {"order": "desc"}}])
+
+    @override_settings(RICHIE_SEARCH_TIME_BUCKET=60000)
+    def test_forms_courses_ms_since_epoch_time_bucket(self, *_):
+        """
+        The current time passed to scripts should be rounded down to the time bucket and
+        be the same for all the scripts of a search.
+        """
+        form = CourseSearchForm(data=QueryDict(query_string="languages=fr"))
+        self.assertTrue(form.is_valid())
+
+        with mock.patch("arrow.utcnow", return_value=arrow.get("2022-03-01 10:00:59")):
+            script_fields = form.get_script_fields()
+        query = form.build_es_query()[2]
+
+        expected = arrow.get("2022-03-01 10:00:00").int_timestamp * 1000
+        self.assertEqual(
+            script_fields["state"]["script"]["params"]["ms_since_epoch"], expected
+        )
+        self.assertEqual(
+            query["function_score"]["script_score"]["script"]["params"][
+                "ms_since_epoch"
+            ],
+            expected,
+        )
+
+    def test_forms_courses_build_es_query_choices_aggs(self, *_):
+        """
+        Choice filters should be aggregated in one "filters" aggregation per filter, with a
+        bucket per choice, under a filter aggregation applying the clauses of other filters.
+        """
+        form = CourseSearchForm(
+            data=QueryDict(query_string="subjects=1&languages=fr&new=new")
+        )
+        self.assertTrue(form.is_valid())
+        aggs = form.build_es_query()[3]["all_courses"]["aggregations"]
+
+        self.assertEqual(
+            aggs["new"],
+            {
+                "filter": {
+                    "bool": {
+                        "must": [
+                            {
+                                "nested": {
+                                    "path": "course_runs",
+                                    "query": {
+                                        "bool": {
+                                            "must": [
+                                                {
+                                                    "terms": {
+                                                        "course_runs.languages": ["fr"]
+                                                    }
+                                                }
+                                            ]
+                                        }
+                                    },
+                                }
+                            },
+                            {"terms": {"categories": ["1"]}},
+                        ]
+                    }
+                },
+                "aggregations": {
+                    "new": {
+                        "filters": {
+                            "filters": {
+                                "new": {"bool": {"must": [{"term": {"is_new": True}}]}}
+                            }
+                        }
+                    }
+                },
+            },
+        )
+
+        # Nested filters share the clauses on fields that are not nested and each bucket
+        # holds the nested query for its choice
+        self.assertEqual(
+            aggs["languages"]["filter"],
+            {
+                "bool": {
+                    "must": [
+                        {"term": {"is_new": True}},
+                        {"terms": {"categories": ["1"]}},
+                    ]
+                }
+            },
+        )
+        language_buckets = aggs["languages"]["aggregations"]["languages"]["filters"][
+            "filters"
+        ]
+        self.assertEqual(list(language_buckets), list(ALL_LANGUAGES_DICT))
+        self.assertEqual(
+            language_buckets["fr"],
+            {
+                "bool": {
+                    "must": [
+                        {
+                            "nested": {
+                                "path": "course_runs",
+                                "query": {
+                                    "bool": {
+                                        "must": [
+                                            {"terms": {"course_runs.languages": ["fr"]}}
+                                        ]
+                                    }
+                                },
+                            }
+                        }
+                    ]
+                }
+            },
+        )
+        self.assertEqual(
+            list(
+                aggs["availability"]["aggregations"]["availability"]["filters"][
+                    "filters"
+                ]
+            ),
+            ["open", "coming_soon", "ongoing", "archived"],
+        )
@@ -1,6 +1,7 @@
 """
 Tests for the index_manager utilities
 """
+import json
 from datetime import datetime
 from unittest import mock
 
@@ -10,17 +11,28 @@ from django.utils import timezone
 
 import pytz
 from elasticsearch.exceptions import NotFoundError
+from elasticsearch.helpers import BulkIndexError
+from elasticsearch.serializer import JSONSerializer
 
 from richie.apps.courses.factories import CourseFactory
 from richie.apps.search import ES_CLIENT, ES_INDICES_CLIENT
+from richie.apps.search.bulk import BulkResult
 from richie.apps.search.index_manager import (
     ES_INDICES,
+    bulk_live_indices,
     get_indices_by_alias,
+    get_pk_ranges,
+    get_watermark,
     perform_create_index,
     regenerate_indices,
+    richie_bulk,
     store_es_scripts,
+    update_indices,
 )
 from richie.apps.search.signals import apply_es_action_to_course
+from richie.apps.search.utils.profiling import IndexingProfiler
+
+from ..core.utils import SynchronousExecutor
 
 
 class IndexManagerTestCase(TestCase):
@@ -352,6 +364,516 @@ class IndexManagerTestCase(TestCase):
         self.assertEqual(mock_put_script.call_count, 3)
 
 
+@mock.patch("richie.apps.search.index_manager.ES_INDICES_CLIENT")
+@mock.patch(
+    "richie.apps.search.index_manager.ProcessPoolExecutor", new=SynchronousExecutor
+)
+@mock.patch("django.db.connections.close_all")
+class IndexManagerWorkersTestCase(TestCase):
+    """
+    Test the creation of our elasticsearch indices by a pool of worker processes. The pool
+    is replaced by a synchronous executor and the ES client is mocked.
+    """
+
+    def test_index_manager_get_pk_ranges(self, *_args):
+        """
+        Courses should be split in ranges of primary keys of about the same size, covering
+        all the courses to index. Indexers that can not be split get only one range.
+        """
+        courses = CourseFactory.create_batch(5, should_publish=True)
+        # Snapshots are not indexed so they should not be counted
+        CourseFactory(page_parent=courses[0].extended_object, should_publish=True)
+        pks = sorted(course.public_extension.pk for course in courses)
+
+        self.assertEqual(
+            get_pk_ranges(ES_INDICES.courses, 2), [(pks[0], pks[2]), (pks[3], pks[4])]
+        )
+        self.assertEqual(get_pk_ranges(ES_INDICES.courses, 5), [(pk, pk) for pk in pks])
+        self.assertEqual(
+            get_pk_ranges(ES_INDICES.courses, 10), [(pk, pk) for pk in pks]
+        )
+        self.assertEqual(get_pk_ranges(ES_INDICES.courses, 1), [None])
+        self.assertEqual(get_pk_ranges(ES_INDICES.organizations, 2), [None])
+
+    def test_index_manager_get_pk_ranges_empty(self, *_args):
+        """Without any course to index, the courses index should not be split."""
+        self.assertEqual(get_pk_ranges(ES_INDICES.courses, 2), [None])
+
+    @mock.patch("richie.apps.search.index_manager.precompute_autocomplete_prefixes")
+    def test_index_manager_regenerate_indices_workers(
+        self, mock_precompute, _mock_close_all, mock_indices_client
+    ):
+        """
+        With several workers, all indices should be populated, the courses index in slices,
+        and the aliases should be swapped in one operation once they are all complete.
+        Autocomplete suggestions of short prefixes are precomputed on the new indices.
+        """
+        mock_indices_client.get_alias.return_value = {}
+        courses = CourseFactory.create_batch(3, should_publish=True)
+
+        documents = []
+
+        def bulk(actions):
+            documents.extend(actions)
+            return len(documents)
+
+        with mock.patch(
+            "richie.apps.search.index_manager.richie_bulk", side_effect=bulk
+        ) as mock_bulk:
+            regenerate_indices(None, workers=2)
+
+        # Categories, organizations and persons are populated at once, courses in 2 slices
+        self.assertEqual(mock_bulk.call_count, 5)
+        new_indices = [
+            call.kwargs["index"] for call in mock_indices_client.create.call_args_list
+        ]
+        self.assertEqual(len(new_indices), 4)
+
+        # All the courses were indexed in the new courses index
+        self.assertEqual(
+            sorted(
+                document["_id"]
+                for document in documents
+                if document["_index"] == new_indices[1]
+            ),
+            sorted(course.get_es_id() for course in courses),
+        )
+
+        mock_indices_client.update_aliases.assert_called_once_with(
+            {
+                "actions": [
+                    {"add": {"index": index, "alias": ix.index_name}}
+                    for index, ix in zip(new_indices, ES_INDICES)
+                ]
+            }
+        )
+        mock_indices_client.delete.assert_not_called()
+        mock_precompute.assert_called_once_with(None)
+
+    @mock.patch(
+        "richie.apps.search.index_manager.richie_bulk",
+        side_effect=[1, ValueError("boom"), 1, 1, 1],
+    )
+    def test_index_manager_regenerate_indices_workers_failure(
+        self, _mock_bulk, _mock_close_all, mock_indices_client
+    ):
+        """
+        If populating a slice fails, the aliases should not be swapped and the new indices
+        should be deleted.
+        """
+        mock_indices_client.get_alias.return_value = {}
+        CourseFactory.create_batch(3, should_publish=True)
+
+        with self.assertRaises(ValueError):
+            regenerate_indices(None, workers=2)
+
+        mock_indices_client.update_aliases.assert_not_called()
+        self.assertEqual(
+            [
+                call.kwargs["index"]
+                for call in mock_indices_client.delete.call_args_list
+            ],
+            [
+                call.kwargs["index"]
+                for call in mock_indices_client.create.call_args_list
+            ],
+        )
+
+
+@mock.patch("richie.apps.search.index_manager.ES_INDICES_CLIENT")
+class IndexManagerUpdateTestCase(TestCase):
+    """
+    Test the update of our elasticsearch indices with the documents that changed. The ES
+    client is mocked.
+    """
+
+    def setUp(self):
+        """Index no stale documents unless a test says otherwise."""
+        super().setUp()
+        patcher = mock.patch("richie.apps.search.index_manager.scan", return_value=[])
+        self.mock_scan = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_index_manager_get_watermark(self, mock_indices_client):
+        """The watermark should be read from the metadata in the mapping of the index."""
+        mock_indices_client.get_mapping.return_value = {
+            "richie_courses_2021-11-22-10h00m00.000000s": {
+                "mappings": {"_meta": {"watermark": "2021-11-22T10:00:00+00:00"}}
+            }
+        }
+        self.assertEqual(
+            get_watermark("richie_courses"),
+            datetime(2021, 11, 22, 10, tzinfo=timezone.utc),
+        )
+        mock_indices_client.get_mapping.assert_called_once_with(index="richie_courses")
+
+    def test_index_manager_get_watermark_missing(self, mock_indices_client):
+        """No watermark should be returned for a missing index or an index without one."""
+        mock_indices_client.get_mapping.return_value = {
+            "richie_courses_2021-11-22-10h00m00.000000s": {"mappings": {}}
+        }
+        self.assertIsNone(get_watermark("richie_courses"))
+
+        mock_indices_client.get_mapping.side_effect = NotFoundError
+        self.assertIsNone(get_watermark("richie_courses"))
+
+    @mock.patch("richie.apps.search.index_manager.invalidate_autocomplete")
+    @mock.patch("richie.apps.search.index_manager.invalidate_search_responses")
+    @mock.patch("richie.apps.search.index_manager.richie_bulk")
+    @mock.patch.object(ES_INDICES.courses, "get_es_documents", return_value=[])
+    # pylint: disable=too-many-arguments
+    def test_index_manager_update_indices(
+        self,
+        mock_get_documents,
+        mock_bulk,
+        mock_invalidate,
+        mock_invalidate_autocomplete,
+        mock_indices_client,
+    ):
+        """
+        Only the documents changed since the watermark of each index should be upserted in
+        the live index and the watermark should be moved to the start of the update. The
+        updated indices should be refreshed and cached responses invalidated only once.
+        """
+        mock_indices_client.get_mapping.return_value = {
+            "some_index": {
+                "mappings": {"_meta": {"watermark": "2021-11-22T10:00:00+00:00"}}
+            }
+        }
+        now = datetime(2030, 1, 1, tzinfo=timezone.utc)
+
+        with mock.patch.object(timezone, "now", return_value=now):
+            update_indices(None)
+
+        mock_get_documents.assert_called_once_with(
+            index="richie_courses",
+            since=datetime(2021, 11, 22, 10, tzinfo=timezone.utc),
+        )
+        self.assertEqual(mock_bulk.call_count, 4)
+        self.assertEqual(mock_indices_client.put_mapping.call_count, 4)
+        mock_indices_client.put_mapping.assert_any_call(
+            body={"_meta": {"watermark": "2030-01-01T00:00:00+00:00"}},
+            index="richie_courses",
+        )
+        self.assertEqual(
+            mock_indices_client.refresh.call_args_list,
+            [
+                mock.call(
+                    index=(
+                        "richie_categories,richie_courses,"
+                        "richie_organizations,richie_persons"
+                    )
+                )
+            ],
+        )
+        self.assertEqual(mock_invalidate.call_args_list, [mock.call()])
+        self.assertEqual(mock_invalidate_autocomplete.call_args_list, [mock.call()])
+
+    @mock.patch("richie.apps.search.index_manager.richie_bulk")
+    @mock.patch.object(ES_INDICES.courses, "get_es_documents", return_value=[])
+    def test_index_manager_update_indices_since(
+        self, mock_get_documents, _mock_bulk, mock_indices_client
+    ):
+        """A date passed as argument should take precedence over stored watermarks."""
+        since = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+        update_indices(None, since=since)
+
+        mock_indices_client.get_mapping.assert_not_called()
+        self.assertEqual(
+            mock_get_documents.call_args_list,
+            [mock.call(index="richie_courses", since=since)],
+        )
+
+    @mock.patch("richie.apps.search.index_manager.richie_bulk", side_effect=list)
+    def test_index_manager_update_indices_profiler(
+        self, mock_bulk, _mock_indices_client
+    ):
+        """The update of each index should be measured by a profiler if any."""
+        profiler = IndexingProfiler()
+        documents = [{"_id": "1", "_index": "richie_courses", "title": "a"}]
+
+        with mock.patch.object(
+            ES_INDICES.courses, "get_es_documents", return_value=documents
+        ):
+            update_indices(None, since=timezone.now(), profiler=profiler)
+
+        self.assertEqual(mock_bulk.call_count, 4)
+        profiles = {
+            profile["indexer"]: profile for profile in profiler.as_dict()["indexers"]
+        }
+        self.assertEqual(len(profiles), 4)
+        self.assertEqual(profiles["CoursesIndexer"]["documents"], 1)
+
+    @mock.patch("richie.apps.search.index_manager.richie_bulk")
+    def test_index_manager_update_indices_skipped(self, mock_bulk, mock_indices_client):
+        """Indices that don't exist yet or hold no watermark should not be updated."""
+        mock_indices_client.get_mapping.return_value = {"some_index": {"mappings": {}}}
+        update_indices(None)
+
+        mock_indices_client.exists_alias.return_value = False
+        update_indices(None, since=datetime(2021, 1, 1, tzinfo=timezone.utc))
+
+        self.assertFalse(mock_bulk.called)
+        self.assertFalse(mock_indices_client.put_mapping.called)
+        self.mock_scan.assert_not_called()
+
+    @mock.patch("richie.apps.search.index_manager.richie_bulk")
+    def test_index_manager_update_indices_stale(self, mock_bulk, _mock_indices_client):
+        """
+        The documents of objects that are not indexed anymore, e.g. because their page was
+        unpublished or deleted, should be deleted from the live index.
+        """
+        course = CourseFactory(should_publish=True)
+        unpublished_course = CourseFactory(should_publish=True)
+        self.assertTrue(unpublished_course.extended_object.unpublish("en"))
+        es_ids = [course.get_es_id(), unpublished_course.get_es_id(), "999"]
+        self.mock_scan.side_effect = lambda client, index, **kwargs: [
+            {"_id": es_id} for es_id in (es_ids if index == "richie_courses" else [])
+        ]
+
+        with mock.patch.object(ES_INDICES.courses, "get_es_documents", return_value=[]):
+            update_indices(None, since=timezone.now())
+
+        deletions = [
+            action
+            for call in mock_bulk.call_args_list
+            for action in call.args[0]
+            if action.get("_op_type") == "delete"
+        ]
+        self.assertEqual(
+            deletions,
+            [
+                {"_op_type": "delete", "_index": "richie_courses", "_id": es_id}
+                for es_id in es_ids[1:]
+            ],
+        )
+
+
+def get_bulk_response(body, errors=None):
+    """
+    Build the response to a bulk request, with an error for the actions on the documents
+    listed in `errors` by their id.
+    """
+    errors = errors or {}
+    items = []
+    for line in body.splitlines():
+        action = json.loads(line)
+        if len(action) != 1 or "_id" not in next(iter(action.values())):
+            continue
+        ((op_type, meta),) = action.items()
+        error = errors.get(meta["_id"])
+        result = {**meta, "status": error["status"] if error else 200}
+        if error:
+            result["error"] = {"type": error["type"]}
+        items.append({op_type: result})
+    return {"errors": bool(errors), "items": items}
+
+
+class RichieBulkTestCase(TestCase):
+    """Test the wrapper around our bulk engine."""
+
+    def setUp(self):
+        """Use a fake Elasticsearch client with a real serializer."""
+        super().setUp()
+        self.es_client = mock.Mock()
+        self.es_client.__es_version__ = "7"
+        self.es_client.transport.serializer = JSONSerializer()
+        for target, new in [
+            ("richie.apps.search.index_manager.ES_CLIENT", self.es_client),
+            ("richie.apps.search.index_manager.ES_INDICES_CLIENT", mock.Mock()),
+        ]:
+            patcher = mock.patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @mock.patch("richie.apps.search.index_manager.invalidate_autocomplete")
+    @mock.patch("richie.apps.search.index_manager.invalidate_search_responses")
+    def test_index_manager_richie_bulk_no_refresh(
+        self, mock_invalidate, mock_invalidate_autocomplete
+    ):
+        """
+        Sending actions with the plain bulk helper should neither refresh indices nor
+        invalidate caches, which is left to the callers updating live indices.
+        """
+        self.es_client.bulk.side_effect = get_bulk_response
+        with mock.patch(
+            "richie.apps.search.index_manager.ES_INDICES_CLIENT"
+        ) as mock_indices_client:
+            self.assertEqual(
+                richie_bulk([{"_id": "1", "_index": "richie_courses", "title": "a"}]),
+                BulkResult(1, []),
+            )
+
+        self.assertFalse(mock_indices_client.refresh.called)
+        self.assertFalse(mock_invalidate.called)
+        self.assertFalse(mock_invalidate_autocomplete.called)
+
+    @mock.patch("richie.apps.search.index_manager.invalidate_search_responses")
+    def test_index_manager_bulk_live_indices_refresh(self, mock_invalidate):
+        """
+        The indices targeted by the actions should be refreshed before cached search responses
+        are invalidated, even if some actions failed.
+        """
+        manager = mock.Mock()
+        manager.attach_mock(mock_invalidate, "invalidate")
+
+        def bulk(body):
+            manager.bulk()
+            return get_bulk_response(body, {"2": {"status": 400, "type": "some_error"}})
+
+        self.es_client.bulk.side_effect = bulk
+        with mock.patch(
+            "richie.apps.search.index_manager.ES_INDICES_CLIENT"
+        ) as mock_indices_client:
+            manager.attach_mock(mock_indices_client.refresh, "refresh")
+            with self.assertRaises(BulkIndexError):
+                bulk_live_indices(
+                    [
+                        {"_id": "1", "_index": "richie_courses", "title": "a"},
+                        {"_id": "2", "_index": "richie_persons", "title": "b"},
+                    ]
+                )
+
+        self.assertEqual(
+            [name for name, _args, _kwargs in manager.mock_calls],
+            ["bulk", "refresh", "invalidate"],
+        )
+        mock_indices_client.refresh.assert_called_once_with(
+            index="richie_courses,richie_persons"
+        )
+
+    @mock.patch("richie.apps.search.index_manager.invalidate_search_responses")
+    def test_index_manager_bulk_live_indices_no_actions(self, mock_invalidate):
+        """Without actions, no index should be refreshed."""
+        with mock.patch(
+            "richie.apps.search.index_manager.ES_INDICES_CLIENT"
+        ) as mock_indices_client:
+            self.assertEqual(bulk_live_indices([]), BulkResult(0, []))
+
+        mock_indices_client.refresh.assert_not_called()
+        mock_invalidate.assert_called_once_with()
+
+    @mock.patch("richie.apps.search.index_manager.invalidate_autocomplete")
+    def test_index_manager_bulk_live_indices_invalidate_autocomplete(
+        self, mock_invalidate
+    ):
+        """
+        Cached suggestions should only be invalidated if an action may change them, not by
+        partial updates that leave the completion field untouched.
+        """
+        self.es_client.bulk.side_effect = get_bulk_response
+
+        bulk_live_indices(
+            [
+                {
+                    "_op_type": "update",
+                    "_id": "1",
+                    "_index": "richie_courses",
+                    "doc": {"course_runs": []},
+                }
+            ]
+        )
+        mock_invalidate.assert_not_called()
+
+        bulk_live_indices([{"_id": "1", "_index": "richie_courses", "title": "a"}])
+        mock_invalidate.assert_called_once_with()
+
+    def test_index_manager_richie_bulk_missing_course(self):
+        """
+        Courses absent from the index should be indexed as whole documents when a partial
+        update is sent for them.
+        """
+        course = CourseFactory(should_publish=True)
+        es_id = str(course.public_extension.extended_object_id)
+        missing = {"status": 404, "type": "document_missing_exception"}
+        self.es_client.bulk.side_effect = lambda body: get_bulk_response(
+            body, {es_id: missing} if '"update"' in body else None
+        )
+
+        result = richie_bulk(
+            [
+                {
+                    "_id": es_id,
+                    "_index": "richie_courses",
+                    "_op_type": "update",
+                    "doc": {"categories": []},
+                }
+            ]
+        )
+
+        self.assertEqual(result, BulkResult(1, []))
+        self.assertEqual(self.es_client.bulk.call_count, 2)
+        lines = self.es_client.bulk.call_args.kwargs["body"].splitlines()
+        self.assertEqual(
+            json.loads(lines[0]), {"index": {"_id": es_id, "_index": "richie_courses"}}
+        )
+        self.assertEqual(
+            json.loads(lines[1])["title"]["en"], course.extended_object.get_title()
+        )
+
+    def test_index_manager_richie_bulk_missing_other_failures(self):
+        """
+        Other failures should be raised, as well as partial updates of documents that are
+        missing from other indices or that fail for another reason.
+        """
+        self.es_client.bulk.side_effect = lambda body: get_bulk_response(
+            body,
+            {
+                "1": {"status": 404, "type": "document_missing_exception"},
+                "2": {"status": 400, "type": "mapper_parsing_exception"},
+                "3": {"status": 404, "type": "document_missing_exception"},
+            },
+        )
+
+        with self.assertRaises(BulkIndexError) as context:
+            richie_bulk(
+                [
+                    {
+                        "_id": "1",
+                        "_index": "richie_organizations",
+                        "_op_type": "update",
+                        "doc": {},
+                    },
+                    {
+                        "_id": "2",
+                        "_index": "richie_courses",
+                        "_op_type": "update",
+                        "doc": {},
+                    },
+                    {"_id": "3", "_index": "richie_courses", "_op_type": "index"},
+                ]
+            )
+
+        self.assertEqual(len(context.exception.errors), 3)
+        self.assertEqual(self.es_client.bulk.call_count, 1)
+
+    def test_index_manager_richie_bulk_missing_unpublished_course(self):
+        """
+        A partial update of a course that is missing from the index and is not indexable
+        anymore should not fail.
+        """
+        course = CourseFactory()
+        es_id = str(course.extended_object_id)
+        self.es_client.bulk.side_effect = lambda body: get_bulk_response(
+            body, {es_id: {"status": 404, "type": "document_missing_exception"}}
+        )
+
+        result = richie_bulk(
+            [
+                {
+                    "_id": es_id,
+                    "_index": "richie_courses",
+                    "_op_type": "update",
+                    "doc": {},
+                }
+            ]
+        )
+
+        self.assertEqual(result, BulkResult(0, []))
+        self.assertEqual(self.es_client.bulk.call_count, 1)
+
+
 class ExOneIndexable:
     """First example indexable"""
 
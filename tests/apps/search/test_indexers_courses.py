@@ -1,10 +1,12 @@
 """
 Tests for the course indexer
 """
+# pylint: disable=too-many-lines
 from datetime import datetime
 from unittest import mock
 
 from django.test import TestCase
+from django.utils import timezone
 
 import pytz
 from cms.api import add_plugin
@@ -19,10 +21,11 @@ from richie.apps.courses.factories import (
     OrganizationFactory,
     PersonFactory,
 )
-from richie.apps.courses.models import CourseState
+from richie.apps.courses.models import Course, CourseState
 from richie.apps.search.indexers.categories import CategoriesIndexer
 from richie.apps.search.indexers.courses import CoursesIndexer
 from richie.apps.search.indexers.organizations import OrganizationsIndexer
+from richie.apps.search.utils.indexers import get_epoch_milliseconds
 from richie.plugins.simple_picture.cms_plugins import SimplePicturePlugin
 
 # pylint: disable=too-many-public-methods
@@ -173,6 +176,273 @@ class CoursesIndexersTestCase(TestCase):
         self.assertEqual(len(indexed_courses), 1)
         self.assertEqual(indexed_courses[0]["_id"], course.get_es_id())
 
+    def test_indexers_courses_get_es_documents_since(self):
+        """
+        Only courses that were published, modified, whose course runs (or the course runs
+        of their snapshots) were modified or that are related to a category, an
+        organization or a person that was published after a date should be indexed.
+        """
+        category = CategoryFactory(should_publish=True)
+        organization = OrganizationFactory(should_publish=True)
+        person = PersonFactory(should_publish=True)
+        courses = [
+            CourseFactory(should_publish=True),
+            CourseFactory(fill_categories=[category], should_publish=True),
+            CourseFactory(fill_organizations=[organization], should_publish=True),
+            CourseFactory(fill_team=[person], should_publish=True),
+            CourseFactory(should_publish=True),
+            CourseFactory(should_publish=True),
+            CourseFactory(should_publish=True),
+        ]
+        course_run = CourseRunFactory(direct_course=courses[4])
+        courses[4].extended_object.publish("en")
+        snapshot = CourseFactory(
+            page_parent=courses[5].extended_object, should_publish=True
+        )
+        snapshot_course_run = CourseRunFactory(direct_course=snapshot)
+        snapshot.extended_object.publish("en")
+        since = timezone.now()
+
+        courses[0].extended_object.publish("en")
+        category.extended_object.publish("en")
+        organization.extended_object.publish("en")
+        person.extended_object.publish("en")
+        public_course_run = course_run.public_course_run
+        public_course_run.enrollment_count = 10
+        public_course_run.save()
+        # The course run of a snapshot is a course run of the course
+        public_snapshot_course_run = snapshot_course_run.public_course_run
+        public_snapshot_course_run.enrollment_count = 10
+        public_snapshot_course_run.save()
+
+        indexed_courses = list(
+            CoursesIndexer.get_es_documents(
+                index="some_index", action="some_action", since=since
+            )
+        )
+        self.assertEqual(
+            sorted(document["_id"] for document in indexed_courses),
+            sorted(course.get_es_id() for course in courses[:6]),
+        )
+
+    @staticmethod
+    def create_courses_with_related_objects(count):
+        """Create published courses related to all kinds of objects found in documents."""
+        meta_category = CategoryFactory(should_publish=True)
+        parent_category = CategoryFactory(
+            page_parent=meta_category.extended_object, should_publish=True
+        )
+        categories = CategoryFactory.create_batch(
+            2,
+            fill_icon=True,
+            page_parent=parent_category.extended_object,
+            should_publish=True,
+        )
+        organizations = OrganizationFactory.create_batch(
+            2, fill_logo=True, should_publish=True
+        )
+        persons = PersonFactory.create_batch(2, should_publish=True)
+
+        courses = []
+        for i in range(count):
+            # Vary the related objects from one course to the other
+            first, last = (1, 2) if i % 2 else (0, 1)
+            course = CourseFactory(
+                fill_categories=categories[:last] + [CategoryFactory()],
+                fill_cover=True,
+                fill_icons=categories[first:],
+                fill_organizations=organizations[first:] + [OrganizationFactory()],
+                fill_team=persons[:last],
+                fill_texts={
+                    "course_description": "CKEditorPlugin",
+                    "course_introduction": "PlainTextPlugin",
+                },
+                page_languages=["en", "fr"],
+            )
+            CourseRunFactory.create_batch(2, direct_course=course)
+            snapshot = CourseFactory(page_parent=course.extended_object)
+            CourseRunFactory(direct_course=snapshot)
+            course.extended_object.publish("en")
+            course.extended_object.publish("fr")
+            courses.append(course)
+        return courses
+
+    def test_indexers_courses_get_es_documents_same_as_get_es_document_for_course(
+        self,
+    ):
+        """
+        Documents built in batches should be the same as documents built course per course.
+        """
+        self.create_courses_with_related_objects(3)
+        courses = Course.objects.filter(
+            extended_object__publisher_is_draft=False,
+            extended_object__node__parent__cms_pages__course__isnull=True,
+        ).order_by("id")
+
+        indexed_courses = list(
+            CoursesIndexer.get_es_documents(index="some_index", action="some_action")
+        )
+
+        self.assertEqual(len(indexed_courses), 3)
+        self.assertEqual(
+            sorted(indexed_courses, key=lambda document: int(document["_id"])),
+            [
+                CoursesIndexer.get_es_document_for_course(
+                    course, index="some_index", action="some_action"
+                )
+                for course in courses
+            ],
+        )
+
+    @mock.patch(
+        "richie.apps.search.indexers.courses.get_picture_info",
+        return_value={"info": "picture info"},
+    )
+    def test_indexers_courses_get_es_documents_number_queries(self, _mock_picture):
+        """
+        The number of queries to build the documents of a batch of courses should not depend
+        on the number of courses.
+        """
+        self.create_courses_with_related_objects(1)
+        with self.assertNumQueries(23):
+            list(CoursesIndexer.get_es_documents())
+
+        self.create_courses_with_related_objects(3)
+        with self.assertNumQueries(23):
+            self.assertEqual(len(list(CoursesIndexer.get_es_documents())), 4)
+
+    def test_indexers_courses_get_es_partial_documents(self):
+        """
+        Partial documents should only update the fields of course documents denormalized from
+        the related objects, with the same values as in whole documents.
+        """
+        self.create_courses_with_related_objects(3)
+        courses = Course.objects.filter(
+            extended_object__publisher_is_draft=False,
+            extended_object__node__parent__cms_pages__course__isnull=True,
+        ).order_by("id")
+        documents = list(CoursesIndexer.get_es_documents(index="some_index"))
+
+        for related, number_queries, fields in [
+            ("categories", 11, {"categories", "categories_names", "icon"}),
+            (
+                "organizations",
+                5,
+                {
+                    "organization_highlighted",
+                    "organization_highlighted_cover_image",
+                    "organizations",
+                    "organizations_names",
+                },
+            ),
+            ("persons", 4, {"persons", "persons_names"}),
+            (
+                "course_runs",
+                2,
+                {
+                    "course_runs",
+                    "is_new",
+                    "state_priority",
+                    "state_date_time",
+                    "state_rank",
+                    "state_changes_on",
+                },
+            ),
+        ]:
+            with self.assertNumQueries(number_queries):
+                actions = list(
+                    CoursesIndexer.get_es_partial_documents(
+                        courses, related, index="some_index"
+                    )
+                )
+
+            self.assertEqual(
+                actions,
+                [
+                    {
+                        "_id": document["_id"],
+                        "_index": "some_index",
+                        "_op_type": "update",
+                        "doc": {field: document[field] for field in fields},
+                    }
+                    for document in sorted(
+                        documents, key=lambda document: int(document["_id"])
+                    )
+                ],
+            )
+
+        with self.assertRaises(ValueError):
+            list(CoursesIndexer.get_es_partial_documents(courses, "programs"))
+
+    def test_indexers_courses_get_es_state(self):
+        """
+        The state of a course should be computed from its course runs like the "score"
+        script does, with the date ranking it in its state and the next date at which its
+        state may change.
+        """
+        now = datetime(2020, 6, 15, tzinfo=pytz.utc)
+
+        def course_run(start, end, enrollment_start, enrollment_end):
+            return CoursesIndexer.format_es_course_run(
+                {
+                    "start": datetime(*start, tzinfo=pytz.utc),
+                    "end": datetime(*end, tzinfo=pytz.utc),
+                    "enrollment_start": datetime(*enrollment_start, tzinfo=pytz.utc),
+                    "enrollment_end": datetime(*enrollment_end, tzinfo=pytz.utc),
+                    "languages": ["en"],
+                }
+            )
+
+        archived = course_run((2019, 1, 1), (2019, 3, 1), (2018, 12, 1), (2019, 1, 15))
+        ongoing_closed = course_run(
+            (2020, 6, 1), (2020, 9, 1), (2020, 5, 1), (2020, 6, 10)
+        )
+        future_open = course_run(
+            (2020, 7, 1), (2020, 10, 1), (2020, 6, 1), (2020, 6, 20)
+        )
+        archived_open = course_run(
+            (2020, 1, 1), (2020, 3, 1), (2019, 12, 1), (2020, 7, 1)
+        )
+
+        for course_runs, state, date_field, rank_sign, changes_on in [
+            ([], CourseState.TO_BE_SCHEDULED, None, 0, None),
+            ([archived], CourseState.ARCHIVED_CLOSED, "end", -1, None),
+            (
+                [ongoing_closed, archived],
+                CourseState.ONGOING_CLOSED,
+                "end",
+                1,
+                ongoing_closed["end"],
+            ),
+            (
+                [future_open, ongoing_closed, archived],
+                CourseState.FUTURE_OPEN,
+                "start",
+                1,
+                future_open["enrollment_end"],
+            ),
+            (
+                [archived_open, archived],
+                CourseState.ARCHIVED_OPEN,
+                "enrollment_end",
+                1,
+                archived_open["enrollment_end"],
+            ),
+        ]:
+            date_time, rank = None, 0
+            if course_runs:
+                date_time = course_runs[0][date_field]
+                rank = rank_sign * course_runs[0][f"{date_field:s}_ms"]
+            self.assertEqual(
+                CoursesIndexer.get_es_state(course_runs, now=now),
+                {
+                    "state_priority": state,
+                    "state_date_time": date_time,
+                    "state_rank": rank,
+                    "state_changes_on": changes_on,
+                },
+            )
+
     @mock.patch(
         "richie.apps.search.indexers.courses.get_picture_info",
         return_value={"info": "picture info"},
@@ -269,6 +539,25 @@ class CoursesIndexersTestCase(TestCase):
         add_plugin(body="english introduction.", language="en", **plugin_params)
         add_plugin(body="introduction française.", language="fr", **plugin_params)
 
+        expected_course_runs = [
+            {
+                "start": course_run.public_course_run.start,
+                "end": course_run.public_course_run.end,
+                "enrollment_start": course_run.public_course_run.enrollment_start,
+                "enrollment_end": course_run.public_course_run.enrollment_end,
+                "start_ms": get_epoch_milliseconds(course_run.public_course_run.start),
+                "end_ms": get_epoch_milliseconds(course_run.public_course_run.end),
+                "enrollment_start_ms": get_epoch_milliseconds(
+                    course_run.public_course_run.enrollment_start
+                ),
+                "enrollment_end_ms": get_epoch_milliseconds(
+                    course_run.public_course_run.enrollment_end
+                ),
+                "languages": course_run.public_course_run.languages,
+            }
+            for course_run in course.course_runs.order_by("-end")
+        ]
+
         # The results were properly formatted and passed to the consumer
         expected_course = {
             "_id": course.get_es_id(),
@@ -301,16 +590,7 @@ class CoursesIndexersTestCase(TestCase):
                     "français",
                 ],
             },
-            "course_runs": [
-                {
-                    "start": course_run.public_course_run.start,
-                    "end": course_run.public_course_run.end,
-                    "enrollment_start": course_run.public_course_run.enrollment_start,
-                    "enrollment_end": course_run.public_course_run.enrollment_end,
-                    "languages": course_run.public_course_run.languages,
-                }
-                for course_run in course.course_runs.order_by("-end")
-            ],
+            "course_runs": expected_course_runs,
             "cover_image": {
                 "en": {"info": "picture info"},
                 "fr": {"info": "picture info"},
@@ -358,6 +638,7 @@ class CoursesIndexersTestCase(TestCase):
                     "titre autre organisation français",
                 ],
             },
+            "page_id": course.get_es_id(),
             "persons": [
                 person1.get_es_id(),
                 person2.get_es_id(),
@@ -366,6 +647,7 @@ class CoursesIndexersTestCase(TestCase):
                 "en": ["Eugène Delacroix", "Comte de Saint-Germain"],
                 "fr": ["Eugène Delacroix", "Earl of Saint-Germain"],
             },
+            **CoursesIndexer.get_es_state(expected_course_runs),
             "title": {"fr": "un titre cours français", "en": "an english course title"},
         }
         indexed_courses = list(
@@ -421,8 +703,13 @@ class CoursesIndexersTestCase(TestCase):
                     "organization_highlighted_cover_image": {},
                     "organizations": [],
                     "organizations_names": {},
+                    "page_id": str(course.extended_object.publisher_public_id),
                     "persons": [],
                     "persons_names": {},
+                    "state_priority": 7,
+                    "state_date_time": None,
+                    "state_rank": 0,
+                    "state_changes_on": None,
                     "title": {"en": "Enhanced incremental circuit"},
                 }
             ],
@@ -519,6 +806,9 @@ class CoursesIndexersTestCase(TestCase):
         self.assertEqual(
             indexed_courses[0]["course_runs"][0]["enrollment_end"].year, 9999
         )
+        self.assertEqual(
+            indexed_courses[0]["course_runs"][0]["enrollment_end_ms"], 253402214400000
+        )
 
     def test_indexers_courses_get_es_document_no_image_cover_picture(self):
         """
@@ -564,7 +854,7 @@ class CoursesIndexersTestCase(TestCase):
             course_icons_placeholder,
             CategoryPlugin,
             "en",
-            **{"page": category.extended_object}
+            **{"page": category.extended_object},
         )
         course.extended_object.publish("en")
         # Make sure we associate an image-less picture with the category through
@@ -4,6 +4,7 @@ Tests for the organization indexer
 from unittest import mock
 
 from django.test import TestCase
+from django.utils import timezone
 
 from cms.api import add_plugin
 
@@ -141,6 +142,23 @@ class OrganizationsIndexersTestCase(TestCase):
             [],
         )
 
+    def test_indexers_organizations_get_es_documents_since(self):
+        """Only organizations published or modified after a date should be indexed."""
+        organization, _other = OrganizationFactory.create_batch(2, should_publish=True)
+        since = timezone.now()
+
+        organization.extended_object.publish("en")
+
+        indexed_organizations = list(
+            OrganizationsIndexer.get_es_documents(
+                index="some_index", action="some_action", since=since
+            )
+        )
+        self.assertEqual(
+            [document["_id"] for document in indexed_organizations],
+            [organization.get_es_id()],
+        )
+
     def test_indexers_organizations_get_es_documents_language_fallback(self):
         """Absolute urls should be computed as expected with language fallback."""
         OrganizationFactory(
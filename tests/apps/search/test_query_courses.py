@@ -5,6 +5,7 @@ from unittest import mock
 
 from django.core.cache import caches
 from django.test import TestCase
+from django.test.utils import override_settings
 
 import arrow
 from cms.models import Page
@@ -519,13 +520,16 @@ class CourseRunsCoursesQueryTestCase(TestCase):
                     "icon": {"en": "icon.jpg"},
                     "title": {"en": "title"},
                     **courses[course_id],
-                    "course_runs": sorted(
-                        [
-                            # Each course randomly gets course runs (thanks to above shuffle)
-                            course_runs[course_run_id]
-                            for course_run_id in course_run_ids
-                        ],
-                        key=lambda o: now - o["end"],
+                    **CoursesIndexer.format_course_runs(
+                        sorted(
+                            [
+                                # Each course randomly gets course runs (thanks to above
+                                # shuffle)
+                                course_runs[course_run_id]
+                                for course_run_id in course_run_ids
+                            ],
+                            key=lambda o: now - o["end"],
+                        )
                     ),
                 }
                 for course_id, course_run_ids in courses_definition
@@ -1779,6 +1783,37 @@ class CourseRunsCoursesQueryTestCase(TestCase):
             self.get_expected_courses(courses_definition, list(data["course_runs"])),
         )
 
+    def test_query_courses_text_aggs_post_filter_strategy(self, *_):
+        """
+        Computing facets on the results of the full text query, while filters are applied to
+        results by a post filter, should return the same results and facet counts as global
+        aggregations that repeat the full text query.
+        """
+        data = self.prepare_indices()
+        subject = data["top_subjects"][0].get_es_id()
+        for query_string in [
+            "query=artificial",
+            f"query=artificial&subjects={subject:s}",
+            "query=artificial&languages=fr&availability=open",
+            "query=boulgakov&new=new&scope=filters",
+        ]:
+            response = self.client.get(f"/api/v1.0/courses/?{query_string:s}")
+            self.assertEqual(response.status_code, 200)
+
+            with override_settings(RICHIE_SEARCH_AGGS_STRATEGY="post_filter"):
+                post_filter_response = self.client.get(
+                    f"/api/v1.0/courses/?{query_string:s}"
+                )
+            self.assertEqual(post_filter_response.status_code, 200)
+
+            self.assertEqual(
+                post_filter_response.json().get("objects"),
+                response.json().get("objects"),
+            )
+            self.assertEqual(
+                post_filter_response.json()["filters"], response.json()["filters"]
+            )
+
     def test_query_courses_code_partial(self, *_):
         """Full-text search should match partial codes."""
         self.prepare_indices()
@@ -123,6 +123,7 @@ class EdgeCasesCoursesQueryTestCase(TestCase):
                 "_index": "test_courses",
                 "_op_type": "create",
                 **course,
+                **CoursesIndexer.format_course_runs(course["course_runs"]),
             }
             for course in courses
         ]
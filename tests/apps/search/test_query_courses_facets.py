@@ -229,16 +229,18 @@ class FacetsCoursesQueryTestCase(TestCase):
                 "cover_image": {"en": "image"},
                 "title": {"en": "title"},
                 **course,
-                "course_runs": [
-                    {
-                        "languages": course_run["languages"],
-                        "start": arrow.utcnow().datetime,
-                        "end": arrow.utcnow().datetime,
-                        "enrollment_start": arrow.utcnow().datetime,
-                        "enrollment_end": arrow.utcnow().datetime,
-                    }
-                    for course_run in course["course_runs"]
-                ],
+                **CoursesIndexer.format_course_runs(
+                    [
+                        {
+                            "languages": course_run["languages"],
+                            "start": arrow.utcnow().datetime,
+                            "end": arrow.utcnow().datetime,
+                            "enrollment_start": arrow.utcnow().datetime,
+                            "enrollment_end": arrow.utcnow().datetime,
+                        }
+                        for course_run in course["course_runs"]
+                    ]
+                ),
             }
             for course in courses
         ]
@@ -0,0 +1,199 @@
+"""
+Tests for the queue of pending updates of the Elasticsearch indices
+"""
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from richie.apps.core.helpers import create_i18n_page
+from richie.apps.courses.factories import CourseFactory, OrganizationFactory
+from richie.apps.search.indexers import ES_INDICES
+from richie.apps.search.models import SearchQueueEntry
+from richie.apps.search.queue import add_action, process_search_queue
+from richie.apps.search.signals import queue_es_action_to_page
+
+
+@mock.patch("richie.apps.search.queue.bulk_live_indices")
+class SearchQueueTestCase(TestCase):
+    """
+    Test processing the queue of pending updates of the Elasticsearch indices.
+    """
+
+    def test_queue_process_search_queue(self, mock_bulk):
+        """
+        Entries should be processed in batches, each batch in one bulk request, and deleted
+        once processed. Documents impacted by several entries should be sent only once.
+        """
+        organization = OrganizationFactory(should_publish=True)
+        courses = CourseFactory.create_batch(
+            2, fill_organizations=[organization], should_publish=True
+        )
+        for course in courses:
+            queue_es_action_to_page(course.extended_object, "index", "en")
+        queue_es_action_to_page(organization.extended_object, "index", "en")
+
+        mock_logger = mock.Mock()
+        self.assertEqual(process_search_queue(batch_size=2, logger=mock_logger), 3)
+
+        mock_logger.error.assert_not_called()
+        self.assertFalse(SearchQueueEntry.objects.exists())
+        self.assertEqual(mock_bulk.call_count, 2)
+
+        # The first batch holds the 2 courses
+        first_batch = list(mock_bulk.call_args_list[0].args[0])
+        self.assertEqual(
+            [action["_id"] for action in first_batch],
+            [course.get_es_id() for course in courses],
+        )
+        # The second batch holds the organization and the courses related to it
+        second_batch = list(mock_bulk.call_args_list[1].args[0])
+        self.assertEqual(
+            sorted(action["_id"] for action in second_batch),
+            sorted(
+                [course.get_es_id() for course in courses] + [organization.get_es_id()]
+            ),
+        )
+
+    def test_queue_process_search_queue_not_indexed(self, mock_bulk):
+        """Entries for pages that are not indexed should be deleted without any request."""
+        page = create_i18n_page("A page", published=True)
+        queue_es_action_to_page(page, "index", "en")
+
+        self.assertEqual(process_search_queue(), 1)
+
+        self.assertFalse(SearchQueueEntry.objects.exists())
+        mock_bulk.assert_not_called()
+
+    @override_settings(RICHIE_SEARCH_QUEUE_RETRY_DELAY=10)
+    def test_queue_process_search_queue_failure(self, mock_bulk):
+        """
+        Entries should be retried later with an increasing delay if the bulk request fails,
+        until they reach the maximum number of attempts.
+        """
+        mock_bulk.side_effect = ValueError("boom")
+        course = CourseFactory(should_publish=True)
+        queue_es_action_to_page(course.extended_object, "index", "en")
+        mock_logger = mock.Mock()
+
+        now = timezone.now()
+        with mock.patch.object(timezone, "now", return_value=now):
+            self.assertEqual(process_search_queue(logger=mock_logger), 0)
+
+        mock_logger.error.assert_called_once()
+        entry = SearchQueueEntry.objects.get()
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.last_error, "ValueError('boom')")
+        self.assertEqual(entry.retry_on, now + timedelta(seconds=10))
+
+        # The entry is not retried before its delay is over
+        self.assertEqual(process_search_queue(), 0)
+        self.assertEqual(mock_bulk.call_count, 1)
+
+        # After the delay, the entry is retried and the next delay is doubled
+        later = now + timedelta(seconds=10)
+        with mock.patch.object(timezone, "now", return_value=later):
+            self.assertEqual(process_search_queue(), 0)
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.attempts, 2)
+        self.assertEqual(entry.retry_on, later + timedelta(seconds=20))
+
+        # Entries that reached the maximum number of attempts are abandoned
+        mock_bulk.reset_mock()
+        with mock.patch.object(timezone, "now", return_value=now + timedelta(hours=1)):
+            self.assertEqual(process_search_queue(max_attempts=2), 0)
+        mock_bulk.assert_not_called()
+        self.assertTrue(SearchQueueEntry.objects.exists())
+
+    def test_queue_process_search_queue_failure_streamed(self, mock_bulk):
+        """
+        Entries whose streamed actions fail to be built should be recorded as failed and
+        not prevent the other entries from being processed.
+        """
+
+        def get_es_partial_documents(*_args, **_kwargs):
+            # Like the indexer, only fail when the documents are iterated
+            yield from []
+            raise ValueError("boom")
+
+        organization = OrganizationFactory(should_publish=True)
+        course = CourseFactory(fill_organizations=[organization], should_publish=True)
+        queue_es_action_to_page(organization.extended_object, "index", "en")
+        queue_es_action_to_page(course.extended_object, "index", "en")
+        mock_logger = mock.Mock()
+
+        with mock.patch.object(
+            ES_INDICES.courses,
+            "get_es_partial_documents",
+            side_effect=get_es_partial_documents,
+        ):
+            self.assertEqual(process_search_queue(logger=mock_logger), 1)
+
+        mock_logger.error.assert_called_once()
+        entry = SearchQueueEntry.objects.get()
+        self.assertEqual(entry.page, organization.extended_object)
+        self.assertEqual(entry.attempts, 1)
+        self.assertEqual(entry.last_error, "ValueError('boom')")
+        self.assertEqual(
+            [action["_id"] for action in mock_bulk.call_args.args[0]],
+            [course.get_es_id()],
+        )
+
+    def test_queue_process_search_queue_requeued(self, mock_bulk):
+        """
+        An entry updated while it is processed should be kept in the queue to be processed
+        again.
+        """
+        course = CourseFactory(should_publish=True)
+        queue_es_action_to_page(course.extended_object, "index", "en")
+
+        def requeue(_actions):
+            mock_bulk.side_effect = None
+            queue_es_action_to_page(course.extended_object, "delete", "en")
+
+        mock_bulk.side_effect = requeue
+
+        # The entry is processed twice
+        self.assertEqual(process_search_queue(), 2)
+
+        self.assertEqual(mock_bulk.call_count, 2)
+        self.assertEqual(
+            [action["_op_type"] for action in mock_bulk.call_args.args[0]], ["delete"]
+        )
+        self.assertFalse(SearchQueueEntry.objects.exists())
+
+    def test_queue_add_action(self, _mock_bulk):
+        """
+        Partial updates of a document should be merged together, and be covered by any
+        other action on the same document.
+        """
+        actions = {}
+        add_action(
+            actions, {"_index": "i", "_id": "1", "_op_type": "update", "doc": {"a": 1}}
+        )
+        add_action(
+            actions, {"_index": "i", "_id": "1", "_op_type": "update", "doc": {"b": 2}}
+        )
+        self.assertEqual(
+            actions,
+            {
+                ("i", "1"): {
+                    "_index": "i",
+                    "_id": "1",
+                    "_op_type": "update",
+                    "doc": {"a": 1, "b": 2},
+                }
+            },
+        )
+
+        add_action(actions, {"_index": "i", "_id": "1", "_op_type": "index", "c": 3})
+        add_action(
+            actions, {"_index": "i", "_id": "1", "_op_type": "update", "doc": {"a": 1}}
+        )
+        self.assertEqual(
+            actions,
+            {("i", "1"): {"_index": "i", "_id": "1", "_op_type": "index", "c": 3}},
+        )
@@ -4,7 +4,7 @@ Tests for the course viewset
 from unittest import mock
 
 from django.db import connection
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from richie.apps.core.factories import UserFactory
 from richie.apps.courses.factories import (
@@ -13,7 +13,9 @@ from richie.apps.courses.factories import (
     OrganizationFactory,
     PersonFactory,
 )
+from richie.apps.search.bulk import BulkResult
 from richie.apps.search.indexers.courses import CoursesIndexer
+from richie.apps.search.models import SearchQueueEntry
 
 
 @mock.patch.object(  # Avoid messing up the development Elasticsearch index
@@ -23,7 +25,8 @@ from richie.apps.search.indexers.courses import CoursesIndexer
     return_value="test_courses",
 )
 @mock.patch(
-    "richie.apps.search.index_manager.bulk_compat"
+    "richie.apps.search.index_manager.parallel_bulk",
+    return_value=BulkResult(0, []),
 )  # Mock call to Elasticsearch
 class CoursesSignalsTestCase(TestCase):
     """
@@ -58,8 +61,9 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 1)
-        action = mock_bulk.call_args[1]["actions"][0]
+        actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 1)
+        action = actions[0]
         self.assertEqual(action["_id"], course.get_es_id())
         self.assertEqual(action["_op_type"], "index")
         self.assertEqual(action["_index"], "test_courses")
@@ -83,8 +87,9 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 1)
-        action = mock_bulk.call_args[1]["actions"][0]
+        actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 1)
+        action = actions[0]
         self.assertEqual(action["_id"], course.get_es_id())
         self.assertEqual(action["_op_type"], "index")
         self.assertEqual(action["_index"], "test_courses")
@@ -101,12 +106,41 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 1)
-        action = mock_bulk.call_args[1]["actions"][0]
+        actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 1)
+        action = actions[0]
         self.assertEqual(action["_id"], course.get_es_id())
         self.assertEqual(action["_op_type"], "delete")
         self.assertEqual(action["_index"], "test_courses")
 
+    @override_settings(RICHIE_QUEUE_SEARCH_UPDATES=True)
+    def test_signals_courses_publish_queued(self, mock_bulk, *_):
+        """
+        When search updates are queued, publishing a course should record a queue entry in
+        the same transaction instead of updating Elasticsearch. Repeated publications and
+        unpublications of the page should be coalesced in the same entry.
+        """
+        course = CourseFactory(page_languages=["en", "fr"])
+
+        self.assertTrue(course.extended_object.publish("en"))
+        self.assertTrue(course.extended_object.publish("fr"))
+        self.run_commit_hooks()
+
+        self.assertFalse(mock_bulk.called)
+        entry = SearchQueueEntry.objects.get()
+        self.assertEqual(entry.page, course.extended_object)
+        self.assertEqual(entry.action, "index")
+        self.assertEqual(entry.language, "fr")
+
+        self.assertTrue(course.extended_object.unpublish("en"))
+        self.assertTrue(course.extended_object.unpublish("fr"))
+        self.run_commit_hooks()
+
+        self.assertFalse(mock_bulk.called)
+        entry = SearchQueueEntry.objects.get()
+        self.assertEqual(entry.page, course.extended_object)
+        self.assertEqual(entry.action, "delete")
+
     def test_signals_organizations_publish(self, mock_bulk, *_):
         """
         Publishing an organization should update its document in the Elasticsearch organizations
@@ -130,11 +164,21 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 3)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 3)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
+        self.assertEqual(
+            set(actions[0]["doc"]),
+            {
+                "organization_highlighted",
+                "organization_highlighted_cover_image",
+                "organizations",
+                "organizations_names",
+            },
+        )
+        self.assertEqual(actions[0]["doc"]["organizations"], [organization.get_es_id()])
         self.assertEqual(actions[1]["_id"], organization.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
         self.assertEqual(actions[1]["_index"], "richie_organizations")
@@ -164,10 +208,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], organization.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
@@ -200,10 +244,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], organization.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
@@ -220,10 +264,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], organization.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "delete")
@@ -252,11 +296,16 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 3)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 3)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
+        self.assertEqual(
+            set(actions[0]["doc"]),
+            {"icon", "categories", "categories_names"},
+        )
+        self.assertEqual(actions[0]["doc"]["categories"], [category.get_es_id()])
         self.assertEqual(actions[1]["_id"], category.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
         self.assertEqual(actions[1]["_index"], "richie_categories")
@@ -286,10 +335,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], category.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
@@ -320,10 +369,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], category.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
@@ -340,10 +389,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], category.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "delete")
@@ -433,11 +482,16 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
+        self.assertEqual(
+            set(actions[0]["doc"]),
+            {"persons", "persons_names"},
+        )
+        self.assertEqual(actions[0]["doc"]["persons"], [person.get_es_id()])
         self.assertEqual(actions[1]["_id"], person.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
         self.assertEqual(actions[1]["_index"], "richie_persons")
@@ -467,10 +521,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], person.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "index")
@@ -487,10 +541,10 @@ class CoursesSignalsTestCase(TestCase):
         self.run_commit_hooks()
 
         self.assertEqual(mock_bulk.call_count, 1)
-        self.assertEqual(len(mock_bulk.call_args[1]["actions"]), 2)
         actions = list(mock_bulk.call_args[1]["actions"])
+        self.assertEqual(len(actions), 2)
         self.assertEqual(actions[0]["_id"], published_course.get_es_id())
-        self.assertEqual(actions[0]["_op_type"], "index")
+        self.assertEqual(actions[0]["_op_type"], "update")
         self.assertEqual(actions[0]["_index"], "test_courses")
         self.assertEqual(actions[1]["_id"], person.get_es_id())
         self.assertEqual(actions[1]["_op_type"], "delete")
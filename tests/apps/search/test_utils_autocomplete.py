@@ -0,0 +1,203 @@
+"""
+Tests for the cache of autocomplete suggestions
+"""
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from richie.apps.search.filter_definitions import FILTERS
+from richie.apps.search.indexers import ES_INDICES
+from richie.apps.search.utils.autocomplete import (
+    autocomplete,
+    changes_suggestions,
+    get_autocomplete_kinds,
+    invalidate_autocomplete,
+    local_cache,
+    normalize_prefix,
+    precompute_autocomplete_prefixes,
+)
+from richie.apps.search.utils.response_cache import invalidate_search_responses
+
+PERSONS_INDEXER = mock.Mock(index_name="richie_persons")
+PERSONS_INDEXER.format_es_document_for_autocomplete.side_effect = (
+    lambda option, language: {"id": option["_id"]}
+)
+
+
+def get_suggest_response(*ids):
+    """Build the response of Elasticsearch to a completion suggester."""
+    return {
+        "suggest": {
+            "suggestions": [{"options": [{"_id": option_id} for option_id in ids]}]
+        }
+    }
+
+
+@override_settings(LANGUAGES=(("en", "English"),))
+@mock.patch("richie.apps.search.utils.multi_search.ES_CLIENT")
+class AutocompleteUtilsTestCase(TestCase):
+    """
+    Test the caches of suggestions in front of the completion suggesters of indices.
+    """
+
+    def setUp(self):
+        """Start each test with empty caches."""
+        super().setUp()
+        caches["search"].clear()
+        local_cache.clear()
+
+    def test_utils_autocomplete_get_kinds(self, _mock_es):
+        """
+        Categories should be autocompleted in the context of the reverse id of the meta
+        category of their filter, which may differ from the name of the filter.
+        """
+        with mock.patch.object(FILTERS["levels"], "reverse_id", "course-levels"):
+            kinds = get_autocomplete_kinds()
+
+        self.assertEqual(
+            kinds,
+            {
+                "courses": (ES_INDICES.courses, None),
+                "subjects": (ES_INDICES.categories, {"kind": ["subjects"]}),
+                "levels": (ES_INDICES.categories, {"kind": ["course-levels"]}),
+                "organizations": (ES_INDICES.organizations, None),
+                "persons": (ES_INDICES.persons, None),
+            },
+        )
+
+    def test_utils_autocomplete_normalize_prefix(self, _mock_es):
+        """Prefixes should be lowercased, stripped of diacritics and extra spaces."""
+        self.assertEqual(normalize_prefix("  Éco  Lo "), "eco lo")
+        self.assertEqual(normalize_prefix("ŒUVRE"), "œuvre")
+
+    def test_utils_autocomplete_short_prefix_shared_cache(self, mock_es):
+        """
+        Suggestions for short prefixes should be cached in the shared cache, for all the
+        prefixes that normalize the same way.
+        """
+        mock_es.search.return_value = get_suggest_response("1")
+
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "ma", "en"), [{"id": "1"}])
+        # Simulate another process with an empty local cache
+        local_cache.clear()
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "Má", "en"), [{"id": "1"}])
+
+        mock_es.search.assert_called_once()
+        self.assertEqual(
+            mock_es.search.call_args[1]["body"]["suggest"]["suggestions"]["prefix"],
+            "ma",
+        )
+
+    def test_utils_autocomplete_long_prefix_local_cache(self, mock_es):
+        """Suggestions for longer prefixes should only be cached by the process."""
+        mock_es.search.return_value = get_suggest_response("1")
+
+        autocomplete(PERSONS_INDEXER, "mathi", "en")
+        autocomplete(PERSONS_INDEXER, "mathi", "en")
+        self.assertEqual(mock_es.search.call_count, 1)
+
+        local_cache.clear()
+        autocomplete(PERSONS_INDEXER, "mathi", "en")
+        self.assertEqual(mock_es.search.call_count, 2)
+
+    def test_utils_autocomplete_cache_key(self, mock_es):
+        """Suggestions should be cached separately by language, contexts and size."""
+        mock_es.search.return_value = get_suggest_response("1")
+
+        autocomplete(PERSONS_INDEXER, "mathi", "en")
+        autocomplete(PERSONS_INDEXER, "mathi", "fr")
+        autocomplete(PERSONS_INDEXER, "mathi", "en", contexts={"kind": ["levels"]})
+        autocomplete(PERSONS_INDEXER, "mathi", "en", size=10)
+        self.assertEqual(mock_es.search.call_count, 4)
+
+    def test_utils_autocomplete_invalidate(self, mock_es):
+        """Suggestions should be invalidated in both caches."""
+        mock_es.search.return_value = get_suggest_response("1")
+        autocomplete(PERSONS_INDEXER, "ma", "en")
+        autocomplete(PERSONS_INDEXER, "mathi", "en")
+
+        invalidate_autocomplete()
+
+        mock_es.search.return_value = get_suggest_response("2")
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "ma", "en"), [{"id": "2"}])
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "mathi", "en"), [{"id": "2"}])
+        self.assertEqual(mock_es.search.call_count, 4)
+
+    def test_utils_autocomplete_invalidate_search_responses(self, mock_es):
+        """
+        Suggestions should be kept when cached search responses are invalidated, e.g. after
+        the state of courses is updated.
+        """
+        mock_es.search.return_value = get_suggest_response("1")
+        autocomplete(PERSONS_INDEXER, "ma", "en")
+
+        invalidate_search_responses()
+
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "ma", "en"), [{"id": "1"}])
+        mock_es.search.assert_called_once()
+
+    def test_utils_autocomplete_changes_suggestions(self, _mock_es):
+        """Only partial updates that leave the completion field untouched should be safe."""
+        self.assertTrue(changes_suggestions({"_id": "1", "_index": "richie_persons"}))
+        self.assertTrue(changes_suggestions({"_op_type": "delete", "_id": "1"}))
+        self.assertTrue(
+            changes_suggestions(
+                {"_op_type": "update", "doc": {"complete": {"en": ["Maths"]}}}
+            )
+        )
+        self.assertFalse(
+            changes_suggestions({"_op_type": "update", "doc": {"course_runs": []}})
+        )
+
+    @override_settings(RICHIE_SEARCH_AUTOCOMPLETE_PRECOMPUTED_ALPHABET="ab")
+    @mock.patch(
+        "richie.apps.search.utils.autocomplete.get_autocomplete_kinds",
+        return_value={
+            "persons": (PERSONS_INDEXER, None),
+            "contributors": (PERSONS_INDEXER, None),
+        },
+    )
+    def test_utils_autocomplete_precompute(self, _mock_kinds, mock_es):
+        """
+        All the short prefixes should be precomputed in one multi search request per level,
+        skipping prefixes that extend a prefix without suggestions, and then be served from
+        the cache.
+        """
+
+        def msearch(body):
+            return {
+                "responses": [
+                    get_suggest_response("1")
+                    if search["suggest"]["suggestions"]["prefix"].startswith("a")
+                    else get_suggest_response()
+                    for search in body[1::2]
+                ]
+            }
+
+        mock_es.msearch.side_effect = msearch
+
+        # Kinds sharing an index and contexts are only precomputed once
+        self.assertEqual(precompute_autocomplete_prefixes(), 4)
+
+        self.assertEqual(mock_es.msearch.call_count, 2)
+        self.assertEqual(
+            [
+                search["suggest"]["suggestions"]["prefix"]
+                for search in mock_es.msearch.call_args[1]["body"][1::2]
+            ],
+            ["aa", "ab"],
+        )
+
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "ab", "en"), [{"id": "1"}])
+        self.assertEqual(autocomplete(PERSONS_INDEXER, "b", "en"), [])
+        self.assertEqual(mock_es.msearch.call_count, 2)
+        mock_es.search.assert_not_called()
+
+    @override_settings(RICHIE_SEARCH_AUTOCOMPLETE_PRECOMPUTED_PREFIX_LENGTH=0)
+    def test_utils_autocomplete_precompute_disabled(self, mock_es):
+        """Nothing should be precomputed if the prefix length is set to 0."""
+        self.assertEqual(precompute_autocomplete_prefixes(), 0)
+        mock_es.msearch.assert_not_called()
+        mock_es.search.assert_not_called()
@@ -0,0 +1,214 @@
+"""
+Tests for the cache of internationalized names of indexed objects
+"""
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from richie.apps.courses.factories import CourseFactory, OrganizationFactory
+from richie.apps.search.signals import apply_es_action_to_page
+from richie.apps.search.utils.i18n_names import (
+    get_i18n_names,
+    get_i18n_names_many,
+    invalidate_i18n_names,
+    local_cache,
+)
+
+CATEGORIES_INDEXER = mock.Mock(index_name="richie_categories")
+ORGANIZATIONS_INDEXER = mock.Mock(index_name="richie_organizations")
+
+
+def get_mget_body(*ids):
+    """Build the body of the `mget` request expected to fetch organizations."""
+    return {
+        "docs": [
+            {"_index": "richie_organizations", "_id": object_id} for object_id in ids
+        ]
+    }
+
+
+def get_mget_response(*docs):
+    """Build the response of Elasticsearch to a `mget` request for the given documents."""
+    return {
+        "docs": [
+            {"_id": doc_id, "found": True, "_source": {"title": title}}
+            for doc_id, title in docs
+        ]
+    }
+
+
+@override_settings(LANGUAGES=(("en", "English"), ("fr", "French")))
+@mock.patch("richie.apps.search.utils.i18n_names.ES_CLIENT")
+class I18nNamesUtilsTestCase(TestCase):
+    """
+    Test the local and shared caches of names used to label the facets of course searches.
+    """
+
+    def setUp(self):
+        """Start each test with empty caches."""
+        super().setUp()
+        caches["search"].clear()
+        local_cache.clear()
+
+    def test_utils_i18n_names_fetch_missing(self, mock_es):
+        """
+        Names missing from the cache should be fetched in one mget request and returned in
+        the requested language.
+        """
+        mock_es.mget.return_value = get_mget_response(
+            ("1", {"en": "Org 1", "fr": "Org 1 fr"}), ("2", {"en": "Org 2"})
+        )
+
+        names = get_i18n_names(ORGANIZATIONS_INDEXER, ["1", "2"], "fr")
+
+        self.assertEqual(names, {"1": "Org 1 fr", "2": "Org 2"})
+        mock_es.mget.assert_called_once_with(
+            body=get_mget_body("1", "2"), _source=["title"]
+        )
+
+    def test_utils_i18n_names_many(self, mock_es):
+        """
+        Names missing from several indices should be fetched in the same mget request and
+        returned by indexer.
+        """
+        mock_es.mget.return_value = get_mget_response(
+            ("2", {"en": "Category 2"}), ("1", {"en": "Org 1"})
+        )
+
+        names = get_i18n_names_many(
+            {ORGANIZATIONS_INDEXER: ["1"], CATEGORIES_INDEXER: ["2"]}, "en"
+        )
+
+        self.assertEqual(
+            names,
+            {
+                CATEGORIES_INDEXER: {"2": "Category 2"},
+                ORGANIZATIONS_INDEXER: {"1": "Org 1"},
+            },
+        )
+        mock_es.mget.assert_called_once_with(
+            body={
+                "docs": [
+                    {"_index": "richie_categories", "_id": "2"},
+                    {"_index": "richie_organizations", "_id": "1"},
+                ]
+            },
+            _source=["title"],
+        )
+
+    def test_utils_i18n_names_many_empty(self, mock_es):
+        """Nothing should be requested if no name is needed."""
+        self.assertEqual(get_i18n_names_many({}), {})
+        self.assertEqual(
+            get_i18n_names_many({CATEGORIES_INDEXER: []}), {CATEGORIES_INDEXER: {}}
+        )
+        mock_es.mget.assert_not_called()
+
+    def test_utils_i18n_names_warm(self, mock_es):
+        """
+        Names of all languages should be cached when fetched so that subsequent requests,
+        in any language, don't hit Elasticsearch.
+        """
+        mock_es.mget.return_value = get_mget_response(
+            ("1", {"en": "Org 1", "fr": "Org 1 fr"})
+        )
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        mock_es.mget.reset_mock()
+
+        self.assertEqual(
+            get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en"), {"1": "Org 1"}
+        )
+        self.assertEqual(
+            get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "fr"), {"1": "Org 1 fr"}
+        )
+        mock_es.mget.assert_not_called()
+
+    def test_utils_i18n_names_shared_cache(self, mock_es):
+        """
+        Names missing from the local cache should be looked for in the shared cache before
+        fetching only the remaining ones from Elasticsearch.
+        """
+        mock_es.mget.return_value = get_mget_response(("1", {"en": "Org 1"}))
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        # Simulate another process with an empty local cache
+        local_cache.clear()
+
+        mock_es.mget.return_value = get_mget_response(("2", {"en": "Org 2"}))
+        names = get_i18n_names(ORGANIZATIONS_INDEXER, ["1", "2"], "en")
+
+        self.assertEqual(names, {"1": "Org 1", "2": "Org 2"})
+        mock_es.mget.assert_called_with(body=get_mget_body("2"), _source=["title"])
+
+    def test_utils_i18n_names_not_found(self, mock_es):
+        """Ids that are not found in the index should be omitted and not cached."""
+        mock_es.mget.return_value = {"docs": [{"_id": "1", "found": False}]}
+
+        self.assertEqual(get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en"), {})
+        self.assertEqual(get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en"), {})
+        self.assertEqual(mock_es.mget.call_count, 2)
+
+    @override_settings(RICHIE_SEARCH_I18N_NAMES_CACHE_SIZE=2)
+    @mock.patch(
+        "richie.apps.search.utils.i18n_names.get_shared_cache", return_value=None
+    )
+    def test_utils_i18n_names_local_cache_size(self, _mock_cache, mock_es):
+        """The local cache should drop the least recently used names beyond its size."""
+        mock_es.mget.return_value = get_mget_response(
+            ("1", {"en": "Org 1"}), ("2", {"en": "Org 2"})
+        )
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1", "2"], "en")
+
+        # Only the names of the last object fetched are kept, in both languages
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["2"], "fr")
+        self.assertEqual(mock_es.mget.call_count, 1)
+
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        self.assertEqual(mock_es.mget.call_count, 2)
+        mock_es.mget.assert_called_with(body=get_mget_body("1"), _source=["title"])
+
+    def test_utils_i18n_names_invalidate(self, mock_es):
+        """Invalidating the cache should clear names in the local and shared caches."""
+        mock_es.mget.return_value = get_mget_response(("1", {"en": "Org 1"}))
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+
+        invalidate_i18n_names()
+
+        mock_es.mget.return_value = get_mget_response(("1", {"en": "New name"}))
+        self.assertEqual(
+            get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en"), {"1": "New name"}
+        )
+        self.assertEqual(mock_es.mget.call_count, 2)
+
+    def test_utils_i18n_names_shared_cache_cleared(self, mock_es):
+        """
+        Clearing the shared cache should also invalidate names cached locally so they can't
+        be revived.
+        """
+        mock_es.mget.return_value = get_mget_response(("1", {"en": "Org 1"}))
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+
+        caches["search"].clear()
+
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        self.assertEqual(mock_es.mget.call_count, 2)
+
+    @mock.patch("richie.apps.search.signals.bulk_live_indices")
+    def test_utils_i18n_names_invalidated_on_publish(self, _mock_bulk, mock_es):
+        """
+        Names should be invalidated when an organization is indexed but not when a course
+        is indexed.
+        """
+        mock_es.mget.return_value = get_mget_response(("1", {"en": "Org 1"}))
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+
+        course = CourseFactory(should_publish=True)
+        apply_es_action_to_page(course.extended_object, "index", "en")
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        self.assertEqual(mock_es.mget.call_count, 1)
+
+        organization = OrganizationFactory(should_publish=True)
+        apply_es_action_to_page(organization.extended_object, "index", "en")
+        get_i18n_names(ORGANIZATIONS_INDEXER, ["1"], "en")
+        self.assertEqual(mock_es.mget.call_count, 2)
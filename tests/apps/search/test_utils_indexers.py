@@ -1,12 +1,19 @@
 """
 Tests for the indexer helpers.
 """
+from datetime import datetime
+
 from django.test import TestCase
 
+import pytz
+
 from richie.apps.search.indexers import IndicesList
 from richie.apps.search.indexers.courses import CoursesIndexer
 from richie.apps.search.indexers.organizations import OrganizationsIndexer
-from richie.apps.search.utils.indexers import slice_string_for_completion
+from richie.apps.search.utils.indexers import (
+    get_epoch_milliseconds,
+    slice_string_for_completion,
+)
 
 
 class UtilsIndexersTestCase(TestCase):
@@ -48,3 +55,22 @@ class UtilsIndexersTestCase(TestCase):
             slice_string_for_completion("Université Paris 18 "),
             ["Université Paris 18", "Paris 18", "18"],
         )
+
+    def test_get_epoch_milliseconds(self):
+        """
+        The get_epoch_milliseconds function converts an aware datetime to milliseconds since
+        the epoch, truncating microseconds.
+        """
+        self.assertEqual(
+            get_epoch_milliseconds(datetime(1970, 1, 1, tzinfo=pytz.utc)), 0
+        )
+        self.assertEqual(
+            get_epoch_milliseconds(datetime(2021, 11, 23, 9, 41, 12, 345678, pytz.utc)),
+            1637660472345,
+        )
+        self.assertEqual(
+            get_epoch_milliseconds(
+                pytz.timezone("Europe/Paris").localize(datetime(2021, 11, 23, 10, 41))
+            ),
+            1637660460000,
+        )
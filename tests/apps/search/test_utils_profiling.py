@@ -0,0 +1,140 @@
+"""
+Tests for the profiler of the population of Elasticsearch indices
+"""
+from itertools import islice
+from unittest import mock
+
+from django.test import TestCase
+
+from richie.apps.courses.factories import CourseFactory
+from richie.apps.courses.models import Course
+from richie.apps.search.utils.profiling import IndexingProfiler, get_percentile
+
+
+class FakeIndexer:
+    """An indexer building one document per course with one query per document."""
+
+    @staticmethod
+    def get_es_documents():
+        """Build documents of various sizes."""
+        for i, course in enumerate(Course.objects.order_by("pk")):
+            # Run a query for each document
+            Course.objects.filter(pk=course.pk).exists()
+            yield {"_id": str(course.pk), "_index": "some_index", "title": "a" * i}
+
+
+class BatchIndexer:
+    """An indexer building documents by batches of 2 courses with one query per batch."""
+
+    @staticmethod
+    def get_batch_size():
+        """Build documents by batches of 2 courses."""
+        return 2
+
+    @staticmethod
+    def get_es_documents():
+        """Run a query for each batch of courses then yield their documents."""
+        courses = Course.objects.order_by("pk").iterator()
+        while True:
+            batch = list(islice(courses, 2))
+            if not batch:
+                break
+            Course.objects.filter(pk__in=[course.pk for course in batch]).exists()
+            for course in batch:
+                yield {"_id": str(course.pk), "_index": "some_index"}
+
+
+class IndexingProfilerTestCase(TestCase):
+    """Test the profiler measuring how documents are built and sent to Elasticsearch."""
+
+    def test_utils_profiling_get_percentile(self):
+        """Percentiles should be computed with the nearest-rank method."""
+        values = list(range(1, 101))
+        self.assertEqual(get_percentile(values, 50), 50)
+        self.assertEqual(get_percentile(values, 95), 95)
+        self.assertEqual(get_percentile(values, 100), 100)
+        self.assertEqual(get_percentile([7], 50), 7)
+        self.assertIsNone(get_percentile([], 50))
+
+    def test_utils_profiling_run(self):
+        """
+        Documents should be passed to the bulk function while measuring their number,
+        the queries run to build them and their size.
+        """
+        CourseFactory.create_batch(3)
+        profiler = IndexingProfiler(slowest_count=2)
+        bulk = mock.Mock(side_effect=list)
+
+        result = profiler.run(FakeIndexer, FakeIndexer.get_es_documents(), bulk)
+
+        self.assertEqual([document["title"] for document in result], ["", "a", "aa"])
+        (profile,) = profiler.as_dict()["indexers"]
+        self.assertEqual(profile["indexer"], "FakeIndexer")
+        self.assertEqual(profile["documents"], 3)
+        # One query to list courses and one query per document
+        self.assertEqual(profile["query_count"], 4)
+        self.assertAlmostEqual(profile["queries_per_document"], 4 / 3)
+        # Metadata are not counted in the size of documents
+        self.assertEqual(profile["size_p50"], len('{"title":"a"}'))
+        self.assertEqual(profile["size_p95"], len('{"title":"aa"}'))
+        self.assertEqual(profile["size_max"], len('{"title":"aa"}'))
+        self.assertAlmostEqual(
+            profile["total_time"], profile["build_time"] + profile["bulk_time"]
+        )
+        # Each document is a batch of its own
+        self.assertEqual(profile["batch_size"], 1)
+        self.assertEqual(len(profile["slowest_batches"]), 2)
+        durations = [batch["build_time"] for batch in profile["slowest_batches"]]
+        self.assertEqual(durations, sorted(durations, reverse=True))
+        for batch in profile["slowest_batches"]:
+            self.assertEqual(batch["first_id"], batch["last_id"])
+            self.assertEqual(batch["documents"], 1)
+
+        report = profiler.format_report()
+        self.assertIn("FakeIndexer: 3 documents in", report)
+        self.assertIn("SQL: 4 queries", report)
+        self.assertIn("document size: p50 13B, p95 14B, max 14B", report)
+        self.assertIn("slowest documents: ", report)
+
+    def test_utils_profiling_run_batches(self):
+        """
+        The time and queries spent building documents in batches should be recorded per
+        batch rather than attributed to the first document of each batch.
+        """
+        courses = CourseFactory.create_batch(5)
+        profiler = IndexingProfiler()
+
+        profiler.run(BatchIndexer, BatchIndexer.get_es_documents(), list)
+
+        (profile,) = profiler.as_dict()["indexers"]
+        self.assertEqual(profile["documents"], 5)
+        self.assertEqual(profile["batch_size"], 2)
+        self.assertEqual(
+            sorted(
+                (batch["first_id"], batch["last_id"], batch["documents"])
+                for batch in profile["slowest_batches"]
+            ),
+            sorted(
+                (str(courses[i].pk), str(courses[min(i + 1, 4)].pk), min(2, 5 - i))
+                for i in range(0, 5, 2)
+            ),
+        )
+        # One query to list courses and one query per batch
+        self.assertEqual(profile["query_count"], 4)
+        self.assertEqual(
+            sum(batch["query_count"] for batch in profile["slowest_batches"]), 4
+        )
+        self.assertIn(
+            "slowest batches (documents are built by batches of 2",
+            profiler.format_report(),
+        )
+
+    def test_utils_profiling_run_empty(self):
+        """An indexer producing no documents should be reported without failing."""
+        profiler = IndexingProfiler()
+        profiler.run(FakeIndexer, iter([]), list)
+
+        (profile,) = profiler.as_dict()["indexers"]
+        self.assertEqual(profile["documents"], 0)
+        self.assertIsNone(profile["size_max"])
+        self.assertIn("FakeIndexer: 0 documents", profiler.format_report())
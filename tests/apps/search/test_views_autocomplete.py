@@ -0,0 +1,181 @@
+"""Test suite for the combined autocomplete view of richie's search app."""
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from richie.apps.search import ES_CLIENT
+from richie.apps.search.utils.autocomplete import local_cache
+
+
+def get_suggest_response(*options):
+    """Build the response of Elasticsearch to a completion suggester."""
+    return {
+        "suggest": {
+            "suggestions": [
+                {
+                    "options": [
+                        {"_id": option_id, "_source": source}
+                        for option_id, source in options
+                    ]
+                }
+            ]
+        }
+    }
+
+
+@override_settings(RICHIE_ES_INDICES_PREFIX="richie")
+@mock.patch.object(ES_CLIENT, "msearch")
+class AutocompleteViewTestCase(TestCase):
+    """
+    Test suite to validate the behavior of the `autocomplete` view, which autocompletes a
+    query on several kinds of objects in one multi search request.
+    """
+
+    def setUp(self):
+        """Start each test with empty caches."""
+        super().setUp()
+        caches["search"].clear()
+        local_cache.clear()
+
+    def test_views_autocomplete(self, mock_msearch):
+        """
+        All kinds of objects should be autocompleted in one multi search request and the
+        results grouped by kind.
+        """
+        mock_msearch.return_value = {
+            "responses": [
+                get_suggest_response(
+                    ("1", {"absolute_url": {"en": "/en/c/"}, "title": {"en": "Maths"}}),
+                ),
+                get_suggest_response(
+                    ("2", {"kind": "subjects", "title": {"en": "Math"}})
+                ),
+                get_suggest_response(),
+                get_suggest_response(("3", {"title": {"en": "Mathematica"}})),
+                get_suggest_response(),
+            ]
+        }
+
+        response = self.client.get("/api/v1.0/search/autocomplete/?query=mat")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "courses": [
+                    {
+                        "absolute_url": "/en/c/",
+                        "id": "1",
+                        "kind": "courses",
+                        "title": "Maths",
+                    }
+                ],
+                "subjects": [{"id": "2", "kind": "subjects", "title": "Math"}],
+                "levels": [],
+                "organizations": [
+                    {"id": "3", "kind": "organizations", "title": "Mathematica"}
+                ],
+                "persons": [],
+            },
+        )
+
+        body = mock_msearch.call_args[1]["body"]
+        self.assertEqual(
+            body[::2],
+            [
+                {"index": "richie_courses"},
+                {"index": "richie_categories"},
+                {"index": "richie_categories"},
+                {"index": "richie_organizations"},
+                {"index": "richie_persons"},
+            ],
+        )
+        self.assertEqual(
+            body[1],
+            {
+                "size": 0,
+                "suggest": {
+                    "suggestions": {
+                        "prefix": "mat",
+                        "completion": {"field": "complete.en", "size": 5},
+                    }
+                },
+            },
+        )
+        self.assertEqual(
+            body[3]["suggest"]["suggestions"]["completion"]["contexts"],
+            {"kind": ["subjects"]},
+        )
+
+    @override_settings(
+        RICHIE_SEARCH_AUTOCOMPLETE_SIZE=3,
+        RICHIE_SEARCH_AUTOCOMPLETE_SIZES={"courses": 10},
+    )
+    def test_views_autocomplete_kinds(self, mock_msearch):
+        """
+        Only the kinds passed in the querystring should be autocompleted, with the size
+        configured for each kind.
+        """
+        mock_msearch.return_value = {
+            "responses": [
+                get_suggest_response(),
+                get_suggest_response(),
+            ]
+        }
+
+        response = self.client.get(
+            "/api/v1.0/search/autocomplete/?query=mat&kind=courses&kind=persons",
+            HTTP_ACCEPT_LANGUAGE="fr",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"courses": [], "persons": []})
+        body = mock_msearch.call_args[1]["body"]
+        self.assertEqual(
+            [
+                body[1]["suggest"]["suggestions"]["completion"],
+                body[3]["suggest"]["suggestions"]["completion"],
+            ],
+            [
+                {"field": "complete.fr", "size": 10},
+                {"field": "complete.fr", "size": 3},
+            ],
+        )
+
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_views_autocomplete_one_kind(self, mock_search, mock_msearch):
+        """A single kind should be autocompleted with a simple search request."""
+        mock_search.return_value = get_suggest_response(
+            ("4", {"title": {"en": "Mathilde"}})
+        )
+
+        response = self.client.get(
+            "/api/v1.0/search/autocomplete/?query=mat&kind=persons"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"persons": [{"id": "4", "kind": "persons", "title": "Mathilde"}]},
+        )
+        mock_msearch.assert_not_called()
+        self.assertEqual(mock_search.call_args[1]["index"], "richie_persons")
+
+    def test_views_autocomplete_invalid(self, mock_msearch):
+        """
+        Error cases: the query is missing or some kinds can not be autocompleted.
+        """
+        response = self.client.get("/api/v1.0/search/autocomplete/")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(
+            "/api/v1.0/search/autocomplete/?query=mat&kind=courses&kind=availability"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(),
+            {"errors": ["Unknown autocomplete kinds: availability."]},
+        )
+        mock_msearch.assert_not_called()
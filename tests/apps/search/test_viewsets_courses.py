@@ -3,15 +3,21 @@ Tests for the course viewset
 """
 from unittest import mock
 
+from django.conf import settings
+from django.core.cache import caches
 from django.test.utils import override_settings
 from django.utils import timezone
 
+import arrow
 import pytz
 from cms.test_utils.testcases import CMSTestCase
-from elasticsearch.exceptions import NotFoundError
+from elasticsearch.exceptions import NotFoundError, TransportError
 
 from richie.apps.search import ES_CLIENT
+from richie.apps.search.bulk import BulkResult
+from richie.apps.search.index_manager import bulk_live_indices
 from richie.apps.search.indexers.courses import CoursesIndexer
+from richie.apps.search.utils.response_cache import get_response_cache_stats
 
 
 # Patch the formatter once so we can keep our tests focused on what we're actually testing
@@ -33,6 +39,8 @@ class CoursesViewsetsTestCase(CMSTestCase):
         """
         super().setUp()
         timezone.activate(pytz.utc)
+        # Don't use names of facets or responses cached by previous tests
+        caches["search"].clear()
 
     def test_viewsets_courses_retrieve(self, *_):
         """
@@ -66,8 +74,13 @@ class CoursesViewsetsTestCase(CMSTestCase):
         "richie.apps.search.forms.CourseSearchForm.get_script_fields",
         lambda *args: {"some": "fields"},
     )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_sort",
+        lambda *args: [{"some": "sort"}],
+    )
+    @mock.patch.object(ES_CLIENT, "mget")
     @mock.patch.object(ES_CLIENT, "search")
-    def test_viewsets_courses_search(self, mock_search, *_):
+    def test_viewsets_courses_search(self, mock_search, mock_mget, *_):
         """
         Happy path: the consumer is filtering courses by matching text
         """
@@ -83,13 +96,25 @@ class CoursesViewsetsTestCase(CMSTestCase):
                     },
                     "aggregations": {
                         "all_courses": {
-                            "availability@archived": {"doc_count": 11},
-                            "availability@coming_soon": {"doc_count": 8},
-                            "availability@ongoing": {"doc_count": 42},
-                            "availability@open": {"doc_count": 59},
-                            "languages@en": {"doc_count": 33},
-                            "languages@fr": {"doc_count": 55},
-                            "new@new": {"doc_count": 66},
+                            "availability": {
+                                "availability": {
+                                    "buckets": {
+                                        "archived": {"doc_count": 11},
+                                        "coming_soon": {"doc_count": 8},
+                                        "ongoing": {"doc_count": 42},
+                                        "open": {"doc_count": 59},
+                                    }
+                                }
+                            },
+                            "languages": {
+                                "languages": {
+                                    "buckets": {
+                                        "en": {"doc_count": 33},
+                                        "fr": {"doc_count": 55},
+                                    }
+                                }
+                            },
+                            "new": {"new": {"buckets": {"new": {"doc_count": 66}}}},
                             "levels": {
                                 "levels": {
                                     "buckets": [
@@ -126,44 +151,38 @@ class CoursesViewsetsTestCase(CMSTestCase):
                         }
                     },
                 }
-            if index == "richie_categories":
-                return {
-                    "hits": {
-                        "hits": [
-                            {"_id": "1", "_source": {"title": {"en": "Level 1"}}},
-                            {"_id": "2", "_source": {"title": {"en": "Level 2"}}},
-                            {"_id": "21", "_source": {"title": {"en": "Subject 1"}}},
-                            {"_id": "22", "_source": {"title": {"en": "Subject 2"}}},
-                        ]
-                    }
-                }
-            if index == "richie_organizations":
-                return {
-                    "hits": {
-                        "hits": [
-                            {
-                                "_id": "11",
-                                "_source": {"title": {"en": "Organization 11"}},
-                            },
-                            {
-                                "_id": "12",
-                                "_source": {"title": {"en": "Organization 12"}},
-                            },
-                        ]
-                    }
-                }
-            if index == "richie_persons":
-                return {
-                    "hits": {
-                        "hits": [
-                            {"_id": "31", "_source": {"title": {"en": "Person 31"}}},
-                            {"_id": "32", "_source": {"title": {"en": "Person 32"}}},
-                            {"_id": "33", "_source": {"title": {"en": "Person 33"}}},
-                        ]
+
+        def mock_mget_implementation(body, **_):
+            titles = {
+                "richie_categories": {
+                    "1": "Level 1",
+                    "2": "Level 2",
+                    "21": "Subject 1",
+                    "22": "Subject 2",
+                },
+                "richie_organizations": {
+                    "11": "Organization 11",
+                    "12": "Organization 12",
+                },
+                "richie_persons": {
+                    "31": "Person 31",
+                    "32": "Person 32",
+                    "33": "Person 33",
+                },
+            }
+            return {
+                "docs": [
+                    {
+                        "_id": doc["_id"],
+                        "found": True,
+                        "_source": {"title": {"en": titles[doc["_index"]][doc["_id"]]}},
                     }
-                }
+                    for doc in body["docs"]
+                ]
+            }
 
         mock_search.side_effect = mock_search_implementation
+        mock_mget.side_effect = mock_mget_implementation
 
         response = self.client.get(
             "/api/v1.0/courses/?query=some%20phrase%20terms&limit=2&offset=20"
@@ -288,8 +307,10 @@ class CoursesViewsetsTestCase(CMSTestCase):
                 },
             },
         )
-        # The ES connector was called with appropriate arguments for the client's request
-        mock_search.assert_any_call(
+        # The ES connector was called with appropriate arguments for the client's request:
+        # one search for courses and one request for the names of all filters' values
+        mock_mget.assert_called_once()
+        mock_search.assert_called_once_with(
             _source=[
                 "absolute_url",
                 "categories",
@@ -308,12 +329,467 @@ class CoursesViewsetsTestCase(CMSTestCase):
                 "aggs": {"some": "aggs"},
                 "query": {"some": "query"},
                 "script_fields": {"some": "fields"},
+                "sort": [{"some": "sort"}],
             },
             from_=77,
             index="richie_courses",
             size=2,
         )
 
+    @override_settings(RICHIE_ES_INDICES_PREFIX="richie")
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_script_fields",
+        lambda *args: {"some": "fields"},
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_post_filter",
+        lambda *args: {"some": "post filter"},
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_post_filter(self, mock_search, *_):
+        """
+        The post filter built by the form should be passed to Elasticsearch when results are
+        requested.
+        """
+        mock_search.return_value = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 1, "relation": "eq"}}
+        }
+
+        response = self.client.get(
+            "/api/v1.0/courses/?query=some%20phrase%20terms&scope=objects"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["objects"], ["Course #523"])
+        self.assertEqual(
+            mock_search.call_args[1]["body"],
+            {
+                "post_filter": {"some": "post filter"},
+                "query": {"some": "query"},
+                "script_fields": {"some": "fields"},
+            },
+        )
+
+    @override_settings(RICHIE_SEARCH_RESPONSE_CACHE_TIMEOUT=60)
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_response_cache(self, mock_search, *_):
+        """
+        Responses should be cached by normalized search parameters and language when the
+        cache is enabled, hits and misses being counted.
+        """
+        mock_search.return_value = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 1, "relation": "eq"}}
+        }
+        url = "/api/v1.0/courses/?scope=objects&languages=en&languages=fr"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["objects"], ["Course #523"])
+        self.assertEqual(mock_search.call_count, 1)
+
+        # The same search, with values in another order, is served from the cache
+        response = self.client.get(
+            "/api/v1.0/courses/?languages=fr&languages=en&scope=objects"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["objects"], ["Course #523"])
+        self.assertEqual(mock_search.call_count, 1)
+
+        # Another language or other parameters are cached separately
+        self.client.cookies.load({settings.LANGUAGE_COOKIE_NAME: "fr"})
+        self.client.get(url)
+        self.client.get(f"{url:s}&limit=3")
+        self.assertEqual(mock_search.call_count, 3)
+
+        self.assertEqual(get_response_cache_stats(), {"hits": 1, "misses": 3})
+
+    @override_settings(
+        RICHIE_SEARCH_RESPONSE_CACHE_TIMEOUT=60, RICHIE_SEARCH_TIME_BUCKET=60000
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_response_cache_time_bucket(self, mock_search, *_):
+        """Cached responses should only be reused within the same bucket of time."""
+        mock_search.return_value = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 1, "relation": "eq"}}
+        }
+        url = "/api/v1.0/courses/?scope=objects"
+
+        for now, call_count in [
+            ("2022-03-01 10:00:01", 1),
+            ("2022-03-01 10:00:59", 1),
+            ("2022-03-01 10:01:00", 2),
+        ]:
+            with mock.patch("arrow.utcnow", return_value=arrow.get(now)):
+                self.client.get(url)
+            self.assertEqual(mock_search.call_count, call_count)
+
+    @override_settings(RICHIE_SEARCH_RESPONSE_CACHE_TIMEOUT=60)
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch(
+        "richie.apps.search.index_manager.parallel_bulk",
+        return_value=BulkResult(0, []),
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_response_cache_invalidated(
+        self, mock_search, _mock_bulk, *_
+    ):
+        """Cached responses should be invalidated when documents are indexed."""
+        mock_search.return_value = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 1, "relation": "eq"}}
+        }
+        url = "/api/v1.0/courses/?scope=objects"
+
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(mock_search.call_count, 1)
+
+        bulk_live_indices([])
+
+        self.client.get(url)
+        self.assertEqual(mock_search.call_count, 2)
+
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_response_cache_disabled(self, mock_search, *_):
+        """Responses should not be cached by default."""
+        mock_search.return_value = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 1, "relation": "eq"}}
+        }
+
+        self.client.get("/api/v1.0/courses/?scope=objects")
+        self.client.get("/api/v1.0/courses/?scope=objects")
+
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(get_response_cache_stats(), {"hits": 0, "misses": 0})
+
+    @override_settings(
+        RICHIE_ES_INDICES_PREFIX="richie",
+        RICHIE_SEARCH_SEPARATE_FACETS=True,
+        RICHIE_SEARCH_FACETS_CACHE_TIMEOUT=3600,
+    )
+    @mock.patch("arrow.utcnow", return_value=arrow.get("2022-03-01 10:00:01"))
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda form: (2, form.cleaned_data["offset"] or 0, {"some": "query"}, {"a": 1}),
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_script_fields",
+        lambda *args: {"some": "fields"},
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_sort",
+        lambda *args: [{"some": "sort"}],
+    )
+    @mock.patch(
+        "richie.apps.search.viewsets.courses.get_faceted_definitions",
+        return_value={"new": {"position": 1}, "languages": {"position": 0}},
+    )
+    @mock.patch.object(ES_CLIENT, "msearch")
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_separate_facets(
+        self, mock_search, mock_msearch, mock_facets, *_
+    ):
+        """
+        Hits and facets should be searched with separate queries in one multi search request
+        and facets should be cached regardless of pagination.
+        """
+        hits_response = {
+            "hits": {"hits": [{"_id": 523}], "total": {"value": 35, "relation": "eq"}}
+        }
+        mock_msearch.return_value = {
+            "responses": [
+                hits_response,
+                {
+                    "hits": {"hits": [], "total": {"value": 35, "relation": "eq"}},
+                    "aggregations": {"all_courses": {"some": "aggregations"}},
+                },
+            ]
+        }
+
+        response = self.client.get("/api/v1.0/courses/?query=some%20phrase")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            {
+                "meta": {"count": 1, "offset": 0, "total_count": 35},
+                "objects": ["Course #523"],
+                "filters": {"languages": {"position": 0}, "new": {"position": 1}},
+            },
+        )
+        mock_search.assert_not_called()
+        hits_body = mock_msearch.call_args[1]["body"][1]
+        self.assertEqual(
+            {key: hits_body[key] for key in hits_body if key != "_source"},
+            {
+                "from": 0,
+                "query": {"some": "query"},
+                "script_fields": {"some": "fields"},
+                "size": 2,
+                "sort": [{"some": "sort"}],
+            },
+        )
+        self.assertEqual(
+            mock_msearch.call_args[1]["body"][::2],
+            [{"index": "richie_courses"}, {"index": "richie_courses"}],
+        )
+        self.assertEqual(
+            mock_msearch.call_args[1]["body"][3],
+            {
+                "aggs": {"a": 1},
+                "query": {"bool": {"filter": [{"some": "query"}]}},
+                "size": 0,
+            },
+        )
+        mock_facets.assert_called_once_with(
+            mock.ANY, {"some": "aggregations"}, data=mock.ANY
+        )
+
+        # The next page only searches hits, facets are read from the cache
+        mock_search.return_value = hits_response
+        response = self.client.get("/api/v1.0/courses/?query=some%20phrase&offset=1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["filters"],
+            {"languages": {"position": 0}, "new": {"position": 1}},
+        )
+        self.assertEqual(response.data["meta"]["offset"], 1)
+        self.assertEqual(mock_msearch.call_count, 1)
+        self.assertEqual(mock_search.call_args[1]["body"]["from"], 1)
+        self.assertEqual(mock_facets.call_count, 1)
+
+        # Requesting only filters doesn't hit Elasticsearch anymore
+        response = self.client.get(
+            "/api/v1.0/courses/?query=some%20phrase&scope=filters"
+        )
+        self.assertEqual(
+            response.data,
+            {
+                "meta": {"count": 0, "offset": 0, "total_count": 35},
+                "filters": {"languages": {"position": 0}, "new": {"position": 1}},
+            },
+        )
+        self.assertEqual(mock_search.call_count, 1)
+        self.assertEqual(mock_msearch.call_count, 1)
+
+    @override_settings(
+        RICHIE_SEARCH_SEPARATE_FACETS=True,
+        RICHIE_SEARCH_FACETS_CACHE_TIMEOUT=3600,
+        RICHIE_SEARCH_TIME_BUCKET=60000,
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch(
+        "richie.apps.search.viewsets.courses.get_faceted_definitions",
+        return_value={"new": {"position": 1}},
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_separate_facets_time_bucket(
+        self, mock_search, mock_facets, *_
+    ):
+        """
+        Cached facets should only be reused within the same bucket of time, as the
+        availability of courses depends on the current time.
+        """
+        mock_search.return_value = {
+            "hits": {"hits": [], "total": {"value": 0, "relation": "eq"}},
+            "aggregations": {"all_courses": {"some": "aggregations"}},
+        }
+        url = "/api/v1.0/courses/?scope=filters"
+
+        for now, call_count in [
+            ("2022-03-01 10:00:01", 1),
+            ("2022-03-01 10:00:59", 1),
+            ("2022-03-01 10:01:00", 2),
+        ]:
+            with mock.patch("arrow.utcnow", return_value=arrow.get(now)):
+                response = self.client.get(url)
+            self.assertEqual(response.data["filters"], {"new": {"position": 1}})
+            self.assertEqual(mock_search.call_count, call_count)
+            self.assertEqual(mock_facets.call_count, call_count)
+
+    @override_settings(RICHIE_SEARCH_SEPARATE_FACETS=True)
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {"some": "aggs"}),
+    )
+    @mock.patch.object(ES_CLIENT, "msearch")
+    def test_viewsets_courses_search_separate_facets_error(self, mock_msearch, *_):
+        """A failure of any of the searches of a multi search request should be raised."""
+        mock_msearch.return_value = {
+            "responses": [
+                {"hits": {"hits": [], "total": {"value": 0, "relation": "eq"}}},
+                {"error": {"type": "search_phase_execution_exception"}, "status": 400},
+            ]
+        }
+
+        with self.assertRaises(TransportError):
+            self.client.get("/api/v1.0/courses/")
+
+    @override_settings(RICHIE_ES_INDICES_PREFIX="richie")
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda form: (2, form.cleaned_data["offset"] or 0, {"some": "query"}, {}),
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_script_fields",
+        lambda *args: {"some": "fields"},
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_cursor_sort",
+        lambda *args: [{"some": "sort"}, {"page_id": {"order": "asc"}}],
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_cursor(self, mock_search, *_):
+        """
+        Results paginated with a cursor should start after the sort values of the last result
+        of the previous page, passed in an opaque cursor.
+        """
+        mock_search.return_value = {
+            "hits": {
+                "hits": [
+                    {"_id": 523, "sort": [1, "523"]},
+                    {"_id": 861, "sort": [2, "861"]},
+                ],
+                "total": {"value": 3, "relation": "eq"},
+            }
+        }
+
+        # The first page is requested with an empty cursor, the offset is ignored
+        response = self.client.get("/api/v1.0/courses/?scope=objects&cursor=&offset=5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["objects"], ["Course #523", "Course #861"])
+        next_cursor = response.data["meta"].pop("next_cursor")
+        self.assertEqual(
+            response.data["meta"], {"count": 2, "offset": 0, "total_count": 3}
+        )
+        mock_search.assert_called_once_with(
+            _source=mock.ANY,
+            body={
+                "query": {"some": "query"},
+                "script_fields": {"some": "fields"},
+                "sort": [{"some": "sort"}, {"page_id": {"order": "asc"}}],
+            },
+            from_=0,
+            index="richie_courses",
+            size=2,
+        )
+
+        mock_search.return_value = {
+            "hits": {
+                "hits": [{"_id": 42, "sort": [3, 42]}],
+                "total": {"value": 3, "relation": "eq"},
+            }
+        }
+        response = self.client.get(
+            f"/api/v1.0/courses/?scope=objects&cursor={next_cursor:s}"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["objects"], ["Course #42"])
+        # This was the last page
+        self.assertIsNone(response.data["meta"]["next_cursor"])
+        self.assertEqual(mock_search.call_args[1]["body"]["search_after"], [2, "861"])
+
+    @override_settings(
+        RICHIE_ES_INDICES_PREFIX="richie", RICHIE_SEARCH_CURSOR_KEEP_ALIVE="1m"
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {}),
+    )
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.get_script_fields",
+        lambda *args: {"some": "fields"},
+    )
+    @mock.patch.object(ES_CLIENT, "open_point_in_time", return_value="pit-1")
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_cursor_point_in_time(
+        self, mock_search, mock_pit, *_
+    ):
+        """
+        Searches paginated with a cursor should be tied to a point in time if configured,
+        opened for the first page and carried by the cursor to the next pages.
+        """
+        mock_search.return_value = {
+            "pit_id": "pit-2",
+            "hits": {
+                "hits": [{"_id": 523, "sort": [1, 7]}, {"_id": 861, "sort": [2, 8]}],
+                "total": {"value": 3, "relation": "eq"},
+            },
+        }
+
+        response = self.client.get("/api/v1.0/courses/?scope=objects&cursor=")
+
+        self.assertEqual(response.status_code, 200)
+        mock_pit.assert_called_once_with(index="richie_courses", keep_alive="1m")
+        self.assertIsNone(mock_search.call_args[1]["index"])
+        self.assertEqual(
+            mock_search.call_args[1]["body"]["pit"], {"id": "pit-1", "keep_alive": "1m"}
+        )
+
+        next_cursor = response.data["meta"]["next_cursor"]
+        response = self.client.get(
+            f"/api/v1.0/courses/?scope=objects&cursor={next_cursor:s}"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_pit.call_count, 1)
+        self.assertEqual(
+            mock_search.call_args[1]["body"]["pit"], {"id": "pit-2", "keep_alive": "1m"}
+        )
+        self.assertEqual(mock_search.call_args[1]["body"]["search_after"], [2, 8])
+
+    @override_settings(RICHIE_SEARCH_RESPONSE_CACHE_TIMEOUT=60)
+    @mock.patch(
+        "richie.apps.search.forms.CourseSearchForm.build_es_query",
+        lambda *args: (2, 0, {"some": "query"}, {}),
+    )
+    @mock.patch.object(ES_CLIENT, "search")
+    def test_viewsets_courses_search_cursor_not_cached(self, mock_search, *_):
+        """Pages of results paginated with a cursor should not be served from the cache."""
+        mock_search.return_value = {
+            "hits": {
+                "hits": [{"_id": 523, "sort": [1, "523"]}],
+                "total": {"value": 1, "relation": "eq"},
+            }
+        }
+
+        self.client.get("/api/v1.0/courses/?scope=objects&cursor=")
+        self.client.get("/api/v1.0/courses/?scope=objects&cursor=")
+
+        self.assertEqual(mock_search.call_count, 2)
+        self.assertEqual(get_response_cache_stats(), {"hits": 0, "misses": 0})
+
+    def test_viewsets_courses_search_cursor_invalid(self, *_):
+        """Error case: the cursor was not returned by a previous search."""
+        response = self.client.get("/api/v1.0/courses/?cursor=forged")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["errors"], {"cursor": ["Invalid cursor."]})
+
     def test_viewsets_courses_search_with_invalid_params(self, *_):
         """
         Error case: the query string params are not properly formatted
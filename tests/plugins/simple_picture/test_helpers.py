@@ -1,6 +1,7 @@
 """Testing helpers for Richie's simple picture plugin."""
 from unittest import mock
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from filer.utils.filer_easy_thumbnails import FilerThumbnailer
@@ -107,3 +108,51 @@ class SimplePictureHelpersTestCase(TestCase):
         simple_picture = PictureFactory(picture=None)
         info = get_picture_info(simple_picture, "my-preset")
         self.assertEqual(info, None)
+
+    @mock.patch.dict(
+        SIMPLEPICTURE_PRESETS, {"my-preset": {"src": {"size": (500, 500)}}}
+    )
+    @mock.patch.object(FilerThumbnailer, "get_thumbnail", return_value=DummyThumbnail())
+    def test_helpers_simplepicture_get_picture_info_cached(self, mock_thumbnail):
+        """
+        The information of a picture should be cached until its image or the preset are
+        modified.
+        """
+        simple_picture = PictureFactory()
+        info = get_picture_info(simple_picture, "my-preset")
+        self.assertEqual(mock_thumbnail.call_count, 1)
+
+        self.assertEqual(get_picture_info(simple_picture, "my-preset"), info)
+        self.assertEqual(mock_thumbnail.call_count, 1)
+
+        # Moving the subject location of the image invalidates the cache
+        simple_picture.picture.subject_location = "10,10"
+        simple_picture.picture.save()
+        get_picture_info(simple_picture, "my-preset")
+        self.assertEqual(mock_thumbnail.call_count, 2)
+
+        # Changing the preset invalidates the cache
+        with mock.patch.dict(
+            SIMPLEPICTURE_PRESETS, {"my-preset": {"src": {"size": (600, 600)}}}
+        ):
+            get_picture_info(simple_picture, "my-preset")
+        self.assertEqual(mock_thumbnail.call_count, 3)
+
+        cache.clear()
+
+    @mock.patch.object(FilerThumbnailer, "get_thumbnail", return_value=DummyThumbnail())
+    def test_helpers_simplepicture_get_picture_info_cached_fallback(
+        self, mock_thumbnail
+    ):
+        """
+        Names without a preset in settings, like the name of a placeholder, should share the
+        cached information of the "default" preset they fall back to.
+        """
+        simple_picture = PictureFactory()
+        info = get_picture_info(simple_picture, "default")
+        self.assertEqual(mock_thumbnail.call_count, 3)
+
+        self.assertEqual(get_picture_info(simple_picture, "unknown-slot"), info)
+        self.assertEqual(mock_thumbnail.call_count, 3)
+
+        cache.clear()